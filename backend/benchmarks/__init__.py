@@ -0,0 +1,15 @@
+"""
+Banco de pruebas de rendimiento reproducible.
+
+    cd backend
+    python -m benchmarks --sizes 1kb,1mb,10mb --output results.json
+    python -m benchmarks --sizes 1mb --baseline benchmarks/baseline.json --fail-on-regression
+
+Los genomas se generan de forma determinista (genomes.py) y los casos
+(cases.py) miden normalización, subida, cada motor de búsqueda,
+persistencia y serialización sobre una BD de pruebas temporal. El runner
+(runner.py) escribe los resultados en JSON y los compara con una línea base.
+
+replay.py (`python -m benchmarks.replay`) reproduce contra un servidor la
+carga grabada con REQUEST_RECORDING y resume sus percentiles de latencia.
+"""
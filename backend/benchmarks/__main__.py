@@ -0,0 +1,79 @@
+"""Línea de comandos del banco de pruebas: `python -m benchmarks --help`."""
+
+import argparse
+import os
+import sys
+
+import django
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument('--sizes', default="1kb,100kb,1mb",
+                        help="Tamaños de genoma separados por comas (b, kb, mb, gb; de 1kb a 1gb)")
+    parser.add_argument('--cases', nargs='*',
+                        help="Casos, grupos o claves a ejecutar (admite comodines); por defecto todos")
+    parser.add_argument('--repeats', type=int, default=5, help="Repeticiones medidas por caso")
+    parser.add_argument('--warmup', type=int, default=1, help="Repeticiones de calentamiento sin medir")
+    parser.add_argument('--max-seconds', type=float, default=30.0,
+                        help="Deja de repetir un caso al superar este tiempo (0 = sin límite)")
+    parser.add_argument('--gc', type=float, default=0.41, help="Proporción de G/C")
+    parser.add_argument('--repeat-fraction', type=float, default=0.05,
+                        help="Fracción del genoma en repeticiones en tándem")
+    parser.add_argument('--repeat-unit', type=int, default=6, help="Bases de la unidad repetida")
+    parser.add_argument('--n-run-every', type=int, default=100_000,
+                        help="Un tramo de N cada tantas bases en promedio (0 = sin N)")
+    parser.add_argument('--n-run-length', type=int, default=100, help="Longitud de los tramos de N")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla de los genomas")
+    parser.add_argument('--no-grpc', action='store_true', help="No arrancar el servidor gRPC de referencia")
+    parser.add_argument('--output', help="Fichero JSON de resultados")
+    parser.add_argument('--baseline', help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="Margen relativo antes de considerar regresión (0.10 = 10%%)")
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help="Termina con código 1 si hay regresiones frente a --baseline")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = _parser().parse_args(argv)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    django.setup()
+
+    from contextlib import nullcontext
+
+    from .cases import default_cases
+    from .genomes import GenomeSpec, parse_size
+    from .runner import (
+        STATUS_REGRESSION, benchmark_database, build_report, compare, format_comparison,
+        load_report, reference_grpc_server, run_suite, select_cases, write_report,
+    )
+
+    sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    spec = GenomeSpec(
+        size=0, gc=args.gc, repeat_fraction=args.repeat_fraction, repeat_unit=args.repeat_unit,
+        n_run_every=args.n_run_every, n_run_length=args.n_run_length, seed=args.seed,
+    )
+
+    with benchmark_database(), (nullcontext() if args.no_grpc else reference_grpc_server()) as grpc_address:
+        cases = select_cases(default_cases(grpc_address), args.cases)
+        results = run_suite(sizes, spec, cases, args.repeats, args.warmup, args.max_seconds or None)
+        report = build_report(results, spec)
+
+    if args.output:
+        write_report(report, args.output)
+        print(f"Resultados en {args.output}")
+
+    if args.baseline:
+        rows = compare(report, load_report(args.baseline), args.tolerance)
+        print(format_comparison(rows))
+        regressions = [row for row in rows if row['status'] == STATUS_REGRESSION]
+        if regressions:
+            print(f"{len(regressions)} regresiones (tolerancia {args.tolerance:.0%})")
+            if args.fail_on_regression:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Casos del banco de pruebas: cada uno prepara sus datos una vez (sin medir),
+deja el estado listo antes de cada repetición (sin medir) y mide run().
+
+Los casos que usan la base de datos trabajan sobre la BD de pruebas que
+crea el runner, nunca sobre la real. Importar este módulo requiere Django
+ya configurado (django.setup()).
+"""
+
+import itertools
+from typing import Dict, List, Optional
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from search_api.models import SearchJob, SearchResult, SearchResultChunk
+from search_api.persistence import ResultWriter
+from search_api.result_store import read_results, write_positions
+from search_api.serializers import SearchJobSerializer, SearchResultSerializer
+from search_api.services import iter_matches, run_grpc_search, run_local_search
+from sequences_api.models import DNASequence
+from sequences_api.serializers import DNASequenceUploadSerializer
+from .genomes import GenomeSpec, iter_fasta
+
+# Límites por encima de los cuales un caso no aplica (los de la propia app).
+# El de subida vale también para la normalización: solo se aplica a subidas.
+MAX_UPLOAD_BYTES = 150 * 1000 * 1000
+MAX_GRPC_BYTES = 100 * 1000 * 1000
+MAX_DB_GENOME_BYTES = 50 * 1000 * 1000
+
+# Coincidencias que se escriben en los casos de persistencia
+PERSIST_MATCHES = 100_000
+
+# Resultados por página en el caso de serialización (máximo de la API)
+SERIALIZE_PAGE = 500
+
+
+class Case:
+    """Caso de benchmark. `name` y `params` identifican el resultado junto con el tamaño."""
+
+    name = ""
+    group = ""
+
+    def __init__(self, **params):
+        self.params = params
+
+    def supports(self, spec: GenomeSpec) -> bool:
+        return True
+
+    def prepare(self, genome: str, spec: GenomeSpec, patterns: Dict[str, str]):
+        """Una vez por tamaño, sin medir."""
+
+    def before_each(self):
+        """Antes de cada repetición, sin medir."""
+
+    def run(self):
+        raise NotImplementedError
+
+    def teardown(self):
+        """Al terminar el tamaño."""
+
+    @property
+    def key(self) -> str:
+        if not self.params:
+            return self.name
+        return f"{self.name}[{','.join(f'{k}={v}' for k, v in sorted(self.params.items()))}]"
+
+
+class NormalizeCase(Case):
+    """Limpieza y validación del texto subido (FASTA en minúsculas, líneas de 60)."""
+
+    name = "normalize"
+    group = "upload"
+
+    def supports(self, spec):
+        return spec.size <= MAX_UPLOAD_BYTES
+
+    def prepare(self, genome, spec, patterns):
+        self.text = b"".join(iter_fasta(spec, lowercase=True)).decode('ascii')
+        self.parse = DNASequenceUploadSerializer()._parse_sequence
+
+    def run(self):
+        return len(self.parse(self.text))
+
+
+class UploadCase(Case):
+    """Subida completa: lectura, hash, deduplicación, parseo e INSERT."""
+
+    name = "upload"
+    group = "upload"
+
+    def supports(self, spec):
+        return spec.size <= MAX_UPLOAD_BYTES
+
+    def prepare(self, genome, spec, patterns):
+        self.content = b"".join(iter_fasta(spec))
+
+    def before_each(self):
+        DNASequence.objects.all().delete()
+
+    def run(self):
+        serializer = DNASequenceUploadSerializer(
+            data={'file': SimpleUploadedFile("genome.fasta", self.content)}
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.save().length
+
+
+class SearchCase(Case):
+    """Búsqueda de un patrón con un motor ('local' o 'grpc' contra el servidor de referencia)."""
+
+    name = "search"
+    group = "search"
+
+    def __init__(self, engine: str, pattern: str, grpc_address: Optional[str] = None):
+        super().__init__(engine=engine, pattern=pattern)
+        self.grpc_address = grpc_address
+
+    def supports(self, spec):
+        if self.params['engine'] == 'grpc':
+            return self.grpc_address is not None and spec.size <= MAX_GRPC_BYTES
+        return True
+
+    def prepare(self, genome, spec, patterns):
+        self.genome = genome
+        self.pattern = patterns[self.params['pattern']]
+
+    def run(self):
+        if self.params['engine'] == 'grpc':
+            host, port = self.grpc_address.rsplit(':', 1)
+            with override_settings(GRPC_HOST=host, GRPC_PORT=port, GRPC_BACKENDS=[], GRPC_TIMEOUT_SECONDS=600):
+                return run_grpc_search(self.genome, self.pattern)['total_matches']
+        # Como en execute_job: las coincidencias se consumen en streaming
+        count = itertools.count()
+        return run_local_search(self.genome, self.pattern, sink=lambda match: next(count))['total_matches']
+
+
+class _JobCase(Case):
+    """Base de los casos que necesitan una secuencia y un job en la BD."""
+
+    def _create_job(self, sequence_text: str, pattern: str):
+        sequence = DNASequence.objects.create(name="benchmark", sequence=sequence_text)
+        return SearchJob.objects.create(sequence=sequence, pattern=pattern, status='PROCESSING')
+
+    def teardown(self):
+        DNASequence.objects.all().delete()
+
+
+class PersistCase(_JobCase):
+    """Escritura en streaming de las coincidencias con ResultWriter ('compact' o 'rows')."""
+
+    name = "persist"
+    group = "persistence"
+
+    def __init__(self, storage: str):
+        super().__init__(storage=storage)
+
+    def prepare(self, genome, spec, patterns):
+        pattern = patterns['short']
+        self.matches: List[Dict] = list(itertools.islice(iter_matches(genome, pattern), PERSIST_MATCHES))
+        # La escritura no lee el texto de la secuencia: basta una fila pequeña
+        self.job = self._create_job("ACGT", pattern)
+
+    def before_each(self):
+        SearchResultChunk.objects.filter(job=self.job).delete()
+        SearchResult.objects.filter(job=self.job).delete()
+
+    def run(self):
+        with override_settings(SEARCH_RESULT_STORAGE=self.params['storage']):
+            with ResultWriter(self.job) as writer:
+                for match in self.matches:
+                    writer.add(match)
+        return writer.written
+
+
+class SerializeCase(_JobCase):
+    """Primera página de resultados: lectura, serializer de DRF y render JSON."""
+
+    name = "serialize"
+    group = "serialization"
+
+    def supports(self, spec):
+        return spec.size <= MAX_DB_GENOME_BYTES
+
+    def prepare(self, genome, spec, patterns):
+        pattern = patterns['short']
+        self.job = self._create_job(genome, pattern)
+        positions = [m['position'] for m in itertools.islice(iter_matches(genome, pattern), SERIALIZE_PAGE)]
+        write_positions(self.job, positions)
+        self.renderer = JSONRenderer()
+
+    def run(self):
+        payload = {
+            'job': SearchJobSerializer(self.job).data,
+            'results': SearchResultSerializer(read_results(self.job, 0, SERIALIZE_PAGE), many=True).data,
+        }
+        return len(self.renderer.render(payload))
+
+
+PATTERN_LENGTHS = {'short': 4, 'long': 20}
+
+
+def default_cases(grpc_address: Optional[str] = None) -> List[Case]:
+    cases: List[Case] = [NormalizeCase(), UploadCase()]
+    for engine in ('local', 'grpc'):
+        for pattern in ('short', 'long', 'absent'):
+            cases.append(SearchCase(engine, pattern, grpc_address))
+    cases += [PersistCase('compact'), PersistCase('rows'), SerializeCase()]
+    return cases
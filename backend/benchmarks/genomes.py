@@ -0,0 +1,149 @@
+"""
+Generadores deterministas de genomas sintéticos.
+
+La misma GenomeSpec produce siempre los mismos bytes, en cualquier máquina
+y versión de Python 3.9+: cada bloque de BLOCK_SIZE bytes sale de un
+random.Random con semilla propia (semilla de la spec + índice del bloque),
+así un bloque no depende de cómo se consumieron los anteriores y se puede
+generar 1 Gb por bloques sin tenerlo entero en memoria.
+
+Rasgos que afectan al rendimiento del motor y de la persistencia:
+- `gc`: proporción de G/C (sesgo de composición; resolución 1/256).
+- `repeat_fraction`: fracción del genoma en repeticiones en tándem de una
+  unidad de `repeat_unit` bases (disparan las coincidencias solapadas).
+- `n_run_every` / `n_run_length`: tramos de N (huecos de ensamblado).
+"""
+
+import random
+import re
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator
+
+BLOCK_SIZE = 1 << 20
+
+# Longitud de cada tramo repetido dentro de un bloque
+REPEAT_TRACT_LENGTH = 600
+
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(b|kb|mb|gb)?\s*$", re.IGNORECASE)
+_UNITS = {None: 1, 'b': 1, 'kb': 1_000, 'mb': 1_000_000, 'gb': 1_000_000_000}
+
+
+def parse_size(text: str) -> int:
+    """'1kb' -> 1000, '2.5mb' -> 2500000, '1gb' -> 10**9 (unidades decimales, como en genómica)."""
+    match = _SIZE_RE.match(str(text))
+    if not match:
+        raise ValueError(f"Tamaño no válido: {text!r}")
+    unit = match.group(2).lower() if match.group(2) else None
+    return int(float(match.group(1)) * _UNITS[unit])
+
+
+def format_size(size: int) -> str:
+    for unit, factor in (('gb', 1_000_000_000), ('mb', 1_000_000), ('kb', 1_000)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return f"{size}b"
+
+
+@dataclass(frozen=True)
+class GenomeSpec:
+    size: int
+    gc: float = 0.41
+    repeat_fraction: float = 0.0
+    repeat_unit: int = 6
+    n_run_every: int = 0
+    n_run_length: int = 100
+    seed: int = 0
+
+    def __post_init__(self):
+        if not 0.0 <= self.gc <= 1.0:
+            raise ValueError("gc debe estar entre 0 y 1")
+        if not 0.0 <= self.repeat_fraction <= 1.0:
+            raise ValueError("repeat_fraction debe estar entre 0 y 1")
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _base_table(gc: float) -> bytes:
+    """Traducción byte aleatorio -> base con la proporción de G/C pedida."""
+    threshold = round(gc * 256)
+    return bytes(
+        (b"GC"[value % 2] if value < threshold else b"AT"[value % 2]) for value in range(256)
+    )
+
+
+def _block(spec: GenomeSpec, index: int, length: int, table: bytes) -> bytearray:
+    rng = random.Random(f"{spec.seed}:{index}")
+    data = bytearray(rng.randbytes(length).translate(table))
+
+    if spec.repeat_fraction and length > REPEAT_TRACT_LENGTH:
+        unit_length = max(1, spec.repeat_unit)
+        tract = min(REPEAT_TRACT_LENGTH, length)
+        for _ in range(int(length * spec.repeat_fraction / tract)):
+            start = rng.randrange(length - tract)
+            unit = bytes(data[start:start + unit_length])
+            data[start:start + tract] = (unit * (tract // unit_length + 1))[:tract]
+
+    if spec.n_run_every:
+        run = min(spec.n_run_length, length)
+        runs, remainder = divmod(length, spec.n_run_every)
+        if rng.random() < remainder / spec.n_run_every:
+            runs += 1
+        for _ in range(runs):
+            start = rng.randrange(length - run + 1)
+            data[start:start + run] = b"N" * run
+    return data
+
+
+def iter_genome(spec: GenomeSpec) -> Iterator[bytes]:
+    """Bytes ASCII del genoma en bloques de BLOCK_SIZE (el último puede ser menor)."""
+    table = _base_table(spec.gc)
+    for index, offset in enumerate(range(0, spec.size, BLOCK_SIZE)):
+        yield bytes(_block(spec, index, min(BLOCK_SIZE, spec.size - offset), table))
+
+
+def generate_genome(spec: GenomeSpec) -> str:
+    """Genoma completo como str (ocupa `size` bytes en memoria)."""
+    buffer = bytearray(spec.size)
+    offset = 0
+    for block in iter_genome(spec):
+        buffer[offset:offset + len(block)] = block
+        offset += len(block)
+    return buffer.decode('ascii')
+
+
+def iter_fasta(spec: GenomeSpec, name: str = "synthetic", width: int = 60,
+               lowercase: bool = False) -> Iterator[bytes]:
+    """
+    Como to_fasta(generate_genome(spec)) pero en bytes y por bloques: sin el
+    genoma, su copia en minúsculas ni una cadena por línea en memoria.
+    """
+    yield f">{name}\n".encode('ascii')
+    pending = b""
+    for block in iter_genome(spec):
+        data = pending + (block.lower() if lowercase else block)
+        full = len(data) - len(data) % width
+        if full:
+            yield b"\n".join(data[i:i + width] for i in range(0, full, width)) + b"\n"
+        pending = data[full:]
+    if pending:
+        yield pending + b"\n"
+
+
+def to_fasta(sequence: str, name: str = "synthetic", width: int = 60, lowercase: bool = False) -> str:
+    """Texto FASTA con líneas de `width` bases, como las que llegan a la subida."""
+    body = sequence.lower() if lowercase else sequence
+    lines = [f">{name}"]
+    lines.extend(body[i:i + width] for i in range(0, len(body), width))
+    return "\n".join(lines) + "\n"
+
+
+def sample_pattern(sequence: str, length: int, seed: int = 0) -> str:
+    """Patrón presente en la secuencia (sin N), elegido de forma determinista."""
+    rng = random.Random(f"pattern:{seed}:{length}")
+    for _ in range(1000):
+        start = rng.randrange(max(1, len(sequence) - length))
+        candidate = sequence[start:start + length]
+        if len(candidate) == length and "N" not in candidate:
+            return candidate
+    raise ValueError("No se encontró un tramo sin N para el patrón")
@@ -0,0 +1,380 @@
+"""
+Reproducción de una carga grabada con REQUEST_RECORDING (config/recording.py).
+
+    cd backend
+    python -m benchmarks.replay --file /tmp/dna-workload.jsonl --url http://127.0.0.1:8000 \\
+        --speedup 4 --concurrency 16 --output replay.json
+
+1. Preparación: por cada secuencia referenciada en la grabación se sube un
+   genoma sintético (genomes.py) con la misma longitud y % GC; la semilla
+   sale de la referencia, así la misma grabación genera siempre los mismos
+   genomas. Las secuencias que la grabación sube se suben al reproducirla.
+2. Reproducción: cada petición sale en su instante original dividido por
+   `speedup` (0 = sin esperas), con como mucho `concurrency` en vuelo. Si
+   todas las conexiones están ocupadas, la petición espera y ese retraso se
+   informa como `lag`. Los patrones redactados se sustituyen por uno
+   aleatorio de la misma longitud. Las peticiones a un job usan el job que
+   creó la búsqueda reproducida; si aún no existe se omiten (`skipped`).
+3. Informe: por endpoint, número de peticiones, errores (5xx o fallo de
+   conexión), estados distintos de los grabados y percentiles de latencia
+   reproducida frente a la grabada.
+
+No necesita Django: solo habla HTTP con el servidor.
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .genomes import GenomeSpec, generate_genome, to_fasta
+
+PERCENTILES = (50, 90, 95, 99)
+
+SEARCH_ENDPOINTS = ('api/search/', 'api/search/explain/')
+UPLOAD_ENDPOINT = 'api/sequences/upload/'
+BATCH_ENDPOINT = 'api/search/batch/'
+JOB_PARAM = '<int:pk>'
+
+DEFAULT_GC = 41.0
+
+# (método, ruta, cuerpo JSON, fichero (nombre, contenido), cabeceras) -> (estado, JSON de respuesta)
+Transport = Callable[[str, str, Optional[Dict], Optional[Tuple[str, bytes]], Dict], Tuple[int, Optional[Dict]]]
+
+
+def load_workload(path: str, include_rotated: bool = True) -> List[Dict]:
+    """Entradas de la grabación (y de sus ficheros rotados) en orden de llegada."""
+    paths = [path]
+    if include_rotated:
+        index = 1
+        while os.path.exists(f"{path}.{index}"):
+            paths.append(f"{path}.{index}")
+            index += 1
+    entries = []
+    for name in paths:
+        with open(name) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and entry.get('endpoint') and 'ts' in entry:
+                    entries.append(entry)
+    entries.sort(key=lambda entry: entry['ts'])
+    return entries
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def _seed(ref: str) -> int:
+    return int(ref[:8], 16) if ref else 0
+
+
+def synthetic_sequence(ref: str, length: int, gc_content: Optional[float]) -> str:
+    gc = (gc_content if gc_content is not None else DEFAULT_GC) / 100
+    return generate_genome(GenomeSpec(size=length, gc=min(1.0, max(0.0, gc)), seed=_seed(ref)))
+
+
+def http_transport(base_url: str, timeout: float = 300.0) -> Transport:
+    """Transporte con urllib contra `base_url`; los multipart se construyen a mano."""
+    base_url = base_url.rstrip('/')
+
+    def send(method, path, body=None, upload=None, headers=None):
+        headers = dict(headers or {})
+        data = None
+        if upload is not None:
+            boundary = uuid.uuid4().hex
+            filename, content = upload
+            data = b"".join([
+                f"--{boundary}\r\n".encode(),
+                f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'.encode(),
+                b"Content-Type: text/plain\r\n\r\n",
+                content,
+                f"\r\n--{boundary}--\r\n".encode(),
+            ])
+            headers['Content-Type'] = f"multipart/form-data; boundary={boundary}"
+        elif body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(base_url + path, data=data, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                status, payload, content_type = response.status, response.read(), response.headers.get('Content-Type')
+        except urllib.error.HTTPError as exc:
+            status, payload, content_type = exc.code, exc.read(), exc.headers.get('Content-Type')
+        if content_type and content_type.startswith('application/json'):
+            try:
+                return status, json.loads(payload)
+            except ValueError:
+                pass
+        return status, None
+
+    return send
+
+
+class Replayer:
+    """Reproduce una lista de entradas con un transporte dado."""
+
+    def __init__(self, entries: Iterable[Dict], transport: Transport, speedup: float = 1.0,
+                 concurrency: int = 8, seed: int = 0, log=print):
+        self.entries = list(entries)
+        self.transport = transport
+        self.speedup = speedup
+        self.concurrency = max(1, concurrency)
+        self.rng = random.Random(seed)
+        self.log = log
+        self.sequences: Dict[str, int] = {}
+        self.jobs: Dict[str, int] = {}
+        self.elapsed_s = 0.0
+        self._lock = threading.Lock()
+
+    # Preparación
+
+    def _referenced_sequences(self) -> Dict[str, Dict]:
+        uploaded = {
+            entry['request'].get('sequence_ref')
+            for entry in self.entries
+            if entry['endpoint'] == UPLOAD_ENDPOINT and entry.get('request')
+        }
+        shapes: Dict[str, Dict] = {}
+        for entry in self.entries:
+            request = entry.get('request') or {}
+            for shape in [request] + list(request.get('sequences') or []):
+                ref = shape.get('sequence_ref')
+                if ref and ref not in uploaded and shape.get('sequence_length'):
+                    shapes.setdefault(ref, shape)
+        return shapes
+
+    @staticmethod
+    def _fasta(ref: str, length: int, gc_content: Optional[float]) -> Tuple[str, bytes]:
+        text = to_fasta(synthetic_sequence(ref, length, gc_content), name=f"replay-{ref}")
+        return f"replay-{ref}.fasta", text.encode()
+
+    def prepare(self):
+        """Sube un genoma sintético por cada secuencia buscada que la grabación no sube."""
+        for ref, shape in self._referenced_sequences().items():
+            upload = self._fasta(ref, shape['sequence_length'], shape.get('gc_content'))
+            status, data = self.transport('POST', '/' + UPLOAD_ENDPOINT, None, upload, {})
+            if status in (200, 201) and data:
+                self.sequences[ref] = data['id']
+            else:
+                self.log(f"No se pudo preparar la secuencia {ref} ({status})")
+        self.log(f"Preparadas {len(self.sequences)} secuencias")
+
+    # Traducción de entradas
+
+    def _pattern(self, shape: Dict) -> str:
+        if shape.get('pattern'):
+            return shape['pattern']
+        return "".join(self.rng.choice("ACGT") for _ in range(shape.get('pattern_length') or 1))
+
+    def build_request(self, entry: Dict):
+        """(método, ruta, cuerpo, fichero) para la entrada, o None si falta una referencia."""
+        endpoint, method = entry['endpoint'], entry['method']
+        request = entry.get('request') or {}
+        body = upload = None
+        if endpoint in SEARCH_ENDPOINTS:
+            sequence_id = self.sequences.get(request.get('sequence_ref'))
+            if sequence_id is None:
+                return None
+            body = {'sequence_id': sequence_id, 'pattern': self._pattern(request)}
+            body.update({key: request[key] for key in ('allow_overlapping', 'mode', 'priority', 'timeout_seconds')
+                         if request.get(key) is not None})
+        elif endpoint == BATCH_ENDPOINT:
+            ids = [self.sequences.get(shape.get('sequence_ref')) for shape in request.get('sequences') or []]
+            if not ids or None in ids:
+                return None
+            body = {'sequence_ids': ids, 'patterns': [self._pattern(shape) for shape in request.get('patterns') or []]}
+            if 'allow_overlapping' in request:
+                body['allow_overlapping'] = request['allow_overlapping']
+        elif endpoint == UPLOAD_ENDPOINT:
+            if not request.get('sequence_length'):
+                return None
+            ref = request.get('sequence_ref') or uuid.uuid4().hex
+            upload = self._fasta(ref, request['sequence_length'], request.get('gc_content'))
+
+        path = '/' + endpoint
+        if JOB_PARAM in path:
+            job_id = self.jobs.get(entry.get('job_ref'))
+            if job_id is None:
+                return None
+            path = path.replace(JOB_PARAM, str(job_id))
+        if '<' in path:
+            return None
+        if entry.get('query'):
+            path += '?' + urllib.parse.urlencode(entry['query'])
+        return method, path, body, upload
+
+    def _remember(self, entry: Dict, status: int, data: Optional[Dict]):
+        if not data or status >= 400:
+            return
+        request = entry.get('request') or {}
+        with self._lock:
+            if entry['endpoint'] == UPLOAD_ENDPOINT and request.get('sequence_ref') and 'id' in data:
+                self.sequences[request['sequence_ref']] = data['id']
+            elif entry.get('job_ref') and isinstance(data.get('job'), dict):
+                self.jobs[entry['job_ref']] = data['job']['id']
+
+    # Reproducción
+
+    def _execute(self, entry: Dict, target: float) -> Dict:
+        started = time.perf_counter()
+        result = {
+            'endpoint': f"{entry['method']} {entry['endpoint']}",
+            'recorded_status': entry.get('status'),
+            'recorded_ms': entry.get('duration_ms'),
+            'lag_ms': max(0.0, (started - target) * 1000),
+        }
+        built = self.build_request(entry)
+        if built is None:
+            result['skipped'] = True
+            return result
+        method, path, body, upload = built
+        headers = {'X-Client-Id': f"replay-{entry['client']}"} if entry.get('client') else {}
+        t0 = time.perf_counter()
+        try:
+            status, data = self.transport(method, path, body, upload, headers)
+        except OSError as exc:
+            result.update(latency_ms=(time.perf_counter() - t0) * 1000, status=None, error=str(exc))
+            return result
+        result.update(latency_ms=(time.perf_counter() - t0) * 1000, status=status)
+        self._remember(entry, status, data)
+        return result
+
+    def run(self) -> List[Dict]:
+        """Lanza las entradas respetando sus tiempos relativos; devuelve un resultado por entrada."""
+        if not self.entries:
+            return []
+        first = self.entries[0]['ts']
+        start = time.perf_counter()
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="replay") as pool:
+            for entry in self.entries:
+                offset = (entry['ts'] - first) / self.speedup if self.speedup > 0 else 0.0
+                target = start + offset
+                delay = target - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(self._execute, entry, target))
+        self.elapsed_s = time.perf_counter() - start
+        return [future.result() for future in futures]
+
+
+def _latency_stats(values: List[float]) -> Dict:
+    stats = {f"p{pct}": percentile(values, pct) for pct in PERCENTILES}
+    stats['max'] = max(values) if values else None
+    return stats
+
+
+def build_report(results: List[Dict], elapsed_s: float) -> Dict:
+    """Percentiles de latencia reproducida y grabada por endpoint y en total."""
+    groups: Dict[str, List[Dict]] = {}
+    for result in results:
+        groups.setdefault(result['endpoint'], []).append(result)
+    groups['total'] = results
+
+    endpoints = {}
+    for name, rows in groups.items():
+        sent = [row for row in rows if not row.get('skipped')]
+        endpoints[name] = {
+            'requests': len(sent),
+            'skipped': len(rows) - len(sent),
+            'errors': sum(1 for row in sent if row['status'] is None or row['status'] >= 500),
+            'status_mismatches': sum(1 for row in sent if row['status'] != row['recorded_status']),
+            'latency_ms': _latency_stats([row['latency_ms'] for row in sent]),
+            'recorded_ms': _latency_stats([row['recorded_ms'] for row in sent if row['recorded_ms'] is not None]),
+            'lag_ms': _latency_stats([row['lag_ms'] for row in sent]),
+        }
+    sent = endpoints['total']['requests']
+    return {
+        'elapsed_s': elapsed_s,
+        'requests_per_s': sent / elapsed_s if elapsed_s else None,
+        'endpoints': endpoints,
+    }
+
+
+def _ms(value: Optional[float]) -> str:
+    return f"{value:9.1f}" if value is not None else f"{'-':>9}"
+
+
+def format_report(report: Dict) -> str:
+    lines = [
+        f"{report['endpoints']['total']['requests']} peticiones en {report['elapsed_s']:.1f} s"
+        + (f" ({report['requests_per_s']:.1f}/s)" if report['requests_per_s'] else ""),
+        f"{'endpoint':40} {'n':>6} {'err':>5} {'≠est':>5} {'omit':>5} "
+        + " ".join(f"{'p' + str(pct):>9}" for pct in PERCENTILES) + f" {'max':>9} {'grab p50':>9} {'grab p95':>9}",
+    ]
+    for name, stats in report['endpoints'].items():
+        latency, recorded = stats['latency_ms'], stats['recorded_ms']
+        lines.append(
+            f"{name:40} {stats['requests']:6d} {stats['errors']:5d} {stats['status_mismatches']:5d} "
+            f"{stats['skipped']:5d} " + " ".join(_ms(latency[f'p{pct}']) for pct in PERCENTILES)
+            + f" {_ms(latency['max'])} {_ms(recorded['p50'])} {_ms(recorded['p95'])}"
+        )
+    lines.append(f"Retraso de envío (lag) p95: {_ms(report['endpoints']['total']['lag_ms']['p95']).strip()} ms")
+    return "\n".join(lines)
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.replay", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--file', required=True, help="Grabación (REQUEST_RECORDING_FILE)")
+    parser.add_argument('--url', default="http://127.0.0.1:8000", help="Servidor contra el que reproducir")
+    parser.add_argument('--speedup', type=float, default=1.0,
+                        help="Factor de aceleración de los tiempos grabados (0 = sin esperas)")
+    parser.add_argument('--concurrency', type=int, default=8, help="Peticiones en vuelo como máximo")
+    parser.add_argument('--endpoint', nargs='*',
+                        help="Solo estos endpoints ('POST api/search/', admite comodines)")
+    parser.add_argument('--limit', type=int, help="Reproducir solo las primeras N peticiones")
+    parser.add_argument('--no-rotated', action='store_true', help="Ignorar los ficheros rotados (.1, .2...)")
+    parser.add_argument('--timeout', type=float, default=300.0, help="Timeout por petición (s)")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla de los patrones redactados")
+    parser.add_argument('--output', help="Fichero JSON con el informe")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = _parser().parse_args(argv)
+    entries = load_workload(args.file, include_rotated=not args.no_rotated)
+    if args.endpoint:
+        entries = [
+            entry for entry in entries
+            if any(fnmatch.fnmatchcase(f"{entry['method']} {entry['endpoint']}", pattern) for pattern in args.endpoint)
+        ]
+    if args.limit:
+        entries = entries[:args.limit]
+    if not entries:
+        print(f"Sin peticiones en {args.file}")
+        return 1
+
+    replayer = Replayer(entries, http_transport(args.url, args.timeout), args.speedup, args.concurrency, args.seed)
+    replayer.prepare()
+    report = build_report(replayer.run(), replayer.elapsed_s)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Informe en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
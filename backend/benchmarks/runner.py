@@ -0,0 +1,226 @@
+"""
+Ejecución, resultados en JSON y comparación con una línea base.
+
+Cada caso se mide por tamaño de genoma: una repetición de calentamiento y
+luego `repeats` repeticiones (menos si se agota `max_seconds`). Se guardan
+mínimo, mediana, media y desviación; la comparación usa la mediana.
+
+Formato del JSON:
+
+    {
+      "meta": {"created_at": ..., "python": ..., "platform": ..., "git_commit": ..., "genome": {...}},
+      "results": {
+        "search[engine=local,pattern=short]@1mb": {
+          "case": "search", "group": "search", "params": {...}, "size": 1000000,
+          "repeats": 5, "min_s": ..., "median_s": ..., "mean_s": ..., "stdev_s": ...,
+          "mb_per_s": ..., "output": ...
+        }
+      }
+    }
+"""
+
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from .cases import PATTERN_LENGTHS, Case, default_cases
+from .genomes import GenomeSpec, format_size, generate_genome, sample_pattern
+
+# Patrón que no aparece en los genomas generados (periodo 4, más largo que los tramos repetidos)
+ABSENT_PATTERN = "ACGT" * 5
+
+STATUS_OK = "ok"
+STATUS_REGRESSION = "regression"
+STATUS_IMPROVEMENT = "improvement"
+STATUS_NEW = "new"
+STATUS_MISSING = "missing"
+
+
+@contextmanager
+def benchmark_database() -> Iterator[None]:
+    """BD de pruebas temporal, como la de la suite de tests; la real no se toca."""
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def reference_grpc_server() -> Iterator[str]:
+    """Servidor gRPC de referencia (Python) en un puerto libre; devuelve su dirección."""
+    from search_api.grpc_server import create_server
+
+    server, port, _ = create_server("127.0.0.1", 0, max_workers=4)
+    try:
+        yield f"127.0.0.1:{port}"
+    finally:
+        server.stop(grace=None)
+
+
+def measure(case: Case, repeats: int = 5, warmup: int = 1, max_seconds: Optional[float] = None) -> Dict:
+    """Mide case.run() y devuelve las estadísticas de sus repeticiones."""
+    output = None
+    for _ in range(warmup):
+        case.before_each()
+        case.run()
+    timings: List[float] = []
+    started = time.perf_counter()
+    for _ in range(max(1, repeats)):
+        case.before_each()
+        t0 = time.perf_counter()
+        output = case.run()
+        timings.append(time.perf_counter() - t0)
+        if max_seconds is not None and time.perf_counter() - started >= max_seconds:
+            break
+    return {
+        'repeats': len(timings),
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+        'stdev_s': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'output': output,
+    }
+
+
+def patterns_for(genome: str, seed: int) -> Dict[str, str]:
+    patterns = {name: sample_pattern(genome, length, seed) for name, length in PATTERN_LENGTHS.items()}
+    patterns['absent'] = ABSENT_PATTERN
+    return patterns
+
+
+def select_cases(cases: Sequence[Case], selectors: Optional[Sequence[str]]) -> List[Case]:
+    """Filtra por nombre de caso, grupo o clave completa (admite comodines: 'search[engine=local*')."""
+    if not selectors:
+        return list(cases)
+    return [
+        case for case in cases
+        if any(fnmatch.fnmatchcase(value, selector)
+               for selector in selectors for value in (case.name, case.group, case.key))
+    ]
+
+
+def run_suite(sizes: Sequence[int], spec: GenomeSpec, cases: Optional[Sequence[Case]] = None,
+              repeats: int = 5, warmup: int = 1, max_seconds: Optional[float] = 30.0,
+              log=print) -> Dict:
+    """Ejecuta los casos para cada tamaño. Debe llamarse dentro de benchmark_database()."""
+    results: Dict[str, Dict] = {}
+    for size in sizes:
+        size_spec = replace(spec, size=size)
+        label = format_size(size)
+        log(f"== Genoma {label} (gc={spec.gc}, repeticiones={spec.repeat_fraction}, seed={spec.seed})")
+        genome = generate_genome(size_spec)
+        patterns = patterns_for(genome, spec.seed)
+        for case in cases if cases is not None else default_cases():
+            if not case.supports(size_spec):
+                log(f"   {case.key}: no aplica a {label}")
+                continue
+            case.prepare(genome, size_spec, patterns)
+            try:
+                stats = measure(case, repeats, warmup, max_seconds)
+            finally:
+                case.teardown()
+            stats.update(
+                case=case.name,
+                group=case.group,
+                params=case.params,
+                size=size,
+                mb_per_s=(size / 1e6) / stats['median_s'] if stats['median_s'] else None,
+            )
+            results[f"{case.key}@{label}"] = stats
+            log(f"   {case.key}: mediana {stats['median_s'] * 1000:.2f} ms ({stats['repeats']} rep.)")
+        del genome
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(results: Dict[str, Dict], spec: GenomeSpec) -> Dict:
+    return {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'git_commit': _git_commit(),
+            'database': connection.vendor,
+            'genome': {key: value for key, value in spec.as_dict().items() if key != 'size'},
+        },
+        'results': results,
+    }
+
+
+def write_report(report: Dict, path: str):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_report(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.10) -> List[Dict]:
+    """
+    Compara las medianas con las de la línea base. Una entrada es regresión
+    si tarda más de (1 + tolerance) veces lo de la base y mejora si tarda
+    menos de (1 - tolerance) veces.
+    """
+    rows = []
+    current_results = current.get('results', {})
+    baseline_results = baseline.get('results', {})
+    for key in sorted(set(current_results) | set(baseline_results)):
+        now = current_results.get(key)
+        before = baseline_results.get(key)
+        if before is None:
+            rows.append({'key': key, 'status': STATUS_NEW, 'current_s': now['median_s']})
+            continue
+        if now is None:
+            rows.append({'key': key, 'status': STATUS_MISSING, 'baseline_s': before['median_s']})
+            continue
+        ratio = now['median_s'] / before['median_s'] if before['median_s'] else float('inf')
+        if ratio > 1 + tolerance:
+            status = STATUS_REGRESSION
+        elif ratio < 1 - tolerance:
+            status = STATUS_IMPROVEMENT
+        else:
+            status = STATUS_OK
+        rows.append({
+            'key': key, 'status': status, 'ratio': ratio,
+            'baseline_s': before['median_s'], 'current_s': now['median_s'],
+        })
+    return rows
+
+
+def format_comparison(rows: List[Dict]) -> str:
+    lines = [f"{'caso':<60} {'base ms':>10} {'actual ms':>10} {'ratio':>7}  estado"]
+    for row in rows:
+        base = f"{row['baseline_s'] * 1000:.2f}" if 'baseline_s' in row else "-"
+        now = f"{row['current_s'] * 1000:.2f}" if 'current_s' in row else "-"
+        ratio = f"{row['ratio']:.2f}" if 'ratio' in row else "-"
+        lines.append(f"{row['key']:<60} {base:>10} {now:>10} {ratio:>7}  {row['status']}")
+    return "\n".join(lines)
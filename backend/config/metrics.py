@@ -0,0 +1,451 @@
+"""
+Registro de métricas del proceso, expuesto en /metrics (formato de texto de Prometheus).
+
+Tres tipos, con etiquetas por nombre:
+
+    UPLOAD_BYTES = registry.counter('dna_upload_bytes_total', 'Bytes subidos')
+    SEARCH_SECONDS = registry.histogram('dna_search_duration_seconds', 'Latencia', ['engine', 'route'])
+    SEARCH_SECONDS.observe(0.12, engine='naive-local', route='local')
+
+- Counter: solo crece (inc).
+- Gauge: valor actual (set/inc/dec). Con varios procesos se suman los de
+  los procesos vivos.
+- Histogram: cubetas fijas acumuladas, más suma y número de observaciones.
+
+Las actualizaciones toman un lock por métrica: son seguras entre hilos.
+Los valores que cuesta mantener al día (p. ej. bytes en caché) se fijan
+justo antes de exportar con `registry.on_collect(fn)`.
+
+Varios procesos (gunicorn, search_worker): con METRICS_MULTIPROCESS_DIR
+cada proceso vuelca su estado a `<dir>/<pid>-<id>.json` como mucho cada
+METRICS_FLUSH_SECONDS (al actualizar) y al salir, con rename atómico; /metrics
+suma su estado en vivo con los ficheros de los demás procesos. El id
+aleatorio evita que un pid reutilizado pise el fichero de un proceso muerto.
+Los contadores e histogramas de procesos que ya terminaron siguen contando;
+sus gauges no. Al exportar, los ficheros de procesos muertos se suman a
+`<dir>/archive.json` y se borran, para que el directorio no crezca con el
+reciclado de workers (p. ej. max_requests de gunicorn). Tras un fork el hijo
+empieza con los valores a cero y otro id para no contar dos veces los del
+padre.
+"""
+
+import atexit
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.http import HttpResponse
+
+try:
+    import fcntl
+except ImportError:  # Windows: los ficheros de procesos muertos no se compactan
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+# Cubetas por defecto para latencias en segundos
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    """Base común: nombre, ayuda, etiquetas y valores por combinación de etiquetas."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["MetricsRegistry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._registry = registry
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: etiquetas {sorted(labels)}, se esperaban {list(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _changed(self):
+        if self._registry is not None:
+            self._registry.maybe_flush()
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> Dict[LabelValues, object]:
+        with self._lock:
+            return {key: (list(value) if isinstance(value, list) else value) for key, value in self._values.items()}
+
+
+class Counter(Metric):
+    kind = COUNTER
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Un contador no puede decrecer")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self._changed()
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = GAUGE
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+        self._changed()
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self._changed()
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    """Cada valor es [n por cubeta..., n en +Inf, suma]; las cubetas se acumulan al exportar."""
+
+    kind = HISTOGRAM
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS, registry: Optional["MetricsRegistry"] = None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(float(b) for b in buckets if not math.isinf(b)))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+        self._changed()
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+            return sum(counts[:-1]) if counts else 0
+
+
+class MetricsRegistry:
+    """Métricas del proceso por nombre; counter()/gauge()/histogram() devuelven la existente si ya está."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+        self._collect_hooks: List[Callable[[], None]] = []
+        self._next_flush = 0.0
+        self._new_instance()
+
+    def _new_instance(self):
+        """Nombre del fichero de este proceso en el directorio compartido (otro tras un fork)."""
+        self._filename = f"{os.getpid()}-{uuid.uuid4().hex[:12]}.json"
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, registry=self, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Métrica {name} ya registrada con otro tipo o etiquetas")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def on_collect(self, hook: Callable[[], None]):
+        """Registra `hook` para actualizar gauges justo antes de exportar."""
+        self._collect_hooks.append(hook)
+
+    def reset(self):
+        """Pone a cero todas las métricas del proceso (pruebas y procesos hijos tras fork)."""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def _after_fork(self):
+        self.reset()
+        self._new_instance()
+        self._next_flush = 0.0
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Estado serializable del proceso: {nombre: {tipo, ayuda, etiquetas, cubetas, muestras}}."""
+        for hook in list(self._collect_hooks):
+            try:
+                hook()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Fallo actualizando métricas antes de exportar")
+        state = {}
+        for name, metric in list(self._metrics.items()):
+            state[name] = {
+                'kind': metric.kind,
+                'help': metric.documentation,
+                'labelnames': list(metric.labelnames),
+                'buckets': list(getattr(metric, 'buckets', [])),
+                'samples': [[list(key), value] for key, value in metric.samples().items()],
+            }
+        return state
+
+    # --- Varios procesos ---
+
+    def maybe_flush(self):
+        if multiprocess_dir() is None:
+            return
+        if time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def flush(self):
+        """Vuelca el estado del proceso a su fichero del directorio compartido."""
+        directory = multiprocess_dir()
+        if directory is None:
+            return
+        self._next_flush = time.monotonic() + getattr(settings, "METRICS_FLUSH_SECONDS", 1.0)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            _write_state(directory, self._filename, {'pid': os.getpid(), 'metrics': self.snapshot()})
+        except OSError as exc:
+            log.warning("No se pudieron volcar las métricas a %s: %s", directory, exc)
+
+    def aggregate(self) -> Dict[str, Dict]:
+        """Estado de este proceso sumado al de los demás procesos del directorio compartido."""
+        merged = self.snapshot()
+        directory = multiprocess_dir()
+        if directory is None or not os.path.isdir(directory):
+            return merged
+        merged = {name: dict(entry, samples=_sample_map(entry)) for name, entry in merged.items()}
+        _compact(directory)
+        archive = _read_state(os.path.join(directory, ARCHIVE_FILE)) or {}
+        _merge_into(merged, archive.get('metrics', {}), gauges=False)
+        folded = set(archive.get('folded', []))
+        for filename in os.listdir(directory):
+            if not _is_process_file(filename) or filename == self._filename or filename in folded:
+                continue
+            data = _read_state(os.path.join(directory, filename))
+            if data is not None:
+                _merge_into(merged, data.get('metrics', {}), gauges=_pid_alive(data.get('pid')))
+        for entry in merged.values():
+            entry['samples'] = [[list(key), value] for key, value in entry['samples'].items()]
+        return merged
+
+    def render(self) -> str:
+        return render_text(self.aggregate())
+
+
+ARCHIVE_FILE = "archive.json"
+_COMPACT_LOCK_FILE = ".compact.lock"
+
+
+def _is_process_file(filename: str) -> bool:
+    return filename.endswith(".json") and filename != ARCHIVE_FILE
+
+
+def _read_state(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # fichero a medio borrar o de otra versión
+
+
+def _merge_into(merged: Dict[str, Dict], metrics: Dict[str, Dict], gauges: bool):
+    """Suma `metrics` (estado volcado) a `merged` (muestras como dict)."""
+    for name, entry in metrics.items():
+        if entry['kind'] == GAUGE and not gauges:
+            continue
+        target = merged.setdefault(name, dict(entry, samples={}))
+        if target['kind'] != entry['kind'] or target['buckets'] != entry['buckets']:
+            continue
+        for key, value in _sample_map(entry).items():
+            target['samples'][key] = _add(target['samples'].get(key), value)
+
+
+def _write_state(directory: str, filename: str, data: Dict):
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as tmp:
+        json.dump(data, tmp)
+    os.replace(tmp_path, os.path.join(directory, filename))
+
+
+def _compact(directory: str):
+    """
+    Suma los contadores e histogramas de los procesos muertos a archive.json
+    y borra sus ficheros. `folded` lista los ficheros sumados en la última
+    pasada: si se cae antes de borrarlos, la siguiente los borra sin volver a
+    sumarlos (y mientras tanto aggregate los ignora).
+    """
+    if fcntl is None:
+        return
+    try:
+        with open(os.path.join(directory, _COMPACT_LOCK_FILE), "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # otro proceso está compactando
+            archive = _read_state(os.path.join(directory, ARCHIVE_FILE)) or {}
+            for filename in archive.get('folded', []):
+                _remove(os.path.join(directory, filename))
+
+            metrics = {name: dict(entry, samples=_sample_map(entry))
+                       for name, entry in archive.get('metrics', {}).items()}
+            folded = []
+            for filename in sorted(os.listdir(directory)):
+                if not _is_process_file(filename):
+                    continue
+                data = _read_state(os.path.join(directory, filename))
+                if data is None or _pid_alive(data.get('pid')):
+                    continue
+                _merge_into(metrics, data.get('metrics', {}), gauges=False)
+                folded.append(filename)
+            if not folded:
+                return
+            for entry in metrics.values():
+                entry['samples'] = [[list(key), value] for key, value in entry['samples'].items()]
+            _write_state(directory, ARCHIVE_FILE, {'folded': folded, 'metrics': metrics})
+            for filename in folded:
+                _remove(os.path.join(directory, filename))
+    except OSError as exc:
+        log.warning("No se pudieron compactar las métricas de %s: %s", directory, exc)
+
+
+def _remove(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _sample_map(entry: Dict) -> Dict[LabelValues, object]:
+    samples = entry['samples']
+    if isinstance(samples, dict):
+        return dict(samples)
+    return {tuple(key): value for key, value in samples}
+
+
+def _add(current, value):
+    if current is None:
+        return list(value) if isinstance(value, list) else value
+    if isinstance(value, list):
+        return [a + b for a, b in zip(current, value)]
+    return current + value
+
+
+def _pid_alive(pid) -> bool:
+    if not isinstance(pid, int):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def render_text(state: Dict[str, Dict]) -> str:
+    """Formato de exposición de texto de Prometheus (0.0.4)."""
+    lines = []
+    for name in sorted(state):
+        entry = state[name]
+        lines.append(f"# HELP {name} {_escape(entry['help'])}")
+        lines.append(f"# TYPE {name} {entry['kind']}")
+        names = entry['labelnames']
+        for key, value in sorted(_sample_map(entry).items()):
+            if entry['kind'] != HISTOGRAM:
+                lines.append(f"{name}{_labels(names, key)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(entry['buckets'] + [math.inf], value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(names, key, ('le', _number(float(bound))))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, key)} {_number(float(value[-1]))}")
+            lines.append(f"{name}_count{_labels(names, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def multiprocess_dir() -> Optional[str]:
+    return getattr(settings, "METRICS_MULTIPROCESS_DIR", None)
+
+
+registry = MetricsRegistry()
+
+
+def _flush_at_exit():
+    try:
+        registry.flush()
+    except Exception:  # pylint: disable=broad-except
+        pass
+
+
+atexit.register(_flush_at_exit)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=registry._after_fork)
+
+
+def metrics_view(request):
+    """GET /metrics: métricas de todos los procesos en formato de texto de Prometheus."""
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -1,3 +1,6 @@
+import time
+
+
 class SimpleCORSMiddleware:
     """
     Middleware simple para habilitar CORS sin dependencias externas.
@@ -16,8 +19,9 @@ class SimpleCORSMiddleware:
 
         # Encabezados CORS básicos
         response['Access-Control-Allow-Origin'] = '*'
-        response['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+        response['Access-Control-Allow-Methods'] = 'GET, POST, DELETE, OPTIONS'
+        response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Client-Id'
+        response['Timing-Allow-Origin'] = '*'
         return response
 
     def _build_options_response(self):
@@ -26,6 +30,157 @@ class SimpleCORSMiddleware:
         resp = HttpResponse()
         resp.status_code = 200
         resp['Access-Control-Allow-Origin'] = '*'
-        resp['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-        resp['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+        resp['Access-Control-Allow-Methods'] = 'GET, POST, DELETE, OPTIONS'
+        resp['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Client-Id'
         return resp
+
+
+class ServerTimingMiddleware:
+    """
+    Mide las etapas de cada petición (ver config/timing.py) y las devuelve
+    en la cabecera Server-Timing, junto con el render de la respuesta
+    (`render`) y el total (`total`). Se desactiva con SERVER_TIMING = False.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from django.conf import settings
+
+        from .timing import collect
+
+        if not getattr(settings, 'SERVER_TIMING', True):
+            return self.get_response(request)
+
+        t0 = time.perf_counter()
+        with collect() as timings:
+            response = self.get_response(request)
+        timings.add('total', (time.perf_counter() - t0) * 1000)
+        response['Server-Timing'] = timings.server_timing()
+        return response
+
+    def process_template_response(self, request, response):
+        # Las respuestas DRF se renderizan después de la vista: se mide aparte
+        from .timing import current_timings
+
+        timings = current_timings()
+        if timings is not None:
+            t0 = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: timings.add('render', (time.perf_counter() - t0) * 1000)
+            )
+        return response
+
+
+class RequestProfilingMiddleware:
+    """
+    Perfila con cProfile y tracemalloc las peticiones que lo piden con la
+    cabecera X-Profile o ?_profile=1 desde un cliente permitido (ver
+    config/profiling.py). Sin REQUEST_PROFILING = True no hace nada.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from django.conf import settings
+
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            return self.get_response(request)
+
+        from .profiling import client_allowed, profile_request, requested_profile
+
+        value = requested_profile(request)
+        if value is None or not client_allowed(request, value):
+            return self.get_response(request)
+        return profile_request(request, self.get_response)
+
+
+class SamplingProfilerMiddleware:
+    """
+    Registra cada petición en el perfilador por muestreo (config/sampling.py)
+    para guardar las pilas de las que superan SAMPLING_PROFILER_THRESHOLD_MS.
+    Sin SAMPLING_PROFILER = True no hace nada.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from .sampling import endpoint_name, profiler_enabled, sampler
+
+        if not profiler_enabled():
+            return self.get_response(request)
+
+        tracked = sampler.begin()
+        try:
+            return self.get_response(request)
+        finally:
+            sampler.end(tracked, endpoint_name(request))
+
+
+class RequestRecordingMiddleware:
+    """
+    Graba la forma anonimizada de cada petición a /api/ (endpoint, tamaño de
+    la secuencia, patrón, opciones y tiempos) para reproducir la carga real
+    con `python -m benchmarks.replay` (ver config/recording.py). Sin
+    REQUEST_RECORDING = True no hace nada.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from .recording import record_request, recording_enabled, should_record
+
+        if not recording_enabled() or not should_record(request):
+            return self.get_response(request)
+        return record_request(request, self.get_response)
+
+
+class TracingMiddleware:
+    """
+    Abre la traza de cada petición (o continúa la de la cabecera
+    traceparent), con un span por consulta a la BD y por etapa medida, y
+    devuelve su id en X-Trace-Id (ver config/tracing.py). Sin TRACING = True
+    no hace nada.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from .tracing import HEADER, RESPONSE_HEADER, start_trace, trace_db, tracing_enabled
+
+        if not tracing_enabled():
+            return self.get_response(request)
+
+        traceparent = request.META.get('HTTP_' + HEADER.upper())
+        with start_trace(f"{request.method} {request.path}", traceparent, **{'http.method': request.method}) as root:
+            if root is None:
+                return self.get_response(request)
+            request.trace_span = root
+            with trace_db():
+                response = self.get_response(request)
+            match = getattr(request, 'resolver_match', None)
+            if match is not None and match.route:
+                root.name = f"{request.method} {match.route}"
+            root.set_attribute('http.route', match.route if match is not None else None)
+            root.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                root.status = 'error'
+            response[RESPONSE_HEADER] = root.trace_id
+        return response
+
+    def process_template_response(self, request, response):
+        # El render de DRF ocurre después de la vista: su span se registra al terminar
+        root = getattr(request, 'trace_span', None)
+        if root is not None:
+            from .tracing import record_span
+
+            start, t0 = time.time(), time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: record_span('render', start, (time.perf_counter() - t0) * 1000, parent=root)
+            )
+        return response
@@ -0,0 +1,189 @@
+"""
+Perfilado bajo demanda de peticiones concretas (RequestProfilingMiddleware).
+
+Con REQUEST_PROFILING = True, una petición se perfila si lleva la cabecera
+`X-Profile` o el parámetro `?_profile=1` y viene de un cliente permitido:
+una IP de REQUEST_PROFILING_ALLOWED_IPS o, si REQUEST_PROFILING_TOKEN está
+definido, cualquier cliente que envíe ese token como valor de la cabecera o
+del parámetro.
+
+La vista se ejecuta bajo cProfile y tracemalloc, y en REQUEST_PROFILING_DIR
+quedan tres ficheros con el mismo id:
+- `<id>.prof`: estadísticas de cProfile (`python -m pstats`, snakeviz...).
+- `<id>.tracemalloc`: snapshot de tracemalloc (`tracemalloc.Snapshot.load`).
+- `<id>.json`: la petición, su duración, las funciones más costosas y las
+  líneas que más memoria reservaron.
+
+El id vuelve en la cabecera X-Profile-Id. cProfile y tracemalloc son
+globales al proceso, así que se perfila una petición a la vez: otra que lo
+pida mientras tanto se atiende sin perfilar y recibe `X-Profile-Skipped:
+busy`. En respuestas en streaming solo se perfila hasta que la vista
+devuelve la respuesta. Se guardan como mucho REQUEST_PROFILING_MAX_ARTIFACTS
+perfiles; los más antiguos se borran.
+"""
+
+import cProfile
+import hmac
+import json
+import logging
+import os
+import pstats
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+HEADER = 'HTTP_X_PROFILE'
+QUERY_PARAM = '_profile'
+RESPONSE_HEADER = 'X-Profile-Id'
+SKIPPED_HEADER = 'X-Profile-Skipped'
+
+# Entradas del resumen JSON
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 30
+
+_EXTENSIONS = ('.prof', '.tracemalloc', '.json')
+
+# Una petición perfilada a la vez por proceso
+_lock = threading.Lock()
+
+
+def profile_dir() -> str:
+    return getattr(settings, 'REQUEST_PROFILING_DIR', None) or os.path.join(tempfile.gettempdir(), 'dna-profiles')
+
+
+def requested_profile(request) -> Optional[str]:
+    """Valor de la cabecera o del parámetro que pide el perfil (None si no se pidió)."""
+    value = request.META.get(HEADER)
+    if value is not None:
+        return value
+    # Solo se parsea la query string si puede contener el parámetro
+    if QUERY_PARAM in request.META.get('QUERY_STRING', ''):
+        return request.GET.get(QUERY_PARAM)
+    return None
+
+
+def client_allowed(request, value: str) -> bool:
+    token = getattr(settings, 'REQUEST_PROFILING_TOKEN', None)
+    if token and hmac.compare_digest(str(value).encode(), str(token).encode()):
+        return True
+    allowed_ips = getattr(settings, 'REQUEST_PROFILING_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    return request.META.get('REMOTE_ADDR') in allowed_ips
+
+
+def new_artifact_id() -> str:
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def _top_functions(profiler: cProfile.Profile) -> List[Dict]:
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [
+        {
+            'function': f"{func} ({filename}:{line})",
+            'calls': calls,
+            'self_ms': round(self_time * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        }
+        for (filename, line, func), (_, calls, self_time, cumulative, _) in rows
+    ]
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot) -> List[Dict]:
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ])
+    return [
+        {'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+         'size_bytes': stat.size, 'count': stat.count}
+        for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+    ]
+
+
+def _rotate(directory: str, keep: int):
+    """Borra los perfiles más antiguos por encima de `keep`."""
+    try:
+        summaries = sorted(
+            (entry for entry in os.scandir(directory) if entry.name.endswith('.json')),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+    except OSError:
+        return
+    for entry in summaries[:max(0, len(summaries) - keep)]:
+        artifact_id = entry.name[:-len('.json')]
+        for extension in _EXTENSIONS:
+            try:
+                os.unlink(os.path.join(directory, artifact_id + extension))
+            except FileNotFoundError:
+                pass
+
+
+def _write_artifacts(artifact_id: str, profiler, snapshot, summary: Dict):
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, artifact_id)
+    profiler.dump_stats(base + '.prof')
+    snapshot.dump(base + '.tracemalloc')
+    summary['top_functions'] = _top_functions(profiler)
+    summary['top_allocations'] = _top_allocations(snapshot)
+    # El .json va el último: su presencia indica un perfil completo
+    with open(base + '.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+    _rotate(directory, getattr(settings, 'REQUEST_PROFILING_MAX_ARTIFACTS', 100))
+
+
+def profile_request(request, get_response):
+    """Atiende la petición bajo cProfile y tracemalloc y guarda el perfil."""
+    if not _lock.acquire(blocking=False):
+        response = get_response(request)
+        response[SKIPPED_HEADER] = 'busy'
+        return response
+    try:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(getattr(settings, 'REQUEST_PROFILING_TRACEMALLOC_FRAMES', 10))
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        profiler = cProfile.Profile()
+        t0 = time.perf_counter()
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+            duration_ms = (time.perf_counter() - t0) * 1000
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+        artifact_id = new_artifact_id()
+        summary = {
+            'id': artifact_id,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'duration_ms': round(duration_ms, 3),
+            'memory_peak_bytes': max(0, peak - memory_before),
+            'memory_retained_bytes': current - memory_before,
+        }
+        try:
+            _write_artifacts(artifact_id, profiler, snapshot, summary)
+        except OSError:
+            log.exception("No se pudo guardar el perfil de %s %s", request.method, request.path)
+            response[SKIPPED_HEADER] = 'write-error'
+            return response
+        response[RESPONSE_HEADER] = artifact_id
+        log.info("Perfil %s: %s %s (%.1f ms)", artifact_id, request.method, request.path, duration_ms)
+        return response
+    finally:
+        _lock.release()
@@ -0,0 +1,244 @@
+"""
+Grabación anonimizada de la carga real de la API (RequestRecordingMiddleware).
+
+Con REQUEST_RECORDING = True cada petición a /api/ (una fracción
+REQUEST_RECORDING_SAMPLE_RATE) añade una línea JSON a
+REQUEST_RECORDING_FILE con la forma de la petición, no su contenido:
+
+    {"ts": 1760000000.123, "method": "POST", "endpoint": "api/search/",
+     "status": 200, "duration_ms": 41.2, "timings": {"engine": 30.1, ...},
+     "client": "3f9a0c1d2e4b",
+     "request": {"sequence_ref": "a81c...", "sequence_length": 1000000,
+                 "gc_content": 41.0, "pattern": "GATTACA", "allow_overlapping": true},
+     "job_ref": "77d0..."}
+
+- `endpoint` es la ruta de la URL (`api/search/jobs/<int:pk>/`), no la
+  ruta concreta: los ids no se guardan.
+- Secuencias, jobs y clientes se sustituyen por referencias opacas
+  (HMAC con SECRET_KEY), estables entre procesos: la misma secuencia o el
+  mismo job tienen la misma referencia en toda la grabación, para que la
+  reproducción respete las búsquedas repetidas y el sondeo de un job.
+- De las secuencias solo se guardan longitud y % GC; de las subidas, el
+  tamaño del fichero. Con REQUEST_RECORDING_PATTERNS = False los patrones
+  se sustituyen por su longitud.
+- No se guardan cabeceras, IPs ni cursores de paginación.
+
+`python -m benchmarks.replay` reproduce el fichero contra un servidor (ver
+benchmarks/replay.py). Las líneas se añaden con una sola escritura O_APPEND
+(varios procesos pueden compartir el fichero) y el fichero se rota a `.1`,
+`.2`... al pasar de REQUEST_RECORDING_MAX_BYTES.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from .sampling import rotate_if_needed
+from .timing import current_timings
+
+log = logging.getLogger(__name__)
+
+PATH_PREFIX = '/api/'
+
+# Cuerpos JSON que se leen para grabar su forma
+MAX_BODY_BYTES = 64 * 1024
+
+# Parámetros de consulta que se conservan (los cursores codifican posiciones del job)
+KEPT_QUERY_PARAMS = ('limit', 'position_gte', 'position_lt', 'page', 'page_size')
+
+# Opciones de búsqueda que se copian tal cual
+SEARCH_OPTIONS = ('allow_overlapping', 'mode', 'priority', 'timeout_seconds')
+
+
+def recording_enabled() -> bool:
+    return getattr(settings, 'REQUEST_RECORDING', False)
+
+
+def recording_file() -> str:
+    return getattr(settings, 'REQUEST_RECORDING_FILE', None) or os.path.join(
+        tempfile.gettempdir(), 'dna-workload.jsonl'
+    )
+
+
+def should_record(request) -> bool:
+    if request.method == 'OPTIONS' or not request.path.startswith(PATH_PREFIX):
+        return False
+    rate = getattr(settings, 'REQUEST_RECORDING_SAMPLE_RATE', 1.0)
+    return rate >= 1.0 or random.random() < rate
+
+
+def anonymize(kind: str, value) -> Optional[str]:
+    """Referencia opaca y estable de un id (`kind`: 'seq', 'job' o 'client')."""
+    if value in (None, ''):
+        return None
+    digest = hmac.new(settings.SECRET_KEY.encode(), f"{kind}:{value}".encode(), hashlib.sha256)
+    return digest.hexdigest()[:16]
+
+
+def read_json_body(request) -> Optional[Dict]:
+    """
+    Cuerpo JSON de la petición, leído antes de la vista (después, DRF ya
+    habrá consumido el stream). Los multipart no se leen.
+    """
+    if request.method not in ('POST', 'PUT', 'PATCH') or request.content_type != 'application/json':
+        return None
+    try:
+        if int(request.META.get('CONTENT_LENGTH') or 0) > MAX_BODY_BYTES:
+            return None
+        data = json.loads(request.body or b'null')
+    except (ValueError, TypeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _pattern(value) -> Dict:
+    if not isinstance(value, str):
+        return {}
+    pattern = value.strip().upper()
+    if getattr(settings, 'REQUEST_RECORDING_PATTERNS', True):
+        return {'pattern': pattern}
+    return {'pattern_length': len(pattern)}
+
+
+def _sequence_shapes(ids: List[int]) -> Dict[int, Dict]:
+    """Referencia, longitud y % GC de cada secuencia, con una sola consulta."""
+    from sequences_api.models import DNASequence
+
+    rows = DNASequence.objects.filter(pk__in=ids).values_list('pk', 'length', 'gc_content') if ids else []
+    shapes = {
+        pk: {
+            'sequence_length': length,
+            'gc_content': round(gc, 1) if gc is not None else None,
+        }
+        for pk, length, gc in rows
+    }
+    return {
+        pk: dict({'sequence_ref': anonymize('seq', pk)}, **shapes.get(pk, {'sequence_length': None}))
+        for pk in ids
+    }
+
+
+def _search_shape(body: Dict) -> Dict:
+    sequence_id = body.get('sequence_id')
+    if isinstance(sequence_id, int):
+        shape = dict(_sequence_shapes([sequence_id])[sequence_id])
+    else:
+        shape = {'sequence_ref': None, 'sequence_length': None}
+    shape.update(_pattern(body.get('pattern')))
+    shape.update({key: body[key] for key in SEARCH_OPTIONS if key in body})
+    return shape
+
+
+def _batch_shape(body: Dict) -> Dict:
+    ids = body.get('sequence_ids') if isinstance(body.get('sequence_ids'), list) else []
+    ids = [pk for pk in ids if isinstance(pk, int)]
+    shapes = _sequence_shapes(ids)
+    patterns = body.get('patterns') if isinstance(body.get('patterns'), list) else []
+    shape = {
+        'sequences': [shapes[pk] for pk in ids],
+        'patterns': [_pattern(pattern) for pattern in patterns],
+    }
+    if 'allow_overlapping' in body:
+        shape['allow_overlapping'] = body['allow_overlapping']
+    return shape
+
+
+def _response_data(response) -> Dict:
+    data = getattr(response, 'data', None)
+    return data if isinstance(data, dict) else {}
+
+
+def request_shape(request, response, route: str, body: Optional[Dict]) -> Dict:
+    """Campos propios del endpoint: petición anonimizada y referencias a lo que creó."""
+    entry: Dict = {}
+    data = _response_data(response)
+    kwargs = request.resolver_match.kwargs if request.resolver_match else {}
+
+    if route in ('api/search/', 'api/search/explain/') and body is not None:
+        entry['request'] = _search_shape(body)
+        job = data.get('job')
+        if isinstance(job, dict):
+            entry['job_ref'] = anonymize('job', job.get('id'))
+    elif route == 'api/search/batch/' and body is not None:
+        entry['request'] = _batch_shape(body)
+    elif route == 'api/sequences/upload/':
+        upload_size = int(request.META.get('CONTENT_LENGTH') or 0)
+        entry['request'] = {'upload_bytes': upload_size}
+        if 'id' in data:
+            entry['request'].update(
+                sequence_ref=anonymize('seq', data['id']),
+                sequence_length=data.get('length'),
+                gc_content=round(data['gc_content'], 1) if data.get('gc_content') is not None else None,
+            )
+    elif 'pk' in kwargs and route.startswith('api/search/jobs/'):
+        entry['job_ref'] = anonymize('job', kwargs['pk'])
+
+    query = {key: request.GET[key] for key in KEPT_QUERY_PARAMS if key in request.GET}
+    if query:
+        entry['query'] = query
+    if 'cursor' in request.GET:
+        entry['cursor'] = True
+    return entry
+
+
+def build_entry(request, response, started: float, duration_ms: float, body: Optional[Dict]) -> Dict:
+    match = request.resolver_match
+    route = match.route if match is not None and match.route else None
+    timings = current_timings()
+    client = request.headers.get('X-Client-Id') or request.META.get('REMOTE_ADDR')
+    entry = {
+        'ts': round(started, 3),
+        'method': request.method,
+        'endpoint': route,
+        'status': response.status_code,
+        'duration_ms': round(duration_ms, 3),
+        'timings': timings.as_dict() if timings is not None else {},
+        'client': anonymize('client', client),
+    }
+    if route is not None:
+        entry.update(request_shape(request, response, route, body))
+    return entry
+
+
+def write_entry(entry: Dict, path: Optional[str] = None):
+    path = path or recording_file()
+    line = json.dumps(entry, separators=(',', ':')) + "\n"
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        rotate_if_needed(
+            path,
+            getattr(settings, 'REQUEST_RECORDING_MAX_BYTES', 100 * 1024 * 1024),
+            getattr(settings, 'REQUEST_RECORDING_BACKUPS', 3),
+        )
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode())
+        finally:
+            os.close(fd)
+    except OSError:
+        log.exception("No se pudo grabar la petición en %s", path)
+
+
+def record_request(request, get_response):
+    """Atiende la petición y añade su línea a la grabación."""
+    body = read_json_body(request)
+    started = time.time()
+    t0 = time.perf_counter()
+    response = get_response(request)
+    duration_ms = (time.perf_counter() - t0) * 1000
+    try:
+        write_entry(build_entry(request, response, started, duration_ms, body))
+    except Exception:  # pylint: disable=broad-except
+        # La grabación nunca debe romper la respuesta
+        log.exception("Error al grabar %s %s", request.method, request.path)
+    return response
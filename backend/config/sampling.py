@@ -0,0 +1,283 @@
+"""
+Perfilador por muestreo continuo de las peticiones lentas.
+
+Con SAMPLING_PROFILER = True, SamplingProfilerMiddleware registra cada
+petición en curso y un hilo en segundo plano toma cada
+SAMPLING_PROFILER_INTERVAL_MS la pila de Python de esos hilos
+(sys._current_frames, sin instrumentar el código). Al terminar, si la
+petición tardó SAMPLING_PROFILER_THRESHOLD_MS o más, sus muestras se añaden
+al fichero de su endpoint; si no, se descartan. El worker asíncrono hace lo
+mismo con los jobs que ejecuta (endpoint `job_search`).
+
+Los ficheros están en SAMPLING_PROFILER_DIR, uno por endpoint
+(`POST_api_search.collapsed`), en formato de pilas colapsadas, el de
+flamegraph.pl, speedscope o inferno:
+
+    config/middleware.py:SamplingProfilerMiddleware.__call__;...;search_api/services.py:_find_matches 42
+
+Cada proceso añade con una sola escritura O_APPEND, así que varios workers
+pueden compartir el directorio. Un fichero que pasa de
+SAMPLING_PROFILER_MAX_BYTES se rota a `.1`, `.2`... y se guardan
+SAMPLING_PROFILER_BACKUPS. `python manage.py profile_hotspots` resume los
+frames con más muestras.
+
+Sin peticiones en curso el hilo espera sin muestrear; el coste por petición
+es registrarla y, si fue lenta, una escritura al terminar.
+"""
+
+import fnmatch
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+EXTENSION = '.collapsed'
+
+_ENDPOINT_RE = re.compile(r'[^A-Za-z0-9]+')
+
+Stack = Tuple[str, ...]
+
+
+def profiler_enabled() -> bool:
+    return getattr(settings, 'SAMPLING_PROFILER', False)
+
+
+def samples_dir() -> str:
+    return getattr(settings, 'SAMPLING_PROFILER_DIR', None) or os.path.join(tempfile.gettempdir(), 'dna-flamegraphs')
+
+
+def endpoint_name(request) -> str:
+    """'POST_api_search' para POST /api/search/ (ruta de la URL, no la ruta concreta)."""
+    match = getattr(request, 'resolver_match', None)
+    route = match.route if match is not None and match.route else 'unresolved'
+    return _ENDPOINT_RE.sub('_', f"{request.method} {route}").strip('_')
+
+
+def _short_path(filename: str) -> str:
+    marker = f"site-packages{os.sep}"
+    if marker in filename:
+        return filename.rsplit(marker, 1)[1]
+    base = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base):
+        return filename[len(base):]
+    return os.path.basename(filename)
+
+
+class _Tracked:
+    __slots__ = ('root', 'started', 'stacks')
+
+    def __init__(self, root):
+        self.root = root
+        self.started = time.perf_counter()
+        self.stacks: Counter = Counter()
+
+
+class SamplingProfiler:
+    """Muestreador de pilas de los hilos registrados con begin()/end()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._active: Dict[int, _Tracked] = {}
+        self._pending: List[Tuple[str, Counter]] = []
+        self._labels: Dict[object, str] = {}
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.samples = 0
+
+    def begin(self) -> _Tracked:
+        """Registra el hilo actual; las pilas se recortan en el frame que llama."""
+        tracked = _Tracked(sys._getframe(1))
+        with self._lock:
+            self._active[threading.get_ident()] = tracked
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return tracked
+
+    def end(self, tracked: _Tracked, endpoint: str) -> float:
+        """Quita el hilo y guarda sus muestras si superó el umbral. Devuelve los ms."""
+        with self._lock:
+            if self._active.get(threading.get_ident()) is tracked:
+                del self._active[threading.get_ident()]
+            stacks = tracked.stacks
+        tracked.root = None
+        elapsed_ms = (time.perf_counter() - tracked.started) * 1000
+        if stacks and elapsed_ms >= getattr(settings, 'SAMPLING_PROFILER_THRESHOLD_MS', 1000):
+            with self._lock:
+                self._pending.append((endpoint, stacks))
+            self._wakeup.set()
+        return elapsed_ms
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, 'co_qualname', code.co_name)
+            label = f"{_short_path(code.co_filename)}:{name}".replace(';', ':')
+            self._labels[code] = label
+        return label
+
+    def _stack(self, frame, root) -> Stack:
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            if frame is root:
+                break
+            frame = frame.f_back
+        labels.reverse()
+        return tuple(labels)
+
+    def sample(self):
+        """Toma una muestra de cada hilo registrado."""
+        frames = sys._current_frames()
+        with self._lock:
+            for ident, tracked in self._active.items():
+                frame = frames.get(ident)
+                if frame is not None and tracked.root is not None:
+                    tracked.stacks[self._stack(frame, tracked.root)] += 1
+                    self.samples += 1
+        del frames
+
+    def flush(self):
+        """Escribe las muestras de las peticiones lentas ya terminadas."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if pending:
+                self._write(pending)
+
+    def _write(self, pending: List[Tuple[str, Counter]]):
+        directory = samples_dir()
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError:
+            log.exception("No se pudo crear %s", directory)
+            return
+        for endpoint, stacks in pending:
+            path = os.path.join(directory, endpoint + EXTENSION)
+            try:
+                rotate_if_needed(
+                    path,
+                    getattr(settings, 'SAMPLING_PROFILER_MAX_BYTES', 10 * 1024 * 1024),
+                    getattr(settings, 'SAMPLING_PROFILER_BACKUPS', 3),
+                )
+                data = "".join(f"{';'.join(stack)} {count}\n" for stack, count in stacks.items())
+                fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, data.encode())
+                finally:
+                    os.close(fd)
+            except OSError:
+                log.exception("No se pudieron guardar las muestras de %s", endpoint)
+
+    def _run(self):
+        while True:
+            if not self._active:
+                self.flush()
+                self._wakeup.wait(1.0)
+                self._wakeup.clear()
+                continue
+            time.sleep(getattr(settings, 'SAMPLING_PROFILER_INTERVAL_MS', 10) / 1000)
+            try:
+                self.sample()
+                self.flush()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Error en el perfilador por muestreo")
+
+    def reset(self):
+        """Estado vacío y sin hilo (tras un fork el hilo del padre no existe)."""
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._active = {}
+        self._pending = []
+        self._wakeup = threading.Event()
+        self._thread = None
+
+
+def rotate_if_needed(path: str, max_bytes: int, backups: int):
+    """Rota `path` a `.1`, `.2`... si pasa de `max_bytes`, conservando `backups` ficheros."""
+    try:
+        if os.path.getsize(path) < max_bytes:
+            return
+    except FileNotFoundError:
+        return
+    if backups <= 0:
+        os.unlink(path)
+        return
+    for index in range(backups - 1, 0, -1):
+        if os.path.exists(f"{path}.{index}"):
+            os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def parse_collapsed(lines: Iterable[str]) -> Counter:
+    stacks: Counter = Counter()
+    for line in lines:
+        stack, _, count = line.rstrip('\n').rpartition(' ')
+        if stack and count.isdigit():
+            stacks[tuple(stack.split(';'))] += int(count)
+    return stacks
+
+
+def load_samples(directory: Optional[str] = None, endpoint: Optional[str] = None,
+                 include_rotated: bool = True) -> Dict[str, Counter]:
+    """Muestras por endpoint; `endpoint` admite comodines ('POST_api_search*')."""
+    directory = directory or samples_dir()
+    result: Dict[str, Counter] = {}
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return result
+    for name in names:
+        base, ext, rotation = name.partition(EXTENSION)
+        if not ext or (rotation and not (include_rotated and rotation[1:].isdigit())):
+            continue
+        if endpoint and not fnmatch.fnmatchcase(base, endpoint):
+            continue
+        with open(os.path.join(directory, name)) as f:
+            result.setdefault(base, Counter()).update(parse_collapsed(f))
+    return result
+
+
+def hotspots(stacks: Counter, limit: int = 20, sort: str = 'self') -> List[Dict]:
+    """
+    Frames con más muestras: `self` cuando el frame estaba en la cima de la
+    pila y `total` cuando estaba en cualquier punto (una vez por pila).
+    """
+    total_samples = sum(stacks.values())
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    for stack, count in stacks.items():
+        if not stack:
+            continue
+        self_counts[stack[-1]] += count
+        for frame in set(stack):
+            total_counts[frame] += count
+    key = self_counts if sort == 'self' else total_counts
+    frames = sorted(total_counts, key=lambda frame: (key[frame], total_counts[frame]), reverse=True)[:limit]
+    return [
+        {
+            'frame': frame,
+            'self': self_counts[frame],
+            'total': total_counts[frame],
+            'self_pct': 100.0 * self_counts[frame] / total_samples if total_samples else 0.0,
+            'total_pct': 100.0 * total_counts[frame] / total_samples if total_samples else 0.0,
+        }
+        for frame in frames
+    ]
+
+
+sampler = SamplingProfiler()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=sampler.reset)
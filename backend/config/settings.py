@@ -47,6 +47,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.middleware.TracingMiddleware',
+    'config.middleware.ServerTimingMiddleware',
+    'config.middleware.RequestProfilingMiddleware',
+    'config.middleware.SamplingProfilerMiddleware',
+    'config.middleware.RequestRecordingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -148,6 +153,110 @@ GRPC_HOST = "localhost"
 GRPC_PORT = "50051"
 GRPC_TIMEOUT_SECONDS = 5
 
+# Balanceo en cliente entre varias réplicas ("host:puerto").
+# Si la lista está vacía se usa GRPC_HOST/GRPC_PORT.
+GRPC_BACKENDS = []
+GRPC_LB_POLICY = "round_robin"  # round_robin | least_outstanding | sequence_hash
+GRPC_EJECT_AFTER_FAILURES = 1  # fallos de conexión seguidos para expulsar una réplica
+GRPC_EJECT_SECONDS = 30  # tiempo fuera antes de volver a probarla
+GRPC_SERVER_WORKERS = 10  # hilos del servidor Python de referencia (run_search_server)
+
+# Enrutado por coste local/gRPC (requiere USE_GRPC_SEARCH)
+SEARCH_COST_ROUTING = False
+SEARCH_ROUTER_WINDOW = 200  # observaciones recientes usadas para calibrar
+SEARCH_ROUTER_EXPLORE_EVERY = 50  # cada N decisiones se prueba la ruta alternativa (0 = nunca)
+
+# Máximo de pares (secuencia, patrón) por petición a /api/search/batch/
+SEARCH_BATCH_MAX_PAIRS = 1000
+
+# Almacenamiento de resultados: "compact" (bloques de posiciones varint) o "rows" (una fila por coincidencia)
+SEARCH_RESULT_STORAGE = "compact"
+SEARCH_RESULT_CHUNK_SIZE = 8192  # posiciones por bloque compacto
+SEARCH_PERSIST_BATCH_SIZE = 5000  # filas por lote en modo "rows"
+SEARCH_PERSIST_THREADED = True  # escribir lotes desde un hilo mientras el motor busca
+
+# Ejecución de jobs: "sync" (en la petición) o "async" (202 + manage.py search_worker)
+SEARCH_EXECUTION_MODE = "sync"
+SEARCH_WORKER_CONCURRENCY = 1  # hilos por proceso search_worker (más de 1 solo compensa con gRPC o PostgreSQL)
+SEARCH_WORKER_POLL_SECONDS = 1.0  # espera con la cola vacía
+SEARCH_JOB_STALE_SECONDS = 3600  # jobs en PROCESSING más tiempo se reencolan al arrancar un worker (0 = nunca)
+SEARCH_JOB_TIMEOUT_SECONDS = 600  # tiempo límite de ejecución por defecto (None = sin límite)
+SEARCH_JOB_MAX_TIMEOUT_SECONDS = 3600  # máximo que puede pedir un cliente con timeout_seconds
+SEARCH_CANCEL_POLL_SECONDS = 0.5  # cada cuánto comprueba un job en ejecución si lo cancelaron desde otro proceso
+SEARCH_COALESCING = True  # búsquedas idénticas concurrentes comparten una sola ejecución
+SEARCH_COALESCE_POLL_SECONDS = 0.2  # cada cuánto mira una búsqueda en espera si el job líder (de otro proceso) terminó
+
+# Borrado de secuencias y jobs por lotes de claves (search_api/deletion.py)
+SEARCH_DELETE_CHUNK_SIZE = 10000  # filas por DELETE
+SEARCH_DELETE_BACKGROUND = False  # DELETE /api/sequences/<id>/ y el admin borran en un hilo (202)
+
+# Caché por proceso del texto de las secuencias (LRU, 0 = desactivada)
+SEQUENCE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# "shared": una sola copia por host en ficheros proyectados con mmap (varios workers; requiere POSIX)
+SEQUENCE_CACHE_BACKEND = "local"
+SEQUENCE_SHM_DIR = None  # por defecto /dev/shm/dna-sequences
+SEQUENCE_SHM_MAX_BYTES = 1024 * 1024 * 1024
+
+# Pool de procesos con afinidad por secuencia (manage.py search_affinity_pool; 0 = desactivado)
+SEARCH_AFFINITY_WORKERS = 0
+SEARCH_AFFINITY_SOCKET_DIR = None  # por defecto <tmp>/dna-affinity
+SEARCH_AFFINITY_MAX_BYTES = 2 * 1024 * 1024 * 1024  # secuencias residentes por proceso del pool
+
+# Cabecera Server-Timing con el tiempo de cada etapa de la petición (ver config/timing.py)
+SERVER_TIMING = True
+
+# Métricas en /metrics (formato Prometheus). Con varios procesos (gunicorn, search_worker),
+# un directorio compartido donde cada proceso vuelca las suyas (ver config/metrics.py)
+METRICS_MULTIPROCESS_DIR = None
+METRICS_FLUSH_SECONDS = 1.0  # como mucho un volcado por proceso en este intervalo
+
+# Perfil de una petición concreta con cabecera X-Profile o ?_profile=1 (ver config/profiling.py)
+REQUEST_PROFILING = False
+REQUEST_PROFILING_DIR = None  # por defecto <tmp>/dna-profiles
+REQUEST_PROFILING_ALLOWED_IPS = ['127.0.0.1', '::1']
+REQUEST_PROFILING_TOKEN = None  # si se define, cualquier cliente que lo envíe como valor puede pedir un perfil
+REQUEST_PROFILING_MAX_ARTIFACTS = 100  # perfiles guardados; los más antiguos se borran
+REQUEST_PROFILING_TRACEMALLOC_FRAMES = 10  # profundidad de las trazas de memoria
+
+# Muestreo continuo de las pilas de las peticiones lentas, en ficheros para flamegraph
+# por endpoint (ver config/sampling.py y manage.py profile_hotspots)
+SAMPLING_PROFILER = False
+SAMPLING_PROFILER_INTERVAL_MS = 10  # una muestra de cada petición en curso por intervalo
+SAMPLING_PROFILER_THRESHOLD_MS = 1000  # solo se guardan las peticiones que tardan al menos esto
+SAMPLING_PROFILER_DIR = None  # por defecto <tmp>/dna-flamegraphs
+SAMPLING_PROFILER_MAX_BYTES = 10 * 1024 * 1024  # tamaño a partir del cual se rota el fichero de un endpoint
+SAMPLING_PROFILER_BACKUPS = 3  # ficheros rotados que se conservan
+
+# Grabación anonimizada de las peticiones a /api/ para reproducirlas con
+# `python -m benchmarks.replay` (ver config/recording.py)
+REQUEST_RECORDING = False
+REQUEST_RECORDING_FILE = None  # por defecto <tmp>/dna-workload.jsonl
+REQUEST_RECORDING_SAMPLE_RATE = 1.0  # fracción de peticiones que se graban
+REQUEST_RECORDING_PATTERNS = True  # False: solo la longitud de cada patrón
+REQUEST_RECORDING_MAX_BYTES = 100 * 1024 * 1024  # tamaño a partir del cual se rota el fichero
+REQUEST_RECORDING_BACKUPS = 3  # ficheros rotados que se conservan
+
+# Trazas distribuidas Django -> gRPC con spans por etapa y consulta (ver config/tracing.py
+# y manage.py show_trace)
+TRACING = False
+TRACING_SAMPLE_RATE = 1.0  # fracción de peticiones sin traceparent que se trazan
+TRACING_EXPORTER = "jsonl"  # "jsonl" (fichero) o "memory" (pruebas)
+TRACING_FILE = None  # por defecto <tmp>/dna-traces.jsonl
+
+# Stream de progreso (GET /api/search/jobs/<id>/events/)
+SEARCH_PROGRESS_INTERVAL_SECONDS = 0.25  # como mucho un evento de progreso por intervalo
+SEARCH_PROGRESS_PERSIST_SECONDS = 2.0  # guardar el progreso en el job para streams de otros procesos (0 = no)
+SEARCH_EVENTS_DB_POLL_SECONDS = 2.0  # lectura del job en BD cuando no se ejecuta en este proceso
+SEARCH_EVENTS_HEARTBEAT_SECONDS = 15.0  # comentario keep-alive sin eventos nuevos
+
+# Planificación de la cola: prioridad, reparto justo por cliente y SJF
+SEARCH_INTERACTIVE_MAX_COST_MS = 500  # jobs estimados por debajo son "interactive"
+SEARCH_PRIORITY_AGING_SECONDS = 300  # cada tramo de espera sube un job una clase (0 = sin envejecimiento)
+SEARCH_CLIENT_MAX_CONCURRENT = 2  # jobs en ejecución a la vez por cliente (0 = sin tope)
+SEARCH_TRUSTED_PROXIES = 0  # proxies propios delante de Django (IP del cliente desde X-Forwarded-For)
+SEARCH_TRUST_CLIENT_ID_HEADER = False  # True solo si un gateway propio fija X-Client-Id
+SEARCH_QUEUE_STATS_WINDOW_SECONDS = 3600  # ventana para las estadísticas de espera
+
 # Límites de subida (ajustados para archivos grandes)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 200 * 1024 * 1024  # 200MB
 FILE_UPLOAD_MAX_MEMORY_SIZE = 200 * 1024 * 1024  # 200MB
@@ -0,0 +1,108 @@
+"""
+Medición de tiempos por etapa.
+
+Un colector (`collect()`) agrupa los spans medidos en su contexto: la
+petición HTTP (ServerTimingMiddleware los devuelve en la cabecera
+Server-Timing) y cada ejecución de job (execute_job guarda el desglose en
+SearchJob.timings). Los colectores se anidan: al cerrarse uno, sus etapas
+se suman al de fuera, así la cabecera de una búsqueda síncrona incluye las
+etapas del job.
+
+    with span('sequence_fetch'):
+        sequence = DNASequence.objects.get(pk=pk)
+
+Sin colector activo, span() no mide nada. El colector vive en un
+ContextVar: cada hilo o tarea tiene el suyo y los hilos auxiliares (p. ej.
+el escritor de resultados) no registran salvo que se les pase el tiempo.
+"""
+
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from .tracing import span as trace_span
+
+_current: ContextVar[Optional["Timings"]] = ContextVar("timings", default=None)
+
+# Nombres válidos como token en Server-Timing
+_INVALID_NAME_CHARS = re.compile(r"[^A-Za-z0-9_.\-]")
+
+
+class Timings:
+    """Milisegundos acumulados y número de spans por etapa, en orden de aparición."""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+
+    def add(self, name: str, ms: float, count: int = 1):
+        stage = self.stages.get(name)
+        if stage is None:
+            self.stages[name] = [ms, count]
+        else:
+            stage[0] += ms
+            stage[1] += count
+
+    def merge(self, other: "Timings"):
+        for name, (ms, count) in other.stages.items():
+            self.add(name, ms, count)
+
+    def ms(self, name: str) -> Optional[float]:
+        stage = self.stages.get(name)
+        return stage[0] if stage is not None else None
+
+    def as_dict(self) -> Dict[str, float]:
+        """Desglose compacto {etapa: ms} para guardar o serializar."""
+        return {name: round(ms, 3) for name, (ms, _) in self.stages.items()}
+
+    def server_timing(self) -> str:
+        """Valor de la cabecera Server-Timing."""
+        parts = []
+        for name, (ms, count) in self.stages.items():
+            token = _INVALID_NAME_CHARS.sub("_", name)
+            parts.append(f"{token};dur={ms:.3f}" + (f';desc="x{count}"' if count > 1 else ""))
+        return ", ".join(parts)
+
+
+def current_timings() -> Optional[Timings]:
+    return _current.get()
+
+
+@contextmanager
+def collect() -> Iterator[Timings]:
+    """Abre un colector; al cerrarse suma sus etapas al colector de fuera, si lo hay."""
+    timings = Timings()
+    reset = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(reset)
+        parent = _current.get()
+        if parent is not None:
+            parent.merge(timings)
+
+
+def record(name: str, ms: float):
+    """Añade `ms` a la etapa `name` del colector activo (si lo hay)."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, ms)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Mide el bloque como etapa `name`, también si termina con excepción. Con
+    una traza activa (config/tracing.py) el bloque es además un span.
+    """
+    with trace_span(name):
+        timings = _current.get()
+        if timings is None:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings.add(name, (time.perf_counter() - t0) * 1000)
@@ -0,0 +1,485 @@
+"""
+Trazas distribuidas sin dependencias externas.
+
+Con TRACING = True, TracingMiddleware abre una traza por petición (o
+continúa la de la cabecera `traceparent` de W3C) y dentro de ella se crean
+spans para:
+- cada etapa medida con config.timing.span (validación, carga de la
+  secuencia, motor, escritura y lectura de resultados, serialización...),
+- cada consulta a la BD (`db`, con el SQL sin parámetros),
+- el render de la respuesta DRF (`render`),
+- cada llamada gRPC (`grpc.client/<método>`).
+
+La llamada gRPC lleva el contexto en los metadatos (`traceparent`) y el
+servidor devuelve sus propios spans en los metadatos finales
+(`x-trace-spans`, JSON, acotado: ver spans_metadata); el cliente los añade a
+la traza, así se ve qué parte del tiempo fue Django, red o microservicio. El worker asíncrono
+continúa la traza de la petición que creó el job (SearchJob.traceparent).
+
+Al terminar la traza de un proceso sus spans se exportan de una vez:
+- `jsonl`: una línea JSON por span en TRACING_FILE (escritura O_APPEND,
+  varios procesos pueden compartir el fichero).
+- `memory`: en `memory_exporter` (pruebas).
+
+`python manage.py show_trace` imprime una traza como árbol.
+
+Sin traza activa, span() no hace nada más que consultar un ContextVar.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import secrets
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+HEADER = 'traceparent'
+RESPONSE_HEADER = 'X-Trace-Id'
+GRPC_SPANS_KEY = 'x-trace-spans'
+
+EXPORTER_JSONL = 'jsonl'
+EXPORTER_MEMORY = 'memory'
+
+SERVICE = 'django'
+
+# SQL guardado por consulta (sin parámetros)
+MAX_SQL_CHARS = 300
+
+# Spans que el servidor gRPC devuelve en los metadatos finales. gRPC rechaza
+# los metadatos por encima de 8 KB (límite blando) o 16 KB (duro), así que
+# un BatchSearch de cientos de pares no puede devolver un span por par.
+MAX_REMOTE_SPANS = 32
+MAX_REMOTE_SPANS_BYTES = 4096
+
+_TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+def tracing_enabled() -> bool:
+    return getattr(settings, 'TRACING', False)
+
+
+def traces_file() -> str:
+    return getattr(settings, 'TRACING_FILE', None) or os.path.join(tempfile.gettempdir(), 'dna-traces.jsonl')
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, span_id del padre, sampled) o None si no es válido."""
+    match = _TRACEPARENT_RE.match((value or '').strip().lower())
+    if not match or match.group(1) == '0' * 32 or match.group(2) == '0' * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+class Trace:
+    """Spans terminados de una traza en este proceso, hasta exportarlos."""
+
+    def __init__(self, trace_id: str, exporter):
+        self.trace_id = trace_id
+        self.exporter = exporter
+        self.spans: List[Dict] = []
+        self.exported = False
+        self._lock = threading.Lock()
+
+    def add(self, data: Dict):
+        with self._lock:
+            if not self.exported:
+                self.spans.append(data)
+                return
+        # Span que termina después de la raíz (p. ej. un stream): se exporta suelto
+        if self.exporter is not None:
+            self.exporter.export([data])
+
+    def finish(self):
+        with self._lock:
+            self.exported = True
+            spans, self.spans = self.spans, []
+        if self.exporter is not None and spans:
+            self.exporter.export(spans)
+        return spans
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'kind', 'service', 'attributes',
+                 'start_time', '_t0', 'status')
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], kind: str = 'internal',
+                 service: str = SERVICE, attributes: Optional[Dict] = None):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.service = service
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self._t0 = time.perf_counter()
+        self.status = 'ok'
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def end(self, duration_ms: Optional[float] = None):
+        if duration_ms is None:
+            duration_ms = (time.perf_counter() - self._t0) * 1000
+        self.trace.add({
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'service': self.service,
+            'start': round(self.start_time, 6),
+            'duration_ms': round(duration_ms, 3),
+            'status': self.status,
+            'attributes': self.attributes,
+        })
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_traceparent() -> str:
+    """traceparent del span activo ('' sin traza), para continuar la traza en otro proceso."""
+    current = _current.get()
+    return current.traceparent() if current is not None else ''
+
+
+@contextmanager
+def _activate(span_obj: Span) -> Iterator[Span]:
+    reset = _current.set(span_obj)
+    try:
+        yield span_obj
+    except BaseException as exc:
+        span_obj.status = 'error'
+        span_obj.attributes.setdefault('error', f"{type(exc).__name__}: {exc}")
+        raise
+    finally:
+        _current.reset(reset)
+        span_obj.end()
+
+
+def _sampled() -> bool:
+    rate = getattr(settings, 'TRACING_SAMPLE_RATE', 1.0)
+    return rate >= 1.0 or random.random() < rate
+
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, kind: str = 'server',
+                exporter=None, service: str = SERVICE, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Span raíz de este proceso. Con `traceparent` válido continúa esa traza
+    (y respeta su decisión de muestreo); si no, empieza una nueva con
+    probabilidad TRACING_SAMPLE_RATE. Devuelve None si no se traza.
+    Al cerrarse exporta los spans de la traza con `exporter` (por defecto el
+    configurado en TRACING_EXPORTER).
+    """
+    parent = parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id, sampled = secrets.token_hex(16), None, _sampled()
+    if not sampled:
+        yield None
+        return
+
+    trace = Trace(trace_id, exporter if exporter is not None else get_exporter())
+    try:
+        with _activate(Span(trace, name, parent_id, kind, service, attributes)) as root:
+            yield root
+    finally:
+        trace.finish()
+
+
+@contextmanager
+def span(name: str, kind: str = 'internal', **attributes) -> Iterator[Optional[Span]]:
+    """Span hijo del activo; sin traza activa no hace nada."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    with _activate(Span(parent.trace, name, parent.span_id, kind, parent.service, attributes)) as child:
+        yield child
+
+
+def record_span(name: str, start_time: float, duration_ms: float, parent: Optional[Span] = None, **attributes):
+    """Span ya medido (p. ej. el render, que termina fuera de la vista)."""
+    parent = parent or _current.get()
+    if parent is None:
+        return
+    child = Span(parent.trace, name, parent.span_id, 'internal', parent.service, attributes)
+    child.start_time = start_time
+    child.end(duration_ms)
+
+
+# Consultas a la BD
+
+
+def _db_span(execute, sql, params, many, context):
+    with span('db', **{'db.statement': sql[:MAX_SQL_CHARS], 'db.many': many}):
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def trace_db() -> Iterator[None]:
+    """Un span por consulta en las conexiones de este hilo, mientras dure el bloque."""
+    from contextlib import ExitStack
+
+    from django.db import connections
+
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(_db_span))
+        yield
+
+
+# Propagación por gRPC
+
+
+def grpc_metadata() -> Optional[Tuple[Tuple[str, str], ...]]:
+    """Metadatos con el contexto del span activo para una llamada saliente."""
+    current = _current.get()
+    if current is None:
+        return None
+    return ((HEADER, current.traceparent()),)
+
+
+def add_remote_spans(metadata: Optional[Iterable]):
+    """Añade a la traza activa los spans que el servidor devolvió en los metadatos finales."""
+    current = _current.get()
+    if current is None or not metadata:
+        return
+    for key, value in metadata:
+        if key != GRPC_SPANS_KEY:
+            continue
+        try:
+            spans = json.loads(value)
+        except (TypeError, ValueError):
+            log.warning("Spans remotos no válidos en los metadatos gRPC")
+            return
+        for data in spans:
+            if isinstance(data, dict) and data.get('trace_id') == current.trace_id:
+                current.trace.add(data)
+
+
+class _Collector:
+    """Exportador que solo guarda los spans (para devolverlos al cliente)."""
+
+    def __init__(self):
+        self.spans: List[Dict] = []
+
+    def export(self, spans: Sequence[Dict]):
+        self.spans.extend(spans)
+
+
+@contextmanager
+def serve_traced(invocation_metadata, name: str, service: str, **attributes) -> Iterator[Optional[_Collector]]:
+    """
+    Lado servidor de una llamada gRPC: si el cliente envió `traceparent`,
+    abre el span del servidor como hijo del span del cliente. Al salir, los
+    spans quedan en `collector.spans` para devolverlos con
+    trailing_metadata(). No depende de TRACING: traza si el cliente lo pide.
+    """
+    metadata = dict(invocation_metadata or ())
+    if parse_traceparent(metadata.get(HEADER)) is None:
+        yield None
+        return
+    collector = _Collector()
+    with start_trace(name, metadata[HEADER], kind='server', exporter=collector, service=service, **attributes):
+        yield collector
+
+
+def _encode(spans: Sequence[Dict]) -> str:
+    return json.dumps(list(spans), separators=(',', ':'))
+
+
+def _with_dropped(root: Dict, dropped: Sequence[Dict]) -> Dict:
+    """El span del servidor con el recuento y la duración total de los spans descartados, por nombre."""
+    if not dropped:
+        return root
+    summary: Dict[str, Dict] = {}
+    for data in dropped:
+        entry = summary.setdefault(data['name'], {'count': 0, 'duration_ms': 0.0})
+        entry['count'] += 1
+        entry['duration_ms'] = round(entry['duration_ms'] + data['duration_ms'], 3)
+    return dict(root, attributes=dict(root['attributes'], dropped_spans=summary))
+
+
+def spans_metadata(collector: Optional[_Collector]) -> Tuple[Tuple[str, str], ...]:
+    """
+    Metadatos finales con los spans del servidor: el del servidor siempre y,
+    de los demás, los más largos que quepan en MAX_REMOTE_SPANS y
+    MAX_REMOTE_SPANS_BYTES. Los descartados se resumen en el atributo
+    `dropped_spans` del span del servidor; un span cuyo padre se descartó
+    cuelga del span del servidor.
+    """
+    if collector is None or not collector.spans:
+        return ()
+    ids = {data['span_id'] for data in collector.spans}
+    roots = [data for data in collector.spans if data['parent_id'] not in ids]
+    root = roots[-1]
+    children = sorted((data for data in collector.spans if data is not root),
+                      key=lambda data: data['duration_ms'], reverse=True)
+    kept, dropped = children[:MAX_REMOTE_SPANS - 1], children[MAX_REMOTE_SPANS - 1:]
+    while True:
+        kept_ids = {root['span_id']} | {data['span_id'] for data in kept}
+        spans = [_with_dropped(root, dropped)] + [
+            data if data['parent_id'] in kept_ids else dict(data, parent_id=root['span_id']) for data in kept
+        ]
+        value = _encode(spans)
+        if len(value) <= MAX_REMOTE_SPANS_BYTES or not kept:
+            return ((GRPC_SPANS_KEY, value),)
+        dropped.append(kept.pop())
+
+
+# Exportadores
+
+
+class JsonLinesExporter:
+    """Una línea JSON por span; toda la traza en una sola escritura O_APPEND."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+
+    def export(self, spans: Sequence[Dict]):
+        path = self.path or traces_file()
+        data = "".join(json.dumps(s, separators=(',', ':')) + "\n" for s in spans).encode()
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        except OSError:
+            log.exception("No se pudieron exportar los spans a %s", path)
+
+
+class InMemoryExporter:
+    """Spans exportados en memoria, para las pruebas."""
+
+    def __init__(self):
+        self.spans: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[Dict]):
+        with self._lock:
+            self.spans.extend(spans)
+
+    def trace(self, trace_id: str) -> List[Dict]:
+        with self._lock:
+            return [s for s in self.spans if s['trace_id'] == trace_id]
+
+    def clear(self):
+        with self._lock:
+            self.spans = []
+
+
+memory_exporter = InMemoryExporter()
+
+
+def get_exporter():
+    if getattr(settings, 'TRACING_EXPORTER', EXPORTER_JSONL) == EXPORTER_MEMORY:
+        return memory_exporter
+    return JsonLinesExporter()
+
+
+# Lectura
+
+
+def load_spans(path: Optional[str] = None) -> List[Dict]:
+    spans = []
+    try:
+        with open(path or traces_file()) as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(data, dict) and 'trace_id' in data:
+                    spans.append(data)
+    except FileNotFoundError:
+        pass
+    return spans
+
+
+def trace_tree(spans: Sequence[Dict]) -> List[Tuple[int, Dict, float]]:
+    """
+    (profundidad, span, ms propios) en orden de árbol. Los ms propios son la
+    duración menos la de los hijos: en un span `grpc.client/...` es el
+    tiempo de red y (des)serialización fuera del servidor.
+    """
+    ids = {s['span_id'] for s in spans}
+    children: Dict[Optional[str], List[Dict]] = {}
+    for s in spans:
+        parent = s.get('parent_id') if s.get('parent_id') in ids else None
+        children.setdefault(parent, []).append(s)
+    for group in children.values():
+        group.sort(key=lambda s: s['start'])
+
+    rows: List[Tuple[int, Dict, float]] = []
+
+    def visit(s: Dict, depth: int):
+        kids = children.get(s['span_id'], [])
+        own = max(0.0, s['duration_ms'] - sum(k['duration_ms'] for k in kids))
+        rows.append((depth, s, own))
+        for kid in kids:
+            visit(kid, depth + 1)
+
+    for root in children.get(None, []):
+        visit(root, 0)
+    return rows
+
+
+def breakdown(spans: Sequence[Dict]) -> Dict[str, float]:
+    """
+    Reparto del tiempo de una traza: BD, microservicio (spans del servidor
+    gRPC), red (llamada gRPC menos lo que tardó el servidor) y el resto en
+    este proceso. Si la traza incluye el job asíncrono, `total_ms` suma
+    petición y job.
+    """
+    by_parent: Dict[Optional[str], List[Dict]] = {}
+    for s in spans:
+        by_parent.setdefault(s.get('parent_id'), []).append(s)
+    ids = {s['span_id'] for s in spans}
+    # La petición y, aparte, el job que continuó su traza en el worker
+    roots = [s for s in spans if s.get('parent_id') not in ids or s.get('kind') == 'consumer']
+    local_roots = [s for s in roots if s.get('service') == SERVICE] or roots
+
+    total = sum(s['duration_ms'] for s in local_roots)
+    db = sum(s['duration_ms'] for s in spans if s['name'] == 'db')
+    remote = network = 0.0
+    for s in spans:
+        if s.get('kind') != 'client':
+            continue
+        served = sum(child['duration_ms'] for child in by_parent.get(s['span_id'], []) if child.get('kind') == 'server')
+        remote += served
+        network += max(0.0, s['duration_ms'] - served)
+    return {
+        'total_ms': round(total, 3),
+        'db_ms': round(db, 3),
+        'grpc_network_ms': round(network, 3),
+        'grpc_server_ms': round(remote, 3),
+        'app_ms': round(max(0.0, total - db - network - remote), 3),
+    }
@@ -20,8 +20,11 @@ from django.contrib import admin
 from django.urls import include, path
 from django.views.generic import TemplateView
 
+from config.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/', include('sequences_api.urls')),
     path('api/', include('search_api.urls')),
     path('', TemplateView.as_view(template_name="index.html"), name='frontend'),
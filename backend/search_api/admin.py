@@ -1,15 +1,30 @@
 from django.contrib import admin
 
-from .models import SearchJob, SearchResult
+from .deletion import admin_deleted_objects, delete_jobs, with_followers
+from .models import SearchJob, SearchResult, SearchResultChunk
 
 
 @admin.register(SearchJob)
 class SearchJobAdmin(admin.ModelAdmin):
-    list_display = ('id', 'sequence', 'pattern', 'status', 'total_matches', 'algorithm_used', 'created_at')
-    list_filter = ('status', 'algorithm_used', 'created_at')
+    list_display = ('id', 'sequence', 'pattern', 'status', 'priority', 'client_id', 'total_matches', 'algorithm_used', 'route', 'worker_id', 'coalesced_with', 'created_at')
+    list_filter = ('status', 'priority', 'algorithm_used', 'route', 'created_at')
     search_fields = ('pattern', 'sequence__name')
     ordering = ('-created_at',)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_sequence_name()
+
+    # Borrado por lotes de claves (ver deletion.py)
+    def get_deleted_objects(self, objs, request):
+        jobs = SearchJob.objects.filter(pk__in=with_followers(obj.pk for obj in objs))
+        return admin_deleted_objects(objs, request, jobs)
+
+    def delete_model(self, request, obj):
+        delete_jobs([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        delete_jobs(queryset.values_list('pk', flat=True))
+
 
 @admin.register(SearchResult)
 class SearchResultAdmin(admin.ModelAdmin):
@@ -17,4 +32,11 @@ class SearchResultAdmin(admin.ModelAdmin):
     list_filter = ('job',)
     search_fields = ('job__pattern',)
 
+
+@admin.register(SearchResultChunk)
+class SearchResultChunkAdmin(admin.ModelAdmin):
+    list_display = ('id', 'job', 'index', 'count', 'first_position', 'last_position')
+    list_filter = ('job',)
+    exclude = ('data',)
+
 # Register your models here.
@@ -0,0 +1,283 @@
+"""
+Procesos de búsqueda con afinidad por secuencia.
+
+Un pool de procesos de larga duración (`manage.py search_affinity_pool`) se
+reparte las secuencias por rendezvous hashing sobre `file_hash`: cada
+secuencia tiene un proceso dueño que la carga una vez y la mantiene en
+memoria. Con SEARCH_AFFINITY_WORKERS > 0, execute_job no carga la secuencia:
+envía (id, file_hash, patrón) al dueño por un socket Unix local y recibe
+las coincidencias por lotes, el progreso y el resultado final. Las búsquedas
+repetidas sobre una secuencia nunca la vuelven a leer, y añadir un proceso
+solo mueve la parte de secuencias que le toca.
+
+Si el dueño no responde al conectar, execute_job busca en el propio proceso.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from multiprocessing import get_context
+from multiprocessing.connection import Client, Listener
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connection
+
+from sequences_api.cache import SequenceCache
+from sequences_api.models import DNASequence
+from .cancellation import CancellationToken, SearchCancelled
+from .grpc_client import _rendezvous_score
+from .progress import ProgressCallback
+from .services import MatchSink, run_local_search
+
+log = logging.getLogger(__name__)
+
+# Coincidencias por mensaje del worker al cliente
+MATCH_BATCH = 1000
+
+# Como mucho un mensaje de progreso por intervalo
+_PROGRESS_INTERVAL_SECONDS = 0.25
+
+
+class AffinityUnavailable(Exception):
+    """El proceso dueño de la secuencia no acepta conexiones."""
+
+
+class AffinitySearchError(Exception):
+    """La búsqueda falló en el proceso dueño o este terminó a mitad."""
+
+
+def pool_size() -> int:
+    return getattr(settings, "SEARCH_AFFINITY_WORKERS", 0)
+
+
+def affinity_enabled() -> bool:
+    return pool_size() > 0
+
+
+def socket_dir() -> str:
+    return getattr(settings, "SEARCH_AFFINITY_SOCKET_DIR", None) or os.path.join(
+        tempfile.gettempdir(), "dna-affinity"
+    )
+
+
+def socket_path(index: int, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or socket_dir(), f"worker-{index}.sock")
+
+
+def owner_index(file_hash: str, workers: int) -> int:
+    """Proceso dueño de la secuencia: al cambiar `workers` solo se mueven las claves necesarias."""
+    return max(range(workers), key=lambda i: _rendezvous_score(f"worker-{i}", file_hash))
+
+
+def _authkey() -> bytes:
+    return hashlib.sha256(settings.SECRET_KEY.encode('utf-8')).digest()
+
+
+def _load_from_db(pk: int) -> str:
+    return DNASequence.objects.values_list('sequence', flat=True).get(pk=pk)
+
+
+class AffinityWorker:
+    """
+    Proceso del pool: atiende búsquedas por su socket y mantiene residentes
+    las secuencias que carga (LRU con SEARCH_AFFINITY_MAX_BYTES).
+    """
+
+    def __init__(self, index: int, address: Optional[str] = None,
+                 loader: Optional[Callable[[int], str]] = None, max_bytes: Optional[int] = None):
+        self.index = index
+        self.address = address or socket_path(index)
+        if max_bytes is None:
+            max_bytes = getattr(settings, "SEARCH_AFFINITY_MAX_BYTES", 2 * 1024 * 1024 * 1024)
+        self.sequences = SequenceCache(max_bytes=max_bytes, name="affinity")
+        self._loader = loader or _load_from_db
+        self._listener: Optional[Listener] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.served = 0
+
+    def start(self) -> "AffinityWorker":
+        os.makedirs(os.path.dirname(self.address), exist_ok=True)
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # socket de un proceso anterior
+        self._listener = Listener(self.address, family='AF_UNIX', authkey=_authkey())
+        self._thread = threading.Thread(target=self._accept_loop, name=f"affinity-{self.index}", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.start()
+        self._thread.join()
+
+    def stop(self):
+        self._stopping.set()
+        if self._listener is not None:
+            self._listener.close()
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def _accept_loop(self):
+        while not self._stopping.is_set():
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                if self._stopping.is_set():
+                    return
+                log.exception("Worker de afinidad %s: fallo al aceptar conexión", self.index)
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _sequence(self, pk: int, file_hash: str) -> str:
+        text = self.sequences.get(pk, file_hash)
+        if text is None:
+            text = self._loader(pk)
+            self.sequences.put(pk, file_hash, text)
+        return text
+
+    def _handle(self, conn):
+        try:
+            while True:
+                request = conn.recv()
+                if isinstance(request, dict):  # un ('cancel',) tardío se descarta
+                    self._search(conn, request)
+        except (EOFError, OSError):
+            return  # el cliente cerró la conexión
+        finally:
+            conn.close()
+            connection.close()
+
+    def _search(self, conn, request: Dict):
+        # Cualquier mensaje del cliente durante la búsqueda (o su cierre) es una cancelación
+        token = CancellationToken(timeout=request.get('timeout'), check=conn.poll, poll_interval=0.05)
+        batch: List[Dict] = []
+        next_progress = [0.0]
+
+        def sink(match: Dict):
+            batch.append(match)
+            if len(batch) >= MATCH_BATCH:
+                conn.send(('matches', list(batch)))
+                batch.clear()
+
+        def progress(bytes_scanned: int):
+            now = time.monotonic()
+            if now >= next_progress[0]:
+                next_progress[0] = now + _PROGRESS_INTERVAL_SECONDS
+                conn.send(('progress', bytes_scanned))
+
+        try:
+            text = self._sequence(request['sequence_id'], request['file_hash'])
+            result = run_local_search(text, request['pattern'], request['allow_overlapping'],
+                                      sink=sink, token=token, progress=progress)
+        except SearchCancelled as exc:
+            conn.send(('cancelled', exc.reason))
+            return
+        except Exception as exc:  # pylint: disable=broad-except
+            conn.send(('error', str(exc)))
+            return
+        if batch:
+            conn.send(('matches', batch))
+        result.pop('matches')
+        self.served += 1
+        conn.send(('done', result))
+
+
+def affinity_search(sequence_id: int, file_hash: str, pattern: str, allow_overlapping: bool = True,
+                    sink: Optional[MatchSink] = None, token: Optional[CancellationToken] = None,
+                    progress: Optional[ProgressCallback] = None, workers: Optional[int] = None,
+                    directory: Optional[str] = None) -> Dict:
+    """
+    Busca en el proceso dueño de la secuencia. Devuelve el dict habitual de
+    resultados; con `sink` las coincidencias se entregan según llegan.
+
+    Lanza AffinityUnavailable si el dueño no acepta la conexión (sin haber
+    entregado nada), SearchCancelled si se cancela o vence el token y
+    AffinitySearchError si la búsqueda falla en el dueño.
+    """
+    index = owner_index(file_hash, workers or pool_size())
+    address = socket_path(index, directory)
+    try:
+        conn = Client(address, family='AF_UNIX', authkey=_authkey())
+    except (FileNotFoundError, ConnectionRefusedError) as exc:
+        raise AffinityUnavailable(address) from exc
+
+    matches: List[Dict] = []
+    deliver = sink or matches.append
+    with conn:
+        conn.send({
+            'sequence_id': sequence_id,
+            'file_hash': file_hash,
+            'pattern': pattern,
+            'allow_overlapping': allow_overlapping,
+            'timeout': token.remaining() if token is not None else None,
+        })
+        while True:
+            if token is not None:
+                # Se comprueba también mientras llegan lotes, no solo con el socket en silencio
+                if token.cancelled:
+                    conn.send(('cancel',))
+                    raise SearchCancelled(token.reason)
+                if not conn.poll(token.poll_interval):
+                    continue
+            try:
+                kind, payload = conn.recv()
+            except EOFError as exc:
+                raise AffinitySearchError(f"El worker de afinidad {index} terminó durante la búsqueda") from exc
+            if kind == 'matches':
+                for match in payload:
+                    deliver(match)
+            elif kind == 'progress':
+                if progress is not None:
+                    progress(payload)
+            elif kind == 'done':
+                payload['matches'] = matches
+                payload['affinity_worker'] = index
+                return payload
+            elif kind == 'cancelled':
+                raise SearchCancelled(payload)
+            else:
+                raise AffinitySearchError(payload)
+
+
+def _run_worker(index: int, directory: str):
+    connection.close()  # no compartir la conexión heredada del proceso padre
+    worker = AffinityWorker(index, socket_path(index, directory))
+    log.info("Worker de afinidad %s escuchando en %s", index, worker.address)
+    worker.serve_forever()
+
+
+class AffinityPool:
+    """Lanza y vigila los procesos del pool, reiniciando los que terminan."""
+
+    def __init__(self, workers: Optional[int] = None, directory: Optional[str] = None):
+        self.workers = workers or pool_size()
+        self.directory = directory or socket_dir()
+        self._context = get_context('fork')
+        self._processes: Dict[int, object] = {}
+        self._stopping = threading.Event()
+
+    def _spawn(self, index: int):
+        process = self._context.Process(target=_run_worker, args=(index, self.directory),
+                                        name=f"affinity-{index}", daemon=True)
+        process.start()
+        self._processes[index] = process
+
+    def run(self, check_interval: float = 1.0):
+        connection.close()
+        for index in range(self.workers):
+            self._spawn(index)
+        while not self._stopping.wait(check_interval):
+            for index, process in list(self._processes.items()):
+                if not process.is_alive():
+                    log.warning("Worker de afinidad %s terminó (código %s); se reinicia", index, process.exitcode)
+                    self._spawn(index)
+
+    def stop(self):
+        self._stopping.set()
+        for process in self._processes.values():
+            process.terminate()
+        for process in self._processes.values():
+            process.join(5)
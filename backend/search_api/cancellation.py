@@ -0,0 +1,126 @@
+"""
+Cancelación cooperativa y tiempo límite de las búsquedas.
+
+Un CancellationToken acompaña a la búsqueda de un job: los motores locales
+lo consultan dentro de su bucle de recorrido y el cliente gRPC cancela la
+llamada en curso cuando se dispara. Se dispara por:
+- cancel() en el mismo proceso (registro por job, ver cancel_local);
+- el tiempo límite del job (deadline);
+- una comprobación periódica (`check`), p. ej. que otro proceso marcó el
+  job como CANCELLED en la BD.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+REASON_CANCELLED = "cancelled"
+REASON_TIMEOUT = "timeout"
+
+
+class SearchCancelled(Exception):
+    """La búsqueda se detuvo por cancelación o por tiempo límite."""
+
+    def __init__(self, reason: str = REASON_CANCELLED):
+        self.reason = reason
+        super().__init__(
+            "Tiempo límite de búsqueda excedido" if reason == REASON_TIMEOUT else "Búsqueda cancelada"
+        )
+
+
+class CancellationToken:
+    """
+    Señal de cancelación compartida entre el job y los motores.
+
+    `timeout` son segundos de reloj desde la creación del token; `check` se
+    invoca como mucho cada `poll_interval` segundos y, si devuelve True, el
+    token queda cancelado. Con `delay_first_check` la primera comprobación
+    espera también un intervalo (p. ej. un job que se acaba de crear o
+    reclamar en PROCESSING no puede estar ya cancelado).
+    """
+
+    def __init__(self, timeout: Optional[float] = None, check: Optional[Callable[[], bool]] = None,
+                 poll_interval: float = 0.5, delay_first_check: bool = False):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.poll_interval = poll_interval
+        self._check = check
+        self._next_poll = time.monotonic() + poll_interval if delay_first_check else 0.0
+        self._reason: Optional[str] = None
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def reason(self) -> Optional[str]:
+        return self._reason
+
+    @property
+    def cancelled(self) -> bool:
+        return self._poll() is not None
+
+    def cancel(self, reason: str = REASON_CANCELLED):
+        with self._lock:
+            if self._reason is not None:
+                return
+            self._reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]):
+        """Registra `callback` para cuando se cancele (se invoca ya si lo está)."""
+        with self._lock:
+            if self._reason is None:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def remaining(self) -> Optional[float]:
+        """Segundos hasta el tiempo límite (None si no hay)."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def _poll(self) -> Optional[str]:
+        if self._reason is None:
+            now = time.monotonic()
+            if self.deadline is not None and now >= self.deadline:
+                self.cancel(REASON_TIMEOUT)
+            elif self._check is not None and now >= self._next_poll:
+                self._next_poll = now + self.poll_interval
+                if self._check():
+                    self.cancel(REASON_CANCELLED)
+        return self._reason
+
+    def raise_if_cancelled(self):
+        if self._reason is not None or self._poll() is not None:
+            raise SearchCancelled(self._reason)
+
+
+# Tokens de los jobs en ejecución en este proceso, para cancelar sin esperar al sondeo
+_active: Dict[int, CancellationToken] = {}
+_active_lock = threading.Lock()
+
+
+def register(job_id: int, token: CancellationToken):
+    with _active_lock:
+        _active[job_id] = token
+
+
+def unregister(job_id: int):
+    with _active_lock:
+        _active.pop(job_id, None)
+
+
+def cancel_local(job_id: int) -> bool:
+    """Cancela el job si se está ejecutando en este proceso."""
+    with _active_lock:
+        token = _active.get(job_id)
+    if token is None:
+        return False
+    token.cancel(REASON_CANCELLED)
+    return True
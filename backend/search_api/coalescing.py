@@ -0,0 +1,151 @@
+"""
+Coalescencia (single-flight) de búsquedas idénticas concurrentes.
+
+Dos búsquedas son idénticas si coinciden el hash de la secuencia, el patrón y
+las opciones. Cuando llegan a la vez, solo la primera (líder) ejecuta la
+búsqueda; las demás (seguidoras) esperan a que termine y comparten sus
+resultados: su job queda COMPLETED apuntando al del líder (coalesced_with)
+y la lectura de resultados se resuelve contra él.
+
+La elección del líder usa la tabla de jobs: el líder ocupa `inflight_key`,
+columna única, de modo que entre procesos solo un job puede tenerla. Las
+seguidoras del mismo proceso se despiertan con un Event en cuanto el líder
+termina; las de otros procesos consultan el estado del líder periódicamente.
+Si el líder no termina bien (falla o se cancela), las seguidoras vuelven a
+competir y una de ellas ejecuta la búsqueda.
+"""
+
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from config.metrics import registry
+from .cancellation import CancellationToken
+from .models import SearchJob
+
+
+COALESCE_EVENTS = registry.counter(
+    'dna_search_coalesce_total', 'Eventos de coalescencia de búsquedas idénticas', ['kind'],
+)
+
+
+def coalescing_enabled() -> bool:
+    return getattr(settings, "SEARCH_COALESCING", True)
+
+
+def coalesce_key(file_hash: str, pattern: str, allow_overlapping: bool) -> str:
+    raw = f"{file_hash}:{pattern}:{int(bool(allow_overlapping))}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class CoalescingStats:
+    """Contadores del proceso (ver snapshot); también se exportan en /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.leaders = 0
+            self.coalesced_local = 0
+            self.coalesced_remote = 0
+            self.leader_failures = 0
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+        COALESCE_EVENTS.inc(kind=name)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'leaders': self.leaders,
+                'coalesced_local': self.coalesced_local,
+                'coalesced_remote': self.coalesced_remote,
+                'coalesced_total': self.coalesced_local + self.coalesced_remote,
+                'leader_failures': self.leader_failures,
+            }
+
+
+stats = CoalescingStats()
+
+# Vuelos en curso dirigidos por este proceso: clave -> Event que se activa al terminar
+_flights: Dict[str, threading.Event] = {}
+_flights_lock = threading.Lock()
+
+
+def _try_lead(job: SearchJob, key: str) -> bool:
+    claim = SearchJob.objects.filter(pk=job.pk)
+    try:
+        if connection.in_atomic_block:
+            # Savepoint: el IntegrityError no debe invalidar la transacción exterior
+            with transaction.atomic():
+                claim.update(inflight_key=key)
+        else:
+            # En autocommit el UPDATE ya es atómico por sí solo
+            claim.update(inflight_key=key)
+    except IntegrityError:
+        return False
+    with _flights_lock:
+        _flights[key] = threading.Event()
+    job.inflight_key = key
+    stats.incr('leaders')
+    return True
+
+
+def finish_flight(key: Optional[str]):
+    """Despierta a las seguidoras locales. El líder llama a esto tras liberar inflight_key."""
+    if not key:
+        return
+    with _flights_lock:
+        event = _flights.pop(key, None)
+    if event is not None:
+        event.set()
+
+
+def _wait(key: str, seconds: float):
+    with _flights_lock:
+        event = _flights.get(key)
+    if event is not None:
+        event.wait(seconds)
+    else:
+        threading.Event().wait(seconds)
+
+
+def _leader_in_flight(leader_pk: int, key: str) -> bool:
+    return SearchJob.objects.filter(pk=leader_pk, status='PROCESSING', inflight_key=key).exists()
+
+
+def lead_or_follow(job: SearchJob, key: str, token: Optional[CancellationToken] = None) -> Optional[SearchJob]:
+    """
+    Devuelve None si `job` pasa a ser el líder (debe ejecutar la búsqueda y
+    luego liberar la clave), o el job líder ya COMPLETED cuyos resultados
+    comparte. Respeta la cancelación y el tiempo límite de `token`.
+    """
+    poll = getattr(settings, "SEARCH_COALESCE_POLL_SECONDS", 0.2)
+    while True:
+        if token is not None:
+            token.raise_if_cancelled()
+        if _try_lead(job, key):
+            return None
+
+        leader = SearchJob.objects.filter(inflight_key=key).only('pk').first()
+        if leader is None:
+            continue  # el líder acaba de terminar: volvemos a competir
+        with _flights_lock:
+            local = key in _flights
+
+        while _leader_in_flight(leader.pk, key):
+            if token is not None:
+                token.raise_if_cancelled()
+            _wait(key, poll)
+
+        leader = SearchJob.objects.filter(pk=leader.pk).first()
+        if leader is not None and leader.status == 'COMPLETED':
+            stats.incr('coalesced_local' if local else 'coalesced_remote')
+            return leader
+        stats.incr('leader_failures')
@@ -0,0 +1,256 @@
+"""
+Borrado por lotes de secuencias y jobs.
+
+`DNASequence.delete()` y `SearchJob.delete()` pasan por el collector de
+Django (on_delete=CASCADE): instancia cada job, resultado y bloque antes de
+borrarlos, y con una secuencia muy buscada son millones de objetos en
+memoria y minutos de bloqueo. Aquí se borra por lotes de claves, de las
+hojas a la raíz, de modo que al collector no le quede nada que instanciar:
+
+    bloques y resultados -> jobs seguidores (coalesced_with) -> jobs -> secuencia
+
+- Resultados y bloques no tienen relaciones ni señales: su `delete()` es ya
+  un único DELETE por lote (fast delete), sin cargar filas.
+- Jobs y secuencia se borran con `.only('pk')` cuando ya no tienen hijos: el
+  collector solo lee sus claves.
+- Cada DELETE afecta como mucho a SEARCH_DELETE_CHUNK_SIZE filas y, fuera
+  de una transacción, se confirma por separado: los bloqueos duran un lote.
+- Antes se cancelan los jobs activos, para que sus workers dejen de
+  escribir resultados (ver cancellation.py).
+
+`delete_sequence_in_background` hace el borrado en un hilo al confirmarse
+la transacción en curso; lo usan DELETE /api/sequences/<id>/ y el admin
+con SEARCH_DELETE_BACKGROUND.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from sequences_api.models import DNASequence
+from .cancellation import cancel_local
+from .models import SearchJob, SearchResult, SearchResultChunk
+from .progress import notifier
+
+log = logging.getLogger(__name__)
+
+# Jobs por lote (sus ids van en un IN)
+JOBS_PER_BATCH = 500
+
+CANCEL_REASON = "Cancelado al borrar el job"
+
+# Borrados en segundo plano de este proceso, por id de secuencia
+_running: Dict[int, threading.Thread] = {}
+_running_lock = threading.Lock()
+
+
+def delete_chunk_size() -> int:
+    return max(1, int(getattr(settings, 'SEARCH_DELETE_CHUNK_SIZE', 10000)))
+
+
+def delete_in_background() -> bool:
+    return getattr(settings, 'SEARCH_DELETE_BACKGROUND', False)
+
+
+def _empty_counts() -> Dict[str, int]:
+    return {'sequences': 0, 'jobs': 0, 'results': 0, 'result_chunks': 0}
+
+
+def _merge(counts: Dict[str, int], other: Dict[str, int]):
+    for key, value in other.items():
+        counts[key] += value
+
+
+def _delete_keys(queryset) -> int:
+    """Borra `queryset` leyendo solo las claves; devuelve las filas de su modelo."""
+    model = queryset.model
+    return queryset.only('pk').delete()[1].get(model._meta.label, 0)
+
+
+def _delete_rows(queryset, chunk_size: int) -> int:
+    """Borra las filas de `queryset` con DELETE de como mucho `chunk_size` filas."""
+    model = queryset.model
+    ids_query = queryset.order_by().values_list('pk', flat=True)
+    deleted = 0
+    while True:
+        ids = list(ids_query[:chunk_size])
+        if not ids:
+            return deleted
+        deleted += _delete_keys(model._base_manager.filter(pk__in=ids))
+
+
+def _cancel_active(jobs) -> List[int]:
+    """Cancela los jobs activos del conjunto y avisa a los de este proceso."""
+    ids = list(jobs.filter(status__in=SearchJob.ACTIVE_STATUSES).order_by().values_list('pk', flat=True))
+    if not ids:
+        return ids
+    SearchJob.objects.filter(pk__in=ids, status__in=SearchJob.ACTIVE_STATUSES).update(
+        status='CANCELLED', error_message=CANCEL_REASON, completed_at=timezone.now(), inflight_key=None,
+    )
+    for pk in ids:
+        cancel_local(pk)
+        notifier.finish(pk, 'CANCELLED')
+    return ids
+
+
+def _next_batch(jobs) -> List[int]:
+    """
+    Siguiente lote de jobs a borrar. Primero los seguidores: un líder no se
+    puede borrar mientras otro job apunte a él con coalesced_with.
+    """
+    ids = jobs.order_by().values_list('pk', flat=True)
+    return list(ids.filter(coalesced_with__isnull=False)[:JOBS_PER_BATCH]) or list(ids[:JOBS_PER_BATCH])
+
+
+def _delete_job_set(jobs, chunk_size: int) -> Dict[str, int]:
+    """Borra los jobs de `jobs` (un QuerySet) con sus resultados, lote a lote."""
+    counts = _empty_counts()
+    _cancel_active(jobs)
+    while True:
+        batch = _next_batch(jobs)
+        if not batch:
+            return counts
+        counts['result_chunks'] += _delete_rows(SearchResultChunk.objects.filter(job_id__in=batch), chunk_size)
+        counts['results'] += _delete_rows(SearchResult.objects.filter(job_id__in=batch), chunk_size)
+        counts['jobs'] += _delete_keys(SearchJob.objects.filter(pk__in=batch))
+
+
+def with_followers(job_ids: Iterable[int]) -> List[int]:
+    """Añade los jobs que comparten resultados con los dados (CASCADE de coalesced_with)."""
+    ids = set(job_ids)
+    new = set(ids)
+    while new:
+        new = set(SearchJob.objects.filter(coalesced_with_id__in=new).values_list('pk', flat=True)) - ids
+        ids |= new
+    return sorted(ids)
+
+
+def delete_jobs(job_ids: Iterable[int], chunk_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Borra los jobs, sus resultados y los jobs coalescidos con ellos.
+    Devuelve cuántas filas se borraron de cada tabla.
+    """
+    chunk_size = chunk_size or delete_chunk_size()
+    ids = with_followers(job_ids)
+    counts = _empty_counts()
+    # Dos pasadas: los seguidores antes que cualquier líder (ver _next_batch)
+    for followers_only in (True, False):
+        for start in range(0, len(ids), JOBS_PER_BATCH):
+            jobs = SearchJob.objects.filter(pk__in=ids[start:start + JOBS_PER_BATCH])
+            if followers_only:
+                jobs = jobs.filter(coalesced_with__isnull=False)
+            _merge(counts, _delete_job_set(jobs, chunk_size))
+    return counts
+
+
+def delete_sequence(sequence_id: int, chunk_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Borra la secuencia con sus jobs y resultados. Devuelve cuántas filas se
+    borraron de cada tabla ('sequences' es 0 si ya no existía).
+    """
+    chunk_size = chunk_size or delete_chunk_size()
+    t0 = time.perf_counter()
+    jobs = SearchJob.objects.filter(sequence_id=sequence_id)
+    counts = _delete_job_set(jobs, chunk_size)
+    with transaction.atomic():
+        # Jobs creados mientras se borraba el resto
+        _merge(counts, _delete_job_set(jobs, chunk_size))
+        # post_delete invalida la caché de secuencias (ver sequences_api/cache.py)
+        counts['sequences'] = _delete_keys(DNASequence.objects.filter(pk=sequence_id))
+    log.info("Secuencia %s borrada en %.1f s: %s", sequence_id, time.perf_counter() - t0, counts)
+    return counts
+
+
+def delete_sequences(sequence_ids: Iterable[int], chunk_size: Optional[int] = None) -> Dict[str, int]:
+    counts = _empty_counts()
+    for sequence_id in sequence_ids:
+        _merge(counts, delete_sequence(sequence_id, chunk_size))
+    return counts
+
+
+def is_deleting(sequence_id: int) -> bool:
+    """True si este proceso está borrando la secuencia en segundo plano."""
+    with _running_lock:
+        return sequence_id in _running
+
+
+def _background_delete(sequence_id: int, chunk_size: Optional[int]):
+    try:
+        delete_sequence(sequence_id, chunk_size)
+    except Exception:  # pylint: disable=broad-except
+        log.exception("Fallo borrando la secuencia %s en segundo plano", sequence_id)
+    finally:
+        connection.close()
+        with _running_lock:
+            _running.pop(sequence_id, None)
+
+
+def _start_background(sequence_id: int, chunk_size: Optional[int]):
+    with _running_lock:
+        if sequence_id in _running:
+            return
+        thread = threading.Thread(
+            target=_background_delete, args=(sequence_id, chunk_size),
+            name=f"delete-sequence-{sequence_id}", daemon=True,
+        )
+        _running[sequence_id] = thread
+    thread.start()
+
+
+def delete_sequence_in_background(sequence_id: int, chunk_size: Optional[int] = None):
+    """
+    Borra la secuencia en un hilo, cuando se confirme la transacción en
+    curso (o ya, si no hay ninguna). Si ya se está borrando no hace nada.
+    """
+    transaction.on_commit(lambda: _start_background(sequence_id, chunk_size))
+
+
+def wait_for_background(timeout: Optional[float] = None) -> bool:
+    """Espera a los borrados en segundo plano de este proceso. False si vence `timeout`."""
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while True:
+        with _running_lock:
+            threads = list(_running.values())
+        if not threads:
+            return True
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            return False
+        threads[0].join(remaining)
+
+
+def pending_counts(jobs) -> Dict[str, int]:
+    """Filas que se borrarían con los jobs de `jobs`, contadas sin cargarlas."""
+    return {
+        'jobs': jobs.count(),
+        'results': SearchResult.objects.filter(job__in=jobs).count(),
+        'result_chunks': SearchResultChunk.objects.filter(job__in=jobs).count(),
+    }
+
+
+def admin_deleted_objects(objs, request, jobs):
+    """
+    Confirmación de borrado del admin con recuentos (`jobs`: todos los jobs
+    que se borrarán), en vez del árbol de objetos que arma el collector y
+    que los carga todos. Devuelve la misma tupla que
+    ModelAdmin.get_deleted_objects.
+    """
+    objs = list(objs)
+    model_count = {}
+    perms_needed = set()
+    if objs and objs[0]._meta.model is not SearchJob:
+        model_count[objs[0]._meta.verbose_name_plural] = len(objs)
+    counts = pending_counts(jobs)
+    for model, key in ((SearchJob, 'jobs'), (SearchResult, 'results'), (SearchResultChunk, 'result_chunks')):
+        if not counts[key]:
+            continue
+        opts = model._meta
+        model_count[opts.verbose_name_plural] = counts[key]
+        if not request.user.has_perm(f"{opts.app_label}.delete_{opts.model_name}"):
+            perms_needed.add(opts.verbose_name)
+    return [str(obj) for obj in objs], model_count, perms_needed, []
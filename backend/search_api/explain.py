@@ -0,0 +1,169 @@
+"""
+Plan de ejecución de una búsqueda sin ejecutarla (EXPLAIN).
+
+explain_search() sigue las mismas decisiones que execute_job/run_search:
+- Ruta: pool de afinidad si está activo; si no, gRPC o local según
+  USE_GRPC_SEARCH y el router de costes (la ruta más barata; las
+  exploraciones periódicas del router no se pueden prever).
+- Caché: si el texto de la secuencia ya está en la caché de secuencias
+  (local o compartida), sin contar la consulta como acierto ni fallo.
+- Coalescencia: si hay un job idéntico en curso al que se uniría.
+- Estimaciones: coincidencias esperadas (bases independientes con el GC de
+  la secuencia; con allow_overlapping=False es una cota superior), tiempo
+  del router para la ruta y memoria adicional en este proceso.
+
+El plan se guarda en SearchJob.plan al crear el job; compare_with_actual()
+lo enfrenta con lo que midió la ejecución. Ese plan no busca el líder
+(lookup_leader=False): lead_or_follow ya lo hace al ejecutar, y el job
+anota en plan['coalescing']['leader_job'] el líder con el que se coalesció.
+"""
+
+import sys
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from sequences_api.cache import BACKEND_SHARED, cache_backend, is_sequence_cached
+from sequences_api.models import DNASequence
+from .affinity import affinity_enabled
+from .coalescing import coalesce_key, coalescing_enabled
+from .models import SearchJob
+from .persistence import DEFAULT_BATCH_SIZE
+from .result_store import STORAGE_ROWS, storage_mode
+from .routing import ROUTE_AFFINITY, ROUTE_GRPC, ROUTE_LOCAL, ROUTE_LOCAL_FALLBACK, get_router
+from .scheduling import classify, estimate_cost_ms
+
+ENGINES = {
+    ROUTE_LOCAL: "naive-local",
+    ROUTE_AFFINITY: "naive-local",
+    ROUTE_GRPC: "grpc",  # el algoritmo lo decide el servidor
+}
+
+# Coincidencias en cola en ResultWriter: el lote en curso más los pendientes del hilo escritor
+_WRITER_BATCHES = 5
+
+# Bytes de una coincidencia en memoria ({'position', 'context_before', 'context_after'})
+_SAMPLE_MATCH = {'position': 10 ** 8, 'context_before': 'A' * 10, 'context_after': 'A' * 10}
+MATCH_BYTES = sys.getsizeof(_SAMPLE_MATCH) + sum(sys.getsizeof(v) for v in _SAMPLE_MATCH.values())
+# Cada coincidencia en la respuesta protobuf antes de convertirla
+PROTO_MATCH_BYTES = 64
+STR_OVERHEAD = sys.getsizeof("")
+
+
+def _writer_batch_size() -> int:
+    if storage_mode() == STORAGE_ROWS:
+        return int(getattr(settings, "SEARCH_PERSIST_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+    return int(getattr(settings, "SEARCH_RESULT_CHUNK_SIZE", 8192))
+
+
+def _plan_route(sequence_length: int, pattern: str, gc_content: Optional[float]):
+    use_grpc = getattr(settings, "USE_GRPC_SEARCH", False)
+    routes = [ROUTE_LOCAL, ROUTE_GRPC] if use_grpc else [ROUTE_LOCAL]
+    decision = get_router().preview(sequence_length, pattern, routes, gc_content)
+    if affinity_enabled():
+        # El pool usa el motor local en otro proceso
+        return ROUTE_AFFINITY, "affinity-pool", decision, decision.estimates[ROUTE_LOCAL]
+    if use_grpc and not getattr(settings, "SEARCH_COST_ROUTING", False):
+        return ROUTE_GRPC, "grpc-enabled", decision, decision.estimates[ROUTE_GRPC]
+    reason = "cheapest" if use_grpc else "local-only"
+    return decision.route, reason, decision, decision.predicted_ms
+
+
+def _estimate_memory(route: str, sequence_length: int, expected_matches: int, cached: bool) -> Dict[str, int]:
+    """Memoria adicional que necesita la búsqueda en este proceso, por concepto (bytes)."""
+    shared = cache_backend() == BACKEND_SHARED
+    # Con la caché compartida el texto es un mmap (fuera del heap); en la local se carga si no estaba
+    text = 0 if cached or shared or route == ROUTE_AFFINITY else sequence_length + STR_OVERHEAD
+    memory = {'sequence_text': text}
+    if route == ROUTE_GRPC:
+        # El mensaje protobuf copia la secuencia (y un mmap se convierte antes a str)
+        memory['grpc_request'] = sequence_length * (2 if shared else 1)
+        # La respuesta llega entera y se convierte a dicts antes de persistir
+        memory['matches'] = expected_matches * (MATCH_BYTES + PROTO_MATCH_BYTES)
+    else:
+        memory['matches'] = min(expected_matches, _writer_batch_size() * _WRITER_BATCHES) * MATCH_BYTES
+    return memory
+
+
+def explain_search(sequence: DNASequence, pattern: str, allow_overlapping: bool = True,
+                   priority: Optional[str] = None, lookup_leader: bool = True) -> Dict:
+    """
+    Plan de la búsqueda de `pattern` (ya normalizado) en `sequence`, sin
+    ejecutarla. Con lookup_leader=False no consulta la BD para buscar un
+    job idéntico en curso (leader_job queda en None).
+    """
+    route, reason, decision, estimated_ms = _plan_route(sequence.length, pattern, sequence.gc_content)
+    expected_matches = int(round(decision.expected_hits))
+    cached = is_sequence_cached(sequence)
+
+    leader = None
+    if lookup_leader and coalescing_enabled():
+        key = coalesce_key(sequence.file_hash, pattern, allow_overlapping)
+        leader = SearchJob.objects.filter(inflight_key=key).values_list('pk', flat=True).first()
+
+    memory = _estimate_memory(route, sequence.length, expected_matches, cached)
+    return {
+        'sequence': {'id': sequence.pk, 'name': sequence.name, 'length': sequence.length},
+        'pattern': pattern,
+        'allow_overlapping': allow_overlapping,
+        'route': route,
+        'route_reason': reason,
+        'fallback_route': ROUTE_LOCAL_FALLBACK if route == ROUTE_GRPC else None,
+        'engine': ENGINES[route],
+        'route_estimates_ms': {name: round(ms, 3) for name, ms in decision.estimates.items()},
+        'sequence_cache': {'backend': cache_backend(), 'hit': cached},
+        'coalescing': {'enabled': coalescing_enabled(), 'leader_job': leader},
+        # Clase que tendría en la cola asíncrona
+        'priority': dict(SearchJob.PRIORITY_CHOICES)[
+            classify(estimate_cost_ms(sequence.length, pattern, sequence.gc_content), priority)
+        ],
+        'estimated_matches': expected_matches,
+        'estimated_time_ms': round(estimated_ms, 3),
+        'estimated_memory_bytes': sum(memory.values()),
+        'memory_breakdown': memory,
+    }
+
+
+def _numeric(predicted, actual) -> Dict:
+    ratio = actual / predicted if predicted and actual is not None else None
+    return {'predicted': predicted, 'actual': actual, 'ratio': round(ratio, 3) if ratio is not None else None}
+
+
+def _categorical(predicted, actual) -> Dict:
+    return {'predicted': predicted, 'actual': actual, 'match': predicted == actual if actual is not None else None}
+
+
+def compare_with_actual(job: SearchJob) -> Dict:
+    """Plan guardado del job frente a lo medido (solo si terminó COMPLETED)."""
+    plan = job.plan or {}
+    actual = None
+    if job.status == 'COMPLETED':
+        coalesced = job.coalesced_with_id is not None
+        actual = {
+            'route': job.route,
+            'engine': job.algorithm_used,
+            'matches': job.total_matches,
+            'time_ms': job.actual_cost_ms,
+            'engine_time_ms': job.search_time_ms,
+            # Sin lectura de la columna `sequence` durante la ejecución, el texto salió de la caché
+            'sequence_cache_hit': (
+                'sequence_text' not in job.timings if job.timings is not None and not coalesced else None
+            ),
+            'coalesced_with': job.coalesced_with_id,
+        }
+
+    comparison = None
+    if actual is not None:
+        comparison = {
+            'route': _categorical(plan.get('route', job.route), actual['route']),
+            'matches': _numeric(plan.get('estimated_matches'), actual['matches']),
+            'time_ms': _numeric(plan.get('estimated_time_ms', job.predicted_cost_ms), actual['time_ms']),
+            'sequence_cache_hit': _categorical(plan.get('sequence_cache', {}).get('hit'), actual['sequence_cache_hit']),
+        }
+    return {
+        'job_id': job.pk,
+        'status': job.status,
+        'plan': job.plan,
+        'actual': actual,
+        'comparison': comparison,
+    }
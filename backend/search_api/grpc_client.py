@@ -1,8 +1,27 @@
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence
+
 import grpc
 from django.conf import settings
 
+from config import tracing
+from .cancellation import REASON_CANCELLED, REASON_TIMEOUT, CancellationToken, SearchCancelled
 from .grpc_stubs import dna_search_pb2, dna_search_pb2_grpc
 
+log = logging.getLogger(__name__)
+
+# Códigos que indican que la réplica no está sana (no que la petición sea inválida).
+# DEADLINE_EXCEEDED no: una búsqueda lenta pero válida agotaría el plazo en
+# todas las réplicas y las expulsaría a todas.
+EJECT_STATUS_CODES = frozenset({
+    grpc.StatusCode.UNAVAILABLE,
+})
+
 
 class GrpcSearchClient:
     """
@@ -19,18 +38,327 @@ class GrpcSearchClient:
         self.channel = grpc.insecure_channel(self.address, options=opts)
         self.stub = dna_search_pb2_grpc.DnaSearchStub(self.channel)
 
-    def search(self, sequence: str, pattern: str, allow_overlapping: bool = True):
+    def search(self, sequence: str, pattern: str, allow_overlapping: bool = True,
+               token: Optional[CancellationToken] = None):
         req = dna_search_pb2.SearchRequest(
             sequence=sequence,
             pattern=pattern,
             allow_overlapping=allow_overlapping,
         )
-        resp = self.stub.Search(req, timeout=self.timeout)
+        with self._traced('Search', req):
+            if token is not None:
+                return self._call_cancellable(self.stub.Search, req, token)
+            return self._call(self.stub.Search, req)
+
+    @contextmanager
+    def _traced(self, method: str, req):
+        """Span de cliente de la llamada; el servidor añade los suyos como hijos."""
+        if tracing.current_span() is None:
+            yield
+            return
+        with tracing.span(f'grpc.client/{method}', kind='client', **{
+            'rpc.address': self.address, 'rpc.request_bytes': req.ByteSize(),
+        }):
+            yield
+
+    def _call(self, method, req):
+        metadata = tracing.grpc_metadata()
+        if metadata is None:
+            return method(req, timeout=self.timeout)
+        resp, call = method.with_call(req, timeout=self.timeout, metadata=metadata)
+        tracing.add_remote_spans(call.trailing_metadata())
         return resp
 
+    def _call_cancellable(self, method, req, token: CancellationToken):
+        """
+        Llamada asíncrona que se cancela (también en el servidor) cuando se
+        dispara el token; el plazo gRPC no supera el tiempo límite del job.
+        Si es ese tiempo límite el que agota el plazo, lanza
+        SearchCancelled(REASON_TIMEOUT) y no un RpcError: la réplica no tiene
+        la culpa y el balanceador no debe reintentar en otra.
+        """
+        timeout = self.timeout
+        remaining = token.remaining()
+        job_deadline = remaining is not None and remaining < timeout
+        if job_deadline:
+            timeout = remaining
+        future = method.future(req, timeout=timeout, metadata=tracing.grpc_metadata())
+        token.add_callback(future.cancel)
+        try:
+            while True:
+                try:
+                    resp = future.result(timeout=token.poll_interval)
+                except grpc.FutureTimeoutError:
+                    token.raise_if_cancelled()
+                    continue
+                except grpc.FutureCancelledError:
+                    raise SearchCancelled(token.reason or REASON_CANCELLED)
+                except grpc.RpcError as exc:
+                    if job_deadline and _status_code(exc) == grpc.StatusCode.DEADLINE_EXCEEDED:
+                        token.cancel(REASON_TIMEOUT)
+                    token.raise_if_cancelled()
+                    raise
+                tracing.add_remote_spans(future.trailing_metadata())
+                return resp
+        finally:
+            token.remove_callback(future.cancel)
+
+    def search_batch(self, sequences: Dict[str, str], patterns: Sequence[str], allow_overlapping: bool = True):
+        """
+        Busca todos los patrones en todas las secuencias en una sola llamada.
+        `sequences` es un dict id -> secuencia; cada secuencia se envía una vez.
+        """
+        req = dna_search_pb2.BatchSearchRequest(
+            sequences=[
+                dna_search_pb2.SequenceEntry(id=str(seq_id), sequence=seq)
+                for seq_id, seq in sequences.items()
+            ],
+            patterns=list(patterns),
+            allow_overlapping=allow_overlapping,
+        )
+        with self._traced('BatchSearch', req):
+            return self._call(self.stub.BatchSearch, req)
+
+
+class Backend:
+    """
+    Réplica del microservicio con su estado de carga y salud.
+    """
+
+    def __init__(self, client: GrpcSearchClient):
+        self.client = client
+        self.address = client.address
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def __repr__(self):
+        return f"Backend({self.address}, outstanding={self.outstanding})"
+
+
+class RoundRobinPolicy:
+    """Reparte las peticiones en orden circular."""
+
+    name = "round_robin"
+    uses_key = False
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def choose(self, backends: Sequence[Backend], key: Optional[str] = None) -> Backend:
+        return backends[next(self._counter) % len(backends)]
+
+
+class LeastOutstandingPolicy:
+    """Elige la réplica con menos peticiones en vuelo (empates en orden circular)."""
+
+    name = "least_outstanding"
+    uses_key = False
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def choose(self, backends: Sequence[Backend], key: Optional[str] = None) -> Backend:
+        offset = next(self._counter)
+        rotated = [backends[(offset + i) % len(backends)] for i in range(len(backends))]
+        return min(rotated, key=lambda b: b.outstanding)
+
+
+class SequenceHashPolicy:
+    """
+    Afinidad por secuencia con rendezvous hashing: la misma secuencia va
+    siempre a la misma réplica y, si esta se expulsa, solo se mueven sus claves.
+    """
+
+    name = "sequence_hash"
+    uses_key = True
+
+    def __init__(self):
+        self._fallback = RoundRobinPolicy()
+
+    def choose(self, backends: Sequence[Backend], key: Optional[str] = None) -> Backend:
+        if key is None:
+            return self._fallback.choose(backends)
+        return max(backends, key=lambda b: _rendezvous_score(b.address, key))
+
+
+LB_POLICIES = {
+    policy.name: policy
+    for policy in (RoundRobinPolicy, LeastOutstandingPolicy, SequenceHashPolicy)
+}
+
+
+def _rendezvous_score(address: str, key: str) -> int:
+    digest = hashlib.blake2b(f"{address}|{key}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def sequence_affinity_key(sequence: str, sample_size: int = 4096) -> str:
+    """
+    Clave barata para afinidad: longitud + muestras del inicio, medio y final.
+    Evita hashear secuencias de cientos de MB en cada petición.
+    """
+    n = len(sequence)
+    mid = n // 2
+    sample = (
+        sequence[:sample_size]
+        + sequence[mid:mid + sample_size]
+        + sequence[-sample_size:]
+    )
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(n).encode('ascii'))
+    h.update(sample.encode('utf-8'))
+    return h.hexdigest()
+
+
+def _status_code(exc: grpc.RpcError):
+    code = getattr(exc, 'code', None)
+    return code() if callable(code) else None
+
+
+class LoadBalancedSearchClient:
+    """
+    Cliente que balancea búsquedas entre varias réplicas del microservicio.
+
+    - Política intercambiable (round_robin, least_outstanding, sequence_hash).
+    - Expulsión pasiva: tras `eject_after` fallos de conexión seguidos la réplica
+      queda fuera durante `eject_seconds` y la petición se reintenta en otra.
+    - Si todas están expulsadas se prueban igualmente (modo pánico).
+    """
+
+    def __init__(
+        self,
+        addresses: Sequence[str],
+        timeout: float = 5.0,
+        policy: str = "round_robin",
+        eject_after: int = 1,
+        eject_seconds: float = 30.0,
+    ):
+        if not addresses:
+            raise ValueError("Se requiere al menos una réplica gRPC.")
+        if policy not in LB_POLICIES:
+            raise ValueError(f"Política de balanceo desconocida: {policy}")
+
+        self.timeout = timeout
+        self.policy = LB_POLICIES[policy]()
+        self.eject_after = max(1, int(eject_after))
+        self.eject_seconds = float(eject_seconds)
+        self.backends: List[Backend] = []
+        for address in addresses:
+            host, port = address.rsplit(':', 1)
+            self.backends.append(Backend(GrpcSearchClient(host, port, timeout)))
+        self.address = ",".join(b.address for b in self.backends)
+        self._lock = threading.Lock()
+
+    def healthy_backends(self) -> List[Backend]:
+        now = time.monotonic()
+        return [b for b in self.backends if b.is_healthy(now)]
+
+    def _acquire(self, key: Optional[str], tried: set) -> Optional[Backend]:
+        with self._lock:
+            now = time.monotonic()
+            candidates = [b for b in self.backends if b.address not in tried and b.is_healthy(now)]
+            if not candidates:
+                candidates = [b for b in self.backends if b.address not in tried]
+            if not candidates:
+                return None
+            backend = self.policy.choose(candidates, key)
+            backend.outstanding += 1
+            return backend
+
+    def _release(self, backend: Backend, failed: bool):
+        with self._lock:
+            backend.outstanding -= 1
+            if not failed:
+                backend.consecutive_failures = 0
+                backend.ejected_until = 0.0
+                return
+            backend.consecutive_failures += 1
+            if backend.consecutive_failures >= self.eject_after:
+                backend.ejected_until = time.monotonic() + self.eject_seconds
+                log.warning("Réplica gRPC %s expulsada durante %.0fs", backend.address, self.eject_seconds)
+
+    def _call(self, affinity_key: Optional[str], invoke: Callable[[GrpcSearchClient], object]):
+        tried = set()
+        last_exc = None
+        while True:
+            backend = self._acquire(affinity_key, tried)
+            if backend is None:
+                raise last_exc
+            tried.add(backend.address)
+            try:
+                resp = invoke(backend.client)
+            except SearchCancelled:
+                self._release(backend, failed=False)
+                raise
+            except grpc.RpcError as exc:
+                code = _status_code(exc)
+                if code is not None and code not in EJECT_STATUS_CODES:
+                    # Error de la petición: la réplica está sana
+                    self._release(backend, failed=False)
+                    raise
+                self._release(backend, failed=True)
+                log.warning("Fallo en réplica gRPC %s (%s), probando otra.", backend.address, code)
+                last_exc = exc
+                continue
+            self._release(backend, failed=False)
+            return resp
+
+    def search(
+        self,
+        sequence: str,
+        pattern: str,
+        allow_overlapping: bool = True,
+        affinity_key: Optional[str] = None,
+        token: Optional[CancellationToken] = None,
+    ):
+        if affinity_key is None and self.policy.uses_key:
+            affinity_key = sequence_affinity_key(sequence)
+        return self._call(
+            affinity_key,
+            lambda client: client.search(sequence, pattern, allow_overlapping, token=token),
+        )
+
+    def search_batch(self, sequences: Dict[str, str], patterns: Sequence[str], allow_overlapping: bool = True):
+        # Afinidad por la primera secuencia del lote
+        affinity_key = None
+        if self.policy.uses_key and sequences:
+            affinity_key = sequence_affinity_key(next(iter(sequences.values())))
+        return self._call(
+            affinity_key,
+            lambda client: client.search_batch(sequences, patterns, allow_overlapping),
+        )
+
+
+_balanced_clients = {}
+_balanced_clients_lock = threading.Lock()
+
+
+def _get_balanced_client(addresses, timeout, policy, eject_after, eject_seconds):
+    # El estado (carga, expulsiones) debe sobrevivir entre peticiones
+    config = (tuple(addresses), timeout, policy, eject_after, eject_seconds)
+    with _balanced_clients_lock:
+        client = _balanced_clients.get(config)
+        if client is None:
+            client = LoadBalancedSearchClient(addresses, timeout, policy, eject_after, eject_seconds)
+            _balanced_clients[config] = client
+        return client
+
 
 def get_grpc_client():
+    timeout = float(getattr(settings, "GRPC_TIMEOUT_SECONDS", 5))
+    backends = getattr(settings, "GRPC_BACKENDS", None)
+    if backends:
+        return _get_balanced_client(
+            backends,
+            timeout,
+            getattr(settings, "GRPC_LB_POLICY", "round_robin"),
+            int(getattr(settings, "GRPC_EJECT_AFTER_FAILURES", 1)),
+            float(getattr(settings, "GRPC_EJECT_SECONDS", 30)),
+        )
     host = getattr(settings, "GRPC_HOST", "localhost")
     port = getattr(settings, "GRPC_PORT", "50051")
-    timeout = float(getattr(settings, "GRPC_TIMEOUT_SECONDS", 5))
     return GrpcSearchClient(host, port, timeout)
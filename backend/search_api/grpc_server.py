@@ -0,0 +1,147 @@
+"""
+Implementación de referencia en Python del servicio DnaSearch.
+
+Sirve `dna_search.proto` con el mismo motor que la búsqueda local
+(`services.iter_matches`), de modo que el transporte gRPC real puede
+probarse y medirse sin el binario C++. Arranque:
+
+    python manage.py run_search_server --port 50051 --workers 8
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent import futures
+from typing import Optional, Tuple
+
+import grpc
+
+from config import tracing
+from .grpc_stubs import dna_search_pb2, dna_search_pb2_grpc
+from .cancellation import CancellationToken, SearchCancelled
+from .services import iter_matches
+
+log = logging.getLogger(__name__)
+
+ALGORITHM_NAME = "naive-python-grpc"
+SERVICE_NAME = "dna-search"
+MAX_MESSAGE_BYTES = 200 * 1024 * 1024  # igual que el servidor C++
+
+
+def _search(sequence: str, pattern: str, allow_overlapping: bool,
+            token: Optional[CancellationToken] = None) -> dna_search_pb2.SearchResponse:
+    t0 = time.perf_counter()
+    with tracing.span('engine'):
+        matches = list(iter_matches(sequence, pattern, allow_overlapping, token))
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    with tracing.span('encode', matches=len(matches)):
+        return dna_search_pb2.SearchResponse(
+            matches=[dna_search_pb2.Match(**m) for m in matches],
+            total_matches=len(matches),
+            search_time_ms=elapsed_ms,
+            algorithm_used=ALGORITHM_NAME,
+        )
+
+
+class DnaSearchServicer(dna_search_pb2_grpc.DnaSearchServicer):
+    """
+    Servicer con la misma semántica que el servidor C++ (validación,
+    contexto de 10 nucleótidos, solapamiento). Lleva contadores de llamadas
+    para pruebas de carga.
+
+    Si el cliente envía `traceparent` en los metadatos, los spans del
+    servidor vuelven en los metadatos finales (ver config/tracing.py).
+    """
+
+    def __init__(self, batch_workers: int = 4):
+        self.batch_workers = max(1, batch_workers)
+        self.search_calls = 0
+        self.batch_calls = 0
+        self.cancelled_calls = 0
+        self._lock = threading.Lock()
+
+    def _count(self, attr: str):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def Search(self, request, context):
+        self._count('search_calls')
+        if not request.sequence or not request.pattern:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Sequence and pattern cannot be empty")
+
+        # Se deja de buscar si el cliente cancela o vence su plazo
+        token = CancellationToken(timeout=context.time_remaining(), check=lambda: not context.is_active())
+        context.add_callback(token.cancel)
+        try:
+            with tracing.serve_traced(context.invocation_metadata(), 'DnaSearch/Search', SERVICE_NAME) as spans:
+                response = _search(request.sequence, request.pattern, request.allow_overlapping, token)
+        except SearchCancelled as exc:
+            self._count('cancelled_calls')
+            log.info("Search interrumpida (%s)", exc.reason)
+            context.abort(grpc.StatusCode.CANCELLED, str(exc))
+        context.set_trailing_metadata(tracing.spans_metadata(spans))
+        return response
+
+    def BatchSearch(self, request, context):
+        self._count('batch_calls')
+        t0 = time.perf_counter()
+        pairs = [(entry, pattern) for entry in request.sequences for pattern in request.patterns]
+
+        def run(pair):
+            entry, pattern = pair
+            result = dna_search_pb2.PairResult(sequence_id=entry.id, pattern=pattern)
+            if not entry.sequence or not pattern:
+                result.error = "Sequence and pattern cannot be empty"
+            else:
+                result.response.CopyFrom(_search(entry.sequence, pattern, request.allow_overlapping))
+            return result
+
+        with tracing.serve_traced(context.invocation_metadata(), 'DnaSearch/BatchSearch', SERVICE_NAME,
+                                  pairs=len(pairs)) as spans:
+            with futures.ThreadPoolExecutor(max_workers=min(self.batch_workers, max(1, len(pairs)))) as pool:
+                # Cada par en una copia del contexto, para que sus spans cuelguen de esta llamada
+                pending = [pool.submit(contextvars.copy_context().run, run, pair) for pair in pairs]
+                results = [future.result() for future in pending]
+
+        context.set_trailing_metadata(tracing.spans_metadata(spans))
+        return dna_search_pb2.BatchSearchResponse(
+            results=results,
+            total_time_ms=(time.perf_counter() - t0) * 1000,
+        )
+
+
+def create_server(
+    host: str = "0.0.0.0",
+    port: int = 50051,
+    max_workers: int = 10,
+    servicer: Optional[DnaSearchServicer] = None,
+) -> Tuple[grpc.Server, int, DnaSearchServicer]:
+    """
+    Crea y arranca el servidor. Con port=0 se elige un puerto libre.
+    Devuelve (server, puerto_real, servicer).
+    """
+    servicer = servicer or DnaSearchServicer(batch_workers=max_workers)
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers),
+        options=[
+            ('grpc.max_send_message_length', MAX_MESSAGE_BYTES),
+            ('grpc.max_receive_message_length', MAX_MESSAGE_BYTES),
+        ],
+    )
+    dna_search_pb2_grpc.add_DnaSearchServicer_to_server(servicer, server)
+    bound_port = server.add_insecure_port(f"{host}:{port}")
+    if bound_port == 0:
+        raise RuntimeError(f"No se pudo abrir {host}:{port}")
+    server.start()
+    log.info("Servidor DnaSearch (Python) escuchando en %s:%s con %d hilos", host, bound_port, max_workers)
+    return server, bound_port, servicer
+
+
+def serve(host: str = "0.0.0.0", port: int = 50051, max_workers: int = 10):
+    """Arranca el servidor y bloquea hasta que termine."""
+    server, _, _ = create_server(host, port, max_workers)
+    try:
+        server.wait_for_termination()
+    except KeyboardInterrupt:
+        server.stop(grace=2)
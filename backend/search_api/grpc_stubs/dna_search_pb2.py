@@ -73,13 +73,91 @@ def _build_file_descriptor():
     field.label = descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
     field.type = descriptor_pb2.FieldDescriptorProto.TYPE_STRING
 
-    # Service DnaSearch with Search rpc
+    # SequenceEntry
+    seq_entry = fdp.message_type.add()
+    seq_entry.name = "SequenceEntry"
+    field = seq_entry.field.add()
+    field.name = "id"
+    field.number = 1
+    field.label = descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+    field.type = descriptor_pb2.FieldDescriptorProto.TYPE_STRING
+    field = seq_entry.field.add()
+    field.name = "sequence"
+    field.number = 2
+    field.label = descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+    field.type = descriptor_pb2.FieldDescriptorProto.TYPE_STRING
+
+    # BatchSearchRequest
+    batch_req = fdp.message_type.add()
+    batch_req.name = "BatchSearchRequest"
+    field = batch_req.field.add()
+    field.name = "sequences"
+    field.number = 1
+    field.label = descriptor_pb2.FieldDescriptorProto.LABEL_REPEATED
+    field.type = descriptor_pb2.FieldDescriptorProto.TYPE_MESSAGE
+    field.type_name = ".dna.SequenceEntry"
+    field = batch_req.field.add()
+    field.name = "patterns"
+    field.number = 2
+    field.label = descriptor_pb2.FieldDescriptorProto.LABEL_REPEATED
+    field.type = descriptor_pb2.FieldDescriptorProto.TYPE_STRING
+    field = batch_req.field.add()
+    field.name = "allow_overlapping"
+    field.number = 3
+    field.label = descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+    field.type = descriptor_pb2.FieldDescriptorProto.TYPE_BOOL
+
+    # PairResult
+    pair_result = fdp.message_type.add()
+    pair_result.name = "PairResult"
+    field = pair_result.field.add()
+    field.name = "sequence_id"
+    field.number = 1
+    field.label = descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+    field.type = descriptor_pb2.FieldDescriptorProto.TYPE_STRING
+    field = pair_result.field.add()
+    field.name = "pattern"
+    field.number = 2
+    field.label = descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+    field.type = descriptor_pb2.FieldDescriptorProto.TYPE_STRING
+    field = pair_result.field.add()
+    field.name = "response"
+    field.number = 3
+    field.label = descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+    field.type = descriptor_pb2.FieldDescriptorProto.TYPE_MESSAGE
+    field.type_name = ".dna.SearchResponse"
+    field = pair_result.field.add()
+    field.name = "error"
+    field.number = 4
+    field.label = descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+    field.type = descriptor_pb2.FieldDescriptorProto.TYPE_STRING
+
+    # BatchSearchResponse
+    batch_resp = fdp.message_type.add()
+    batch_resp.name = "BatchSearchResponse"
+    field = batch_resp.field.add()
+    field.name = "results"
+    field.number = 1
+    field.label = descriptor_pb2.FieldDescriptorProto.LABEL_REPEATED
+    field.type = descriptor_pb2.FieldDescriptorProto.TYPE_MESSAGE
+    field.type_name = ".dna.PairResult"
+    field = batch_resp.field.add()
+    field.name = "total_time_ms"
+    field.number = 2
+    field.label = descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+    field.type = descriptor_pb2.FieldDescriptorProto.TYPE_DOUBLE
+
+    # Service DnaSearch with Search and BatchSearch rpcs
     service = fdp.service.add()
     service.name = "DnaSearch"
     method = service.method.add()
     method.name = "Search"
     method.input_type = ".dna.SearchRequest"
     method.output_type = ".dna.SearchResponse"
+    method = service.method.add()
+    method.name = "BatchSearch"
+    method.input_type = ".dna.BatchSearchRequest"
+    method.output_type = ".dna.BatchSearchResponse"
 
     serialized = fdp.SerializeToString()
     pool = descriptor_pool.Default()
@@ -92,7 +170,15 @@ FILE_DESCRIPTOR = _build_file_descriptor()
 SearchRequest = message_factory.GetMessageClass(FILE_DESCRIPTOR.message_types_by_name["SearchRequest"])
 Match = message_factory.GetMessageClass(FILE_DESCRIPTOR.message_types_by_name["Match"])
 SearchResponse = message_factory.GetMessageClass(FILE_DESCRIPTOR.message_types_by_name["SearchResponse"])
+SequenceEntry = message_factory.GetMessageClass(FILE_DESCRIPTOR.message_types_by_name["SequenceEntry"])
+BatchSearchRequest = message_factory.GetMessageClass(FILE_DESCRIPTOR.message_types_by_name["BatchSearchRequest"])
+PairResult = message_factory.GetMessageClass(FILE_DESCRIPTOR.message_types_by_name["PairResult"])
+BatchSearchResponse = message_factory.GetMessageClass(FILE_DESCRIPTOR.message_types_by_name["BatchSearchResponse"])
 
 _sym_db.RegisterMessage(SearchRequest)
 _sym_db.RegisterMessage(Match)
 _sym_db.RegisterMessage(SearchResponse)
+_sym_db.RegisterMessage(SequenceEntry)
+_sym_db.RegisterMessage(BatchSearchRequest)
+_sym_db.RegisterMessage(PairResult)
+_sym_db.RegisterMessage(BatchSearchResponse)
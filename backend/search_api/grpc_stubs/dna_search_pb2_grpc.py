@@ -11,6 +11,11 @@ class DnaSearchStub(object):
                 request_serializer=dna_search_pb2.SearchRequest.SerializeToString,
                 response_deserializer=dna_search_pb2.SearchResponse.FromString,
                 )
+        self.BatchSearch = channel.unary_unary(
+                '/dna.DnaSearch/BatchSearch',
+                request_serializer=dna_search_pb2.BatchSearchRequest.SerializeToString,
+                response_deserializer=dna_search_pb2.BatchSearchResponse.FromString,
+                )
 
 
 class DnaSearchServicer(object):
@@ -19,6 +24,11 @@ class DnaSearchServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def BatchSearch(self, request, context):
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_DnaSearchServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -27,6 +37,11 @@ def add_DnaSearchServicer_to_server(servicer, server):
                     request_deserializer=dna_search_pb2.SearchRequest.FromString,
                     response_serializer=dna_search_pb2.SearchResponse.SerializeToString,
             ),
+            'BatchSearch': grpc.unary_unary_rpc_method_handler(
+                    servicer.BatchSearch,
+                    request_deserializer=dna_search_pb2.BatchSearchRequest.FromString,
+                    response_serializer=dna_search_pb2.BatchSearchResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'dna.DnaSearch', rpc_method_handlers)
@@ -0,0 +1,321 @@
+"""
+Ejecución de SearchJob y cola respaldada por la base de datos.
+
+La tabla search_jobs hace de cola: un job PENDING es trabajo por hacer y un
+worker lo reclama pasándolo a PROCESSING de forma atómica. El orden en que se
+reclaman (prioridad, reparto entre clientes y SJF) está en scheduling.py.
+- PostgreSQL: SELECT ... FOR UPDATE SKIP LOCKED, de modo que varios workers
+  reclaman jobs distintos sin esperarse entre sí.
+- SQLite y otros: UPDATE condicional (WHERE status = 'PENDING'); las
+  escrituras están serializadas y solo un worker ve filas afectadas.
+
+execute_job es el mismo camino de ejecución para el modo síncrono (en la
+petición HTTP) y para los workers. Las búsquedas idénticas concurrentes se
+coalescen (ver coalescing.py): solo una ejecuta el motor.
+"""
+
+import logging
+import time
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from config.metrics import registry
+from config.timing import collect, current_timings, span
+from sequences_api.cache import open_sequence
+from sequences_api.models import DNASequence
+from . import cancellation
+from .affinity import AffinityUnavailable, affinity_enabled, affinity_search
+from .cancellation import REASON_CANCELLED, REASON_TIMEOUT, CancellationToken, SearchCancelled
+from .coalescing import coalesce_key, coalescing_enabled, finish_flight, lead_or_follow
+from .models import SearchJob, SearchResult, SearchResultChunk
+from .persistence import ResultWriter
+from .progress import ProgressReporter
+from .routing import ROUTE_AFFINITY
+from .scheduling import queue_order
+from .services import run_search
+
+log = logging.getLogger(__name__)
+
+MODE_SYNC = "sync"
+MODE_ASYNC = "async"
+
+SEARCH_SECONDS = registry.histogram(
+    'dna_search_duration_seconds', 'Duración extremo a extremo de los jobs completados', ['engine', 'route'],
+)
+SEARCH_JOBS = registry.counter('dna_search_jobs_total', 'Jobs de búsqueda terminados', ['status'])
+SEARCH_MATCHES = registry.histogram(
+    'dna_search_matches', 'Coincidencias por job completado',
+    buckets=(0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+
+
+def execution_mode() -> str:
+    return getattr(settings, "SEARCH_EXECUTION_MODE", MODE_SYNC)
+
+
+def job_timeout(job: SearchJob) -> Optional[float]:
+    """Tiempo límite de ejecución del job en segundos (None = sin límite)."""
+    return job.timeout_seconds or getattr(settings, "SEARCH_JOB_TIMEOUT_SECONDS", None)
+
+
+def _is_cancelled(job_id: int) -> bool:
+    return SearchJob.objects.filter(pk=job_id, status='CANCELLED').exists()
+
+
+def _finish_if_processing(job: SearchJob, status: str, **fields) -> bool:
+    """Cierra el job solo si sigue en PROCESSING (no pisa una cancelación)."""
+    fields.update(status=status, completed_at=timezone.now(), inflight_key=None)
+    timings = current_timings()
+    if timings is not None:
+        fields['timings'] = timings.as_dict()
+    with span('job_save'):
+        updated = SearchJob.objects.filter(pk=job.pk, status='PROCESSING').update(**fields)
+    job.refresh_state()
+    return bool(updated)
+
+
+def execute_job(job: SearchJob) -> Optional[Dict]:
+    """
+    Ejecuta la búsqueda de un job ya en PROCESSING, guarda sus resultados y lo
+    marca como completado. Si falla, lo marca como fallido y relanza el error.
+
+    La búsqueda se detiene con SearchCancelled si el job se cancela (en este
+    u otro proceso) o si supera su tiempo límite (el job queda FAILED); en
+    ambos casos se borran los resultados parciales.
+
+    Si otro job idéntico ya está en curso, este espera a que termine y queda
+    COMPLETED apuntando a él (coalesced_with) sin ejecutar la búsqueda.
+
+    El progreso (bytes recorridos, coincidencias, ETA) y el estado final se
+    publican para el stream de eventos del job (ver progress.py).
+
+    El texto de la secuencia sale de la caché de secuencias (ver
+    sequences_api/cache.py): la fila se carga sin la columna `sequence`.
+
+    El tiempo de cada etapa (carga, motor, escritura de resultados...) se
+    guarda en `timings` al cerrar el job y se suma al colector de la
+    petición, si la hay (ver config/timing.py).
+
+    Devuelve el resultado de run_search más `end_to_end_ms`.
+    """
+    with collect():
+        if not SearchJob.sequence.is_cached(job):
+            with span('sequence_fetch'):
+                job.sequence = DNASequence.objects.defer('sequence').get(pk=job.sequence_id)
+        progress = ProgressReporter(job.pk, job.sequence.length)
+        result_data = None
+        try:
+            result_data = _execute(job, progress)
+            return result_data
+        finally:
+            progress.finish(job.status)
+            observe_job(job, result_data)
+
+
+def observe_job(job: SearchJob, result_data: Optional[Dict] = None):
+    """Métricas del job terminado: estado y, si se completó, latencia por motor/ruta y coincidencias."""
+    SEARCH_JOBS.inc(status=job.status.lower())
+    if job.status != 'COMPLETED':
+        return
+    SEARCH_MATCHES.observe(job.total_matches or 0)
+    if result_data is not None and 'end_to_end_ms' in result_data:
+        # Las seguidoras coalescidas solo esperaron al líder: no son latencia del motor
+        engine = 'coalesced' if job.coalesced_with_id else (job.algorithm_used or 'unknown')
+        SEARCH_SECONDS.observe(result_data['end_to_end_ms'] / 1000, engine=engine, route=job.route or 'unknown')
+
+
+def _execute(job: SearchJob, progress: ProgressReporter) -> Optional[Dict]:
+    sequence = job.sequence
+    token = CancellationToken(
+        timeout=job_timeout(job),
+        check=lambda: _is_cancelled(job.pk),
+        poll_interval=getattr(settings, "SEARCH_CANCEL_POLL_SECONDS", 0.5),
+        # El job acaba de pasar a PROCESSING; una cancelación anterior a la
+        # primera comprobación la detecta igualmente el UPDATE final
+        delay_first_check=True,
+    )
+    key = None
+    completed = False
+    cancellation.register(job.pk, token)
+    try:
+        try:
+            t0 = time.perf_counter()
+            if coalescing_enabled():
+                flight_key = coalesce_key(sequence.file_hash, job.pattern, job.allow_overlapping)
+                with span('coalesce'):
+                    leader = lead_or_follow(job, flight_key, token)
+                if leader is not None:
+                    return _complete_coalesced(job, leader, t0)
+                key = flight_key
+            # Las coincidencias se escriben por lotes mientras el motor sigue buscando
+            with ResultWriter(job) as writer:
+                result_data = _run_engine(job, sequence, progress.counting(writer.add), token, progress.scanned)
+            result_data['end_to_end_ms'] = (time.perf_counter() - t0) * 1000
+        except SearchCancelled as exc:
+            if exc.reason == REASON_TIMEOUT:
+                _finish_if_processing(job, 'FAILED', error_message=str(exc))
+            else:
+                job.refresh_state()
+            log.info("Job %s detenido: %s", job.pk, exc)
+            raise
+        except Exception as exc:
+            if not _finish_if_processing(job, 'FAILED', error_message=str(exc)):
+                raise SearchCancelled(REASON_CANCELLED) from exc
+            raise
+
+        # COMPLETED e inflight_key = NULL van en el mismo UPDATE: una seguidora
+        # nunca ve al líder sin clave y aún en PROCESSING (lo tomaría por fallido)
+        completed = _finish_if_processing(
+            job,
+            'COMPLETED',
+            total_matches=result_data['total_matches'],
+            search_time_ms=result_data['search_time_ms'],
+            algorithm_used=result_data['algorithm_used'],
+            route=result_data.get('route'),
+            predicted_cost_ms=result_data.get('predicted_cost_ms'),
+            actual_cost_ms=result_data.get('actual_cost_ms'),
+        )
+    finally:
+        cancellation.unregister(job.pk)
+        # Con el estado final ya guardado
+        _release_flight(job, key, cleared=completed)
+
+    if not completed:
+        # Cancelado justo al terminar: no dejamos resultados de un job cancelado
+        SearchResultChunk.objects.filter(job_id=job.pk).delete()
+        SearchResult.objects.filter(job_id=job.pk).delete()
+        raise SearchCancelled(REASON_CANCELLED)
+    return result_data
+
+
+def _release_flight(job: SearchJob, key: Optional[str], cleared: bool = False):
+    """
+    Libera la clave de coalescencia si el job aún la tiene y despierta a las
+    seguidoras de este proceso. Se llama después de guardar el estado final
+    del líder; con `cleared` ese UPDATE ya liberó la clave.
+    """
+    if key is None:
+        return
+    if not cleared:
+        SearchJob.objects.filter(pk=job.pk, inflight_key=key).update(inflight_key=None)
+    finish_flight(key)
+
+
+def _run_engine(job: SearchJob, sequence: DNASequence, sink, token: CancellationToken, progress) -> Dict:
+    """
+    Con el pool de afinidad activo busca en el proceso dueño de la secuencia
+    (ver affinity.py); si no, o si el dueño no acepta la conexión, aquí.
+    """
+    if affinity_enabled():
+        t0 = time.perf_counter()
+        try:
+            with span('engine'):
+                result_data = affinity_search(
+                    sequence.pk, sequence.file_hash, job.pattern, job.allow_overlapping,
+                    sink=sink, token=token, progress=progress,
+                )
+        except AffinityUnavailable as exc:
+            log.warning("Worker de afinidad no disponible (%s); se busca en este proceso", exc)
+        else:
+            result_data.update(route=ROUTE_AFFINITY, actual_cost_ms=(time.perf_counter() - t0) * 1000)
+            return result_data
+
+    with open_sequence(sequence) as data, span('engine'):
+        return run_search(
+            data, job.pattern, job.allow_overlapping, sequence.gc_content,
+            sink=sink, token=token, progress=progress,
+        )
+
+
+def _complete_coalesced(job: SearchJob, leader: SearchJob, t0: float) -> Dict:
+    """Cierra un job seguidor con los datos del líder, cuyos resultados comparte."""
+    fields = {}
+    if job.plan and 'coalescing' in job.plan:
+        # El plan se guardó sin buscar el líder: se anota el real en el mismo UPDATE
+        fields['plan'] = dict(job.plan, coalescing=dict(job.plan['coalescing'], leader_job=leader.pk))
+    completed = _finish_if_processing(
+        job,
+        'COMPLETED',
+        total_matches=leader.total_matches,
+        search_time_ms=leader.search_time_ms,
+        algorithm_used=leader.algorithm_used,
+        route=leader.route,
+        predicted_cost_ms=leader.predicted_cost_ms,
+        actual_cost_ms=leader.actual_cost_ms,
+        coalesced_with=leader,
+        **fields,
+    )
+    if not completed:
+        raise SearchCancelled(REASON_CANCELLED)
+    log.info("Job %s coalescido con el job %s", job.pk, leader.pk)
+    return {
+        'matches': [],
+        'total_matches': leader.total_matches,
+        'search_time_ms': leader.search_time_ms,
+        'algorithm_used': leader.algorithm_used,
+        'route': leader.route,
+        'coalesced_with': leader.pk,
+        'end_to_end_ms': (time.perf_counter() - t0) * 1000,
+    }
+
+
+def _claim_skip_locked(worker_id: str) -> Optional[SearchJob]:
+    with transaction.atomic():
+        for candidates in queue_order():
+            job = candidates.select_for_update(skip_locked=True).first()
+            if job is None:
+                continue
+            job.status = 'PROCESSING'
+            job.started_at = timezone.now()
+            job.worker_id = worker_id
+            job.save(update_fields=['status', 'started_at', 'worker_id'])
+            return job
+    return None
+
+
+def _claim_conditional_update(worker_id: str, attempts: int = 8) -> Optional[SearchJob]:
+    for candidates in queue_order():
+        for pk in candidates.values_list('pk', flat=True)[:attempts]:
+            claimed = SearchJob.objects.filter(pk=pk, status='PENDING').update(
+                status='PROCESSING', started_at=timezone.now(), worker_id=worker_id,
+            )
+            if claimed:
+                return SearchJob.objects.get(pk=pk)
+    return None
+
+
+def claim_next_job(worker_id: str) -> Optional[SearchJob]:
+    """Reclama el siguiente job según la planificación (ver scheduling.py), o None."""
+    if connection.features.has_select_for_update_skip_locked:
+        return _claim_skip_locked(worker_id)
+    return _claim_conditional_update(worker_id)
+
+
+def requeue_stale_jobs(stale_after_seconds: Optional[int] = None) -> int:
+    """
+    Devuelve a PENDING los jobs que llevan demasiado tiempo en PROCESSING
+    (el worker que los reclamó murió). Devuelve cuántos se reencolaron.
+    """
+    if stale_after_seconds is None:
+        stale_after_seconds = getattr(settings, "SEARCH_JOB_STALE_SECONDS", 3600)
+    if not stale_after_seconds:
+        return 0
+    cutoff = timezone.now() - timedelta(seconds=stale_after_seconds)
+    stale = SearchJob.objects.filter(status='PROCESSING', started_at__lt=cutoff, worker_id__isnull=False)
+    stale_ids = list(stale.values_list('pk', flat=True))
+    if not stale_ids:
+        return 0
+    # Resultados parciales del intento anterior
+    SearchResultChunk.objects.filter(job_id__in=stale_ids).delete()
+    SearchResult.objects.filter(job_id__in=stale_ids).delete()
+    count = stale.filter(pk__in=stale_ids).update(
+        status='PENDING', started_at=None, worker_id=None, inflight_key=None,
+        progress_bytes=None, progress_matches=None,
+    )
+    if count:
+        log.warning("Reencolados %d jobs abandonados", count)
+    return count
@@ -0,0 +1,46 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from config.sampling import hotspots, load_samples, samples_dir
+
+
+class Command(BaseCommand):
+    help = "Frames con más muestras en los ficheros del perfilador por muestreo (SAMPLING_PROFILER_DIR)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None, help='Directorio de muestras (por defecto SAMPLING_PROFILER_DIR)')
+        parser.add_argument('--endpoint', default=None,
+                            help="Endpoint o patrón con comodines, p. ej. 'POST_api_search*'")
+        parser.add_argument('--limit', type=int, default=20, help='Frames que se muestran')
+        parser.add_argument('--sort', choices=['self', 'total'], default='self',
+                            help='self: tiempo en el propio frame; total: incluye lo que llama')
+        parser.add_argument('--no-rotated', action='store_true', help='Ignorar los ficheros rotados (.1, .2...)')
+        parser.add_argument('--per-endpoint', action='store_true', help='Una tabla por endpoint')
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or samples_dir()
+        samples = load_samples(directory, options['endpoint'], include_rotated=not options['no_rotated'])
+        if not samples:
+            self.stdout.write(f"Sin muestras en {directory}")
+            return
+
+        self.stdout.write(f"Muestras en {directory}:")
+        for endpoint, stacks in sorted(samples.items(), key=lambda item: -sum(item[1].values())):
+            self.stdout.write(f"  {endpoint}: {sum(stacks.values())}")
+
+        if options['per_endpoint']:
+            groups = sorted(samples.items())
+        else:
+            merged = Counter()
+            for stacks in samples.values():
+                merged.update(stacks)
+            groups = [("todos los endpoints", merged)]
+        for title, stacks in groups:
+            self.stdout.write("")
+            self.stdout.write(f"{title} ({sum(stacks.values())} muestras)")
+            self.stdout.write(f"{'self %':>7} {'total %':>8} {'self':>7} {'total':>7}  frame")
+            for row in hotspots(stacks, options['limit'], options['sort']):
+                self.stdout.write(
+                    f"{row['self_pct']:7.1f} {row['total_pct']:8.1f} {row['self']:7d} {row['total']:7d}  {row['frame']}"
+                )
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from search_api.grpc_server import serve
+
+
+class Command(BaseCommand):
+    help = "Arranca el servidor gRPC DnaSearch de referencia (Python) para pruebas locales."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='0.0.0.0', help='Interfaz de escucha')
+        parser.add_argument('--port', type=int, default=int(getattr(settings, 'GRPC_PORT', 50051)),
+                            help='Puerto de escucha (por defecto GRPC_PORT)')
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'GRPC_SERVER_WORKERS', 10),
+                            help='Tamaño del pool de hilos del servidor')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"DnaSearch (Python) en {options['host']}:{options['port']} con {options['workers']} hilos"
+        )
+        serve(options['host'], options['port'], options['workers'])
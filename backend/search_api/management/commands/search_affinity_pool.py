@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from search_api.affinity import AffinityPool, socket_dir
+
+
+class Command(BaseCommand):
+    help = "Arranca el pool de procesos de búsqueda con afinidad por secuencia (SEARCH_AFFINITY_WORKERS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'SEARCH_AFFINITY_WORKERS', 0) or 4,
+                            help='Procesos del pool (debe coincidir con SEARCH_AFFINITY_WORKERS de la API)')
+        parser.add_argument('--socket-dir', default=None,
+                            help='Directorio de los sockets (por defecto SEARCH_AFFINITY_SOCKET_DIR)')
+
+    def handle(self, *args, **options):
+        pool = AffinityPool(workers=options['workers'], directory=options['socket_dir'] or socket_dir())
+        self.stdout.write(f"Pool de afinidad con {pool.workers} procesos en {pool.directory}")
+        try:
+            pool.run()
+        except KeyboardInterrupt:
+            pool.stop()
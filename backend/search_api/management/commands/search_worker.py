@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from search_api.worker import SearchWorker
+
+
+class Command(BaseCommand):
+    help = "Ejecuta los jobs de búsqueda asíncronos (PENDING) encolados en la base de datos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int,
+                            default=getattr(settings, 'SEARCH_WORKER_CONCURRENCY', 1),
+                            help='Hilos de ejecución en este proceso')
+        parser.add_argument('--poll-interval', type=float,
+                            default=getattr(settings, 'SEARCH_WORKER_POLL_SECONDS', 1.0),
+                            help='Segundos de espera cuando la cola está vacía')
+        parser.add_argument('--once', action='store_true',
+                            help='Vaciar la cola y terminar en lugar de quedarse esperando')
+
+    def handle(self, *args, **options):
+        worker = SearchWorker(concurrency=options['concurrency'], poll_interval=options['poll_interval'])
+        self.stdout.write(f"Worker {worker.worker_id} con {worker.concurrency} hilos")
+        try:
+            worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            worker.stop()
+            worker.join()
+        self.stdout.write(
+            f"Jobs procesados: {worker.processed} (fallidos: {worker.failed}, detenidos: {worker.cancelled})"
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from config.tracing import breakdown, load_spans, trace_tree, traces_file
+
+# Atributos que se muestran junto a cada span
+SHOWN_ATTRIBUTES = ('http.route', 'http.status_code', 'db.statement', 'rpc.address', 'job.id', 'error')
+
+
+class Command(BaseCommand):
+    help = "Muestra como árbol una traza del fichero de TRACING_FILE y el reparto de su tiempo."
+
+    def add_arguments(self, parser):
+        parser.add_argument('trace_id', nargs='?', help='Id de la traza (cabecera X-Trace-Id); por defecto la última')
+        parser.add_argument('--file', default=None, help='Fichero de spans (por defecto TRACING_FILE)')
+        parser.add_argument('--min-ms', type=float, default=0.0, help='Oculta los spans más cortos')
+
+    def handle(self, *args, **options):
+        path = options['file'] or traces_file()
+        spans = load_spans(path)
+        if not spans:
+            raise CommandError(f"Sin spans en {path}")
+        trace_id = options['trace_id'] or spans[-1]['trace_id']
+        spans = [s for s in spans if s['trace_id'] == trace_id]
+        if not spans:
+            raise CommandError(f"No hay spans de la traza {trace_id} en {path}")
+
+        self.stdout.write(f"Traza {trace_id} ({len(spans)} spans)")
+        self.stdout.write(f"{'ms':>10} {'propios':>9}  span")
+        for depth, span, own in trace_tree(spans):
+            if span['duration_ms'] < options['min_ms']:
+                continue
+            details = ", ".join(
+                f"{key}={str(span['attributes'][key])[:80]}"
+                for key in SHOWN_ATTRIBUTES if span.get('attributes', {}).get(key) is not None
+            )
+            status = " [error]" if span.get('status') == 'error' else ""
+            self.stdout.write(
+                f"{span['duration_ms']:10.3f} {own:9.3f}  {'  ' * depth}{span['name']} ({span.get('service')})"
+                f"{status}{'  ' + details if details else ''}"
+            )
+
+        self.stdout.write("")
+        for key, value in breakdown(spans).items():
+            self.stdout.write(f"{key:>16}: {value:10.3f}")
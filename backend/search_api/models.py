@@ -3,6 +3,15 @@ from django.utils import timezone
 from sequences_api.models import DNASequence
 
 
+class SearchJobQuerySet(models.QuerySet):
+    def with_sequence_name(self):
+        """
+        Trae la secuencia en el mismo SELECT (para sequence_name) pero sin su
+        texto, que puede ocupar cientos de MB.
+        """
+        return self.select_related('sequence').defer('sequence__sequence')
+
+
 class SearchJob(models.Model):
     """
     Modelo para registrar trabajos de búsqueda de patrones en secuencias de ADN.
@@ -13,6 +22,20 @@ class SearchJob(models.Model):
         ('PROCESSING', 'En Proceso'),
         ('COMPLETED', 'Completado'),
         ('FAILED', 'Fallido'),
+        ('CANCELLED', 'Cancelado'),
+    ]
+
+    # Estados en los que el job aún puede cancelarse
+    ACTIVE_STATUSES = ('PENDING', 'PROCESSING')
+
+    # Clases de prioridad de la cola asíncrona (menor valor = antes)
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_NORMAL = 1
+    PRIORITY_BULK = 2
+    PRIORITY_CHOICES = [
+        (PRIORITY_INTERACTIVE, 'interactive'),
+        (PRIORITY_NORMAL, 'normal'),
+        (PRIORITY_BULK, 'bulk'),
     ]
     
     sequence = models.ForeignKey(DNASequence, on_delete=models.CASCADE, related_name='search_jobs', help_text="Secuencia de ADN donde se busca")
@@ -53,11 +76,115 @@ class SearchJob(models.Model):
         help_text="Algoritmo utilizado (KMP, Boyer-Moore, etc.)"
     )
 
+    route = models.CharField(
+        max_length=20,
+        null=True,
+        blank=True,
+        help_text="Ruta elegida por el router (local, grpc, local-fallback) o affinity"
+    )
+
+    predicted_cost_ms = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Coste previsto por el router para la ruta elegida (ms)"
+    )
+
+    actual_cost_ms = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Coste real extremo a extremo de la ruta elegida (ms)"
+    )
+
+    timings = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Desglose por etapa de la ejecución, {etapa: ms} (ver config/timing.py)"
+    )
+
+    plan = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Plan previsto al crear el job: ruta, motor, caché y estimaciones (ver explain.py)"
+    )
+    traceparent = models.CharField(
+        max_length=55,
+        blank=True,
+        default='',
+        help_text="Contexto de traza de la petición que creó el job; el worker la continúa (config/tracing.py)"
+    )
+
     created_at = models.DateTimeField(
         default=timezone.now,
         help_text="Fecha y hora de creación del trabajo"
     )
 
+    priority = models.PositiveSmallIntegerField(
+        choices=PRIORITY_CHOICES,
+        default=PRIORITY_NORMAL,
+        help_text="Clase de prioridad en la cola asíncrona"
+    )
+
+    client_id = models.CharField(
+        max_length=200,
+        blank=True,
+        default='',
+        help_text="Cliente que envió el job (usuario o IP, ver scheduling.client_identity), para el reparto justo"
+    )
+
+    estimated_cost_ms = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Coste estimado al encolar, para ordenar primero los jobs cortos"
+    )
+
+    timeout_seconds = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Tiempo límite de ejecución (s); vacío = SEARCH_JOB_TIMEOUT_SECONDS"
+    )
+
+    inflight_key = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        unique=True,
+        help_text="Clave de coalescencia mientras este job es el líder de búsquedas idénticas en curso"
+    )
+
+    coalesced_with = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='coalesced_jobs',
+        help_text="Job idéntico cuya ejecución y resultados comparte este job"
+    )
+
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Fecha y hora en que empezó la ejecución"
+    )
+
+    progress_bytes = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Bytes de la secuencia recorridos hasta el último guardado de progreso"
+    )
+
+    progress_matches = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Coincidencias encontradas hasta el último guardado de progreso"
+    )
+
+    worker_id = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        help_text="Worker que reclamó el job (modo asíncrono)"
+    )
+
     completed_at = models.DateTimeField(
         null=True,
         blank=True,
@@ -69,6 +196,8 @@ class SearchJob(models.Model):
         blank=True,
         help_text="Mensaje de error si el trabajo falló"
     )
+
+    objects = SearchJobQuerySet.as_manager()
     
     class Meta:
         db_table = 'search_jobs'
@@ -77,6 +206,8 @@ class SearchJob(models.Model):
             models.Index(fields=['created_at']),
             models.Index(fields=['status']),
             models.Index(fields=['sequence', 'pattern']),
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'priority', 'client_id']),
         ]
 
         verbose_name = 'Search Job'
@@ -85,17 +216,26 @@ class SearchJob(models.Model):
     def __str__(self):
         return f"Search '{self.pattern}' in {self.sequence.name} ({self.status})"
     
+    @property
+    def priority_name(self):
+        return dict(self.PRIORITY_CHOICES).get(self.priority)
+
     def mark_as_processing(self):
         """Marca el trabajo como en proceso."""
         self.status = 'PROCESSING'
+        self.started_at = timezone.now()
         self.save()
     
-    def mark_as_completed(self, total_matches, search_time_ms, algorithm_used):
+    def mark_as_completed(self, total_matches, search_time_ms, algorithm_used,
+                          route=None, predicted_cost_ms=None, actual_cost_ms=None):
         """Marca el trabajo como completado con resultados."""
         self.status = 'COMPLETED'
         self.total_matches = total_matches
         self.search_time_ms = search_time_ms
         self.algorithm_used = algorithm_used
+        self.route = route
+        self.predicted_cost_ms = predicted_cost_ms
+        self.actual_cost_ms = actual_cost_ms
         self.completed_at = timezone.now()
         self.save()
     
@@ -106,6 +246,24 @@ class SearchJob(models.Model):
         self.completed_at = timezone.now()
         self.save()
 
+    def refresh_state(self):
+        """Recarga los campos del job sin descartar la secuencia ya cargada."""
+        self.refresh_from_db(fields=[
+            field.name for field in self._meta.concrete_fields if field.name not in ('id', 'sequence')
+        ])
+
+    def cancel(self, reason="Cancelado por el usuario"):
+        """
+        Pasa el job a CANCELLED si sigue pendiente o en proceso (de forma
+        atómica frente a los workers). Devuelve True si se canceló.
+        """
+        now = timezone.now()
+        cancelled = SearchJob.objects.filter(pk=self.pk, status__in=self.ACTIVE_STATUSES).update(
+            status='CANCELLED', error_message=reason, completed_at=now, inflight_key=None,
+        )
+        self.refresh_from_db(fields=['status', 'error_message', 'completed_at'])
+        return bool(cancelled)
+
 
 class SearchResult(models.Model):
     """
@@ -144,4 +302,57 @@ class SearchResult(models.Model):
         verbose_name_plural = 'Search Results'
     
     def __str__(self):
-        return f"Match at position {self.position} in job #{self.job.id}"
\ No newline at end of file
+        return f"Match at position {self.position} in job #{self.job.id}"
+
+class SearchResultChunk(models.Model):
+    """
+    Bloque de posiciones de coincidencia en formato compacto (deltas varint).
+    Ver search_api/result_store.py.
+    """
+    job = models.ForeignKey(
+        SearchJob,
+        on_delete=models.CASCADE,
+        related_name='result_chunks',
+        help_text="Trabajo de búsqueda al que pertenece este bloque"
+    )
+
+    index = models.PositiveIntegerField(
+        help_text="Orden del bloque dentro del job"
+    )
+
+    start_offset = models.BigIntegerField(
+        help_text="Número de coincidencias del job anteriores a este bloque"
+    )
+
+    first_position = models.BigIntegerField(
+        help_text="Primera posición del bloque"
+    )
+
+    last_position = models.BigIntegerField(
+        help_text="Última posición del bloque"
+    )
+
+    count = models.PositiveIntegerField(
+        help_text="Número de posiciones en el bloque"
+    )
+
+    data = models.BinaryField(
+        help_text="Deltas entre posiciones consecutivas codificadas como varint"
+    )
+
+    class Meta:
+        db_table = 'search_result_chunks'
+        ordering = ['index']
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'index'], name='unique_chunk_index_per_job'),
+        ]
+        indexes = [
+            models.Index(fields=['job', 'start_offset']),
+            models.Index(fields=['job', 'first_position']),
+            models.Index(fields=['job', 'last_position']),
+        ]
+        verbose_name = 'Search Result Chunk'
+        verbose_name_plural = 'Search Result Chunks'
+
+    def __str__(self):
+        return f"Chunk #{self.index} ({self.count} matches) in job #{self.job_id}"
@@ -0,0 +1,99 @@
+"""
+Paginación keyset de los resultados de un job.
+
+Los cursores son opacos (base64 de un JSON pequeño) y codifican la última
+posición vista y la dirección. Como la posición es única dentro de un job,
+la clave (job_id, position) basta para continuar la página siguiente o
+anterior con una búsqueda por índice, sin OFFSET.
+"""
+
+import base64
+import binascii
+import json
+from typing import Dict, Optional, Tuple
+
+from rest_framework.exceptions import ValidationError
+
+from .result_store import seek_results
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+DIRECTION_NEXT = "n"
+DIRECTION_PREV = "p"
+
+
+def encode_cursor(position: int, direction: str) -> str:
+    raw = json.dumps({"p": position, "d": direction}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        position, direction = int(data["p"]), data["d"]
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise ValidationError({"cursor": "Cursor inválido."})
+    if direction not in (DIRECTION_NEXT, DIRECTION_PREV) or position < 0:
+        raise ValidationError({"cursor": "Cursor inválido."})
+    return position, direction
+
+
+def _int_param(params, name: str) -> Optional[int]:
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: "Debe ser un entero."})
+    if value < 0:
+        raise ValidationError({name: "Debe ser mayor o igual que 0."})
+    return value
+
+
+def _limit_param(params) -> int:
+    try:
+        limit = int(params.get("limit", DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise ValidationError({"limit": "Debe ser un entero."})
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def paginate_results(job, params) -> Dict:
+    """
+    Página de resultados del job según los parámetros de la petición:
+    `limit`, `cursor`, `position_gte` y `position_lt`.
+
+    Devuelve los resultados en orden de posición junto con `next_cursor` y
+    `prev_cursor` (None si no hay más en esa dirección).
+    """
+    limit = _limit_param(params)
+    lower = _int_param(params, "position_gte")
+    upper = _int_param(params, "position_lt")
+
+    cursor = params.get("cursor")
+    direction = DIRECTION_NEXT
+    if cursor:
+        position, direction = decode_cursor(cursor)
+        if direction == DIRECTION_NEXT:
+            lower = position + 1 if lower is None else max(lower, position + 1)
+        else:
+            upper = position if upper is None else min(upper, position)
+
+    backwards = direction == DIRECTION_PREV
+    # Pedimos uno de más para saber si hay otra página en la misma dirección
+    results = seek_results(job, lower, upper, limit + 1, descending=backwards)
+    has_more = len(results) > limit
+    if has_more:
+        results = results[1:] if backwards else results[:limit]
+
+    has_next = has_more if not backwards else bool(cursor)
+    has_prev = has_more if backwards else bool(cursor)
+
+    return {
+        "results": results,
+        "next_cursor": encode_cursor(results[-1]["position"], DIRECTION_NEXT) if results and has_next else None,
+        "prev_cursor": encode_cursor(results[0]["position"], DIRECTION_PREV) if results and has_prev else None,
+    }
@@ -0,0 +1,212 @@
+"""
+Persistencia de resultados en streaming.
+
+ResultWriter recibe las coincidencias una a una mientras el motor busca,
+las agrupa en lotes acotados y las escribe desde un hilo propio, de modo que
+la búsqueda y las escrituras en BD se solapan y la memoria queda limitada a
+unos pocos lotes.
+
+Cada lote usa la vía masiva más rápida del backend:
+- formato compacto: bloques varint (ver result_store) con bulk_create;
+- filas en PostgreSQL: COPY ... FROM STDIN;
+- filas en SQLite/otros: INSERT multi-fila (bulk_create) respetando el
+  límite de variables por sentencia.
+"""
+
+import io
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connection, connections
+
+from config.timing import record, span
+
+from .models import SearchResult, SearchResultChunk
+from .result_store import STORAGE_ROWS, build_chunks, storage_mode
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+_STOP = object()
+
+
+def _copy_escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _copy_rows_postgres(conn, job_id: int, matches: List[Dict]) -> bool:
+    """COPY de filas SearchResult. Devuelve False si el driver no lo soporta."""
+    table = SearchResult._meta.db_table
+    columns = [SearchResult._meta.get_field(name).column
+               for name in ('job', 'position', 'context_before', 'context_after')]
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+
+    buf = io.StringIO()
+    for m in matches:
+        buf.write(
+            f"{job_id}\t{m['position']}\t"
+            f"{_copy_escape(m.get('context_before', ''))}\t{_copy_escape(m.get('context_after', ''))}\n"
+        )
+    buf.seek(0)
+
+    with conn.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):  # psycopg2
+            raw.copy_expert(sql, buf)
+            return True
+        if hasattr(raw, 'copy'):  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buf.getvalue())
+            return True
+    return False
+
+
+def insert_rows(job, matches: List[Dict], conn=None):
+    """Inserta filas SearchResult por la vía masiva más rápida del backend."""
+    conn = conn or connection
+    if conn.vendor == 'postgresql' and _copy_rows_postgres(conn, job.pk, matches):
+        return
+    objs = [
+        SearchResult(
+            job_id=job.pk,
+            position=m['position'],
+            context_before=m.get('context_before', ''),
+            context_after=m.get('context_after', ''),
+        )
+        for m in matches
+    ]
+    fields = [SearchResult._meta.get_field(name) for name in ('job', 'position', 'context_before', 'context_after')]
+    batch_size = conn.ops.bulk_batch_size(fields, objs) or len(objs)
+    SearchResult.objects.using(conn.alias).bulk_create(objs, batch_size=batch_size)
+
+
+class ResultWriter:
+    """
+    Etapa de persistencia con cola acotada y escritura por lotes.
+
+    Uso:
+        with ResultWriter(job) as writer:
+            run_search(..., sink=writer.add)
+
+    Si el llamante está dentro de una transacción, las escrituras se hacen en
+    su mismo hilo (otra conexión no vería el job aún sin confirmar).
+    Al salir con excepción se borran los resultados parciales.
+
+    Etapas medidas (config/timing.py): `persist_flush`, la espera al cerrar
+    hasta que se escribe lo pendiente, y `db_write`, el tiempo total de
+    escritura en BD (en el hilo escritor se solapa con la búsqueda).
+    """
+
+    def __init__(self, job, batch_size: Optional[int] = None, max_pending_batches: int = 4,
+                 threaded: Optional[bool] = None):
+        self.job = job
+        self.storage = storage_mode()
+        if batch_size is None:
+            if self.storage == STORAGE_ROWS:
+                batch_size = int(getattr(settings, "SEARCH_PERSIST_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+            else:
+                batch_size = int(getattr(settings, "SEARCH_RESULT_CHUNK_SIZE", 8192))
+        self.batch_size = max(1, batch_size)
+        if threaded is None:
+            threaded = getattr(settings, "SEARCH_PERSIST_THREADED", True) and not connection.in_atomic_block
+        self.threaded = threaded
+
+        self.written = 0
+        self.write_ms = 0.0
+        self._buffer: List[Dict] = []
+        self._next_chunk = 0
+        self._error: Optional[BaseException] = None
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_pending_batches))
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def start(self):
+        if self.threaded and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"result-writer-{self.job.pk}", daemon=True)
+            self._thread.start()
+
+    def add(self, match: Dict):
+        self._buffer.append(match)
+        if len(self._buffer) >= self.batch_size:
+            self._submit()
+
+    def _submit(self):
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        if self.threaded:
+            if self._error is not None:
+                raise self._error
+            self._queue.put(batch)  # bloquea si el escritor va por detrás (backpressure)
+        else:
+            self._write_batch(batch, connection)
+
+    def close(self) -> int:
+        """Escribe lo pendiente y espera al hilo. Devuelve el total escrito."""
+        with span('persist_flush'):
+            self._submit()
+            self._join()
+        record('db_write', self.write_ms)
+        if self._error is not None:
+            raise self._error
+        return self.written
+
+    def abort(self):
+        """Detiene la escritura y borra los resultados parciales del job."""
+        self._buffer = []
+        self._join()
+        SearchResultChunk.objects.filter(job_id=self.job.pk).delete()
+        SearchResult.objects.filter(job_id=self.job.pk).delete()
+
+    def _join(self):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        conn = connections['default']
+        try:
+            while True:
+                batch = self._queue.get()
+                if batch is _STOP:
+                    break
+                if self._error is None:
+                    try:
+                        self._write_batch(batch, conn)
+                    except Exception as exc:  # pylint: disable=broad-except
+                        log.error("Fallo escribiendo resultados del job %s: %s", self.job.pk, exc)
+                        self._error = exc
+        finally:
+            conn.close()
+
+    def _write_batch(self, batch: List[Dict], conn):
+        t0 = time.perf_counter()
+        if self.storage == STORAGE_ROWS:
+            insert_rows(self.job, batch, conn)
+        else:
+            chunks = build_chunks(
+                self.job,
+                (m['position'] for m in batch),
+                chunk_size=self.batch_size,
+                start_index=self._next_chunk,
+                start_offset=self.written,
+            )
+            SearchResultChunk.objects.using(conn.alias).bulk_create(chunks)
+            self._next_chunk += len(chunks)
+        self.written += len(batch)
+        self.write_ms += (time.perf_counter() - t0) * 1000
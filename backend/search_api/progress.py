@@ -0,0 +1,160 @@
+"""
+Progreso de los jobs en ejecución para el stream SSE (ver views.SearchJobEventsView).
+
+Los motores informan de los bytes recorridos mediante un callback; el
+ProgressReporter del job añade las coincidencias encontradas, estima el
+tiempo restante y publica el estado en el notificador del proceso, donde
+esperan los clientes conectados al stream sin consultar la base de datos.
+
+Para los clientes de otros procesos (p. ej. el job lo ejecuta un worker),
+el reporter guarda también el progreso en el job cada
+SEARCH_PROGRESS_PERSIST_SECONDS y el stream lo lee de la base de datos.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+
+from .models import SearchJob
+
+# Callback de los motores: bytes de la secuencia ya recorridos
+ProgressCallback = Callable[[int], None]
+
+# Tiempo que se conserva el estado final de un job para los clientes que lleguen tarde
+_FINISHED_TTL_SECONDS = 60.0
+
+
+class ProgressNotifier:
+    """Último estado de progreso de cada job del proceso, con espera por cambios."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._states: Dict[int, Dict] = {}
+        self._finished_at: Dict[int, float] = {}
+
+    def publish(self, job_id: int, **fields):
+        with self._cond:
+            state = self._states.setdefault(job_id, {'version': 0})
+            state.update(fields)
+            state['version'] += 1
+            self._cond.notify_all()
+
+    def finish(self, job_id: int, status: str):
+        """Publica el estado final; los clientes en espera leen el job y cierran el stream."""
+        now = time.monotonic()
+        with self._cond:
+            self._prune(now)
+            state = self._states.setdefault(job_id, {'version': 0})
+            state.update(status=status, eta_s=0.0 if status == 'COMPLETED' else None)
+            state['version'] += 1
+            self._finished_at[job_id] = now
+            self._cond.notify_all()
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        with self._cond:
+            state = self._states.get(job_id)
+            return dict(state) if state is not None else None
+
+    def wait(self, job_id: int, after_version: int, timeout: float) -> Optional[Dict]:
+        """
+        Espera a que el estado del job pase de `after_version` (como mucho
+        `timeout` segundos). Devuelve el nuevo estado o None si no cambió.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                state = self._states.get(job_id)
+                if state is not None and state['version'] > after_version:
+                    return dict(state)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def _prune(self, now: float):
+        expired = [job_id for job_id, at in self._finished_at.items() if now - at > _FINISHED_TTL_SECONDS]
+        for job_id in expired:
+            self._finished_at.pop(job_id, None)
+            self._states.pop(job_id, None)
+
+
+notifier = ProgressNotifier()
+
+
+class ProgressReporter:
+    """
+    Progreso de un job en ejecución. `scanned` es el callback para los
+    motores y `counting(sink)` envuelve el sink para contar coincidencias.
+    Las publicaciones se limitan a una cada SEARCH_PROGRESS_INTERVAL_SECONDS.
+    """
+
+    def __init__(self, job_id: int, total_bytes: int):
+        self.job_id = job_id
+        self.total_bytes = total_bytes
+        self.bytes_scanned = 0
+        self.matches = 0
+        self.interval = getattr(settings, "SEARCH_PROGRESS_INTERVAL_SECONDS", 0.25)
+        self.persist_interval = getattr(settings, "SEARCH_PROGRESS_PERSIST_SECONDS", 2.0)
+        self._started = time.monotonic()
+        self._next_publish = 0.0
+        self._next_persist = self._started + self.persist_interval
+        notifier.publish(job_id, status='PROCESSING', **self.snapshot())
+
+    def counting(self, sink: Callable[[Dict], None]) -> Callable[[Dict], None]:
+        def counted(match: Dict):
+            sink(match)
+            self.matches += 1
+        return counted
+
+    def eta_seconds(self) -> Optional[float]:
+        if not self.bytes_scanned or not self.total_bytes:
+            return None
+        elapsed = time.monotonic() - self._started
+        rate = self.bytes_scanned / elapsed if elapsed > 0 else 0.0
+        if rate <= 0:
+            return None
+        return max(0.0, (self.total_bytes - self.bytes_scanned) / rate)
+
+    def snapshot(self) -> Dict:
+        return {
+            'bytes_scanned': self.bytes_scanned,
+            'total_bytes': self.total_bytes,
+            'matches': self.matches,
+            'eta_s': self.eta_seconds(),
+        }
+
+    def scanned(self, bytes_scanned: int):
+        self.bytes_scanned = bytes_scanned
+        now = time.monotonic()
+        if now < self._next_publish:
+            return
+        self._next_publish = now + self.interval
+        notifier.publish(self.job_id, **self.snapshot())
+        if self.persist_interval and now >= self._next_persist:
+            self._next_persist = now + self.persist_interval
+            self.persist()
+
+    def persist(self):
+        SearchJob.objects.filter(pk=self.job_id, status='PROCESSING').update(
+            progress_bytes=self.bytes_scanned, progress_matches=self.matches,
+        )
+
+    def finish(self, status: str):
+        if status == 'COMPLETED':
+            self.bytes_scanned = self.total_bytes
+        notifier.publish(self.job_id, **self.snapshot())
+        notifier.finish(self.job_id, status)
+
+
+def progress_from_job(job: SearchJob, total_bytes: int) -> Dict:
+    """Estado de progreso a partir del job guardado (jobs de otros procesos)."""
+    done = job.status == 'COMPLETED'
+    return {
+        'status': job.status,
+        'bytes_scanned': total_bytes if done else (job.progress_bytes or 0),
+        'total_bytes': total_bytes,
+        'matches': job.total_matches if done else (job.progress_matches or 0),
+        'eta_s': 0.0 if done else None,
+    }
@@ -0,0 +1,304 @@
+"""
+Almacenamiento compacto de resultados de búsqueda.
+
+En lugar de una fila SearchResult por coincidencia, las posiciones de un job
+se guardan ordenadas en bloques (SearchResultChunk): cada bloque codifica las
+diferencias entre posiciones consecutivas como varints (LEB128), de modo que
+coincidencias cercanas ocupan 1-2 bytes. Cada bloque guarda además su primera
+posición y su desplazamiento ordinal dentro del job, lo que permite acceso
+aleatorio por página sin decodificar todo el job.
+
+El contexto (nucleótidos antes/después) no se almacena: se recalcula al leer.
+Si el texto ya está en memoria (instancia cargada, caché local o mmap
+compartido, ver sequences_api/cache.py) se recorta de ahí; si no, se leen de
+la BD solo tramos acotados alrededor de cada coincidencia, sin cargar la
+secuencia completa.
+
+Los jobs con filas SearchResult (formato anterior) siguen leyéndose igual, y
+los jobs coalescidos (ver coalescing.py) leen los resultados de su líder.
+
+Además del acceso por desplazamiento (read_results), seek_results permite
+recorrer los resultados por rango de posiciones (paginación keyset): los
+bloques se localizan con los índices (job, first_position) y
+(job, last_position) y el coste de una página no depende de lo lejos que
+esté del inicio.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db.models.functions import Substr
+
+from sequences_api.cache import cached_sequence
+from sequences_api.models import DNASequence
+from .models import SearchJob, SearchResultChunk
+
+CONTEXT_WINDOW = 10
+DEFAULT_CHUNK_SIZE = 8192
+
+STORAGE_COMPACT = "compact"
+STORAGE_ROWS = "rows"
+
+
+def encode_varint_deltas(positions: List[int], first: int) -> bytes:
+    """Codifica posiciones crecientes como deltas varint respecto a `first`."""
+    out = bytearray()
+    prev = first
+    for pos in positions:
+        delta = pos - prev
+        if delta < 0:
+            raise ValueError("Las posiciones deben estar ordenadas de forma creciente.")
+        prev = pos
+        while delta >= 0x80:
+            out.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def decode_varint_deltas(data: bytes, first: int) -> List[int]:
+    """Inverso de encode_varint_deltas."""
+    positions = []
+    prev = first
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        prev += value
+        positions.append(prev)
+        value = 0
+        shift = 0
+    return positions
+
+
+def storage_mode() -> str:
+    return getattr(settings, "SEARCH_RESULT_STORAGE", STORAGE_COMPACT)
+
+
+def build_chunks(job, positions: Iterable[int], chunk_size: Optional[int] = None,
+                 start_index: int = 0, start_offset: int = 0) -> List[SearchResultChunk]:
+    """Agrupa las posiciones (ordenadas) en bloques listos para bulk_create."""
+    chunk_size = chunk_size or int(getattr(settings, "SEARCH_RESULT_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+    chunks = []
+    buffer: List[int] = []
+    index = start_index
+    offset = start_offset
+
+    def flush():
+        nonlocal index, offset
+        first = buffer[0]
+        chunks.append(SearchResultChunk(
+            job=job,
+            index=index,
+            start_offset=offset,
+            first_position=first,
+            last_position=buffer[-1],
+            count=len(buffer),
+            data=encode_varint_deltas(buffer, first),
+        ))
+        index += 1
+        offset += len(buffer)
+        buffer.clear()
+
+    for pos in positions:
+        buffer.append(pos)
+        if len(buffer) >= chunk_size:
+            flush()
+    if buffer:
+        flush()
+    return chunks
+
+
+def write_positions(job, positions: Iterable[int], chunk_size: Optional[int] = None) -> int:
+    """Guarda las posiciones del job en formato compacto. Devuelve cuántas se guardaron."""
+    chunks = build_chunks(job, positions, chunk_size)
+    SearchResultChunk.objects.bulk_create(chunks)
+    return sum(c.count for c in chunks)
+
+
+def _results_job(job):
+    """Job que guarda los resultados: el líder si la búsqueda se coalesció."""
+    return job.coalesced_with if job.coalesced_with_id else job
+
+
+def has_compact_results(job) -> bool:
+    return _results_job(job).result_chunks.exists()
+
+
+def count_results(job) -> int:
+    """Número de coincidencias guardadas, en cualquiera de los dos formatos."""
+    job = _results_job(job)
+    chunk_counts = list(job.result_chunks.values_list('count', flat=True))
+    if chunk_counts:
+        return sum(chunk_counts)
+    return job.results.count()
+
+
+def _text(data, start: int, end: int) -> str:
+    """data[start:end] como str (la proyección mmap devuelve bytes)."""
+    window = data[start:end]
+    return window.decode('ascii') if isinstance(window, bytes) else window
+
+
+def _with_context(sequence, positions: List[int], pattern_length: int) -> List[Dict]:
+    return [
+        {
+            "position": pos,
+            "context_before": _text(sequence, max(0, pos - CONTEXT_WINDOW), pos),
+            "context_after": _text(sequence, pos + pattern_length, pos + pattern_length + CONTEXT_WINDOW),
+        }
+        for pos in positions
+    ]
+
+
+def _loaded_sequence(job) -> Optional[DNASequence]:
+    """La secuencia del job si la instancia ya la trae (sin consultar la BD)."""
+    for candidate in (job, job.coalesced_with if job.coalesced_with_id else None):
+        if candidate is not None and SearchJob.sequence.is_cached(candidate):
+            return candidate.sequence
+    return None
+
+
+def _context_windows(job, positions: List[int], sequence: Optional[DNASequence] = None) -> List[Dict]:
+    """
+    Contexto de las posiciones (crecientes). Se recorta del texto en memoria
+    si `sequence` (la instancia ya cargada) lo trae o está en caché; si no,
+    se leen de la BD solo los tramos de CONTEXT_WINDOW + patrón +
+    CONTEXT_WINDOW que las rodean, en una consulta con un Substr por tramo.
+    Los tramos que se solapan se fusionan: una página cuesta
+    O(limit × tramo), no depende del tamaño de la secuencia ni de lo
+    separadas que estén las coincidencias.
+    """
+    if not positions:
+        return []
+    pattern_length = len(job.pattern)
+    if sequence is not None:
+        with cached_sequence(sequence) as data:
+            if data is not None:
+                return _with_context(data, positions, pattern_length)
+
+    spans: List[List[int]] = []
+    for pos in positions:
+        start, end = max(0, pos - CONTEXT_WINDOW), pos + pattern_length + CONTEXT_WINDOW
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+    windows = (
+        DNASequence.objects
+        .filter(pk=job.sequence_id)
+        .order_by()
+        .values_list(*[Substr('sequence', start + 1, end - start) for start, end in spans])
+        .get()
+    )
+
+    results = []
+    span_index = 0
+    for pos in positions:
+        while pos > spans[span_index][1]:
+            span_index += 1
+        start = spans[span_index][0]
+        item = _with_context(windows[span_index], [pos - start], pattern_length)[0]
+        item['position'] = pos
+        results.append(item)
+    return results
+
+
+def read_positions(job, offset: int = 0, limit: int = 100) -> List[int]:
+    """Posiciones [offset, offset+limit) del job en formato compacto."""
+    job = _results_job(job)
+    first_start = (
+        job.result_chunks
+        .filter(start_offset__lte=offset)
+        .order_by('-start_offset')
+        .values_list('start_offset', flat=True)
+        .first()
+    )
+    if first_start is None:
+        return []
+
+    chunks = (
+        job.result_chunks
+        .filter(start_offset__gte=first_start, start_offset__lt=offset + limit)
+        .order_by('start_offset')
+        .values_list('start_offset', 'first_position', 'data')
+    )
+    positions: List[int] = []
+    for chunk_start, first_position, data in chunks:
+        decoded = decode_varint_deltas(bytes(data), first_position)
+        lo = max(0, offset - chunk_start)
+        positions.extend(decoded[lo:lo + (limit - len(positions))])
+    return positions
+
+
+def read_results(job, offset: int = 0, limit: int = 100) -> List[Dict]:
+    """
+    Página de resultados (posición y contexto) en orden de posición,
+    independientemente del formato en que se guardaron.
+    """
+    sequence = _loaded_sequence(job)
+    job = _results_job(job)
+    if not has_compact_results(job):
+        return list(
+            job.results.order_by('position')
+            .values('position', 'context_before', 'context_after')[offset:offset + limit]
+        )
+
+    return _context_windows(job, read_positions(job, offset, limit), sequence)
+
+
+def _in_range(pos: int, lower: Optional[int], upper: Optional[int]) -> bool:
+    return (lower is None or pos >= lower) and (upper is None or pos < upper)
+
+
+def seek_positions(job, lower: Optional[int] = None, upper: Optional[int] = None,
+                   limit: int = 100, descending: bool = False) -> List[int]:
+    """
+    Hasta `limit` posiciones p del job (formato compacto) con lower <= p < upper.
+
+    Con descending=False devuelve las primeras a partir de `lower`; con
+    descending=True las últimas antes de `upper`. Siempre en orden creciente.
+    """
+    job = _results_job(job)
+    chunks = job.result_chunks.all()
+    if upper is not None:
+        chunks = chunks.filter(first_position__lt=upper)
+    if lower is not None:
+        chunks = chunks.filter(last_position__gte=lower)
+    chunks = chunks.order_by('-first_position' if descending else 'first_position')
+
+    positions: List[int] = []
+    for first_position, data in chunks.values_list('first_position', 'data').iterator(chunk_size=4):
+        decoded = [p for p in decode_varint_deltas(bytes(data), first_position) if _in_range(p, lower, upper)]
+        if descending:
+            positions[:0] = decoded[-(limit - len(positions)):]
+        else:
+            positions.extend(decoded[:limit - len(positions)])
+        if len(positions) >= limit:
+            break
+    return positions
+
+
+def seek_results(job, lower: Optional[int] = None, upper: Optional[int] = None,
+                 limit: int = 100, descending: bool = False) -> List[Dict]:
+    """Como seek_positions pero con contexto y para ambos formatos de almacenamiento."""
+    sequence = _loaded_sequence(job)
+    job = _results_job(job)
+    if has_compact_results(job):
+        return _context_windows(job, seek_positions(job, lower, upper, limit, descending), sequence)
+
+    rows = job.results.all()
+    if lower is not None:
+        rows = rows.filter(position__gte=lower)
+    if upper is not None:
+        rows = rows.filter(position__lt=upper)
+    rows = list(
+        rows.order_by('-position' if descending else 'position')
+        .values('position', 'context_before', 'context_after')[:limit]
+    )
+    if descending:
+        rows.reverse()
+    return rows
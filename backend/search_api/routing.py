@@ -0,0 +1,234 @@
+"""
+Enrutado por coste entre el motor local y el microservicio gRPC.
+
+Cada ruta se modela como suma de componentes (motor y transporte). Cada
+componente es un modelo lineal sobre características de la petición,
+recalibrado en línea con las últimas mediciones (`search_time_ms` del motor y
+tiempo extremo a extremo) y regularizado hacia unos valores iniciales para
+que funcione sin historial.
+"""
+
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+ROUTE_LOCAL = "local"
+ROUTE_GRPC = "grpc"
+ROUTE_LOCAL_FALLBACK = "local-fallback"
+ROUTE_AFFINITY = "affinity"  # proceso del pool de afinidad (ver affinity.py), fuera del modelo de costes
+
+# Probabilidad aproximada de 'N' en secuencias reales (regiones sin secuenciar)
+_N_PROBABILITY = 0.001
+
+# Coeficientes iniciales [fijo_ms, ms_por_MB, ms_por_1000_hits, ms_por_MB*patrón/100]
+DEFAULT_PRIORS = {
+    (ROUTE_LOCAL, "engine"): (0.05, 2.0, 1.5, 0.5),
+    (ROUTE_GRPC, "engine"): (0.0, 1.5, 0.3, 0.5),
+    (ROUTE_GRPC, "transport"): (1.5, 6.0, 0.5, 0.0),
+}
+
+ROUTE_COMPONENTS = {
+    ROUTE_LOCAL: ("engine",),
+    ROUTE_GRPC: ("engine", "transport"),
+}
+
+
+def estimate_matches(sequence_length: int, pattern: str, gc_content: Optional[float] = None) -> float:
+    """
+    Número esperado de coincidencias asumiendo bases independientes.
+    gc_content en porcentaje (0-100); por defecto 50%.
+    """
+    pat_len = len(pattern)
+    positions = sequence_length - pat_len + 1
+    if pat_len == 0 or positions <= 0:
+        return 0.0
+
+    gc = 0.5 if gc_content is None else gc_content / 100.0
+    p_base = {
+        'G': gc / 2,
+        'C': gc / 2,
+        'A': (1 - gc) / 2,
+        'T': (1 - gc) / 2,
+        'N': _N_PROBABILITY,
+    }
+    prob = 1.0
+    for base in pattern:
+        prob *= p_base.get(base, 0.0)
+        if prob == 0.0:
+            break
+    return positions * prob
+
+
+def request_features(sequence_length: int, pattern_length: int, expected_hits: float) -> Tuple[float, ...]:
+    seq_mb = sequence_length / 1_000_000
+    return (1.0, seq_mb, expected_hits / 1000, seq_mb * pattern_length / 100)
+
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> List[float]:
+    """Eliminación gaussiana con pivoteo parcial (sistemas pequeños)."""
+    n = len(vector)
+    a = [row[:] + [vector[i]] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        a[col], a[pivot] = a[pivot], a[col]
+        if a[col][col] == 0:
+            continue
+        for r in range(col + 1, n):
+            factor = a[r][col] / a[col][col]
+            for c in range(col, n + 1):
+                a[r][c] -= factor * a[col][c]
+    x = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        if a[r][r] == 0:
+            continue
+        acc = a[r][n] - sum(a[r][c] * x[c] for c in range(r + 1, n))
+        x[r] = acc / a[r][r]
+    return x
+
+
+class CostModel:
+    """
+    Modelo lineal cost_ms = w · features ajustado por mínimos cuadrados sobre
+    una ventana de observaciones recientes, con regularización ridge hacia
+    los coeficientes iniciales.
+    """
+
+    def __init__(self, prior: Sequence[float], window: int = 200, ridge: float = 1.0):
+        self.prior = tuple(prior)
+        self.weights = list(prior)
+        self.ridge = ridge
+        self.observations = deque(maxlen=window)
+
+    @property
+    def samples(self) -> int:
+        return len(self.observations)
+
+    def predict(self, features: Sequence[float]) -> float:
+        return max(0.0, sum(w * x for w, x in zip(self.weights, features)))
+
+    def observe(self, features: Sequence[float], cost_ms: float):
+        self.observations.append((tuple(features), float(cost_ms)))
+        self._refit()
+
+    def _refit(self):
+        n = len(self.prior)
+        xtx = [[self.ridge if i == j else 0.0 for j in range(n)] for i in range(n)]
+        xty = [self.ridge * p for p in self.prior]
+        for features, y in self.observations:
+            for i in range(n):
+                xty[i] += features[i] * y
+                for j in range(n):
+                    xtx[i][j] += features[i] * features[j]
+        self.weights = _solve(xtx, xty)
+
+
+@dataclass
+class RouteDecision:
+    route: str
+    predicted_ms: float
+    expected_hits: float
+    features: Tuple[float, ...]
+    estimates: Dict[str, float] = field(default_factory=dict)
+    explored: bool = False
+
+
+class CostRouter:
+    """
+    Elige por petición la ruta más barata según los modelos calibrados.
+
+    Cada `explore_every` decisiones se elige la ruta alternativa para que
+    su modelo siga recibiendo mediciones.
+    """
+
+    def __init__(self, priors: Dict[Tuple[str, str], Sequence[float]] = None,
+                 window: int = 200, explore_every: int = 0):
+        priors = priors or DEFAULT_PRIORS
+        self.models = {key: CostModel(prior, window=window) for key, prior in priors.items()}
+        self.explore_every = explore_every
+        self._decisions = 0
+        self._lock = threading.Lock()
+
+    def predict(self, route: str, features: Sequence[float]) -> float:
+        return sum(self.models[(route, c)].predict(features) for c in ROUTE_COMPONENTS[route])
+
+    def estimate(self, sequence_length: int, pattern: str, routes: Iterable[str] = (ROUTE_LOCAL, ROUTE_GRPC),
+                 gc_content: Optional[float] = None) -> float:
+        """Coste previsto (ms) por la ruta más barata, sin contar como decisión."""
+        hits = estimate_matches(sequence_length, pattern, gc_content)
+        features = request_features(sequence_length, len(pattern), hits)
+        with self._lock:
+            return min(self.predict(route, features) for route in routes)
+
+    def choose(self, sequence_length: int, pattern: str, routes: Iterable[str] = (ROUTE_LOCAL, ROUTE_GRPC),
+               gc_content: Optional[float] = None) -> RouteDecision:
+        routes = list(routes)
+        hits = estimate_matches(sequence_length, pattern, gc_content)
+        features = request_features(sequence_length, len(pattern), hits)
+        with self._lock:
+            estimates = {route: self.predict(route, features) for route in routes}
+            self._decisions += 1
+            explore = (
+                self.explore_every > 0
+                and len(routes) > 1
+                and self._decisions % self.explore_every == 0
+            )
+        ranked = sorted(routes, key=lambda r: estimates[r])
+        route = ranked[1] if explore else ranked[0]
+        return RouteDecision(route, estimates[route], hits, features, estimates, explore)
+
+    def preview(self, sequence_length: int, pattern: str, routes: Iterable[str] = (ROUTE_LOCAL, ROUTE_GRPC),
+                gc_content: Optional[float] = None) -> RouteDecision:
+        """Como choose() pero sin contar como decisión ni explorar (para EXPLAIN)."""
+        routes = list(routes)
+        hits = estimate_matches(sequence_length, pattern, gc_content)
+        features = request_features(sequence_length, len(pattern), hits)
+        with self._lock:
+            estimates = {route: self.predict(route, features) for route in routes}
+        route = min(routes, key=lambda r: estimates[r])
+        return RouteDecision(route, estimates[route], hits, features, estimates)
+
+    def observe(self, route: str, features: Sequence[float], end_to_end_ms: float,
+                engine_ms: Optional[float] = None):
+        """
+        Registra una ejecución. Para rutas remotas el tiempo de transporte es
+        la diferencia entre el extremo a extremo y el tiempo del motor.
+        """
+        with self._lock:
+            if route == ROUTE_GRPC and engine_ms is not None:
+                engine_ms = min(engine_ms, end_to_end_ms)
+                self.models[(route, "engine")].observe(features, engine_ms)
+                self.models[(route, "transport")].observe(features, end_to_end_ms - engine_ms)
+            elif route == ROUTE_LOCAL:
+                self.models[(route, "engine")].observe(features, end_to_end_ms)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                f"{route}:{component}": {"weights": list(model.weights), "samples": model.samples}
+                for (route, component), model in self.models.items()
+            }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> CostRouter:
+    """Router por proceso, para que la calibración se acumule entre peticiones."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = CostRouter(
+                window=int(getattr(settings, "SEARCH_ROUTER_WINDOW", 200)),
+                explore_every=int(getattr(settings, "SEARCH_ROUTER_EXPLORE_EVERY", 50)),
+            )
+        return _router
+
+
+def reset_router():
+    global _router
+    with _router_lock:
+        _router = None
@@ -0,0 +1,211 @@
+"""
+Planificación de la cola de jobs asíncronos.
+
+Orden en que los workers reclaman jobs PENDING:
+1. Clase de prioridad (interactive < normal < bulk). Un job sube una clase
+   por cada SEARCH_PRIORITY_AGING_SECONDS de espera, para que los bulk no
+   esperen indefinidamente.
+2. Reparto justo entre clientes: dentro de una clase se atiende antes al
+   cliente con menos jobs en ejecución (y, a igualdad, al que lleva más
+   tiempo esperando). Los clientes que ya tienen SEARCH_CLIENT_MAX_CONCURRENT
+   jobs en ejecución no reciben más hasta que terminen.
+3. Shortest-job-first: de los jobs del cliente elegido, el de menor coste
+   estimado (ver CostRouter.estimate).
+
+El tope por cliente es aproximado: dos workers que reclaman a la vez pueden
+superarlo en uno.
+
+El cliente de un job lo fija el servidor (ver client_identity): el usuario
+autenticado o, si no lo hay, la IP de origen. La cabecera X-Client-Id la
+puede inventar cualquiera en cada petición para saltarse el tope, así que
+solo cuenta con SEARCH_TRUST_CLIENT_ID_HEADER (un gateway propio la fija).
+"""
+
+from datetime import timedelta
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db.models import Count, F, Min, Q, QuerySet
+from django.utils import timezone
+
+from . import coalescing
+from .models import SearchJob
+from .routing import get_router
+
+PRIORITY_BY_NAME = {name: value for value, name in SearchJob.PRIORITY_CHOICES}
+PRIORITIES = sorted(PRIORITY_BY_NAME.values())
+
+
+def aging_seconds() -> float:
+    return getattr(settings, "SEARCH_PRIORITY_AGING_SECONDS", 300)
+
+
+def client_cap() -> int:
+    return getattr(settings, "SEARCH_CLIENT_MAX_CONCURRENT", 2)
+
+
+def client_ip(request) -> str:
+    """
+    IP de origen. Detrás de SEARCH_TRUSTED_PROXIES proxies (p. ej. el
+    balanceador) REMOTE_ADDR es el del proxy: la IP del cliente es la que
+    añadió el más externo a X-Forwarded-For. Las entradas anteriores las
+    pudo escribir el propio cliente y se ignoran.
+    """
+    proxies = getattr(settings, "SEARCH_TRUSTED_PROXIES", 0)
+    if proxies > 0:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR') or ''
+
+
+def client_identity(request) -> str:
+    """
+    Identificador del cliente para el reparto justo de la cola. `request` es
+    la petición de Django: la API no autentica (DRF deja un AnonymousUser),
+    así que el usuario se saca de la sesión.
+    """
+    user = get_user(request) if hasattr(request, 'session') else None
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    if getattr(settings, "SEARCH_TRUST_CLIENT_ID_HEADER", False):
+        header = request.headers.get('X-Client-Id')
+        if header:
+            return header[:200]
+    return client_ip(request)[:200]
+
+
+def estimate_cost_ms(sequence_length: int, pattern: str, gc_content: Optional[float] = None) -> float:
+    return get_router().estimate(sequence_length, pattern, gc_content=gc_content)
+
+
+def classify(estimated_cost_ms: float, requested: Optional[str] = None) -> int:
+    """
+    Clase de prioridad para un job nuevo. Sin petición explícita, los jobs
+    baratos son interactivos; un job caro no puede pedir la clase interactiva.
+    """
+    interactive_max = getattr(settings, "SEARCH_INTERACTIVE_MAX_COST_MS", 500)
+    cheap = estimated_cost_ms <= interactive_max
+    if requested is None:
+        return SearchJob.PRIORITY_INTERACTIVE if cheap else SearchJob.PRIORITY_NORMAL
+    priority = PRIORITY_BY_NAME[requested]
+    if priority == SearchJob.PRIORITY_INTERACTIVE and not cheap:
+        return SearchJob.PRIORITY_NORMAL
+    return priority
+
+
+def running_by_client() -> Dict[str, int]:
+    """Jobs en ejecución por cliente en los workers (las peticiones síncronas no cuentan)."""
+    rows = (
+        SearchJob.objects
+        .filter(status='PROCESSING', worker_id__isnull=False)
+        .values('client_id')
+        .annotate(n=Count('id'))
+    )
+    return {row['client_id']: row['n'] for row in rows}
+
+
+def effective_class_filter(priority: int, now=None) -> Q:
+    """Jobs de la clase `priority` más los de clases inferiores que ya envejecieron hasta ella."""
+    now = now or timezone.now()
+    condition = Q(priority=priority)
+    aging = aging_seconds()
+    if aging:
+        for lower in PRIORITIES:
+            if lower > priority:
+                cutoff = now - timedelta(seconds=aging * (lower - priority))
+                condition |= Q(priority=lower, created_at__lte=cutoff)
+    return condition
+
+
+def queue_order(now=None) -> Iterator[QuerySet]:
+    """
+    Candidatos en orden de preferencia: cada queryset son los jobs pendientes
+    de un cliente en una clase, ya ordenados por coste estimado.
+    """
+    now = now or timezone.now()
+    running = running_by_client()
+    cap = client_cap()
+    pending = SearchJob.objects.filter(status='PENDING')
+    if cap:
+        capped = [client for client, n in running.items() if n >= cap]
+        if capped:
+            pending = pending.exclude(client_id__in=capped)
+
+    for priority in PRIORITIES:
+        in_class = pending.filter(effective_class_filter(priority, now))
+        clients = in_class.values('client_id').annotate(oldest=Min('created_at'))
+        ordered = sorted(clients, key=lambda row: (running.get(row['client_id'], 0), row['oldest']))
+        for row in ordered:
+            yield (
+                in_class
+                .filter(client_id=row['client_id'])
+                .order_by(F('estimated_cost_ms').asc(nulls_last=True), 'created_at', 'id')
+            )
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def queue_stats(window_seconds: Optional[int] = None) -> Dict:
+    """
+    Profundidad de cola y tiempos de espera por clase. Las esperas se
+    calculan sobre los jobs que empezaron en los últimos `window_seconds`.
+    """
+    window_seconds = window_seconds or getattr(settings, "SEARCH_QUEUE_STATS_WINDOW_SECONDS", 3600)
+    now = timezone.now()
+    since = now - timedelta(seconds=window_seconds)
+
+    counts = {
+        (row['priority'], row['status']): row['n']
+        for row in (
+            SearchJob.objects
+            .filter(status__in=['PENDING', 'PROCESSING'])
+            .values('priority', 'status')
+            .annotate(n=Count('id'))
+        )
+    }
+    oldest = dict(
+        SearchJob.objects.filter(status='PENDING')
+        .values('priority').annotate(oldest=Min('created_at'))
+        .values_list('priority', 'oldest')
+    )
+    waits: Dict[int, List[float]] = {p: [] for p in PRIORITIES}
+    started = (
+        SearchJob.objects
+        .filter(started_at__gte=since, worker_id__isnull=False)
+        .values_list('priority', 'created_at', 'started_at')
+    )
+    for priority, created_at, started_at in started:
+        waits.setdefault(priority, []).append((started_at - created_at).total_seconds())
+
+    classes = {}
+    for value, name in SearchJob.PRIORITY_CHOICES:
+        class_waits = waits.get(value, [])
+        classes[name] = {
+            'pending': counts.get((value, 'PENDING'), 0),
+            'processing': counts.get((value, 'PROCESSING'), 0),
+            'oldest_pending_wait_s': (now - oldest[value]).total_seconds() if value in oldest else None,
+            'started_in_window': len(class_waits),
+            'avg_wait_s': sum(class_waits) / len(class_waits) if class_waits else None,
+            'p95_wait_s': _percentile(class_waits, 95),
+            'max_wait_s': max(class_waits) if class_waits else None,
+        }
+
+    return {
+        'classes': classes,
+        'running_by_client': running_by_client(),
+        'client_max_concurrent': client_cap(),
+        'window_seconds': window_seconds,
+        'coalescing': dict(
+            coalescing.stats.snapshot(),
+            coalesced_in_window=SearchJob.objects.filter(
+                coalesced_with__isnull=False, completed_at__gte=since,
+            ).count(),
+        ),
+    }
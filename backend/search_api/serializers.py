@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 
 from sequences_api.models import DNASequence
@@ -9,6 +10,19 @@ class SearchRequestSerializer(serializers.Serializer):
     sequence_id = serializers.IntegerField()
     pattern = serializers.CharField(max_length=1000)
     allow_overlapping = serializers.BooleanField(default=True)
+    # sync: se ejecuta en la petición; async: se encola y responde 202.
+    # Por defecto SEARCH_EXECUTION_MODE.
+    mode = serializers.ChoiceField(choices=['sync', 'async'], required=False)
+    # Clase en la cola asíncrona; por defecto según el coste estimado
+    priority = serializers.ChoiceField(choices=['interactive', 'normal', 'bulk'], required=False)
+    # Tiempo límite de ejecución; por defecto SEARCH_JOB_TIMEOUT_SECONDS
+    timeout_seconds = serializers.FloatField(required=False, min_value=0.1)
+
+    def validate_timeout_seconds(self, value):
+        max_timeout = getattr(settings, 'SEARCH_JOB_MAX_TIMEOUT_SECONDS', None)
+        if max_timeout and value > max_timeout:
+            raise serializers.ValidationError(f"El tiempo límite máximo es {max_timeout} s.")
+        return value
 
     def validate_pattern(self, value):
         normalized = normalize_sequence(value)
@@ -20,6 +34,32 @@ class SearchRequestSerializer(serializers.Serializer):
         return value
 
 
+class BatchSearchRequestSerializer(serializers.Serializer):
+    sequence_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    patterns = serializers.ListField(child=serializers.CharField(max_length=1000), allow_empty=False)
+    allow_overlapping = serializers.BooleanField(default=True)
+
+    def validate_patterns(self, value):
+        return list(dict.fromkeys(validate_dna_sequence(normalize_sequence(p)) for p in value))
+
+    def validate_sequence_ids(self, value):
+        unique_ids = list(dict.fromkeys(value))
+        found = set(DNASequence.objects.filter(pk__in=unique_ids).values_list('pk', flat=True))
+        missing = [pk for pk in unique_ids if pk not in found]
+        if missing:
+            raise serializers.ValidationError(f"Secuencias inexistentes: {missing}")
+        return unique_ids
+
+    def validate(self, attrs):
+        max_pairs = getattr(settings, 'SEARCH_BATCH_MAX_PAIRS', 1000)
+        pairs = len(attrs['sequence_ids']) * len(attrs['patterns'])
+        if pairs > max_pairs:
+            raise serializers.ValidationError(
+                f"El lote tiene {pairs} pares (máximo {max_pairs})."
+            )
+        return attrs
+
+
 class SearchResultSerializer(serializers.ModelSerializer):
     class Meta:
         model = SearchResult
@@ -28,6 +68,7 @@ class SearchResultSerializer(serializers.ModelSerializer):
 
 class SearchJobSerializer(serializers.ModelSerializer):
     sequence_name = serializers.CharField(source='sequence.name', read_only=True)
+    priority = serializers.CharField(source='priority_name', read_only=True)
 
     class Meta:
         model = SearchJob
@@ -38,9 +79,21 @@ class SearchJobSerializer(serializers.ModelSerializer):
             'pattern',
             'allow_overlapping',
             'status',
+            'priority',
+            'estimated_cost_ms',
             'total_matches',
             'search_time_ms',
             'algorithm_used',
+            'route',
+            'predicted_cost_ms',
+            'actual_cost_ms',
+            'timings',
+            'coalesced_with',
             'created_at',
+            'timeout_seconds',
+            'started_at',
+            'progress_bytes',
+            'progress_matches',
             'completed_at',
+            'error_message',
         ]
@@ -1,49 +1,123 @@
 import logging
+import mmap
 import time
-from typing import Dict, List
+from typing import Callable, Dict, Iterator, List, Optional, Union
 
 import grpc
 from django.conf import settings
 
+from config.metrics import registry
+from config.timing import record
 from sequences_api.validators import normalize_sequence, validate_dna_sequence
+from .cancellation import CancellationToken
+from .progress import ProgressCallback
 from .grpc_client import get_grpc_client
+from .routing import ROUTE_GRPC, ROUTE_LOCAL, ROUTE_LOCAL_FALLBACK, get_router
 
 log = logging.getLogger(__name__)
 
+GRPC_ERRORS = registry.counter('dna_grpc_errors_total', 'Llamadas gRPC fallidas', ['method', 'code'])
+GRPC_FALLBACKS = registry.counter(
+    'dna_grpc_fallbacks_total', 'Búsquedas que recurrieron al motor local tras un fallo gRPC', ['method'],
+)
 
-def _find_matches(sequence: str, pattern: str, allow_overlapping: bool = True) -> List[Dict]:
+# Consumidor de coincidencias en streaming (ver persistence.ResultWriter)
+MatchSink = Callable[[Dict], None]
+
+# Texto de la secuencia o sus bytes ASCII proyectados (caché compartida, ver sequences_api/cache.py)
+SequenceData = Union[str, bytes, mmap.mmap]
+
+
+# Tramo máximo recorrido entre comprobaciones de cancelación y avisos de progreso
+SCAN_WINDOW = 1 << 20
+
+
+def _find_cancellable(sequence: SequenceData, pattern, start: int, token: Optional[CancellationToken],
+                      progress: Optional[ProgressCallback] = None) -> int:
     """
-    Búsqueda naive para etapa inicial (sin microservicio C++).
-    Devuelve lista de dicts con posición y contexto.
+    sequence.find por tramos de SCAN_WINDOW; entre tramos comprueba el token
+    e informa a `progress` de los bytes recorridos.
+    """
+    seq_len = len(sequence)
+    pat_len = len(pattern)
+    while True:
+        if token is not None:
+            token.raise_if_cancelled()
+        if progress is not None:
+            progress(start)
+        stop = min(seq_len, start + SCAN_WINDOW + pat_len - 1)
+        idx = sequence.find(pattern, start, stop)
+        if idx != -1 or stop == seq_len:
+            return idx
+        start = stop - pat_len + 1
+
+
+def iter_matches(sequence: SequenceData, pattern: str, allow_overlapping: bool = True,
+                 token: Optional[CancellationToken] = None,
+                 progress: Optional[ProgressCallback] = None) -> Iterator[Dict]:
+    """
+    Búsqueda naive (sin microservicio C++) como generador: produce cada
+    coincidencia con posición y contexto según se encuentra.
+
+    Con `token`, el recorrido se detiene con SearchCancelled en cuanto se
+    cancela el job o vence su tiempo límite. Con `progress`, recibe los
+    bytes recorridos (al menos una vez por tramo y al terminar).
+
+    `sequence` puede ser también un buffer de bytes ASCII (p. ej. un mmap):
+    se recorre sin copiarlo y solo se decodifica el contexto.
     """
-    matches = []
     start = 0
     pat_len = len(pattern)
+    as_text = isinstance(sequence, str)
+    if not as_text:
+        pattern = pattern.encode('ascii')
 
     while True:
-        idx = sequence.find(pattern, start)
+        if token is None and progress is None:
+            idx = sequence.find(pattern, start)
+        else:
+            idx = _find_cancellable(sequence, pattern, start, token, progress)
         if idx == -1:
             break
 
         context_before = sequence[max(0, idx - 10):idx]
         context_after = sequence[idx + pat_len: idx + pat_len + 10]
+        if not as_text:
+            context_before = context_before.decode('ascii')
+            context_after = context_after.decode('ascii')
 
-        matches.append({
+        yield {
             "position": idx,
             "context_before": context_before,
             "context_after": context_after,
-        })
+        }
 
         # Modo solapado vs directo
         start = idx + 1 if allow_overlapping else idx + pat_len
 
-    return matches
+    if progress is not None:
+        progress(len(sequence))
+
+
+def _find_matches(sequence: str, pattern: str, allow_overlapping: bool = True) -> List[Dict]:
+    """
+    Búsqueda naive para etapa inicial (sin microservicio C++).
+    Devuelve lista de dicts con posición y contexto.
+    """
+    return list(iter_matches(sequence, pattern, allow_overlapping))
 
 
-def run_local_search(sequence: str, pattern: str, allow_overlapping: bool = True) -> Dict:
+def run_local_search(sequence: SequenceData, pattern: str, allow_overlapping: bool = True,
+                     sink: Optional[MatchSink] = None, token: Optional[CancellationToken] = None,
+                     progress: Optional[ProgressCallback] = None) -> Dict:
     """
     Ejecuta búsqueda local usando algoritmo simple.
     Retorna dict con métricas y matches.
+
+    Si se indica `sink`, cada coincidencia se le entrega según se encuentra
+    (p. ej. a un ResultWriter) y `matches` queda vacío. Con `token` la
+    búsqueda puede cancelarse (SearchCancelled); `progress` recibe los
+    bytes recorridos.
     """
     normalized_pattern = normalize_sequence(pattern)
     validated_pattern = validate_dna_sequence(normalized_pattern)
@@ -52,29 +126,50 @@ def run_local_search(sequence: str, pattern: str, allow_overlapping: bool = True
         raise ValueError("El patrón es demasiado largo (máximo 1000 caracteres).")
 
     t0 = time.perf_counter()
-    matches = _find_matches(sequence, validated_pattern, allow_overlapping)
+    if sink is None:
+        matches = list(iter_matches(sequence, validated_pattern, allow_overlapping, token, progress))
+        total = len(matches)
+    else:
+        matches = []
+        total = 0
+        for match in iter_matches(sequence, validated_pattern, allow_overlapping, token, progress):
+            sink(match)
+            total += 1
     elapsed_ms = (time.perf_counter() - t0) * 1000
 
     return {
         "pattern": validated_pattern,
-        "total_matches": len(matches),
+        "total_matches": total,
         "search_time_ms": elapsed_ms,
         "matches": matches,
         "algorithm_used": "naive-local",
     }
 
 
-def run_grpc_search(sequence: str, pattern: str, allow_overlapping: bool = True) -> Dict:
+def run_grpc_search(sequence: SequenceData, pattern: str, allow_overlapping: bool = True,
+                    token: Optional[CancellationToken] = None) -> Dict:
     """
     Ejecuta búsqueda vía microservicio gRPC (C++).
+    Con `token`, la llamada se cancela en el servidor si se cancela el job.
     """
+    if not isinstance(sequence, str):
+        # El mensaje protobuf copia la secuencia de todos modos
+        sequence = str(sequence, 'ascii')
     normalized_pattern = normalize_sequence(pattern)
     validated_pattern = validate_dna_sequence(normalized_pattern)
 
     client = get_grpc_client()
     log.info("Invocando gRPC a %s con allow_overlapping=%s", client.address, allow_overlapping)
-    resp = client.search(sequence=sequence, pattern=validated_pattern, allow_overlapping=allow_overlapping)
+    if token is None:
+        resp = client.search(sequence=sequence, pattern=validated_pattern, allow_overlapping=allow_overlapping)
+    else:
+        resp = client.search(sequence=sequence, pattern=validated_pattern, allow_overlapping=allow_overlapping,
+                             token=token)
+    return _response_to_result(resp, validated_pattern)
+
 
+def _response_to_result(resp, pattern: str) -> Dict:
+    """Convierte un SearchResponse gRPC al dict de resultados común."""
     matches = []
     for m in resp.matches:
         matches.append({
@@ -84,7 +179,7 @@ def run_grpc_search(sequence: str, pattern: str, allow_overlapping: bool = True)
         })
 
     return {
-        "pattern": validated_pattern,
+        "pattern": pattern,
         "total_matches": resp.total_matches or len(matches),
         "search_time_ms": resp.search_time_ms,
         "matches": matches,
@@ -92,16 +187,133 @@ def run_grpc_search(sequence: str, pattern: str, allow_overlapping: bool = True)
     }
 
 
-def run_search(sequence: str, pattern: str, allow_overlapping: bool = True) -> Dict:
+def _status_name(exc: grpc.RpcError) -> str:
+    code = exc.code() if callable(getattr(exc, 'code', None)) else None
+    return getattr(code, 'name', 'UNKNOWN')
+
+
+def run_batch_search(sequences: Dict[int, str], patterns: List[str], allow_overlapping: bool = True) -> List[Dict]:
+    """
+    Busca cada patrón en cada secuencia. Con gRPC habilitado usa una sola
+    llamada BatchSearch (cada secuencia viaja una vez y el servidor ejecuta
+    los pares en paralelo); si falla, ejecuta los pares localmente.
+
+    Devuelve un dict por par, en orden secuencia-mayor, con el resultado
+    habitual más `sequence_id`, `route` y `error` (None si fue bien). Los
+    patrones repetidos se buscan una sola vez.
+    """
+    # Sin repetidos (tras normalizar, "atg" y "ATG" son el mismo), en su orden
+    validated_patterns = list(dict.fromkeys(validate_dna_sequence(normalize_sequence(p)) for p in patterns))
+
+    if getattr(settings, "USE_GRPC_SEARCH", False):
+        try:
+            return _run_grpc_batch(sequences, validated_patterns, allow_overlapping)
+        except grpc.RpcError as exc:
+            log.error("Fallo gRPC en lote (%s). Usando fallback local.", exc)
+            GRPC_ERRORS.inc(method='BatchSearch', code=_status_name(exc))
+            GRPC_FALLBACKS.inc(method='BatchSearch')
+            route = ROUTE_LOCAL_FALLBACK
+    else:
+        route = ROUTE_LOCAL
+
+    pair_results = []
+    for seq_id, sequence in sequences.items():
+        for pattern in validated_patterns:
+            result = run_local_search(sequence, pattern, allow_overlapping)
+            result.update(sequence_id=seq_id, route=route, error=None)
+            pair_results.append(result)
+    return pair_results
+
+
+def _run_grpc_batch(sequences: Dict[int, str], patterns: List[str], allow_overlapping: bool) -> List[Dict]:
+    client = get_grpc_client()
+    ids = {str(seq_id): seq_id for seq_id in sequences}
+    log.info("Invocando BatchSearch a %s con %d pares", client.address, len(ids) * len(patterns))
+    resp = client.search_batch(
+        {str(seq_id): seq for seq_id, seq in sequences.items()},
+        patterns,
+        allow_overlapping,
+    )
+
+    pair_results = []
+    for pair in resp.results:
+        if pair.error:
+            result = {"pattern": pair.pattern, "error": pair.error}
+        else:
+            result = _response_to_result(pair.response, pair.pattern)
+            result["error"] = None
+        result.update(sequence_id=ids.get(pair.sequence_id, pair.sequence_id), route=ROUTE_GRPC)
+        pair_results.append(result)
+    return pair_results
+
+
+def run_search(sequence: SequenceData, pattern: str, allow_overlapping: bool = True,
+               gc_content: Optional[float] = None, sink: Optional[MatchSink] = None,
+               token: Optional[CancellationToken] = None,
+               progress: Optional[ProgressCallback] = None) -> Dict:
     """
     Orquesta la búsqueda usando gRPC si está habilitado, con fallback local.
+
+    Con SEARCH_COST_ROUTING activo elige por petición la ruta más barata según
+    el router de costes. El resultado incluye la ruta elegida y su coste
+    previsto y real (extremo a extremo, ms).
+
+    Con `sink`, las coincidencias se entregan en streaming en lugar de
+    acumularse en `matches` (el motor local las entrega mientras busca).
+
+    Con `token`, la búsqueda se puede cancelar o limitar en tiempo: lanza
+    SearchCancelled y no recurre al fallback local si el fallo gRPC se debe
+    a la cancelación.
+
+    `progress` recibe los bytes recorridos: el motor local informa durante el
+    recorrido; la llamada gRPC es unaria y solo informa al terminar.
     """
     use_grpc = getattr(settings, "USE_GRPC_SEARCH", False)
-    if not use_grpc:
-        return run_local_search(sequence, pattern, allow_overlapping)
-
-    try:
-        return run_grpc_search(sequence, pattern, allow_overlapping)
-    except grpc.RpcError as exc:
-        log.error("Fallo gRPC (%s). Usando fallback local.", exc)
-        return run_local_search(sequence, pattern, allow_overlapping)
+    router = get_router()
+    routes = [ROUTE_LOCAL, ROUTE_GRPC] if use_grpc else [ROUTE_LOCAL]
+    decision = router.choose(len(sequence), normalize_sequence(pattern), routes, gc_content)
+    if use_grpc and not getattr(settings, "SEARCH_COST_ROUTING", False):
+        route = ROUTE_GRPC
+    else:
+        route = decision.route
+    predicted_ms = decision.estimates[route]
+
+    t0 = time.perf_counter()
+    if route == ROUTE_LOCAL:
+        result = run_local_search(sequence, pattern, allow_overlapping, sink, token, progress)
+    else:
+        try:
+            result = run_grpc_search(sequence, pattern, allow_overlapping, token)
+        except grpc.RpcError as exc:
+            GRPC_ERRORS.inc(method='Search', code=_status_name(exc))
+            if token is not None:
+                token.raise_if_cancelled()
+            log.error("Fallo gRPC (%s). Usando fallback local.", exc)
+            GRPC_FALLBACKS.inc(method='Search')
+            result = run_local_search(sequence, pattern, allow_overlapping, sink, token, progress)
+            route = ROUTE_LOCAL_FALLBACK
+        else:
+            if result.get("search_time_ms") is not None:
+                # Tiempo del motor en el servidor frente a serialización y red
+                call_ms = (time.perf_counter() - t0) * 1000
+                record("grpc_server", result["search_time_ms"])
+                record("grpc_transport", max(0.0, call_ms - result["search_time_ms"]))
+            if progress is not None:
+                progress(len(sequence))
+
+    # El motor local entrega al sink mientras busca; la respuesta gRPC se
+    # entrega aquí. Las dos rutas se miden hasta entregar la última coincidencia.
+    if sink is not None and result["matches"]:
+        for match in result["matches"]:
+            if token is not None:
+                token.raise_if_cancelled()
+            sink(match)
+        result["matches"] = []
+    actual_ms = (time.perf_counter() - t0) * 1000
+
+    router.observe(route, decision.features, actual_ms, result.get("search_time_ms"))
+
+    result["route"] = route
+    result["predicted_cost_ms"] = predicted_ms
+    result["actual_cost_ms"] = actual_ms
+    return result
@@ -0,0 +1,147 @@
+"""
+Pruebas del pool de afinidad por secuencia (search_api/affinity.py)
+
+Cubre:
+- Reparto por rendezvous hashing sobre file_hash
+- Búsqueda en el worker dueño: resultados, streaming, progreso y residencia
+- Errores, cancelación y tiempo límite a través del socket
+- execute_job con SEARCH_AFFINITY_WORKERS y fallback si el worker no está
+"""
+
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from sequences_api.models import DNASequence
+from search_api import affinity
+from search_api.affinity import (
+    AffinitySearchError,
+    AffinityUnavailable,
+    AffinityWorker,
+    affinity_search,
+    owner_index,
+    socket_path,
+)
+from search_api.cancellation import REASON_TIMEOUT, CancellationToken, SearchCancelled
+from search_api.jobs import execute_job
+from search_api.models import SearchJob
+from search_api.result_store import count_results, read_results
+from search_api.services import run_local_search
+
+
+class OwnerIndexTests(SimpleTestCase):
+    """Reparto de secuencias entre procesos"""
+
+    def test_stable_and_spread(self):
+        keys = [f"hash-{i}" for i in range(1000)]
+        owners = [owner_index(k, 4) for k in keys]
+        self.assertEqual(owners, [owner_index(k, 4) for k in keys])
+        for index in range(4):
+            self.assertGreater(owners.count(index), 150)
+
+    def test_adding_worker_moves_only_its_share(self):
+        keys = [f"hash-{i}" for i in range(1000)]
+        moved = [k for k in keys if owner_index(k, 4) != owner_index(k, 5)]
+        self.assertTrue(all(owner_index(k, 5) == 4 for k in moved))
+        self.assertLess(len(moved), 300)
+
+
+class AffinityWorkerTests(SimpleTestCase):
+    """Búsquedas contra un worker del pool (en un hilo de este proceso)"""
+
+    SEQUENCES = {1: "CCGATTACACC" * 300, 2: "A" * 3_000_000}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.loads = []
+        self.worker = AffinityWorker(0, socket_path(0, self.directory), loader=self._load).start()
+        self.addCleanup(self.worker.stop)
+
+    def _load(self, pk):
+        self.loads.append(pk)
+        return self.SEQUENCES[pk]
+
+    def _search(self, pk, pattern, **kwargs):
+        return affinity_search(pk, f"hash-{pk}", pattern, workers=1, directory=self.directory, **kwargs)
+
+    def test_same_results_and_sequence_stays_resident(self):
+        result = self._search(1, "GATTACA")
+        expected = run_local_search(self.SEQUENCES[1], "GATTACA")
+        self.assertEqual(result['total_matches'], 300)
+        self.assertEqual(result['matches'], expected['matches'])
+        self.assertEqual(result['affinity_worker'], 0)
+
+        self._search(1, "TTAC")
+        self.assertEqual(self.loads, [1])
+        self.assertEqual(self.worker.served, 2)
+
+    def test_streams_matches_and_progress(self):
+        received, progress = [], []
+        with patch.object(affinity, 'MATCH_BATCH', 7):
+            result = self._search(1, "GATTACA", sink=received.append, progress=progress.append)
+        self.assertEqual(result['matches'], [])
+        self.assertEqual(len(received), 300)
+        self.assertTrue(progress)
+
+    def test_engine_error_is_reported(self):
+        with self.assertRaises(AffinitySearchError):
+            self._search(1, "XYZ")
+
+    def test_cancel_stops_worker_search(self):
+        token = CancellationToken(poll_interval=0.02)
+        threading.Timer(0.1, token.cancel).start()
+        t0 = time.perf_counter()
+        with self.assertRaises(SearchCancelled):
+            self._search(2, "A", sink=lambda m: None, token=token)
+        self.assertLess(time.perf_counter() - t0, 2.0)
+        # El worker sigue atendiendo después de la cancelación
+        self.assertEqual(self._search(1, "GATTACA")['total_matches'], 300)
+
+    def test_timeout_travels_to_worker(self):
+        with self.assertRaises(SearchCancelled) as ctx:
+            self._search(2, "A", sink=lambda m: None, token=CancellationToken(timeout=0.1, poll_interval=0.02))
+        self.assertEqual(ctx.exception.reason, REASON_TIMEOUT)
+
+    def test_missing_worker(self):
+        with self.assertRaises(AffinityUnavailable):
+            affinity_search(1, "hash-1", "ATG", workers=1, directory=tempfile.gettempdir() + "/no-such-pool")
+
+
+@override_settings(USE_GRPC_SEARCH=False, SEARCH_AFFINITY_WORKERS=1)
+class AffinityExecuteJobTests(TestCase):
+    """execute_job despacha al worker dueño"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.sequence = DNASequence.objects.create(name="affinity", sequence="ATGC" * 500)
+        texts = {self.sequence.pk: self.sequence.sequence}
+        self.worker = AffinityWorker(0, socket_path(0, self.directory), loader=texts.__getitem__).start()
+        self.addCleanup(self.worker.stop)
+
+    def _execute(self):
+        job = SearchJob.objects.create(sequence=self.sequence, pattern="ATG", status='PROCESSING')
+        execute_job(SearchJob.objects.get(pk=job.pk))
+        job.refresh_from_db()
+        return job
+
+    def test_job_runs_in_owner(self):
+        with override_settings(SEARCH_AFFINITY_SOCKET_DIR=self.directory):
+            job = self._execute()
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertEqual(job.route, 'affinity')
+        self.assertEqual(count_results(job), 500)
+        self.assertEqual(read_results(job, 0, 1)[0]['context_after'], "CATGCATGCA")
+        self.assertEqual(self.worker.served, 1)
+
+    def test_falls_back_when_pool_is_down(self):
+        with override_settings(SEARCH_AFFINITY_SOCKET_DIR=self.directory + "/missing"):
+            job = self._execute()
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertEqual(job.route, 'local')
+        self.assertEqual(self.worker.served, 0)
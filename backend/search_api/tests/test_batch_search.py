@@ -0,0 +1,157 @@
+"""
+Pruebas de la búsqueda por lotes (BatchSearch)
+
+Cubre:
+- GrpcSearchClient.search_batch contra el servidor Python de referencia
+- run_batch_search vía gRPC y con fallback local
+- Endpoint POST /api/search/batch/
+"""
+
+import json
+
+from django.test import TestCase, override_settings
+
+from sequences_api.models import DNASequence
+from search_api.grpc_client import GrpcSearchClient, LoadBalancedSearchClient
+from search_api.grpc_server import create_server
+from search_api.models import SearchJob
+from search_api.result_store import count_results
+from search_api.routing import ROUTE_GRPC, ROUTE_LOCAL, ROUTE_LOCAL_FALLBACK
+from search_api.services import run_batch_search
+
+
+class BatchSearchClientTests(TestCase):
+    """Pruebas del RPC BatchSearch con servidor Python en proceso"""
+
+    def setUp(self):
+        self.server, port, self.servicer = create_server("127.0.0.1", 0)
+        self.address = f"127.0.0.1:{port}"
+        self.client = GrpcSearchClient("127.0.0.1", port, timeout=5.0)
+
+    def tearDown(self):
+        self.server.stop(None)
+
+    def test_returns_one_result_per_pair(self):
+        resp = self.client.search_batch(
+            {"1": "ATGATGATG", "2": "CCCATG"},
+            ["ATG", "CC"],
+        )
+        self.assertEqual(len(resp.results), 4)
+        by_pair = {(r.sequence_id, r.pattern): r.response.total_matches for r in resp.results}
+        self.assertEqual(by_pair, {
+            ("1", "ATG"): 3,
+            ("1", "CC"): 0,
+            ("2", "ATG"): 1,
+            ("2", "CC"): 2,
+        })
+        self.assertEqual(self.servicer.batch_calls, 1)
+
+    def test_respects_overlapping_flag(self):
+        resp = self.client.search_batch({"1": "AAAA"}, ["AA"], allow_overlapping=False)
+        self.assertEqual(resp.results[0].response.total_matches, 2)
+
+    def test_empty_pattern_reports_error_per_pair(self):
+        resp = self.client.search_batch({"1": "ATG"}, ["", "AT"])
+        self.assertTrue(resp.results[0].error)
+        self.assertFalse(resp.results[1].error)
+
+    def test_balanced_client_supports_batch(self):
+        client = LoadBalancedSearchClient([self.address], timeout=5.0)
+        resp = client.search_batch({"1": "ATGATG"}, ["ATG"])
+        self.assertEqual(resp.results[0].response.total_matches, 2)
+
+
+class RunBatchSearchTests(TestCase):
+    """Pruebas de run_batch_search"""
+
+    def setUp(self):
+        self.server, port, self.servicer = create_server("127.0.0.1", 0)
+        self.host, self.port = "127.0.0.1", str(port)
+
+    def tearDown(self):
+        self.server.stop(None)
+
+    def test_uses_single_grpc_call(self):
+        with override_settings(USE_GRPC_SEARCH=True, GRPC_HOST=self.host, GRPC_PORT=self.port):
+            results = run_batch_search({10: "ATGATG", 11: "ATG"}, ["atg", "TG"])
+
+        self.assertEqual(self.servicer.batch_calls, 1)
+        self.assertEqual(self.servicer.search_calls, 0)
+        self.assertEqual([(r['sequence_id'], r['pattern']) for r in results],
+                         [(10, "ATG"), (10, "TG"), (11, "ATG"), (11, "TG")])
+        self.assertTrue(all(r['route'] == ROUTE_GRPC for r in results))
+        self.assertEqual(results[0]['total_matches'], 2)
+
+    def test_duplicate_patterns_are_searched_once(self):
+        with override_settings(USE_GRPC_SEARCH=True, GRPC_HOST=self.host, GRPC_PORT=self.port):
+            results = run_batch_search({10: "ATGATG"}, ["TG", "atg", "TG", "ATG"])
+        self.assertEqual([r['pattern'] for r in results], ["TG", "ATG"])
+        with override_settings(USE_GRPC_SEARCH=False):
+            results = run_batch_search({10: "ATGATG"}, ["ATG", "atg"])
+        self.assertEqual(len(results), 1)
+
+    @override_settings(USE_GRPC_SEARCH=True, GRPC_HOST="127.0.0.1", GRPC_PORT="1", GRPC_TIMEOUT_SECONDS=1)
+    def test_falls_back_to_local(self):
+        results = run_batch_search({1: "ATGATG"}, ["ATG"])
+        self.assertEqual(results[0]['route'], ROUTE_LOCAL_FALLBACK)
+        self.assertEqual(results[0]['total_matches'], 2)
+
+    @override_settings(USE_GRPC_SEARCH=False)
+    def test_local_when_grpc_disabled(self):
+        results = run_batch_search({1: "ATGATG", 2: "GGG"}, ["ATG"])
+        self.assertEqual([r['total_matches'] for r in results], [2, 0])
+        self.assertTrue(all(r['route'] == ROUTE_LOCAL for r in results))
+
+
+@override_settings(USE_GRPC_SEARCH=False)
+class BatchSearchEndpointTests(TestCase):
+    """Pruebas del endpoint /api/search/batch/"""
+
+    def setUp(self):
+        self.seq_a = DNASequence.objects.create(name="a", sequence="ATGATGATG")
+        self.seq_b = DNASequence.objects.create(name="b", sequence="TTTATG")
+
+    def _post(self, payload):
+        return self.client.post('/api/search/batch/', json.dumps(payload), content_type='application/json')
+
+    def test_creates_job_per_pair(self):
+        response = self._post({
+            'sequence_ids': [self.seq_a.id, self.seq_b.id],
+            'patterns': ['ATG', 'TTT'],
+        })
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['total_pairs'], 4)
+        self.assertEqual(SearchJob.objects.count(), 4)
+        self.assertTrue(all(r['status'] == 'COMPLETED' for r in data['results']))
+
+        first = SearchJob.objects.get(pk=data['results'][0]['job_id'])
+        self.assertEqual(first.sequence_id, self.seq_a.id)
+        self.assertEqual(first.pattern, 'ATG')
+        self.assertEqual(count_results(first), 3)
+
+    def test_rejects_unknown_sequence(self):
+        response = self._post({'sequence_ids': [self.seq_a.id, 99999], 'patterns': ['ATG']})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_invalid_pattern(self):
+        response = self._post({'sequence_ids': [self.seq_a.id], 'patterns': ['ATG', 'XYZ']})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(SEARCH_BATCH_MAX_PAIRS=3)
+    def test_rejects_too_many_pairs(self):
+        response = self._post({
+            'sequence_ids': [self.seq_a.id, self.seq_b.id],
+            'patterns': ['ATG', 'TTT'],
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_duplicate_sequence_ids_are_collapsed(self):
+        response = self._post({'sequence_ids': [self.seq_a.id, self.seq_a.id], 'patterns': ['ATG']})
+        self.assertEqual(response.json()['total_pairs'], 1)
+
+    def test_duplicate_patterns_are_collapsed(self):
+        response = self._post({'sequence_ids': [self.seq_a.id], 'patterns': ['ATG', 'atg', 'TTT', 'ATG']})
+        self.assertEqual(response.json()['total_pairs'], 2)
+        self.assertEqual(sorted(SearchJob.objects.values_list('pattern', flat=True)), ['ATG', 'TTT'])
@@ -0,0 +1,291 @@
+"""
+Pruebas de cancelación y tiempo límite (search_api/cancellation.py)
+
+Cubre:
+- CancellationToken: plazo, sondeo externo y callbacks
+- Comprobaciones cooperativas en el recorrido del motor local
+- Cancelación de llamadas gRPC (cliente y servidor de referencia)
+- execute_job: estados CANCELLED/FAILED y limpieza de resultados parciales
+- Endpoint POST /api/search/jobs/{id}/cancel/
+"""
+
+import json
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import grpc
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from sequences_api.models import DNASequence
+from search_api import cancellation, services
+from search_api.cancellation import (
+    REASON_CANCELLED,
+    REASON_TIMEOUT,
+    CancellationToken,
+    SearchCancelled,
+)
+from search_api.grpc_client import GrpcSearchClient, LoadBalancedSearchClient
+from search_api.grpc_server import create_server
+from search_api.jobs import claim_next_job, execute_job
+from search_api.models import SearchJob
+from search_api.result_store import count_results
+from search_api.services import iter_matches, run_local_search, run_search
+
+
+class CancellationTokenTests(SimpleTestCase):
+    """Pruebas del token"""
+
+    def test_deadline(self):
+        token = CancellationToken(timeout=0.01)
+        self.assertIsNone(token.reason)
+        time.sleep(0.02)
+        with self.assertRaises(SearchCancelled) as ctx:
+            token.raise_if_cancelled()
+        self.assertEqual(ctx.exception.reason, REASON_TIMEOUT)
+        self.assertEqual(token.remaining(), 0.0)
+
+    def test_external_check_is_throttled(self):
+        check = Mock(return_value=False)
+        token = CancellationToken(check=check, poll_interval=60)
+        for _ in range(100):
+            token.raise_if_cancelled()
+        self.assertEqual(check.call_count, 1)
+
+    def test_delayed_first_check(self):
+        check = Mock(return_value=True)
+        token = CancellationToken(check=check, poll_interval=60, delay_first_check=True)
+        self.assertFalse(token.cancelled)
+        check.assert_not_called()
+        # Sin intervalo la primera comprobación sigue siendo inmediata
+        self.assertTrue(CancellationToken(check=check, poll_interval=0, delay_first_check=True).cancelled)
+
+    def test_external_check_cancels(self):
+        token = CancellationToken(check=lambda: True)
+        self.assertTrue(token.cancelled)
+        self.assertEqual(token.reason, REASON_CANCELLED)
+
+    def test_callbacks_run_once(self):
+        token = CancellationToken()
+        callback = Mock()
+        token.add_callback(callback)
+        token.cancel()
+        token.cancel()
+        callback.assert_called_once()
+
+        late = Mock()
+        token.add_callback(late)
+        late.assert_called_once()
+
+    def test_local_registry(self):
+        token = CancellationToken()
+        cancellation.register(42, token)
+        self.assertTrue(cancellation.cancel_local(42))
+        cancellation.unregister(42)
+        self.assertTrue(token.cancelled)
+        self.assertFalse(cancellation.cancel_local(42))
+
+
+class LocalEngineCancellationTests(SimpleTestCase):
+    """El motor local se detiene dentro de su bucle"""
+
+    def test_windowed_scan_finds_same_matches(self):
+        sequence = ("ATGCGT" * 50) + "GATTACA" + ("CG" * 40) + "GATTACA"
+        expected = [m['position'] for m in iter_matches(sequence, "GATTACA")]
+        with patch.object(services, 'SCAN_WINDOW', 7):
+            windowed = [m['position'] for m in iter_matches(sequence, "GATTACA", token=CancellationToken())]
+        self.assertEqual(windowed, expected)
+        self.assertEqual(len(expected), 2)
+
+    def test_cancelled_token_stops_immediately(self):
+        token = CancellationToken()
+        token.cancel()
+        with self.assertRaises(SearchCancelled):
+            next(iter_matches("ATG" * 10, "ATG", token=token))
+
+    def test_timeout_interrupts_long_scan(self):
+        sequence = "A" * 3_000_000
+        t0 = time.perf_counter()
+        with self.assertRaises(SearchCancelled) as ctx:
+            run_local_search(sequence, "A", True, sink=lambda m: None, token=CancellationToken(timeout=0.05))
+        self.assertEqual(ctx.exception.reason, REASON_TIMEOUT)
+        self.assertLess(time.perf_counter() - t0, 1.0)
+
+    def test_scan_without_matches_checks_between_windows(self):
+        check = Mock(return_value=False)
+        token = CancellationToken(check=check, poll_interval=0)
+        with patch.object(services, 'SCAN_WINDOW', 1000):
+            self.assertEqual(list(iter_matches("C" * 10_000, "ATG", token=token)), [])
+        self.assertGreaterEqual(check.call_count, 10)
+
+
+class GrpcCancellationTests(TestCase):
+    """La cancelación llega al servidor gRPC"""
+
+    def setUp(self):
+        self.server, self.port, self.servicer = create_server("127.0.0.1", 0)
+        self.client = GrpcSearchClient("127.0.0.1", self.port, timeout=30.0)
+
+    def tearDown(self):
+        self.server.stop(None)
+
+    def _wait_for(self, predicate, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if predicate():
+                return True
+            time.sleep(0.02)
+        return False
+
+    def test_cancel_aborts_remote_search(self):
+        token = CancellationToken(poll_interval=0.05)
+        threading.Timer(0.2, token.cancel).start()
+        t0 = time.perf_counter()
+        with self.assertRaises(SearchCancelled):
+            self.client.search("A" * 10_000_000, "A", True, token=token)
+        self.assertLess(time.perf_counter() - t0, 2.0)
+        self.assertTrue(self._wait_for(lambda: self.servicer.cancelled_calls == 1))
+
+    def test_job_deadline_bounds_grpc_timeout(self):
+        token = CancellationToken(timeout=0.2, poll_interval=0.05)
+        with self.assertRaises((SearchCancelled, grpc.RpcError)):
+            self.client.search("A" * 10_000_000, "A", True, token=token)
+        self.assertTrue(token.cancelled)
+        self.assertTrue(self._wait_for(lambda: self.servicer.cancelled_calls == 1))
+
+    def test_job_deadline_exceeded_is_a_timeout(self):
+        # Sondeo largo: el plazo gRPC vence antes de que el cliente mire el token
+        token = CancellationToken(timeout=0.2, poll_interval=5)
+        with self.assertRaises(SearchCancelled) as ctx:
+            self.client.search("A" * 10_000_000, "A", True, token=token)
+        self.assertEqual(ctx.exception.reason, REASON_TIMEOUT)
+
+    def test_job_timeout_does_not_eject_replicas(self):
+        other, other_port, other_servicer = create_server("127.0.0.1", 0)
+        self.addCleanup(other.stop, None)
+        client = LoadBalancedSearchClient([f"127.0.0.1:{self.port}", f"127.0.0.1:{other_port}"], timeout=30.0)
+        token = CancellationToken(timeout=0.2, poll_interval=5)
+        with self.assertRaises(SearchCancelled) as ctx:
+            client.search("A" * 10_000_000, "A", True, token=token)
+        self.assertEqual(ctx.exception.reason, REASON_TIMEOUT)
+        # Sin reintento en la otra réplica y ninguna expulsada
+        self.assertEqual(self.servicer.search_calls + other_servicer.search_calls, 1)
+        self.assertEqual(len(client.healthy_backends()), 2)
+
+    def test_token_without_cancel_returns_response(self):
+        resp = self.client.search("ATGATG", "ATG", True, token=CancellationToken())
+        self.assertEqual(resp.total_matches, 2)
+
+    def test_run_search_does_not_fall_back_after_cancel(self):
+        token = CancellationToken(timeout=0.2, poll_interval=0.05)
+        with override_settings(USE_GRPC_SEARCH=True, GRPC_HOST="127.0.0.1", GRPC_PORT=str(self.port),
+                               GRPC_TIMEOUT_SECONDS=30):
+            with patch('search_api.services.run_local_search') as local:
+                with self.assertRaises(SearchCancelled):
+                    run_search("A" * 10_000_000, "A", True, token=token)
+        local.assert_not_called()
+
+
+@override_settings(USE_GRPC_SEARCH=False)
+class ExecuteJobCancellationTests(TestCase):
+    """Estados finales y limpieza en execute_job"""
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="long", sequence="A" * 3_000_000)
+
+    def _job(self, **kwargs):
+        return SearchJob.objects.create(sequence=self.sequence, pattern="A", status='PROCESSING', **kwargs)
+
+    def test_timeout_marks_failed_and_cleans_up(self):
+        job = self._job(timeout_seconds=0.05)
+        with self.assertRaises(SearchCancelled):
+            execute_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'FAILED')
+        self.assertIn("Tiempo límite", job.error_message)
+        self.assertEqual(count_results(job), 0)
+
+    @override_settings(SEARCH_JOB_TIMEOUT_SECONDS=0.05)
+    def test_default_timeout_from_settings(self):
+        job = self._job()
+        with self.assertRaises(SearchCancelled):
+            execute_job(job)
+
+    def test_cancelled_in_database_stops_job(self):
+        job = self._job()
+        job.cancel()
+        with self.assertRaises(SearchCancelled):
+            execute_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'CANCELLED')
+        self.assertEqual(count_results(job), 0)
+
+    def test_in_process_cancel_is_immediate(self):
+        job = self._job()
+        threading.Timer(0.1, cancellation.cancel_local, args=(job.pk,)).start()
+        t0 = time.perf_counter()
+        with self.assertRaises(SearchCancelled):
+            execute_job(job)
+        self.assertLess(time.perf_counter() - t0, 1.5)
+        self.assertEqual(count_results(job), 0)
+
+    def test_cancel_after_search_discards_results(self):
+        short = DNASequence.objects.create(name="short", sequence="ATGATG")
+        job = SearchJob.objects.create(sequence=short, pattern="ATG", status='PROCESSING')
+        original = services.run_search
+
+        def search_then_cancel(*args, **kwargs):
+            result = original(*args, **kwargs)
+            SearchJob.objects.filter(pk=job.pk).update(status='CANCELLED')
+            return result
+
+        with patch('search_api.jobs.run_search', side_effect=search_then_cancel):
+            with self.assertRaises(SearchCancelled):
+                execute_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'CANCELLED')
+        self.assertEqual(count_results(job), 0)
+
+
+@override_settings(USE_GRPC_SEARCH=False)
+class CancelEndpointTests(TestCase):
+    """Pruebas de POST /api/search/jobs/{id}/cancel/"""
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="cancel", sequence="ATGC" * 100)
+
+    def test_cancel_pending_job(self):
+        job = SearchJob.objects.create(sequence=self.sequence, pattern="ATG", status='PENDING')
+        response = self.client.post(f'/api/search/jobs/{job.id}/cancel/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['job']['status'], 'CANCELLED')
+        self.assertIsNone(claim_next_job("w"))
+
+    def test_cancel_finished_job_conflicts(self):
+        job = SearchJob.objects.create(sequence=self.sequence, pattern="ATG", status='COMPLETED')
+        response = self.client.post(f'/api/search/jobs/{job.id}/cancel/')
+        self.assertEqual(response.status_code, 409)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'COMPLETED')
+
+    def test_cancel_unknown_job(self):
+        self.assertEqual(self.client.post('/api/search/jobs/999999/cancel/').status_code, 404)
+
+    def test_sync_search_timeout_returns_504(self):
+        big = DNASequence.objects.create(name="big", sequence="A" * 3_000_000)
+        response = self.client.post(
+            '/api/search/',
+            json.dumps({'sequence_id': big.id, 'pattern': 'A', 'timeout_seconds': 0.1}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(response.json()['job']['status'], 'FAILED')
+
+    @override_settings(SEARCH_JOB_MAX_TIMEOUT_SECONDS=60)
+    def test_timeout_above_maximum_rejected(self):
+        response = self.client.post(
+            '/api/search/',
+            json.dumps({'sequence_id': self.sequence.id, 'pattern': 'ATG', 'timeout_seconds': 120}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
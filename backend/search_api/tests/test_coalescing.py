@@ -0,0 +1,210 @@
+"""
+Pruebas de la coalescencia de búsquedas idénticas (search_api/coalescing.py)
+
+Cubre:
+- Clave de coalescencia por secuencia, patrón y opciones
+- Elección del líder a través de inflight_key
+- Búsquedas idénticas concurrentes: un solo recorrido del motor; las seguidoras
+  comparten los resultados del líder
+- Líder fallido: una seguidora toma el relevo
+- Cancelación de una seguidora en espera
+- Contadores en /api/search/queue/
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from sequences_api.models import DNASequence
+from search_api import coalescing
+from search_api.cancellation import SearchCancelled
+from search_api.coalescing import coalesce_key, finish_flight
+from search_api import jobs
+from search_api.jobs import execute_job
+from search_api.models import SearchJob
+from search_api.result_store import count_results, read_results
+
+
+def _wait_if_locked(execute, sql, params, many, context):
+    """
+    La BD de pruebas es SQLite en memoria con caché compartida, que responde
+    "table is locked" en lugar de esperar cuando otro hilo escribe (ver
+    WorkerPoolTests en test_jobs.py): se reintenta como haría un busy timeout.
+    """
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as exc:
+            if 'locked' not in str(exc) or time.monotonic() > deadline:
+                raise
+            time.sleep(0.005)
+
+
+class CoalesceKeyTests(SimpleTestCase):
+    """Pruebas de la clave"""
+
+    def test_same_inputs_same_key(self):
+        self.assertEqual(coalesce_key("abc", "ATG", True), coalesce_key("abc", "ATG", True))
+
+    def test_options_change_key(self):
+        base = coalesce_key("abc", "ATG", True)
+        self.assertNotEqual(base, coalesce_key("abc", "ATG", False))
+        self.assertNotEqual(base, coalesce_key("abc", "ATGC", True))
+        self.assertNotEqual(base, coalesce_key("abd", "ATG", True))
+
+    def test_local_followers_wake_on_finish(self):
+        key = "local-wake"
+        coalescing._flights[key] = threading.Event()
+        threading.Timer(0.05, finish_flight, args=(key,)).start()
+        t0 = time.perf_counter()
+        coalescing._wait(key, 5.0)
+        self.assertLess(time.perf_counter() - t0, 1.0)
+        self.assertNotIn(key, coalescing._flights)
+
+
+@override_settings(USE_GRPC_SEARCH=False, SEARCH_COALESCING=True, SEARCH_CANCEL_POLL_SECONDS=0)
+class CoalescedExecutionTests(TestCase):
+    """Líder y seguidoras en execute_job"""
+
+    def setUp(self):
+        coalescing.stats.reset()
+        self.sequence = DNASequence.objects.create(name="coalesce", sequence="ATGCATGC" * 50)
+        self.key = coalesce_key(self.sequence.file_hash, "ATG", True)
+
+    def _job(self):
+        return SearchJob.objects.create(sequence=self.sequence, pattern="ATG", status='PROCESSING')
+
+    def _leader_in_flight(self):
+        """Un líder con resultados ya guardados que sigue figurando en curso."""
+        leader = self._job()
+        execute_job(leader)
+        SearchJob.objects.filter(pk=leader.pk).update(status='PROCESSING', inflight_key=self.key)
+        return leader
+
+    def test_single_search_leads_and_releases_key(self):
+        job = self._job()
+        execute_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertIsNone(job.inflight_key)
+        self.assertIsNone(job.coalesced_with_id)
+        self.assertEqual(coalescing.stats.snapshot()['leaders'], 1)
+
+    def test_follower_takes_over_when_leader_fails(self):
+        leader = self._leader_in_flight()
+        follower = self._job()
+
+        def leader_fails(key, seconds):
+            SearchJob.objects.filter(pk=leader.pk).update(status='FAILED', inflight_key=None)
+
+        with patch('search_api.coalescing._wait', side_effect=leader_fails):
+            execute_job(follower)
+
+        follower.refresh_from_db()
+        self.assertEqual(follower.status, 'COMPLETED')
+        self.assertIsNone(follower.coalesced_with_id)
+        self.assertEqual(count_results(follower), 100)
+        self.assertEqual(coalescing.stats.snapshot()['leader_failures'], 1)
+
+    def test_waiting_follower_can_be_cancelled(self):
+        self._leader_in_flight()
+        follower = self._job()
+
+        def follower_cancelled(key, seconds):
+            follower.cancel()
+
+        with patch('search_api.coalescing._wait', side_effect=follower_cancelled):
+            with self.assertRaises(SearchCancelled):
+                execute_job(follower)
+        follower.refresh_from_db()
+        self.assertEqual(follower.status, 'CANCELLED')
+        self.assertIsNone(follower.coalesced_with_id)
+
+    @override_settings(SEARCH_COALESCING=False)
+    def test_disabled_runs_every_search(self):
+        self._leader_in_flight()
+        job = self._job()
+        execute_job(job)
+        job.refresh_from_db()
+        self.assertIsNone(job.coalesced_with_id)
+        self.assertEqual(count_results(job), 100)
+
+
+@override_settings(USE_GRPC_SEARCH=False, SEARCH_COALESCING=True, SEARCH_CANCEL_POLL_SECONDS=0,
+                   SEARCH_COALESCE_POLL_SECONDS=0.05, SEARCH_PERSIST_THREADED=False)
+class ConcurrentCoalescingTests(TransactionTestCase):
+    """Jobs idénticos ejecutados a la vez en hilos distintos"""
+
+    def setUp(self):
+        coalescing.stats.reset()
+        self.sequence = DNASequence.objects.create(name="concurrent", sequence="ATGCATGC" * 50)
+        self.engine_runs = 0
+        self.lock = threading.Lock()
+
+    def _slow_engine(self, *args, **kwargs):
+        with self.lock:
+            self.engine_runs += 1
+        time.sleep(0.3)  # las demás llegan mientras el líder busca
+        return self.real_run_search(*args, **kwargs)
+
+    def _run_concurrently(self, count):
+        created = [
+            SearchJob.objects.create(sequence=self.sequence, pattern="ATG", status='PROCESSING')
+            for _ in range(count)
+        ]
+        errors = []
+
+        def run(job):
+            try:
+                with connection.execute_wrapper(_wait_if_locked):
+                    execute_job(job)
+            except Exception as exc:  # pylint: disable=broad-except
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        self.real_run_search = jobs.run_search
+        with patch('search_api.jobs.run_search', side_effect=self._slow_engine):
+            threads = [threading.Thread(target=run, args=(job,)) for job in created]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(10)
+        self.assertEqual(errors, [])
+        return [SearchJob.objects.get(pk=job.pk) for job in created]
+
+    def test_identical_jobs_run_the_engine_once(self):
+        done = self._run_concurrently(4)
+
+        self.assertEqual(self.engine_runs, 1)
+        self.assertTrue(all(job.status == 'COMPLETED' for job in done))
+        self.assertTrue(all(job.inflight_key is None for job in done))
+        leaders = [job for job in done if job.coalesced_with_id is None]
+        self.assertEqual(len(leaders), 1)
+        leader = leaders[0]
+        for job in done:
+            self.assertEqual(job.total_matches, 100)
+            self.assertEqual(count_results(job), 100)
+        follower = next(job for job in done if job.coalesced_with_id == leader.pk)
+        self.assertEqual(read_results(follower, 0, 5), read_results(leader, 0, 5))
+        self.assertEqual(coalescing.stats.snapshot(), {
+            'leaders': 1, 'coalesced_local': 3, 'coalesced_remote': 0,
+            'coalesced_total': 3, 'leader_failures': 0,
+        })
+
+    def test_detail_and_queue_endpoints(self):
+        done = self._run_concurrently(2)
+        leader = next(job for job in done if job.coalesced_with_id is None)
+        follower = next(job for job in done if job.coalesced_with_id is not None)
+
+        data = self.client.get(f'/api/search/jobs/{follower.id}/').json()
+        self.assertEqual(data['job']['coalesced_with'], leader.pk)
+        self.assertEqual(len(data['results']), 100)
+
+        stats = self.client.get('/api/search/queue/').json()['coalescing']
+        self.assertEqual(stats['coalesced_local'] + stats['coalesced_remote'], 1)
+        self.assertEqual(stats['coalesced_in_window'], 1)
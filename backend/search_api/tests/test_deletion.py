@@ -0,0 +1,170 @@
+"""
+Pruebas del borrado por lotes (search_api/deletion.py)
+
+Cubre:
+- Secuencias y jobs borrados por lotes de claves, sin cargar resultados
+- Cancelación de jobs activos y cascada de los jobs coalescidos
+- Invalidación de la caché de secuencias
+- Endpoints DELETE de secuencias (también en segundo plano) y de jobs
+- Confirmación y borrado desde el admin
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from search_api import cancellation
+from search_api.cancellation import REASON_CANCELLED, CancellationToken
+from search_api.deletion import delete_jobs, delete_sequence, wait_for_background
+from search_api.models import SearchJob, SearchResult, SearchResultChunk
+from search_api.result_store import write_positions
+from sequences_api.cache import load_sequence_text, sequence_cache
+from sequences_api.models import DNASequence
+
+
+def _make_jobs(sequence):
+    """Un job con filas, otro compacto con un seguidor y uno en ejecución."""
+    rows = SearchJob.objects.create(sequence=sequence, pattern='ATG', status='COMPLETED', total_matches=25)
+    SearchResult.objects.bulk_create([SearchResult(job=rows, position=i * 8) for i in range(25)])
+    leader = SearchJob.objects.create(sequence=sequence, pattern='CGT', status='COMPLETED', total_matches=30)
+    write_positions(leader, range(0, 300, 10), chunk_size=4)
+    follower = SearchJob.objects.create(sequence=sequence, pattern='CGT', status='COMPLETED', coalesced_with=leader)
+    running = SearchJob.objects.create(sequence=sequence, pattern='TAC', status='PROCESSING')
+    return rows, leader, follower, running
+
+
+class DeleteSequenceTests(TestCase):
+    """delete_sequence y delete_jobs"""
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="big", sequence="ATGCGTAC" * 50)
+        self.other = DNASequence.objects.create(name="kept", sequence="GATTACA" * 10)
+        self.kept_job = SearchJob.objects.create(sequence=self.other, pattern='GAT', status='COMPLETED')
+        SearchResult.objects.create(job=self.kept_job, position=0)
+
+    def test_deletes_everything_in_chunks(self):
+        rows, leader, follower, running = _make_jobs(self.sequence)
+        token = CancellationToken()
+        cancellation.register(running.pk, token)
+        self.addCleanup(cancellation.unregister, running.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            counts = delete_sequence(self.sequence.pk, chunk_size=7)
+
+        self.assertEqual(counts, {'sequences': 1, 'jobs': 4, 'results': 25, 'result_chunks': 8})
+        self.assertFalse(DNASequence.objects.filter(pk=self.sequence.pk).exists())
+        self.assertFalse(SearchJob.objects.filter(sequence_id=self.sequence.pk).exists())
+        self.assertEqual(SearchResult.objects.count(), 1)
+        self.assertEqual(SearchResultChunk.objects.count(), 0)
+        self.assertEqual(token.reason, REASON_CANCELLED)
+
+        sql = [q['sql'] for q in queries.captured_queries]
+        # 25 filas en lotes de 7 (más el DELETE por job_id, ya vacío, del
+        # collector al borrar los jobs); nunca se leen las filas completas
+        self.assertEqual(sum(s.startswith('DELETE FROM "search_results" WHERE "search_results"."id"') for s in sql), 4)
+        self.assertFalse(any('"context_before"' in s or '"data"' in s for s in sql))
+        self.assertFalse(any('"dna_sequences"."sequence"' in s for s in sql))
+
+    def test_invalidates_cache(self):
+        load_sequence_text(self.sequence)
+        self.assertTrue(sequence_cache.contains(self.sequence.pk, self.sequence.file_hash))
+        delete_sequence(self.sequence.pk)
+        self.assertFalse(sequence_cache.contains(self.sequence.pk, self.sequence.file_hash))
+
+    def test_missing_sequence(self):
+        self.assertEqual(delete_sequence(999999)['sequences'], 0)
+
+    def test_delete_jobs_cascades_followers(self):
+        rows, leader, follower, running = _make_jobs(self.sequence)
+        counts = delete_jobs([leader.pk], chunk_size=3)
+        self.assertEqual(counts, {'sequences': 0, 'jobs': 2, 'results': 0, 'result_chunks': 8})
+        self.assertEqual(set(SearchJob.objects.filter(sequence=self.sequence).values_list('pk', flat=True)),
+                         {rows.pk, running.pk})
+        running.refresh_from_db()
+        self.assertEqual(running.status, 'PROCESSING')
+
+    def test_delete_running_job(self):
+        running = _make_jobs(self.sequence)[3]
+        token = CancellationToken()
+        cancellation.register(running.pk, token)
+        self.addCleanup(cancellation.unregister, running.pk)
+        delete_jobs([running.pk])
+        self.assertEqual(token.reason, REASON_CANCELLED)
+        self.assertFalse(SearchJob.objects.filter(pk=running.pk).exists())
+
+
+class DeleteEndpointTests(TestCase):
+    """DELETE /api/sequences/{id}/ y /api/search/jobs/{id}/"""
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="api", sequence="ATGCGTAC" * 50)
+        self.jobs = _make_jobs(self.sequence)
+
+    def test_delete_sequence(self):
+        response = self.client.delete(f'/api/sequences/{self.sequence.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['deleted'], {'sequences': 1, 'jobs': 4, 'results': 25, 'result_chunks': 8})
+        self.assertEqual(self.client.delete(f'/api/sequences/{self.sequence.pk}/').status_code, 404)
+
+    def test_delete_job(self):
+        rows = self.jobs[0]
+        response = self.client.delete(f'/api/search/jobs/{rows.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['deleted']['results'], 25)
+        self.assertEqual(self.client.get(f'/api/search/jobs/{rows.pk}/').status_code, 404)
+        self.assertTrue(DNASequence.objects.filter(pk=self.sequence.pk).exists())
+
+
+class AdminDeleteTests(TestCase):
+    """Confirmación con recuentos y borrado por lotes desde el admin"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(user)
+        self.sequence = DNASequence.objects.create(name="admin", sequence="ATGCGTAC" * 50)
+        self.jobs = _make_jobs(self.sequence)
+
+    def test_sequence_confirmation_and_delete(self):
+        url = f'/admin/sequences_api/dnasequence/{self.sequence.pk}/delete/'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, 'Search Results: 25')
+        self.assertContains(response, 'Search Jobs: 4')
+        self.assertFalse(any('"context_before"' in q['sql'] for q in queries.captured_queries))
+
+        response = self.client.post(url, {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(DNASequence.objects.filter(pk=self.sequence.pk).exists())
+        self.assertEqual(SearchResult.objects.count(), 0)
+
+    def test_delete_selected_jobs(self):
+        leader = self.jobs[1]
+        response = self.client.post('/admin/search_api/searchjob/', {
+            'action': 'delete_selected', '_selected_action': [leader.pk], 'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(SearchJob.objects.filter(sequence=self.sequence).count(), 2)
+        self.assertEqual(SearchResultChunk.objects.count(), 0)
+
+
+@override_settings(SEARCH_DELETE_BACKGROUND=True)
+class BackgroundDeleteTests(TransactionTestCase):
+    """Borrado en un hilo tras responder 202"""
+
+    def test_background_delete(self):
+        sequence = DNASequence.objects.create(name="bg", sequence="ATGCGTAC" * 50)
+        _make_jobs(sequence)
+        response = self.client.delete(f'/api/sequences/{sequence.pk}/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], 'deleting')
+        self.assertTrue(wait_for_background(timeout=10))
+        self.assertFalse(DNASequence.objects.filter(pk=sequence.pk).exists())
+        self.assertEqual(SearchResult.objects.count(), 0)
+        self.assertEqual(SearchJob.objects.count(), 0)
+
+    def test_query_parameter_overrides_setting(self):
+        sequence = DNASequence.objects.create(name="fg", sequence="ATGC" * 10)
+        response = self.client.delete(f'/api/sequences/{sequence.pk}/?background=false')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['deleted']['sequences'], 1)
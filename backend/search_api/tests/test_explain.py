@@ -0,0 +1,160 @@
+"""
+Pruebas del plan de búsqueda (search_api/explain.py)
+
+Cubre:
+- POST /api/search/explain/ devuelve ruta, motor y estimaciones sin crear jobs
+- Acierto en la caché de secuencias y job idéntico en curso
+- Ruta gRPC forzada y elegida por coste
+- Plan guardado en el job y comparación con lo medido al terminar
+- El plan guardado no busca el líder: lo anota la ejecución coalescida
+"""
+
+import json
+import time
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from sequences_api.cache import sequence_cache
+from sequences_api.models import DNASequence
+from search_api.coalescing import coalesce_key
+from search_api import jobs
+from search_api.explain import compare_with_actual, explain_search
+from search_api.models import SearchJob
+from search_api.routing import ROUTE_GRPC, ROUTE_LOCAL, reset_router
+
+
+@override_settings(USE_GRPC_SEARCH=False, SEARCH_COALESCING=False, SEARCH_AFFINITY_WORKERS=0,
+                   SEARCH_EXECUTION_MODE='sync', SEARCH_CANCEL_POLL_SECONDS=0)
+class ExplainEndpointTests(TestCase):
+    """Plan sin ejecutar la búsqueda"""
+
+    def setUp(self):
+        reset_router()
+        sequence_cache.clear()
+        self.addCleanup(sequence_cache.clear)
+        self.sequence = DNASequence.objects.create(name="explain", sequence="ATGCGTAC" * 500)
+
+    def _explain(self, **body):
+        body.setdefault('sequence_id', self.sequence.pk)
+        return self.client.post('/api/search/explain/', json.dumps(body), content_type='application/json')
+
+    def test_plan_without_executing(self):
+        response = self._explain(pattern='atg')
+        self.assertEqual(response.status_code, 200)
+        plan = response.json()
+        self.assertEqual(plan['pattern'], 'ATG')
+        self.assertEqual(plan['route'], ROUTE_LOCAL)
+        self.assertEqual(plan['route_reason'], 'local-only')
+        self.assertEqual(plan['engine'], 'naive-local')
+        self.assertEqual(list(plan['route_estimates_ms']), [ROUTE_LOCAL])
+        self.assertEqual(plan['estimated_matches'], round(3998 / 64))
+        self.assertGreater(plan['estimated_time_ms'], 0)
+        self.assertEqual(plan['estimated_memory_bytes'], sum(plan['memory_breakdown'].values()))
+        self.assertFalse(SearchJob.objects.exists())
+
+    def test_invalid_request(self):
+        self.assertEqual(self._explain(pattern='XYZ').status_code, 400)
+        self.assertEqual(self._explain(sequence_id=999999, pattern='ATG').status_code, 400)
+
+    def test_sequence_cache_hit(self):
+        with self.settings(SEQUENCE_CACHE_MAX_BYTES=10 * 1024 * 1024):
+            before = self._explain(pattern='ATG').json()
+            self.assertFalse(before['sequence_cache']['hit'])
+            self.assertGreater(before['memory_breakdown']['sequence_text'], 4000)
+
+            self.client.post('/api/search/', json.dumps({'sequence_id': self.sequence.pk, 'pattern': 'ATG'}),
+                             content_type='application/json')
+            after = self._explain(pattern='ATG').json()
+        self.assertTrue(after['sequence_cache']['hit'])
+        self.assertEqual(after['memory_breakdown']['sequence_text'], 0)
+
+    def test_coalescing_leader(self):
+        leader = SearchJob.objects.create(sequence=self.sequence, pattern='ATG', status='PROCESSING',
+                                          inflight_key=coalesce_key(self.sequence.file_hash, 'ATG', True))
+        with self.settings(SEARCH_COALESCING=True):
+            plan = self._explain(pattern='ATG').json()
+        self.assertEqual(plan['coalescing'], {'enabled': True, 'leader_job': leader.pk})
+        self.assertIsNone(self._explain(pattern='ATG').json()['coalescing']['leader_job'])
+
+    def test_grpc_routes(self):
+        with self.settings(USE_GRPC_SEARCH=True, SEARCH_COST_ROUTING=False):
+            plan = explain_search(self.sequence, 'ATG')
+        self.assertEqual((plan['route'], plan['route_reason'], plan['engine']), (ROUTE_GRPC, 'grpc-enabled', 'grpc'))
+        self.assertEqual(plan['fallback_route'], 'local-fallback')
+        self.assertEqual(plan['memory_breakdown']['grpc_request'], self.sequence.length)
+
+        with self.settings(USE_GRPC_SEARCH=True, SEARCH_COST_ROUTING=True):
+            plan = explain_search(self.sequence, 'ATG')
+        # Secuencia pequeña: el transporte hace más barato el motor local
+        self.assertEqual((plan['route'], plan['route_reason']), (ROUTE_LOCAL, 'cheapest'))
+        self.assertEqual(plan['estimated_time_ms'], round(min(plan['route_estimates_ms'].values()), 3))
+
+
+@override_settings(USE_GRPC_SEARCH=False, SEARCH_COALESCING=False, SEARCH_AFFINITY_WORKERS=0,
+                   SEARCH_CANCEL_POLL_SECONDS=0)
+class PredictedVsActualTests(TestCase):
+    """Plan guardado en el job frente a la ejecución"""
+
+    def setUp(self):
+        reset_router()
+        sequence_cache.clear()
+        self.addCleanup(sequence_cache.clear)
+        self.sequence = DNASequence.objects.create(name="actual", sequence="ATGCGTAC" * 500)
+
+    def _search(self, mode):
+        response = self.client.post(
+            '/api/search/',
+            json.dumps({'sequence_id': self.sequence.pk, 'pattern': 'ATG', 'mode': mode}),
+            content_type='application/json',
+        )
+        return SearchJob.objects.get(pk=response.json()['job']['id'])
+
+    def test_completed_job(self):
+        job = self._search('sync')
+        self.assertEqual(job.plan['route'], ROUTE_LOCAL)
+
+        response = self.client.get(f'/api/search/jobs/{job.pk}/explain/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'COMPLETED')
+        self.assertEqual(data['actual']['matches'], 500)
+        self.assertEqual(data['comparison']['route'], {'predicted': ROUTE_LOCAL, 'actual': ROUTE_LOCAL, 'match': True})
+        matches = data['comparison']['matches']
+        self.assertEqual(matches['predicted'], job.plan['estimated_matches'])
+        self.assertAlmostEqual(matches['ratio'], 500 / matches['predicted'], places=3)
+        self.assertIsNotNone(data['comparison']['time_ms']['actual'])
+        # Con la caché vacía el texto se leyó de la BD, como preveía el plan
+        self.assertEqual(data['comparison']['sequence_cache_hit'], {'predicted': False, 'actual': False, 'match': True})
+
+    def test_pending_job(self):
+        job = self._search('async')
+        self.assertEqual(job.plan['priority'], job.get_priority_display())
+
+        data = compare_with_actual(job)
+        self.assertEqual(data['status'], 'PENDING')
+        self.assertEqual(data['plan']['route'], ROUTE_LOCAL)
+        self.assertIsNone(data['actual'])
+        self.assertIsNone(data['comparison'])
+
+    def test_stored_plan_skips_leader_lookup(self):
+        with self.settings(SEARCH_COALESCING=True), CaptureQueriesContext(connection) as queries:
+            job = self._search('sync')
+        self.assertEqual(job.plan['coalescing'], {'enabled': True, 'leader_job': None})
+        # Ninguna consulta busca un líder por inflight_key: esta búsqueda fue el líder
+        self.assertFalse([q['sql'] for q in queries.captured_queries
+                          if q['sql'].startswith('SELECT') and '"inflight_key" =' in q['sql']])
+
+    def test_coalesced_job_records_leader(self):
+        leader = SearchJob.objects.create(sequence=self.sequence, pattern='ATG', status='COMPLETED', total_matches=500)
+        with self.settings(SEARCH_COALESCING=True):
+            plan = explain_search(self.sequence, 'ATG', lookup_leader=False)
+        follower = SearchJob.objects.create(sequence=self.sequence, pattern='ATG', status='PROCESSING', plan=plan)
+        jobs._complete_coalesced(follower, leader, time.perf_counter())
+        follower.refresh_from_db()
+        self.assertEqual(follower.plan['coalescing'], {'enabled': True, 'leader_job': leader.pk})
+        self.assertEqual(follower.plan['route'], plan['route'])
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get('/api/search/jobs/999999/explain/').status_code, 404)
@@ -0,0 +1,91 @@
+"""
+Pruebas para search_api/grpc_server.py (servidor de referencia en Python)
+
+Cubre:
+- Semántica de Search igual a la del servidor C++
+- Flujo completo /api/search/ sobre transporte gRPC real
+- Comando run_search_server
+"""
+
+import io
+import json
+from unittest.mock import patch
+
+import grpc
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from sequences_api.models import DNASequence
+from search_api.grpc_client import GrpcSearchClient
+from search_api.grpc_server import ALGORITHM_NAME, create_server
+from search_api.models import SearchJob
+from search_api.services import run_grpc_search
+
+
+class ReferenceServerTests(TestCase):
+    """Pruebas del servicer contra un servidor real en proceso"""
+
+    def setUp(self):
+        self.server, self.port, self.servicer = create_server("127.0.0.1", 0, max_workers=4)
+        self.grpc_client = GrpcSearchClient("127.0.0.1", self.port, timeout=5.0)
+
+    def tearDown(self):
+        self.server.stop(None)
+
+    def test_search_matches_local_engine(self):
+        resp = self.grpc_client.search("0123456789ATGAATG", "ATG", allow_overlapping=True)
+        self.assertEqual(resp.total_matches, 2)
+        self.assertEqual(resp.algorithm_used, ALGORITHM_NAME)
+        self.assertEqual(resp.matches[0].position, 10)
+        self.assertEqual(resp.matches[0].context_before, "0123456789")
+        self.assertEqual(resp.matches[0].context_after, "AATG")
+
+    def test_non_overlapping(self):
+        resp = self.grpc_client.search("AAAA", "AA", allow_overlapping=False)
+        self.assertEqual([m.position for m in resp.matches], [0, 2])
+
+    def test_empty_pattern_is_invalid_argument(self):
+        with self.assertRaises(grpc.RpcError) as ctx:
+            self.grpc_client.search("ATCG", "")
+        self.assertEqual(ctx.exception.code(), grpc.StatusCode.INVALID_ARGUMENT)
+
+    def test_counts_calls(self):
+        self.grpc_client.search("ATCG", "AT")
+        self.grpc_client.search("ATCG", "CG")
+        self.assertEqual(self.servicer.search_calls, 2)
+
+    def test_run_grpc_search_over_real_transport(self):
+        with override_settings(GRPC_HOST="127.0.0.1", GRPC_PORT=str(self.port)):
+            result = run_grpc_search("ATGATG", "atg")
+        self.assertEqual(result['total_matches'], 2)
+        self.assertEqual(result['algorithm_used'], ALGORITHM_NAME)
+
+    def test_search_endpoint_over_real_transport(self):
+        sequence = DNASequence.objects.create(name="e2e", sequence="ATGCATGCATG")
+        with override_settings(USE_GRPC_SEARCH=True, GRPC_HOST="127.0.0.1", GRPC_PORT=str(self.port)):
+            response = self.client.post(
+                '/api/search/',
+                json.dumps({'sequence_id': sequence.id, 'pattern': 'ATG'}),
+                content_type='application/json',
+            )
+
+        self.assertEqual(response.status_code, 200)
+        job = SearchJob.objects.get(pk=response.json()['job']['id'])
+        self.assertEqual(job.algorithm_used, ALGORITHM_NAME)
+        self.assertEqual(job.route, 'grpc')
+        self.assertEqual(job.total_matches, 3)
+
+
+class RunSearchServerCommandTests(TestCase):
+    """Pruebas del comando de gestión"""
+
+    @patch('search_api.management.commands.run_search_server.serve')
+    def test_passes_options(self, mock_serve):
+        call_command('run_search_server', '--port', '6123', '--workers', '3', stdout=io.StringIO())
+        mock_serve.assert_called_once_with('0.0.0.0', 6123, 3)
+
+    @override_settings(GRPC_PORT="6200", GRPC_SERVER_WORKERS=7)
+    @patch('search_api.management.commands.run_search_server.serve')
+    def test_defaults_from_settings(self, mock_serve):
+        call_command('run_search_server', stdout=io.StringIO())
+        mock_serve.assert_called_once_with('0.0.0.0', 6200, 7)
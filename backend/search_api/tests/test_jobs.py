@@ -0,0 +1,180 @@
+"""
+Pruebas de la ejecución asíncrona de jobs (search_api/jobs.py y worker.py)
+
+Cubre:
+- Modo async del endpoint de búsqueda (202 + Location)
+- Reclamación atómica de jobs PENDING (UPDATE condicional y SKIP LOCKED)
+- Pool de workers y comando search_worker
+- Reencolado de jobs abandonados
+"""
+
+import io
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from sequences_api.models import DNASequence
+from search_api.jobs import (
+    _claim_conditional_update,
+    _claim_skip_locked,
+    claim_next_job,
+    execute_job,
+    requeue_stale_jobs,
+)
+from search_api.models import SearchJob
+from search_api.result_store import count_results, write_positions
+from search_api.worker import SearchWorker
+
+
+@override_settings(USE_GRPC_SEARCH=False)
+class AsyncSearchEndpointTests(TestCase):
+    """Pruebas del modo asíncrono de POST /api/search/"""
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="async", sequence="ATGCATGC" * 100)
+
+    def _post(self, payload):
+        return self.client.post('/api/search/', json.dumps(payload), content_type='application/json')
+
+    def test_async_returns_202_and_pending_job(self):
+        response = self._post({'sequence_id': self.sequence.id, 'pattern': 'ATG', 'mode': 'async'})
+
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        job = SearchJob.objects.get(pk=data['job']['id'])
+        self.assertEqual(job.status, 'PENDING')
+        self.assertEqual(response['Location'], f'/api/search/jobs/{job.id}/')
+        self.assertEqual(data['status_url'], response['Location'])
+        self.assertEqual(count_results(job), 0)
+
+    @override_settings(SEARCH_EXECUTION_MODE="async")
+    def test_setting_makes_async_the_default(self):
+        response = self._post({'sequence_id': self.sequence.id, 'pattern': 'ATG'})
+        self.assertEqual(response.status_code, 202)
+
+    @override_settings(SEARCH_EXECUTION_MODE="async")
+    def test_request_can_force_sync(self):
+        response = self._post({'sequence_id': self.sequence.id, 'pattern': 'ATG', 'mode': 'sync'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['job']['status'], 'COMPLETED')
+
+    def test_invalid_mode(self):
+        response = self._post({'sequence_id': self.sequence.id, 'pattern': 'ATG', 'mode': 'later'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_poll_until_completed(self):
+        response = self._post({'sequence_id': self.sequence.id, 'pattern': 'ATG', 'mode': 'async'})
+        url = response['Location']
+        self.assertEqual(self.client.get(url).json()['job']['status'], 'PENDING')
+
+        SearchWorker(concurrency=1).run_one()
+
+        data = self.client.get(url).json()
+        self.assertEqual(data['job']['status'], 'COMPLETED')
+        self.assertEqual(data['job']['total_matches'], 200)
+        self.assertEqual(len(data['results']), 100)
+        self.assertIsNotNone(data['job']['started_at'])
+
+
+@override_settings(USE_GRPC_SEARCH=False)
+class ClaimTests(TestCase):
+    """Pruebas de reclamación y ejecución de jobs"""
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="queue", sequence="ATGATG")
+        now = timezone.now()
+        self.jobs = [
+            SearchJob.objects.create(sequence=self.sequence, pattern="ATG", status='PENDING',
+                                     client_id=f"client-{i}", created_at=now + timedelta(seconds=i))
+            for i in range(3)
+        ]
+
+    def test_claims_oldest_first(self):
+        for claim in (_claim_conditional_update, _claim_skip_locked):
+            SearchJob.objects.update(status='PENDING', worker_id=None)
+            job = claim(f"w-{claim.__name__}")
+            self.assertEqual(job.pk, self.jobs[0].pk)
+            self.assertEqual(job.status, 'PROCESSING')
+            self.assertEqual(job.worker_id, f"w-{claim.__name__}")
+            self.assertIsNotNone(job.started_at)
+
+    def test_each_job_claimed_once(self):
+        claimed = [claim_next_job(f"w{i}") for i in range(4)]
+        self.assertEqual([j.pk for j in claimed[:3]], [j.pk for j in self.jobs])
+        self.assertIsNone(claimed[3])
+
+    def test_skips_jobs_claimed_by_others(self):
+        SearchJob.objects.filter(pk=self.jobs[0].pk).update(status='PROCESSING')
+        self.assertEqual(claim_next_job("w").pk, self.jobs[1].pk)
+
+    def test_execute_marks_failed_and_reraises(self):
+        job = claim_next_job("w")
+        with patch('search_api.jobs.run_search', side_effect=RuntimeError("motor caído")):
+            with self.assertRaises(RuntimeError):
+                execute_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'FAILED')
+        self.assertEqual(job.error_message, "motor caído")
+
+    def test_worker_counts_failures(self):
+        worker = SearchWorker(concurrency=1)
+        with patch('search_api.jobs.run_search', side_effect=RuntimeError("boom")):
+            self.assertTrue(worker.run_one())
+        self.assertEqual((worker.processed, worker.failed), (1, 1))
+
+    def test_requeue_stale_jobs(self):
+        job = claim_next_job("dead-worker")
+        write_positions(job, [0, 3])
+        SearchJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(requeue_stale_jobs(stale_after_seconds=60), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'PENDING')
+        self.assertIsNone(job.worker_id)
+        self.assertEqual(count_results(job), 0)
+
+    def test_requeue_ignores_recent_and_sync_jobs(self):
+        claim_next_job("alive")
+        SearchJob.objects.create(sequence=self.sequence, pattern="TG", status='PROCESSING',
+                                 started_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(requeue_stale_jobs(stale_after_seconds=60), 0)
+
+
+@override_settings(USE_GRPC_SEARCH=False)
+class WorkerPoolTests(TransactionTestCase):
+    """
+    El pool vacía la cola sin ejecutar ningún job dos veces.
+
+    La BD de pruebas es SQLite en memoria con caché compartida, que responde
+    "table is locked" en lugar de esperar cuando dos hilos escriben a la vez,
+    así que aquí se usa un hilo; la exclusión entre workers la cubre ClaimTests.
+    """
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="pool", sequence="ATGC" * 2000)
+        for _ in range(12):
+            SearchJob.objects.create(sequence=self.sequence, pattern="ATG", status='PENDING')
+
+    def test_pool_drains_queue(self):
+        worker = SearchWorker(concurrency=1, worker_id="pool")
+        with patch('search_api.worker.execute_job', wraps=execute_job) as spy:
+            worker.run(once=True)
+
+        self.assertEqual(worker.processed, 12)
+        self.assertEqual(worker.failed, 0)
+        executed = [call.args[0].pk for call in spy.call_args_list]
+        self.assertEqual(len(executed), len(set(executed)))
+        self.assertEqual(SearchJob.objects.filter(status='COMPLETED').count(), 12)
+        for job in SearchJob.objects.all():
+            self.assertEqual(count_results(job), 2000)
+            self.assertTrue(job.worker_id.startswith("pool/"))
+
+    def test_management_command_once(self):
+        out = io.StringIO()
+        call_command('search_worker', '--once', '--concurrency', '1', stdout=out)
+        self.assertIn("Jobs procesados: 12", out.getvalue())
+        self.assertFalse(SearchJob.objects.filter(status='PENDING').exists())
@@ -0,0 +1,168 @@
+"""
+Pruebas del balanceo de carga en cliente (search_api/grpc_client.py)
+
+Cubre:
+- Políticas round_robin, least_outstanding y sequence_hash
+- Expulsión de réplicas caídas y reintento en otra (no por plazo agotado)
+- get_grpc_client con GRPC_BACKENDS
+- Varias réplicas locales reales (servidor Python de referencia)
+"""
+
+import grpc
+from django.test import SimpleTestCase, override_settings
+
+from search_api.grpc_client import (
+    Backend,
+    LeastOutstandingPolicy,
+    LoadBalancedSearchClient,
+    RoundRobinPolicy,
+    SequenceHashPolicy,
+    get_grpc_client,
+)
+from search_api.grpc_server import create_server
+
+
+class _FakeClient:
+    def __init__(self, address):
+        self.address = address
+
+
+def _fake_backends(n):
+    return [Backend(_FakeClient(f"10.0.0.{i}:50051")) for i in range(n)]
+
+
+class PolicyTests(SimpleTestCase):
+    """Pruebas unitarias de las políticas de selección"""
+
+    def test_round_robin_cycles(self):
+        backends = _fake_backends(3)
+        policy = RoundRobinPolicy()
+        chosen = [policy.choose(backends).address for _ in range(6)]
+        self.assertEqual(chosen[:3], [b.address for b in backends])
+        self.assertEqual(chosen[3:], chosen[:3])
+
+    def test_least_outstanding_picks_idle(self):
+        backends = _fake_backends(3)
+        backends[0].outstanding = 4
+        backends[1].outstanding = 0
+        backends[2].outstanding = 2
+        policy = LeastOutstandingPolicy()
+        for _ in range(3):
+            self.assertIs(policy.choose(backends), backends[1])
+
+    def test_sequence_hash_is_sticky(self):
+        backends = _fake_backends(4)
+        policy = SequenceHashPolicy()
+        first = policy.choose(backends, key="genoma-1")
+        for _ in range(5):
+            self.assertIs(policy.choose(backends, key="genoma-1"), first)
+
+    def test_sequence_hash_only_moves_keys_of_removed_backend(self):
+        backends = _fake_backends(4)
+        policy = SequenceHashPolicy()
+        keys = [f"seq-{i}" for i in range(200)]
+        before = {k: policy.choose(backends, key=k).address for k in keys}
+        removed = backends[0].address
+        after = {k: policy.choose(backends[1:], key=k).address for k in keys}
+        for k in keys:
+            if before[k] != removed:
+                self.assertEqual(before[k], after[k])
+
+    def test_sequence_hash_spreads_keys(self):
+        backends = _fake_backends(3)
+        policy = SequenceHashPolicy()
+        used = {policy.choose(backends, key=f"seq-{i}").address for i in range(100)}
+        self.assertEqual(len(used), 3)
+
+
+class LoadBalancedClientTests(SimpleTestCase):
+    """Pruebas con varias réplicas gRPC locales"""
+
+    def setUp(self):
+        self.servers = []
+        self.servicers = []
+        self.addresses = []
+        for _ in range(3):
+            server, port, servicer = create_server("127.0.0.1", 0, max_workers=2)
+            self.servers.append(server)
+            self.servicers.append(servicer)
+            self.addresses.append(f"127.0.0.1:{port}")
+
+    def _calls(self):
+        return [s.search_calls for s in self.servicers]
+
+    def tearDown(self):
+        for server in self.servers:
+            server.stop(None)
+
+    def test_round_robin_spreads_requests(self):
+        client = LoadBalancedSearchClient(self.addresses, timeout=2.0)
+        for _ in range(6):
+            client.search("ATGATG", "ATG")
+        self.assertEqual(self._calls(), [2, 2, 2])
+
+    def test_results_are_correct(self):
+        client = LoadBalancedSearchClient(self.addresses, timeout=2.0)
+        resp = client.search("ATGATGATG", "ATG", allow_overlapping=True)
+        self.assertEqual(resp.total_matches, 3)
+        self.assertEqual([m.position for m in resp.matches], [0, 3, 6])
+
+    def test_sequence_hash_keeps_sequence_on_one_replica(self):
+        client = LoadBalancedSearchClient(self.addresses, timeout=2.0, policy="sequence_hash")
+        sequence = "ATCG" * 1000
+        for _ in range(5):
+            client.search(sequence, "TCG")
+        self.assertEqual(sorted(self._calls()), [0, 0, 5])
+
+    def test_unhealthy_replica_is_ejected(self):
+        self.servers[0].stop(None)
+        client = LoadBalancedSearchClient(self.addresses, timeout=2.0, eject_seconds=60)
+
+        for _ in range(6):
+            self.assertEqual(client.search("ATGATG", "ATG").total_matches, 2)
+
+        self.assertEqual(self._calls(), [0, 3, 3])
+        healthy = [b.address for b in client.healthy_backends()]
+        self.assertNotIn(self.addresses[0], healthy)
+        self.assertEqual(len(healthy), 2)
+
+    def test_deadline_exceeded_does_not_eject(self):
+        client = LoadBalancedSearchClient(self.addresses, timeout=0.2)
+        with self.assertRaises(grpc.RpcError) as ctx:
+            client.search("A" * 3_000_000, "A")
+        self.assertEqual(ctx.exception.code(), grpc.StatusCode.DEADLINE_EXCEEDED)
+        # Sin reintentos en otras réplicas y todas siguen sanas
+        self.assertEqual(sum(self._calls()), 1)
+        self.assertEqual(len(client.healthy_backends()), 3)
+
+    def test_ejected_replica_returns_after_timeout(self):
+        client = LoadBalancedSearchClient(self.addresses, timeout=2.0, eject_seconds=0)
+        client.backends[1].consecutive_failures = 1
+        client.backends[1].ejected_until = 1.0  # ya vencido
+        self.assertEqual(len(client.healthy_backends()), 3)
+
+    def test_all_replicas_down_raises(self):
+        for server in self.servers:
+            server.stop(None)
+        client = LoadBalancedSearchClient(self.addresses, timeout=1.0)
+        with self.assertRaises(grpc.RpcError):
+            client.search("ATGATG", "ATG")
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            LoadBalancedSearchClient(self.addresses, policy="random")
+
+
+class GetBalancedClientTests(SimpleTestCase):
+    """Pruebas de get_grpc_client con varias réplicas configuradas"""
+
+    @override_settings(GRPC_BACKENDS=["127.0.0.1:6001", "127.0.0.1:6002"], GRPC_LB_POLICY="least_outstanding")
+    def test_returns_balanced_client(self):
+        client = get_grpc_client()
+        self.assertIsInstance(client, LoadBalancedSearchClient)
+        self.assertEqual(client.policy.name, "least_outstanding")
+        self.assertEqual([b.address for b in client.backends], ["127.0.0.1:6001", "127.0.0.1:6002"])
+
+    @override_settings(GRPC_BACKENDS=["127.0.0.1:6003"])
+    def test_balanced_client_is_reused(self):
+        self.assertIs(get_grpc_client(), get_grpc_client())
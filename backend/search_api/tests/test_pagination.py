@@ -0,0 +1,166 @@
+"""
+Pruebas de la paginación keyset de resultados (search_api/pagination.py)
+
+Cubre:
+- Cursores opacos siguiente/anterior
+- Filtros position_gte / position_lt
+- Formato compacto y filas SearchResult
+- Contexto de coincidencias dispersas con tramos acotados
+- Endpoint GET /api/search/jobs/{id}/
+"""
+
+import re
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+
+from sequences_api.models import DNASequence
+from search_api.models import SearchJob, SearchResult
+from search_api.pagination import decode_cursor, encode_cursor, paginate_results
+from search_api.result_store import seek_positions, seek_results, write_positions
+
+
+class CursorTests(SimpleTestCase):
+    """Pruebas de codificación de cursores"""
+
+    def test_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(12345, "n")), (12345, "n"))
+
+    def test_cursor_is_opaque(self):
+        self.assertNotIn("12345", encode_cursor(12345, "p"))
+
+    def test_rejects_garbage(self):
+        for bad in ("%%%", "bm9wZQ", encode_cursor(1, "x")):
+            with self.assertRaises(ValidationError):
+                decode_cursor(bad)
+
+
+class KeysetPaginationTests(TestCase):
+    """Recorrido completo hacia delante y hacia atrás"""
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="pages", sequence="ACGT" * 2500)
+        self.job = SearchJob.objects.create(sequence=self.sequence, pattern="CG", status='COMPLETED')
+        self.positions = list(range(1, 10_000, 4))  # 2500 coincidencias
+        write_positions(self.job, self.positions, chunk_size=300)
+
+    def _walk_forward(self, params):
+        seen, pages = [], 0
+        page = paginate_results(self.job, params)
+        while True:
+            pages += 1
+            seen.extend(r['position'] for r in page['results'])
+            if not page['next_cursor']:
+                return seen, pages, page
+            page = paginate_results(self.job, {**params, 'cursor': page['next_cursor']})
+
+    def test_forward_walk_covers_everything(self):
+        seen, pages, _ = self._walk_forward({'limit': '250'})
+        self.assertEqual(seen, self.positions)
+        self.assertEqual(pages, 10)
+
+    def test_first_page_has_no_prev(self):
+        page = paginate_results(self.job, {'limit': '10'})
+        self.assertIsNone(page['prev_cursor'])
+        self.assertEqual([r['position'] for r in page['results']], self.positions[:10])
+
+    def test_prev_cursor_returns_previous_page(self):
+        first = paginate_results(self.job, {'limit': '7'})
+        second = paginate_results(self.job, {'limit': '7', 'cursor': first['next_cursor']})
+        back = paginate_results(self.job, {'limit': '7', 'cursor': second['prev_cursor']})
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['prev_cursor'])
+        self.assertEqual(back['next_cursor'], first['next_cursor'])
+
+    def test_backward_walk_across_chunks(self):
+        params = {'limit': '400', 'position_gte': '2000'}
+        *_, last = self._walk_forward(params)
+        collected = [r['position'] for r in last['results']]
+        page = last
+        while page['prev_cursor']:
+            page = paginate_results(self.job, {**params, 'cursor': page['prev_cursor']})
+            collected = [r['position'] for r in page['results']] + collected
+        self.assertEqual(collected, [p for p in self.positions if p >= 2000])
+
+    def test_range_filters(self):
+        seen, _, _ = self._walk_forward({'limit': '50', 'position_gte': '1001', 'position_lt': '2001'})
+        self.assertEqual(seen, [p for p in self.positions if 1001 <= p < 2001])
+
+    def test_results_have_context(self):
+        page = paginate_results(self.job, {'limit': '1', 'position_gte': '5000'})
+        pos = page['results'][0]['position']
+        seq = self.sequence.sequence
+        self.assertEqual(page['results'][0]['context_before'], seq[pos - 10:pos])
+        self.assertEqual(page['results'][0]['context_after'], seq[pos + 2:pos + 12])
+
+    def test_sparse_page_reads_bounded_windows(self):
+        text = "A" * 300_000
+        sequence = DNASequence.objects.create(name="sparse", sequence=text)
+        job = SearchJob.objects.create(sequence=sequence, pattern="AAA", status='COMPLETED')
+        positions = list(range(1000, 300_000, 30_000))
+        write_positions(job, positions, chunk_size=3)
+        job = SearchJob.objects.get(pk=job.pk)  # sin el texto en memoria
+
+        with CaptureQueriesContext(connection) as queries:
+            page = seek_results(job, lower=1000, limit=100)
+
+        self.assertEqual([r['position'] for r in page], positions)
+        self.assertEqual(page[-1]['context_after'], "A" * 10)
+        # Un Substr de patrón + 20 por coincidencia, no el tramo de la primera a la última
+        lengths = [int(n) for n in re.findall(r'SUBSTR\([^,]+, \d+, (\d+)\)', queries.captured_queries[-1]['sql'])]
+        self.assertEqual(lengths, [23] * len(positions))
+
+    def test_seek_descending(self):
+        self.assertEqual(seek_positions(self.job, upper=1001, limit=3, descending=True), [989, 993, 997])
+
+    def test_invalid_filters(self):
+        with self.assertRaises(ValidationError):
+            paginate_results(self.job, {'position_gte': 'abc'})
+        with self.assertRaises(ValidationError):
+            paginate_results(self.job, {'position_lt': '-1'})
+
+
+class LegacyRowsPaginationTests(TestCase):
+    """Los jobs guardados como filas se paginan igual"""
+
+    def setUp(self):
+        sequence = DNASequence.objects.create(name="rows", sequence="ATG" * 100)
+        self.job = SearchJob.objects.create(sequence=sequence, pattern="ATG", status='COMPLETED')
+        SearchResult.objects.bulk_create(
+            SearchResult(job=self.job, position=p, context_before="", context_after="")
+            for p in range(0, 300, 3)
+        )
+
+    def test_pages_over_rows(self):
+        first = paginate_results(self.job, {'limit': '40'})
+        second = paginate_results(self.job, {'limit': '40', 'cursor': first['next_cursor']})
+        third = paginate_results(self.job, {'limit': '40', 'cursor': second['next_cursor']})
+        self.assertEqual(second['results'][0]['position'], 120)
+        self.assertEqual(len(third['results']), 20)
+        self.assertIsNone(third['next_cursor'])
+        back = paginate_results(self.job, {'limit': '40', 'cursor': third['prev_cursor']})
+        self.assertEqual(back['results'], second['results'])
+
+
+class JobDetailEndpointTests(TestCase):
+    """Pruebas del endpoint de detalle con cursores"""
+
+    def setUp(self):
+        sequence = DNASequence.objects.create(name="endpoint", sequence="ACGT" * 500)
+        self.job = SearchJob.objects.create(sequence=sequence, pattern="CG", status='COMPLETED')
+        write_positions(self.job, range(1, 2000, 4))
+
+    def test_returns_cursors(self):
+        data = self.client.get(f'/api/search/jobs/{self.job.id}/?limit=100').json()
+        self.assertEqual(len(data['results']), 100)
+        self.assertIsNone(data['prev_cursor'])
+
+        nxt = self.client.get(f'/api/search/jobs/{self.job.id}/', {'limit': 100, 'cursor': data['next_cursor']}).json()
+        self.assertEqual(nxt['results'][0]['position'], 401)
+        self.assertIsNotNone(nxt['prev_cursor'])
+
+    def test_invalid_cursor_is_400(self):
+        response = self.client.get(f'/api/search/jobs/{self.job.id}/?cursor=invalid!')
+        self.assertEqual(response.status_code, 400)
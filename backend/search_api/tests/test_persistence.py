@@ -0,0 +1,131 @@
+"""
+Pruebas para search_api/persistence.py (persistencia en streaming)
+
+Cubre:
+- Lotes acotados en formato compacto y en filas
+- Escritura desde hilo propio solapada con la búsqueda
+- Limpieza de resultados parciales ante errores
+- Integración con run_search(sink=...)
+"""
+
+from unittest.mock import patch
+
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from sequences_api.models import DNASequence
+from search_api.models import SearchJob, SearchResult, SearchResultChunk
+from search_api.persistence import ResultWriter, insert_rows
+from search_api.result_store import count_results, read_positions
+from search_api.services import run_search
+
+
+def _matches(n, step=3):
+    return [{'position': i * step, 'context_before': 'AC', 'context_after': 'GT'} for i in range(n)]
+
+
+class ResultWriterInlineTests(TestCase):
+    """Dentro de una transacción el escritor trabaja en el mismo hilo"""
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="persist", sequence="ATG" * 5000)
+        self.job = SearchJob.objects.create(sequence=self.sequence, pattern="ATG", status='PROCESSING')
+
+    def test_inline_inside_transaction(self):
+        writer = ResultWriter(self.job)
+        self.assertFalse(writer.threaded)
+
+    def test_compact_batches_keep_offsets(self):
+        with ResultWriter(self.job, batch_size=1000) as writer:
+            for match in _matches(2500):
+                writer.add(match)
+
+        self.assertEqual(writer.written, 2500)
+        chunks = list(SearchResultChunk.objects.filter(job=self.job).order_by('index'))
+        self.assertEqual([c.index for c in chunks], [0, 1, 2])
+        self.assertEqual([c.start_offset for c in chunks], [0, 1000, 2000])
+        self.assertEqual(read_positions(self.job, 999, 2), [2997, 3000])
+
+    @override_settings(SEARCH_RESULT_STORAGE="rows")
+    def test_rows_mode(self):
+        with ResultWriter(self.job, batch_size=700) as writer:
+            for match in _matches(2000):
+                writer.add(match)
+        self.assertEqual(self.job.results.count(), 2000)
+        self.assertEqual(self.job.results.get(position=30).context_after, 'GT')
+
+    def test_abort_removes_partial_results(self):
+        with self.assertRaises(RuntimeError):
+            with ResultWriter(self.job, batch_size=100) as writer:
+                for match in _matches(350):
+                    writer.add(match)
+                raise RuntimeError("fallo en el motor")
+        self.assertFalse(SearchResultChunk.objects.filter(job=self.job).exists())
+
+    def test_insert_rows_above_sqlite_variable_limit(self):
+        # 4 columnas x 5000 filas supera con creces el límite de 999 variables
+        insert_rows(self.job, _matches(5000))
+        self.assertEqual(SearchResult.objects.filter(job=self.job).count(), 5000)
+
+    @override_settings(USE_GRPC_SEARCH=False)
+    def test_run_search_streams_into_sink(self):
+        received = []
+        result = run_search(self.sequence.sequence, "ATG", sink=received.append)
+        self.assertEqual(result['matches'], [])
+        self.assertEqual(result['total_matches'], 5000)
+        self.assertEqual(len(received), 5000)
+
+    @override_settings(USE_GRPC_SEARCH=True)
+    @patch('search_api.services.run_grpc_search')
+    def test_run_search_feeds_grpc_matches_to_sink(self, mock_grpc):
+        mock_grpc.return_value = {
+            'pattern': 'ATG', 'total_matches': 2, 'search_time_ms': 1.0,
+            'matches': _matches(2), 'algorithm_used': 'KMP',
+        }
+        received = []
+        result = run_search("ATGATG", "ATG", sink=received.append)
+        self.assertEqual(len(received), 2)
+        self.assertEqual(result['matches'], [])
+
+
+@override_settings(USE_GRPC_SEARCH=False)
+class ResultWriterThreadedTests(TransactionTestCase):
+    """Con autocommit el escritor usa su propio hilo y conexión"""
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="threaded", sequence="ATGC" * 20_000)
+        self.job = SearchJob.objects.create(sequence=self.sequence, pattern="ATG", status='PROCESSING')
+
+    def test_uses_thread_outside_transaction(self):
+        writer = ResultWriter(self.job)
+        self.assertTrue(writer.threaded)
+
+    def test_search_and_writes_overlap(self):
+        with ResultWriter(self.job, batch_size=1000, max_pending_batches=2) as writer:
+            result = run_search(self.sequence.sequence, "ATG", sink=writer.add)
+
+        self.assertEqual(result['total_matches'], 20_000)
+        self.assertEqual(writer.written, 20_000)
+        self.assertEqual(count_results(self.job), 20_000)
+        self.assertEqual(read_positions(self.job, 19_999, 1), [79_996])
+
+    def test_writer_error_is_raised(self):
+        with patch.object(ResultWriter, '_write_batch', side_effect=ValueError("disco lleno")):
+            writer = ResultWriter(self.job, batch_size=10)
+            writer.start()
+            with self.assertRaises(ValueError):
+                for match in _matches(100):
+                    writer.add(match)
+                writer.close()
+            writer.abort()
+
+    def test_search_endpoint_persists_all_matches(self):
+        response = self.client.post(
+            '/api/search/',
+            {'sequence_id': self.sequence.id, 'pattern': 'ATG'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        job = SearchJob.objects.get(pk=response.json()['job']['id'])
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertEqual(count_results(job), 20_000)
+        self.assertEqual(len(response.json()['results']), 100)
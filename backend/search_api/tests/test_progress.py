@@ -0,0 +1,161 @@
+"""
+Pruebas del progreso de jobs y del stream SSE (search_api/progress.py)
+
+Cubre:
+- Callback de progreso del motor local (por tramos y al terminar)
+- ProgressReporter: conteo de coincidencias, ETA, límite de frecuencia y guardado en BD
+- ProgressNotifier: espera por cambios
+- GET /api/search/jobs/{id}/events/ con job local, de otro proceso y terminado
+"""
+
+import json
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from sequences_api.models import DNASequence
+from search_api import services
+from search_api.jobs import execute_job
+from search_api.models import SearchJob
+from search_api.progress import ProgressNotifier, ProgressReporter, notifier
+from search_api.services import iter_matches
+
+
+def _events(chunks):
+    """Convierte trozos del stream en una lista de (evento, datos)."""
+    events = []
+    for chunk in chunks:
+        text = chunk.decode() if isinstance(chunk, bytes) else chunk
+        lines = dict(line.split(": ", 1) for line in text.strip().splitlines() if line.startswith(("event", "data")))
+        if 'event' in lines:
+            events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+class EngineProgressTests(SimpleTestCase):
+    """El motor local informa de los bytes recorridos"""
+
+    def test_reports_each_window_and_end(self):
+        seen = []
+        sequence = "C" * 5000 + "ATG"
+        with patch.object(services, 'SCAN_WINDOW', 1000):
+            matches = list(iter_matches(sequence, "ATG", progress=seen.append))
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(seen, sorted(seen))
+        self.assertGreaterEqual(len(seen), 5)
+        self.assertEqual(seen[-1], len(sequence))
+
+
+@override_settings(SEARCH_PROGRESS_INTERVAL_SECONDS=0, SEARCH_PROGRESS_PERSIST_SECONDS=0)
+class ProgressReporterTests(SimpleTestCase):
+    """Estado publicado por el reporter"""
+
+    def test_counts_matches_and_estimates_eta(self):
+        reporter = ProgressReporter(-1, 1000)
+        sink = reporter.counting(lambda match: None)
+        sink({'position': 1})
+        sink({'position': 2})
+        reporter.scanned(500)
+        state = notifier.get(-1)
+        self.assertEqual(state['matches'], 2)
+        self.assertEqual(state['bytes_scanned'], 500)
+        self.assertIsNotNone(state['eta_s'])
+
+        reporter.finish('COMPLETED')
+        state = notifier.get(-1)
+        self.assertEqual(state['status'], 'COMPLETED')
+        self.assertEqual(state['bytes_scanned'], 1000)
+        self.assertEqual(state['eta_s'], 0.0)
+
+    @override_settings(SEARCH_PROGRESS_INTERVAL_SECONDS=60)
+    def test_publishing_is_throttled(self):
+        reporter = ProgressReporter(-2, 1000)
+        reporter.scanned(10)
+        version = notifier.get(-2)['version']
+        for n in range(20, 1000, 10):
+            reporter.scanned(n)
+        self.assertEqual(notifier.get(-2)['version'], version)
+
+    def test_wait_returns_new_state_or_times_out(self):
+        local = ProgressNotifier()
+        self.assertIsNone(local.wait(7, 0, 0.01))
+        local.publish(7, status='PROCESSING')
+        self.assertEqual(local.wait(7, 0, 0.01)['version'], 1)
+        self.assertIsNone(local.wait(7, 1, 0.01))
+
+
+@override_settings(USE_GRPC_SEARCH=False, SEARCH_EVENTS_DB_POLL_SECONDS=0.01,
+                   SEARCH_PROGRESS_INTERVAL_SECONDS=0)
+class JobEventsEndpointTests(TestCase):
+    """Pruebas de GET /api/search/jobs/{id}/events/"""
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="events", sequence="ATGC" * 250)
+
+    def _stream(self, job):
+        response = self.client.get(f'/api/search/jobs/{job.id}/events/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return iter(response.streaming_content)
+
+    def test_completed_job_sends_done(self):
+        job = SearchJob.objects.create(sequence=self.sequence, pattern="ATG", status='PROCESSING')
+        execute_job(job)
+
+        events = _events(self._stream(job))
+        self.assertEqual([name for name, _ in events], ['progress', 'done'])
+        self.assertEqual(events[0][1]['percent'], 100.0)
+        self.assertEqual(events[0][1]['matches'], 250)
+        self.assertEqual(events[1][1]['status'], 'COMPLETED')
+
+    def test_local_job_streams_notifier_updates(self):
+        job = SearchJob.objects.create(sequence=self.sequence, pattern="ATG", status='PROCESSING')
+        reporter = ProgressReporter(job.pk, 1000)
+        stream = self._stream(job)
+        next(stream)  # retry
+
+        reporter.scanned(250)
+        self.assertEqual(_events([next(stream)])[0][1]['bytes_scanned'], 250)
+
+        reporter.scanned(600)
+        self.assertEqual(_events([next(stream)])[0][1]['percent'], 60.0)
+
+        SearchJob.objects.filter(pk=job.pk).update(status='FAILED', error_message="boom")
+        reporter.finish('FAILED')
+        events = _events(stream)
+        self.assertEqual(events[-1][0], 'done')
+        self.assertEqual(events[-1][1]['error_message'], "boom")
+
+    def test_job_in_other_process_reads_saved_progress(self):
+        job = SearchJob.objects.create(
+            sequence=self.sequence, pattern="ATG", status='PROCESSING', progress_bytes=400, progress_matches=100,
+        )
+        stream = self._stream(job)
+        next(stream)
+        progress = _events([next(stream)])[0][1]
+        self.assertEqual(progress['percent'], 40.0)
+        self.assertEqual(progress['matches'], 100)
+
+        SearchJob.objects.filter(pk=job.pk).update(status='CANCELLED')
+        events = _events(stream)
+        self.assertEqual(events[-1][1]['status'], 'CANCELLED')
+
+    @override_settings(SEARCH_PROGRESS_PERSIST_SECONDS=0.0001)
+    def test_running_job_saves_progress(self):
+        big = DNASequence.objects.create(name="big", sequence="C" * 3_000_000)
+        job = SearchJob.objects.create(sequence=big, pattern="ATG", status='PROCESSING')
+        with patch('search_api.progress.ProgressReporter.persist', autospec=True) as persist:
+            execute_job(job)
+        self.assertTrue(persist.called)
+
+    def test_async_response_links_events(self):
+        response = self.client.post(
+            '/api/search/',
+            json.dumps({'sequence_id': self.sequence.id, 'pattern': 'ATG', 'mode': 'async'}),
+            content_type='application/json',
+        )
+        job_id = response.json()['job']['id']
+        self.assertEqual(response.json()['events_url'], f'/api/search/jobs/{job_id}/events/')
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get('/api/search/jobs/999999/events/').status_code, 404)
@@ -0,0 +1,129 @@
+"""
+Pruebas para search_api/result_store.py (almacenamiento compacto)
+
+Cubre:
+- Codificación varint de deltas
+- Agrupación en bloques y acceso aleatorio por página
+- Reconstrucción del contexto desde tramos acotados de la secuencia
+- Compatibilidad con jobs guardados como filas SearchResult
+"""
+
+import re
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from sequences_api.models import DNASequence
+from search_api.models import SearchJob, SearchResult, SearchResultChunk
+from search_api.result_store import (
+    build_chunks,
+    count_results,
+    decode_varint_deltas,
+    encode_varint_deltas,
+    read_positions,
+    read_results,
+    write_positions,
+)
+
+
+class VarintTests(SimpleTestCase):
+    """Pruebas de la codificación de posiciones"""
+
+    def test_round_trip(self):
+        positions = [5, 6, 7, 200, 70_000, 3_000_000_000]
+        data = encode_varint_deltas(positions, 5)
+        self.assertEqual(decode_varint_deltas(data, 5), positions)
+
+    def test_close_positions_use_one_byte(self):
+        positions = list(range(100, 1100, 3))
+        data = encode_varint_deltas(positions, 100)
+        self.assertEqual(len(data), len(positions))
+
+    def test_rejects_unsorted_positions(self):
+        with self.assertRaises(ValueError):
+            encode_varint_deltas([10, 5], 10)
+
+    def test_empty(self):
+        self.assertEqual(decode_varint_deltas(encode_varint_deltas([], 0), 0), [])
+
+
+class ResultStoreTests(TestCase):
+    """Pruebas de escritura y lectura por bloques"""
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="store", sequence="ACGT" * 2500)
+        self.job = SearchJob.objects.create(sequence=self.sequence, pattern="CG", status='COMPLETED')
+        self.positions = list(range(1, 10_000, 4))  # 2500 coincidencias
+
+    def test_chunks_have_offsets(self):
+        chunks = build_chunks(self.job, self.positions, chunk_size=1000)
+        self.assertEqual([c.count for c in chunks], [1000, 1000, 500])
+        self.assertEqual([c.start_offset for c in chunks], [0, 1000, 2000])
+        self.assertEqual(chunks[1].first_position, self.positions[1000])
+        self.assertEqual(chunks[1].last_position, self.positions[1999])
+
+    def test_write_and_count(self):
+        written = write_positions(self.job, self.positions, chunk_size=1000)
+        self.assertEqual(written, 2500)
+        self.assertEqual(SearchResultChunk.objects.filter(job=self.job).count(), 3)
+        self.assertEqual(count_results(self.job), 2500)
+        self.assertFalse(SearchResult.objects.filter(job=self.job).exists())
+
+    def test_page_spanning_chunks(self):
+        write_positions(self.job, self.positions, chunk_size=1000)
+        self.assertEqual(read_positions(self.job, 990, 20), self.positions[990:1010])
+        self.assertEqual(read_positions(self.job, 0, 5), self.positions[:5])
+        self.assertEqual(read_positions(self.job, 2495, 100), self.positions[2495:])
+        self.assertEqual(read_positions(self.job, 5000, 10), [])
+
+    def test_results_include_context(self):
+        write_positions(self.job, self.positions, chunk_size=1000)
+        page = read_results(self.job, 3, 1)
+        pos = self.positions[3]
+        seq = self.sequence.sequence
+        self.assertEqual(page, [{
+            'position': pos,
+            'context_before': seq[pos - 10:pos],
+            'context_after': seq[pos + 2:pos + 12],
+        }])
+
+    def test_context_at_sequence_edges(self):
+        write_positions(self.job, [0, 9998])
+        first, last = read_results(self.job, 0, 2)
+        self.assertEqual(first['context_before'], "")
+        self.assertEqual(last['context_after'], "")
+
+    def test_sparse_page_reads_bounded_windows(self):
+        text = "C" * 200_000
+        positions = [5, 8, 100_000, 199_990]
+        for pos in positions:
+            text = text[:pos] + "CG" + text[pos + 2:]
+        sequence = DNASequence.objects.create(name="sparse", sequence=text)
+        job = SearchJob.objects.create(sequence=sequence, pattern="CG", status='COMPLETED')
+        write_positions(job, positions)
+        job = SearchJob.objects.get(pk=job.pk)  # sin el texto en memoria
+
+        with CaptureQueriesContext(connection) as queries:
+            page = read_results(job, 0, 10)
+
+        self.assertEqual(page, [
+            {'position': pos, 'context_before': text[max(0, pos - 10):pos], 'context_after': text[pos + 2:pos + 12]}
+            for pos in positions
+        ])
+        # Un tramo por coincidencia (los solapados, fusionados); nunca la secuencia entera
+        lengths = [int(n) for n in re.findall(r'SUBSTR\([^,]+, \d+, (\d+)\)', queries.captured_queries[-1]['sql'])]
+        self.assertEqual(lengths, [20, 22, 22])
+        for query in queries.captured_queries:
+            self.assertNotIn('"dna_sequences"."sequence"', re.sub(r'SUBSTR\([^)]*\)', '', query['sql']))
+
+    def test_legacy_rows_are_still_readable(self):
+        SearchResult.objects.create(job=self.job, position=5, context_before="A", context_after="C")
+        SearchResult.objects.create(job=self.job, position=1, context_before="", context_after="G")
+        self.assertEqual(count_results(self.job), 2)
+        self.assertEqual([r['position'] for r in read_results(self.job)], [1, 5])
+
+    def test_chunks_deleted_with_job(self):
+        write_positions(self.job, self.positions)
+        self.job.delete()
+        self.assertFalse(SearchResultChunk.objects.exists())
@@ -0,0 +1,190 @@
+"""
+Pruebas para search_api/routing.py (enrutado por coste)
+
+Cubre:
+- Estimación de coincidencias esperadas
+- Calibración en línea de CostModel
+- Decisión de ruta según tamaño de la petición
+- Registro de ruta y costes en run_search y en SearchJob
+- Mismo criterio de medida en las dos rutas (motor y entrega al sink)
+"""
+
+import json
+import time
+from unittest.mock import patch
+
+import grpc
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from sequences_api.models import DNASequence
+from search_api.models import SearchJob
+from search_api.routing import (
+    ROUTE_GRPC,
+    ROUTE_LOCAL,
+    ROUTE_LOCAL_FALLBACK,
+    CostModel,
+    CostRouter,
+    estimate_matches,
+    request_features,
+    reset_router,
+)
+from search_api.services import run_search
+
+
+def _slow_sink(match):
+    time.sleep(0.01)
+
+
+class EstimateMatchesTests(SimpleTestCase):
+    """Pruebas de la estimación de coincidencias"""
+
+    def test_uniform_composition(self):
+        # 4^-3 por posición en 1000 posiciones aprox.
+        self.assertAlmostEqual(estimate_matches(1002, "ATG"), 1000 / 64)
+
+    def test_gc_bias(self):
+        rich = estimate_matches(10_000, "GCGC", gc_content=80)
+        poor = estimate_matches(10_000, "GCGC", gc_content=20)
+        self.assertGreater(rich, poor)
+
+    def test_pattern_longer_than_sequence(self):
+        self.assertEqual(estimate_matches(3, "ATCG"), 0.0)
+
+    def test_invalid_base_gives_zero(self):
+        self.assertEqual(estimate_matches(100, "ZZ"), 0.0)
+
+
+class CostModelTests(SimpleTestCase):
+    """Pruebas de la calibración en línea"""
+
+    def test_predicts_prior_without_data(self):
+        model = CostModel((1.0, 2.0, 0.0, 0.0))
+        self.assertAlmostEqual(model.predict((1.0, 3.0, 0.0, 0.0)), 7.0)
+
+    def test_converges_to_observed_costs(self):
+        model = CostModel((0.0, 0.0, 0.0, 0.0), ridge=0.01)
+        for mb in (1, 2, 5, 10, 20, 50):
+            features = request_features(mb * 1_000_000, 3, 0)
+            model.observe(features, 4.0 + 3.0 * mb)
+        prediction = model.predict(request_features(30_000_000, 3, 0))
+        self.assertAlmostEqual(prediction, 94.0, delta=1.0)
+
+    def test_window_is_bounded(self):
+        model = CostModel((0.0, 0.0, 0.0, 0.0), window=5)
+        for _ in range(20):
+            model.observe((1.0, 0.0, 0.0, 0.0), 1.0)
+        self.assertEqual(model.samples, 5)
+
+
+class CostRouterTests(SimpleTestCase):
+    """Pruebas de la decisión de ruta"""
+
+    def _calibrated_router(self):
+        router = CostRouter(explore_every=0)
+        for mb in (0.001, 0.01, 1, 10, 100):
+            features = request_features(int(mb * 1_000_000), 3, 0)
+            # Local: sin overhead fijo pero caro por MB; gRPC: 2ms fijos y barato por MB
+            router.observe(ROUTE_LOCAL, features, 0.01 + 5.0 * mb)
+            router.observe(ROUTE_GRPC, features, 2.0 + 1.0 * mb, engine_ms=0.5 * mb)
+        return router
+
+    def test_small_sequence_goes_local(self):
+        decision = self._calibrated_router().choose(1000, "ATG")
+        self.assertEqual(decision.route, ROUTE_LOCAL)
+
+    def test_large_sequence_goes_grpc(self):
+        decision = self._calibrated_router().choose(100_000_000, "ATG")
+        self.assertEqual(decision.route, ROUTE_GRPC)
+        self.assertLess(decision.estimates[ROUTE_GRPC], decision.estimates[ROUTE_LOCAL])
+
+    def test_only_available_routes_are_considered(self):
+        decision = self._calibrated_router().choose(100_000_000, "ATG", routes=[ROUTE_LOCAL])
+        self.assertEqual(decision.route, ROUTE_LOCAL)
+
+    def test_grpc_observation_splits_engine_and_transport(self):
+        router = CostRouter()
+        features = request_features(1_000_000, 3, 0)
+        router.observe(ROUTE_GRPC, features, 10.0, engine_ms=4.0)
+        self.assertEqual(router.models[(ROUTE_GRPC, "engine")].samples, 1)
+        self.assertEqual(router.models[(ROUTE_GRPC, "transport")].observations[0][1], 6.0)
+
+    def test_exploration_picks_alternative(self):
+        router = CostRouter(explore_every=2)
+        first = router.choose(1000, "ATG")
+        second = router.choose(1000, "ATG")
+        self.assertTrue(second.explored)
+        self.assertNotEqual(first.route, second.route)
+
+
+class RunSearchRoutingTests(TestCase):
+    """Pruebas de integración de run_search con el router"""
+
+    def setUp(self):
+        reset_router()
+
+    def tearDown(self):
+        reset_router()
+
+    @override_settings(USE_GRPC_SEARCH=False)
+    def test_reports_local_route(self):
+        result = run_search("ATGATG", "ATG")
+        self.assertEqual(result['route'], ROUTE_LOCAL)
+        self.assertGreaterEqual(result['actual_cost_ms'], 0)
+        self.assertIsNotNone(result['predicted_cost_ms'])
+
+    @override_settings(USE_GRPC_SEARCH=True, SEARCH_COST_ROUTING=False)
+    @patch('search_api.services.run_grpc_search')
+    def test_static_mode_always_uses_grpc(self, mock_grpc):
+        mock_grpc.return_value = {
+            'pattern': 'ATG', 'total_matches': 0, 'search_time_ms': 1.0,
+            'matches': [], 'algorithm_used': 'KMP',
+        }
+        result = run_search("ATGATG", "ATG")
+        self.assertEqual(result['route'], ROUTE_GRPC)
+
+    @override_settings(USE_GRPC_SEARCH=True, SEARCH_COST_ROUTING=True, SEARCH_ROUTER_EXPLORE_EVERY=0)
+    @patch('search_api.services.run_grpc_search')
+    def test_cost_mode_keeps_small_search_local(self, mock_grpc):
+        result = run_search("ATGATG", "ATG")
+        mock_grpc.assert_not_called()
+        self.assertEqual(result['route'], ROUTE_LOCAL)
+
+    @override_settings(USE_GRPC_SEARCH=True, SEARCH_COST_ROUTING=False)
+    @patch('search_api.services.run_grpc_search')
+    def test_fallback_route_is_recorded(self, mock_grpc):
+        mock_grpc.side_effect = grpc.RpcError()
+        result = run_search("ATGATG", "ATG")
+        self.assertEqual(result['route'], ROUTE_LOCAL_FALLBACK)
+
+    @override_settings(USE_GRPC_SEARCH=True, SEARCH_COST_ROUTING=True, SEARCH_ROUTER_EXPLORE_EVERY=0)
+    @patch('search_api.services.run_grpc_search')
+    @patch('search_api.routing.CostRouter.observe')
+    def test_both_routes_measure_sink_delivery(self, observe, mock_grpc):
+        mock_grpc.return_value = {
+            'pattern': 'ATG', 'total_matches': 3, 'search_time_ms': 0.1, 'algorithm_used': 'KMP',
+            'matches': [{'position': p, 'context_before': '', 'context_after': ''} for p in (0, 3, 6)],
+        }
+        local = run_search("ATGATGATG", "ATG", sink=_slow_sink)
+        with override_settings(SEARCH_COST_ROUTING=False):
+            remote = run_search("ATGATGATG", "ATG", sink=_slow_sink)
+        self.assertEqual((local['route'], remote['route']), (ROUTE_LOCAL, ROUTE_GRPC))
+        # Tres entregas de 10 ms en las dos rutas, también en lo que aprende el router
+        for result, call in zip((local, remote), observe.call_args_list):
+            self.assertGreaterEqual(result['actual_cost_ms'], 30)
+            self.assertEqual(call.args[2], result['actual_cost_ms'])
+
+    @override_settings(USE_GRPC_SEARCH=False)
+    def test_route_is_saved_on_job(self):
+        sequence = DNASequence.objects.create(name="routing", sequence="ATGATGATG")
+        response = self.client.post(
+            '/api/search/',
+            json.dumps({'sequence_id': sequence.id, 'pattern': 'ATG'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['job']['route'], ROUTE_LOCAL)
+
+        job = SearchJob.objects.get(pk=response.json()['job']['id'])
+        self.assertEqual(job.route, ROUTE_LOCAL)
+        self.assertIsNotNone(job.predicted_cost_ms)
+        self.assertIsNotNone(job.actual_cost_ms)
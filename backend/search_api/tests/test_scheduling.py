@@ -0,0 +1,186 @@
+"""
+Pruebas de la planificación de la cola asíncrona (search_api/scheduling.py)
+
+Cubre:
+- Clases de prioridad y envejecimiento
+- Reparto justo entre clientes y tope de concurrencia por cliente
+- Identidad del cliente fijada por el servidor (usuario, IP, proxies de confianza)
+- Shortest-job-first por coste estimado
+- Estadísticas de cola y endpoint /api/search/queue/
+"""
+
+import json
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from sequences_api.models import DNASequence
+from search_api.jobs import claim_next_job
+from search_api.models import SearchJob
+from search_api.routing import CostRouter
+from search_api.scheduling import classify, queue_stats
+
+INTERACTIVE = SearchJob.PRIORITY_INTERACTIVE
+NORMAL = SearchJob.PRIORITY_NORMAL
+BULK = SearchJob.PRIORITY_BULK
+
+
+class ClassifyTests(TestCase):
+    """Asignación de clase al encolar"""
+
+    @override_settings(SEARCH_INTERACTIVE_MAX_COST_MS=100)
+    def test_default_by_cost(self):
+        self.assertEqual(classify(5.0), INTERACTIVE)
+        self.assertEqual(classify(5000.0), NORMAL)
+
+    @override_settings(SEARCH_INTERACTIVE_MAX_COST_MS=100)
+    def test_expensive_jobs_cannot_be_interactive(self):
+        self.assertEqual(classify(5000.0, 'interactive'), NORMAL)
+        self.assertEqual(classify(5.0, 'bulk'), BULK)
+
+    def test_router_estimate_grows_with_size(self):
+        router = CostRouter()
+        self.assertLess(router.estimate(1_000, "ATG"), router.estimate(50_000_000, "ATG"))
+
+
+@override_settings(SEARCH_PRIORITY_AGING_SECONDS=300, SEARCH_CLIENT_MAX_CONCURRENT=2)
+class SchedulingOrderTests(TestCase):
+    """Orden en que los workers reclaman los jobs"""
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="sched", sequence="ATG" * 10)
+        self.now = timezone.now()
+
+    def _job(self, client="a", priority=NORMAL, cost=10.0, age_s=0, status='PENDING', worker_id=None):
+        return SearchJob.objects.create(
+            sequence=self.sequence, pattern="ATG", status=status, client_id=client,
+            priority=priority, estimated_cost_ms=cost, worker_id=worker_id,
+            created_at=self.now - timedelta(seconds=age_s),
+        )
+
+    def _claim_order(self):
+        order = []
+        while True:
+            job = claim_next_job("w")
+            if job is None:
+                return order
+            order.append(job.pk)
+
+    def test_priority_classes(self):
+        bulk = self._job("a", BULK, age_s=30)
+        normal = self._job("b", NORMAL, age_s=20)
+        interactive = self._job("c", INTERACTIVE, age_s=10)
+        self.assertEqual(self._claim_order(), [interactive.pk, normal.pk, bulk.pk])
+
+    def test_aged_bulk_job_overtakes_normal(self):
+        normal = self._job("a", NORMAL, age_s=10)
+        old_bulk = self._job("b", BULK, age_s=400)
+        self.assertEqual(claim_next_job("w").pk, old_bulk.pk)
+        self.assertEqual(claim_next_job("w").pk, normal.pk)
+
+    def test_shortest_job_first_within_client(self):
+        big = self._job("a", cost=900.0, age_s=50)
+        small = self._job("a", cost=3.0, age_s=1)
+        self.assertEqual(claim_next_job("w").pk, small.pk)
+        self.assertEqual(claim_next_job("w").pk, big.pk)
+
+    @override_settings(SEARCH_CLIENT_MAX_CONCURRENT=0)
+    def test_fair_share_interleaves_clients(self):
+        flood = [self._job("flood", age_s=100 - i) for i in range(5)]
+        other = [self._job("polite", age_s=50 - i) for i in range(2)]
+        order = self._claim_order()
+        # Tras el primer job de "flood" le toca a "polite", que tiene menos en curso
+        self.assertEqual(order[:4], [flood[0].pk, other[0].pk, flood[1].pk, other[1].pk])
+        self.assertEqual(len(order), 7)
+
+    def test_concurrency_cap_per_client(self):
+        for _ in range(2):
+            self._job("a", status='PROCESSING', worker_id="w")
+        waiting = self._job("a")
+        self.assertIsNone(claim_next_job("w"))
+
+        other = self._job("b")
+        self.assertEqual(claim_next_job("w").pk, other.pk)
+
+        SearchJob.objects.filter(client_id="a", status='PROCESSING').update(status='COMPLETED')
+        self.assertEqual(claim_next_job("w").pk, waiting.pk)
+
+    def test_sync_jobs_do_not_count_against_cap(self):
+        for _ in range(2):
+            self._job("a", status='PROCESSING')  # peticiones síncronas: sin worker_id
+        waiting = self._job("a")
+        self.assertEqual(claim_next_job("w").pk, waiting.pk)
+
+    def test_queue_stats(self):
+        self._job("a", INTERACTIVE, age_s=30)
+        self._job("a", BULK, age_s=90)
+        started = self._job("b", NORMAL, age_s=20)
+        SearchJob.objects.filter(pk=started.pk).update(
+            status='PROCESSING', worker_id="w", started_at=self.now - timedelta(seconds=5),
+        )
+
+        stats = queue_stats()
+        classes = stats['classes']
+        self.assertEqual(classes['interactive']['pending'], 1)
+        self.assertEqual(classes['bulk']['pending'], 1)
+        self.assertGreaterEqual(classes['bulk']['oldest_pending_wait_s'], 90)
+        self.assertEqual(classes['normal']['processing'], 1)
+        self.assertAlmostEqual(classes['normal']['avg_wait_s'], 15, delta=1)
+        self.assertIsNone(classes['interactive']['avg_wait_s'])
+        self.assertEqual(stats['running_by_client'], {"b": 1})
+
+
+@override_settings(USE_GRPC_SEARCH=False, SEARCH_INTERACTIVE_MAX_COST_MS=500)
+class AsyncEnqueueTests(TestCase):
+    """El endpoint guarda clase, cliente y coste estimado"""
+
+    def setUp(self):
+        self.small = DNASequence.objects.create(name="small", sequence="ATGC" * 250)
+
+    def _post(self, payload, **headers):
+        return self.client.post('/api/search/', json.dumps(payload), content_type='application/json', **headers)
+
+    def _client_of(self, **headers):
+        response = self._post({'sequence_id': self.small.id, 'pattern': 'ATG', 'mode': 'async'}, **headers)
+        return SearchJob.objects.get(pk=response.json()['job']['id']).client_id
+
+    def test_small_search_is_interactive(self):
+        response = self._post({'sequence_id': self.small.id, 'pattern': 'ATG', 'mode': 'async'})
+        job = SearchJob.objects.get(pk=response.json()['job']['id'])
+        self.assertEqual(job.priority, INTERACTIVE)
+        self.assertIsNotNone(job.estimated_cost_ms)
+        self.assertEqual(response.json()['job']['priority'], 'interactive')
+
+    def test_requested_priority_and_ip_fallback(self):
+        response = self._post({'sequence_id': self.small.id, 'pattern': 'ATG', 'mode': 'async', 'priority': 'bulk'})
+        job = SearchJob.objects.get(pk=response.json()['job']['id'])
+        self.assertEqual(job.priority, BULK)
+        self.assertEqual(job.client_id, "127.0.0.1")
+
+    def test_client_id_header_is_not_trusted(self):
+        # Un id nuevo por petición no debe saltarse el tope por cliente
+        self.assertEqual(self._client_of(HTTP_X_CLIENT_ID="lab-7"), "127.0.0.1")
+        with self.settings(SEARCH_TRUST_CLIENT_ID_HEADER=True):
+            self.assertEqual(self._client_of(HTTP_X_CLIENT_ID="lab-7"), "lab-7")
+
+    def test_authenticated_user(self):
+        user = get_user_model().objects.create_user('ana', password='pass')
+        self.client.force_login(user)
+        self.assertEqual(self._client_of(HTTP_X_CLIENT_ID="lab-7"), f"user:{user.pk}")
+
+    def test_trusted_proxies(self):
+        forwarded = {'HTTP_X_FORWARDED_FOR': "6.6.6.6, 10.1.2.3", 'REMOTE_ADDR': "192.168.0.1"}
+        self.assertEqual(self._client_of(**forwarded), "192.168.0.1")
+        with self.settings(SEARCH_TRUSTED_PROXIES=1):
+            # La primera entrada la escribió el cliente; la última, el balanceador
+            self.assertEqual(self._client_of(**forwarded), "10.1.2.3")
+        with self.settings(SEARCH_TRUSTED_PROXIES=3):
+            self.assertEqual(self._client_of(**forwarded), "192.168.0.1")
+
+    def test_queue_endpoint(self):
+        self._post({'sequence_id': self.small.id, 'pattern': 'ATG', 'mode': 'async'})
+        data = self.client.get('/api/search/queue/').json()
+        self.assertEqual(data['classes']['interactive']['pending'], 1)
+        self.assertIn('p95_wait_s', data['classes']['bulk'])
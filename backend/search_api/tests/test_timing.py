@@ -0,0 +1,132 @@
+"""
+Pruebas de la medición por etapas (config/timing.py) y de Server-Timing
+
+Cubre:
+- Spans, colectores anidados y formato de la cabecera
+- Cabecera Server-Timing en búsqueda síncrona, asíncrona y subida de secuencias
+- Desglose guardado en SearchJob.timings (petición y worker)
+- Transporte gRPC frente a tiempo del motor en el servidor
+"""
+
+import io
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from config.timing import Timings, collect, current_timings, record, span
+from sequences_api.models import DNASequence
+from search_api.jobs import execute_job
+from search_api.models import SearchJob
+from search_api.services import run_search
+
+
+def _stages(response):
+    """Etapas de la cabecera Server-Timing: {nombre: ms}."""
+    stages = {}
+    for part in response['Server-Timing'].split(', '):
+        name, *params = part.split(';')
+        stages[name] = float(dict(p.split('=', 1) for p in params)['dur'])
+    return stages
+
+
+class TimingsTests(SimpleTestCase):
+    """API de spans"""
+
+    def test_span_without_collector_is_noop(self):
+        with span('anything'):
+            pass
+        self.assertIsNone(current_timings())
+
+    def test_spans_accumulate_and_nest(self):
+        with collect() as outer:
+            with span('validate'):
+                pass
+            with collect() as inner:
+                record('engine', 5.0)
+                record('engine', 2.5)
+            self.assertEqual(inner.as_dict(), {'engine': 7.5})
+        self.assertEqual(list(outer.as_dict()), ['validate', 'engine'])
+        self.assertEqual(outer.ms('engine'), 7.5)
+        self.assertIsNone(current_timings())
+
+    def test_span_records_on_exception(self):
+        with collect() as timings:
+            with self.assertRaises(ValueError):
+                with span('engine'):
+                    raise ValueError("fallo")
+        self.assertIsNotNone(timings.ms('engine'))
+
+    def test_header_format(self):
+        timings = Timings()
+        timings.add('db write', 1.23456)
+        timings.add('engine', 2.0)
+        timings.add('engine', 3.0)
+        self.assertEqual(timings.server_timing(), 'db_write;dur=1.235, engine;dur=5.000;desc="x2"')
+
+
+@override_settings(USE_GRPC_SEARCH=False, SEARCH_COALESCING=False)
+class SearchServerTimingTests(TestCase):
+    """Etapas de las peticiones de búsqueda y subida"""
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="timing", sequence="ATGC" * 1000)
+
+    def test_sync_search_header_and_job_breakdown(self):
+        response = self.client.post(
+            '/api/search/', {'sequence_id': self.sequence.pk, 'pattern': 'ATG'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        stages = _stages(response)
+        for name in ('validate', 'sequence_fetch', 'job_create', 'engine', 'persist_flush', 'db_write',
+                     'job_save', 'result_read', 'serialize', 'render', 'total'):
+            self.assertIn(name, stages)
+        self.assertGreaterEqual(stages['total'], stages['engine'])
+
+        job = SearchJob.objects.get(pk=response.json()['job']['id'])
+        self.assertIn('engine', job.timings)
+        self.assertIn('db_write', job.timings)
+        self.assertNotIn('serialize', job.timings)  # solo las etapas de la ejecución del job
+        self.assertEqual(response.json()['job']['timings'], job.timings)
+
+    def test_async_search_header(self):
+        response = self.client.post(
+            '/api/search/', {'sequence_id': self.sequence.pk, 'pattern': 'ATG', 'mode': 'async'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertIn('job_create', _stages(response))
+
+    def test_worker_execution_persists_timings(self):
+        job = SearchJob.objects.create(sequence=self.sequence, pattern="GCA", status='PROCESSING')
+        execute_job(SearchJob.objects.get(pk=job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertIn('sequence_fetch', job.timings)
+        self.assertIn('engine', job.timings)
+
+    def test_upload_header(self):
+        upload = io.BytesIO(b">chr\nATGCATGC\n")
+        upload.name = "seq.fasta"
+        response = self.client.post('/api/sequences/upload/', {'file': upload})
+        self.assertEqual(response.status_code, 201)
+        stages = _stages(response)
+        for name in ('validate', 'hash', 'dedup', 'parse', 'db_insert', 'total'):
+            self.assertIn(name, stages)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_header_can_be_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/sequences/'))
+
+
+class GrpcTransportTimingTests(SimpleTestCase):
+    """Con gRPC se separa el tiempo del servidor del transporte"""
+
+    @override_settings(USE_GRPC_SEARCH=True, SEARCH_COST_ROUTING=False)
+    def test_grpc_server_and_transport(self):
+        response = MagicMock(matches=[], total_matches=0, search_time_ms=0.5, algorithm_used="kmp")
+        client = MagicMock(address="fake:1")
+        client.search.return_value = response
+        with patch('search_api.services.get_grpc_client', return_value=client), collect() as timings:
+            run_search("ATGC" * 10, "ATG")
+        self.assertEqual(timings.ms('grpc_server'), 0.5)
+        self.assertGreaterEqual(timings.ms('grpc_transport'), 0.0)
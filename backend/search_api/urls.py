@@ -1,8 +1,23 @@
 from django.urls import path
 
-from .views import SearchJobDetailView, SearchView
+from .views import (
+    BatchSearchView,
+    QueueStatsView,
+    SearchJobCancelView,
+    SearchJobDetailView,
+    SearchJobEventsView,
+    SearchExplainView,
+    SearchJobExplainView,
+    SearchView,
+)
 
 urlpatterns = [
     path('search/', SearchView.as_view(), name='search'),
+    path('search/explain/', SearchExplainView.as_view(), name='search-explain'),
+    path('search/batch/', BatchSearchView.as_view(), name='search-batch'),
     path('search/jobs/<int:pk>/', SearchJobDetailView.as_view(), name='search-job-detail'),
+    path('search/jobs/<int:pk>/events/', SearchJobEventsView.as_view(), name='search-job-events'),
+    path('search/jobs/<int:pk>/explain/', SearchJobExplainView.as_view(), name='search-job-explain'),
+    path('search/jobs/<int:pk>/cancel/', SearchJobCancelView.as_view(), name='search-job-cancel'),
+    path('search/queue/', QueueStatsView.as_view(), name='search-queue-stats'),
 ]
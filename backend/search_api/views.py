@@ -1,105 +1,402 @@
-from django.db import transaction
+import json
+import time
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.views import View
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from config.timing import span
+from config.tracing import current_traceparent
+from sequences_api.cache import load_sequence_text
 from sequences_api.models import DNASequence
-from .models import SearchJob, SearchResult
-from .serializers import SearchJobSerializer, SearchRequestSerializer, SearchResultSerializer
-from .services import run_search
+from .cancellation import REASON_TIMEOUT, SearchCancelled, cancel_local
+from .deletion import delete_jobs
+from .explain import compare_with_actual, explain_search
+from .jobs import MODE_ASYNC, execute_job, execution_mode, observe_job
+from .models import SearchJob
+from .pagination import paginate_results
+from .persistence import ResultWriter
+from .progress import notifier, progress_from_job
+from .scheduling import classify, client_identity, estimate_cost_ms, queue_stats
+from .result_store import read_results
+from .serializers import (
+    BatchSearchRequestSerializer,
+    SearchJobSerializer,
+    SearchRequestSerializer,
+    SearchResultSerializer,
+)
+from .services import run_batch_search
+
+
+def _complete_job(job, result_data):
+    job.mark_as_completed(
+        total_matches=result_data['total_matches'],
+        search_time_ms=result_data['search_time_ms'],
+        algorithm_used=result_data['algorithm_used'],
+        route=result_data.get('route'),
+        predicted_cost_ms=result_data.get('predicted_cost_ms'),
+        actual_cost_ms=result_data.get('actual_cost_ms'),
+    )
+
+
+def _persist_job_results(job, result_data):
+    """Guarda las coincidencias del job y lo marca como completado."""
+    with ResultWriter(job) as writer:
+        for match in result_data['matches']:
+            writer.add(match)
+    _complete_job(job, result_data)
 
 
 class SearchView(APIView):
     """
-    Endpoint de búsqueda inicial (sin microservicio, búsqueda local naive).
+    Endpoint de búsqueda.
+
+    En modo síncrono ejecuta la búsqueda dentro de la petición y devuelve los
+    primeros resultados. En modo asíncrono (`mode: "async"` o
+    SEARCH_EXECUTION_MODE) crea el job PENDING, responde 202 y un worker
+    (`manage.py search_worker`) lo ejecuta; el cliente consulta el detalle del job.
+
+    Cada etapa (validación, carga de la secuencia, alta del job, motor,
+    escritura y lectura de resultados, serialización) se mide con
+    config.timing y sale en la cabecera Server-Timing.
     """
 
     def post(self, request, *args, **kwargs):
         req_serializer = SearchRequestSerializer(data=request.data)
-        if not req_serializer.is_valid():
+        with span('validate'):
+            valid = req_serializer.is_valid()
+        if not valid:
             return Response(req_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         sequence_id = req_serializer.validated_data['sequence_id']
         pattern = req_serializer.validated_data['pattern']
         allow_overlapping = req_serializer.validated_data['allow_overlapping']
+        mode = req_serializer.validated_data.get('mode') or execution_mode()
+        timeout_seconds = req_serializer.validated_data.get('timeout_seconds')
 
-        sequence = DNASequence.objects.get(pk=sequence_id)
+        # El texto lo carga execute_job desde la caché de secuencias
+        with span('sequence_fetch'):
+            sequence = DNASequence.objects.defer('sequence').get(pk=sequence_id)
 
-        # Creamos el job y ejecutamos búsqueda local en la misma petición
-        job = SearchJob.objects.create(
-            sequence=sequence,
-            pattern=pattern,
-            allow_overlapping=allow_overlapping,
-            status='PROCESSING',
-        )
+        with span('plan'):
+            # El líder lo busca lead_or_follow al ejecutar (ver explain.py)
+            plan = explain_search(sequence, pattern, allow_overlapping,
+                                  req_serializer.validated_data.get('priority'), lookup_leader=False)
 
-        try:
-            import time
-            t0 = time.perf_counter()
-            result_data = run_search(sequence.sequence, pattern, allow_overlapping)
-            end_to_end_ms = (time.perf_counter() - t0) * 1000
-            matches = result_data['matches']
-
-            # Guardamos resultados asociados al job
-            with transaction.atomic():
-                SearchResult.objects.bulk_create([
-                    SearchResult(
-                        job=job,
-                        position=match['position'],
-                        context_before=match['context_before'],
-                        context_after=match['context_after'],
-                    )
-                    for match in matches
-                ])
-
-                job.mark_as_completed(
-                    total_matches=result_data['total_matches'],
-                    search_time_ms=result_data['search_time_ms'],
-                    algorithm_used=result_data['algorithm_used'],
+        if mode == MODE_ASYNC:
+            estimated_cost_ms = estimate_cost_ms(sequence.length, pattern, sequence.gc_content)
+            with span('job_create'):
+                job = SearchJob.objects.create(
+                    sequence=sequence,
+                    pattern=pattern,
+                    allow_overlapping=allow_overlapping,
+                    status='PENDING',
+                    priority=classify(estimated_cost_ms, req_serializer.validated_data.get('priority')),
+                    client_id=client_identity(request._request),
+                    estimated_cost_ms=estimated_cost_ms,
+                    timeout_seconds=timeout_seconds,
+                    plan=plan,
+                    traceparent=current_traceparent(),
                 )
+            status_url = reverse('search-job-detail', kwargs={'pk': job.pk})
+            return Response(
+                {
+                    'job': SearchJobSerializer(job).data,
+                    'status_url': status_url,
+                    'events_url': reverse('search-job-events', kwargs={'pk': job.pk}),
+                },
+                status=status.HTTP_202_ACCEPTED,
+                headers={'Location': status_url},
+            )
 
+        # Creamos el job y ejecutamos la búsqueda en la misma petición
+        with span('job_create'):
+            job = SearchJob.objects.create(
+                sequence=sequence,
+                pattern=pattern,
+                allow_overlapping=allow_overlapping,
+                status='PROCESSING',
+                client_id=client_identity(request._request),
+                timeout_seconds=timeout_seconds,
+                started_at=timezone.now(),
+                plan=plan,
+            )
+
+        try:
+            result_data = execute_job(job)
+        except SearchCancelled as exc:
+            timed_out = exc.reason == REASON_TIMEOUT
+            return Response(
+                {'detail': str(exc), 'job': SearchJobSerializer(job).data},
+                status=status.HTTP_504_GATEWAY_TIMEOUT if timed_out else status.HTTP_409_CONFLICT,
+            )
         except Exception as exc:  # pylint: disable=broad-except
-            job.mark_as_failed(str(exc))
             return Response(
                 {'detail': f'Error durante la búsqueda: {exc}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
         # Serializamos respuesta con resumen y primeros resultados
-        job_data = SearchJobSerializer(job).data
-        top_results = SearchResultSerializer(job.results.all()[:100], many=True).data
+        with span('result_read'):
+            first_results = read_results(job, 0, 100)
+        with span('serialize'):
+            job_data = SearchJobSerializer(job).data
+            top_results = SearchResultSerializer(first_results, many=True).data
 
         return Response(
             {
                 'job': job_data,
                 'results': top_results,
-                'end_to_end_ms': end_to_end_ms,
+                'end_to_end_ms': result_data['end_to_end_ms'],
                 'search_time_ms': result_data.get('search_time_ms'),
             },
             status=status.HTTP_200_OK,
         )
 
 
-class SearchJobDetailView(generics.RetrieveAPIView):
+class BatchSearchView(APIView):
     """
-    Permite consultar un job y sus resultados (limitados).
+    Busca varios patrones en varias secuencias con una sola llamada al motor.
+    Crea un SearchJob por par (secuencia, patrón) y devuelve el resumen de cada uno.
     """
 
-    queryset = SearchJob.objects.all()
+    def post(self, request, *args, **kwargs):
+        req_serializer = BatchSearchRequestSerializer(data=request.data)
+        if not req_serializer.is_valid():
+            return Response(req_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        sequence_ids = req_serializer.validated_data['sequence_ids']
+        patterns = req_serializer.validated_data['patterns']
+        allow_overlapping = req_serializer.validated_data['allow_overlapping']
+
+        with span('sequence_fetch'):
+            sequences = DNASequence.objects.defer('sequence').in_bulk(sequence_ids)
+
+        t0 = time.perf_counter()
+        try:
+            with span('engine'):
+                pair_results = run_batch_search(
+                    {pk: load_sequence_text(sequences[pk]) for pk in sequence_ids},
+                    patterns,
+                    allow_overlapping,
+                )
+        except Exception as exc:  # pylint: disable=broad-except
+            return Response(
+                {'detail': f'Error durante la búsqueda: {exc}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        end_to_end_ms = (time.perf_counter() - t0) * 1000
+
+        results = []
+        for pair in pair_results:
+            job = SearchJob.objects.create(
+                sequence=sequences[pair['sequence_id']],
+                pattern=pair['pattern'],
+                allow_overlapping=allow_overlapping,
+                status='PROCESSING',
+            )
+            if pair['error']:
+                job.mark_as_failed(pair['error'])
+            else:
+                _persist_job_results(job, pair)
+            observe_job(job)
+            results.append({
+                'sequence_id': pair['sequence_id'],
+                'pattern': pair['pattern'],
+                'job_id': job.id,
+                'status': job.status,
+                'total_matches': job.total_matches,
+                'search_time_ms': job.search_time_ms,
+                'error': pair['error'],
+            })
+
+        return Response(
+            {
+                'results': results,
+                'total_pairs': len(results),
+                'end_to_end_ms': end_to_end_ms,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class SearchJobDetailView(generics.RetrieveDestroyAPIView):
+    """
+    Permite consultar un job y sus resultados, paginados por posición.
+
+    Parámetros: `limit` (máx. 500), `cursor` (valor de next_cursor/prev_cursor
+    de una respuesta anterior), `position_gte` y `position_lt`.
+
+    DELETE borra el job (cancelándolo si sigue activo), sus resultados y los
+    jobs coalescidos con él, por lotes (ver deletion.py).
+    """
+
+    queryset = SearchJob.objects.with_sequence_name()
     serializer_class = SearchJobSerializer
 
     def retrieve(self, request, *args, **kwargs):
         job = self.get_object()
-        limit = int(request.query_params.get('limit', 100))
-        limit = max(1, min(limit, 500))
-        results = SearchResultSerializer(job.results.all()[:limit], many=True).data
+        page = paginate_results(job, request.query_params)
+        results = SearchResultSerializer(page['results'], many=True).data
         job_data = self.get_serializer(job).data
         return Response(
             {
                 'job': job_data,
                 'results': results,
+                'next_cursor': page['next_cursor'],
+                'prev_cursor': page['prev_cursor'],
             },
             status=status.HTTP_200_OK,
         )
 
+    def destroy(self, request, *args, **kwargs):
+        pk = get_object_or_404(SearchJob.objects.only('pk'), pk=kwargs['pk']).pk
+        return Response({'id': pk, 'status': 'deleted', 'deleted': delete_jobs([pk])}, status=status.HTTP_200_OK)
+
+
+class SearchJobCancelView(APIView):
+    """
+    Cancela un job pendiente o en ejecución. La búsqueda en curso se detiene
+    (motor local o llamada gRPC) y sus resultados parciales se borran.
+    """
+
+    def post(self, request, pk, *args, **kwargs):
+        job = get_object_or_404(SearchJob.objects.with_sequence_name(), pk=pk)
+        if not job.cancel():
+            return Response(
+                {'detail': f'El job ya terminó con estado {job.status}.', 'job': SearchJobSerializer(job).data},
+                status=status.HTTP_409_CONFLICT,
+            )
+        # Si se ejecuta en este proceso, se detiene sin esperar al sondeo
+        cancel_local(job.pk)
+        notifier.finish(job.pk, job.status)
+        return Response({'job': SearchJobSerializer(job).data}, status=status.HTTP_200_OK)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _progress_payload(state) -> dict:
+    total = state.get('total_bytes') or 0
+    scanned = state.get('bytes_scanned') or 0
+    return {
+        'status': state['status'],
+        'bytes_scanned': scanned,
+        'total_bytes': total,
+        'percent': round(100.0 * scanned / total, 1) if total else None,
+        'matches': state.get('matches') or 0,
+        'eta_s': state.get('eta_s'),
+    }
+
+
+def _job_events(job, total_bytes):
+    """
+    Eventos `progress` mientras el job está activo y un `done` final con el
+    job serializado. Si el job se ejecuta en este proceso los eventos llegan
+    del notificador; si no, se lee el job cada SEARCH_EVENTS_DB_POLL_SECONDS.
+    """
+    db_poll = getattr(settings, "SEARCH_EVENTS_DB_POLL_SECONDS", 2.0)
+    heartbeat = getattr(settings, "SEARCH_EVENTS_HEARTBEAT_SECONDS", 15.0)
+
+    yield f"retry: {int(db_poll * 1000)}\n\n"
+    local = notifier.get(job.pk)
+    state = local or progress_from_job(job, total_bytes)
+    version = local['version'] if local else 0
+    last_sent = None
+    quiet = 0.0
+    while True:
+        if state['status'] not in SearchJob.ACTIVE_STATUSES:
+            job.refresh_state()
+            if job.status not in SearchJob.ACTIVE_STATUSES:
+                yield _sse('progress', _progress_payload(progress_from_job(job, total_bytes)))
+                yield _sse('done', SearchJobSerializer(job).data)
+                return
+            state = progress_from_job(job, total_bytes)
+
+        payload = _progress_payload(state)
+        if payload != last_sent:
+            yield _sse('progress', payload)
+            last_sent = payload
+            quiet = 0.0
+
+        t0 = time.monotonic()
+        update = notifier.wait(job.pk, version, db_poll)
+        quiet += time.monotonic() - t0
+        if update is not None:
+            version = update['version']
+            state = update
+            continue
+        if quiet >= heartbeat:
+            yield ": keepalive\n\n"
+            quiet = 0.0
+        else:
+            local = notifier.get(job.pk)
+            if local is not None and local['status'] in SearchJob.ACTIVE_STATUSES:
+                continue  # job de este proceso sin novedades: no hace falta leer la BD
+        job.refresh_state()
+        state = progress_from_job(job, total_bytes)
+
+
+class SearchJobEventsView(View):
+    """
+    Stream Server-Sent Events con el progreso de un job (bytes recorridos,
+    coincidencias hasta ahora, ETA) y su estado final, para no tener que
+    consultar GET /api/search/jobs/{id}/ en bucle.
+    """
+
+    def get(self, request, pk, *args, **kwargs):
+        job = get_object_or_404(SearchJob.objects.with_sequence_name(), pk=pk)
+        total_bytes = job.sequence.length
+        response = StreamingHttpResponse(_job_events(job, total_bytes), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class SearchExplainView(APIView):
+    """
+    Plan de una búsqueda sin ejecutarla: ruta (local, gRPC o pool de
+    afinidad), motor, acierto en la caché de secuencias o job idéntico en
+    curso, y coincidencias, tiempo y memoria estimados. Acepta el mismo
+    cuerpo que POST /api/search/ y no crea ningún job.
+    """
+
+    def post(self, request, *args, **kwargs):
+        req_serializer = SearchRequestSerializer(data=request.data)
+        if not req_serializer.is_valid():
+            return Response(req_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = req_serializer.validated_data
+        sequence = DNASequence.objects.defer('sequence').get(pk=data['sequence_id'])
+        plan = explain_search(sequence, data['pattern'], data['allow_overlapping'], data.get('priority'))
+        return Response(plan, status=status.HTTP_200_OK)
+
+
+class SearchJobExplainView(APIView):
+    """
+    Plan guardado al crear el job frente a lo medido en la ejecución
+    (ruta, coincidencias, tiempo y caché), cuando el job ha terminado.
+    """
+
+    def get(self, request, pk, *args, **kwargs):
+        job = get_object_or_404(SearchJob, pk=pk)
+        return Response(compare_with_actual(job), status=status.HTTP_200_OK)
+
+
+class QueueStatsView(APIView):
+    """
+    Estado de la cola asíncrona: jobs pendientes y en ejecución por clase de
+    prioridad, tiempos de espera recientes y jobs en curso por cliente.
+    """
+
+    def get(self, request, *args, **kwargs):
+        return Response(queue_stats(), status=status.HTTP_200_OK)
+
 # Create your views here.
@@ -0,0 +1,124 @@
+"""
+Pool local de workers para los jobs asíncronos.
+
+Cada hilo del pool reclama jobs PENDING de la tabla search_jobs (ver jobs.py)
+y los ejecuta. No hace falta broker externo: basta con lanzar uno o varios
+procesos `python manage.py search_worker`. Las búsquedas locales en Python
+están limitadas por el GIL, así que para repartirlas entre núcleos conviene
+lanzar varios procesos en lugar de subir la concurrencia de uno solo.
+"""
+
+import logging
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from django.conf import settings
+from django.db import connection
+
+from config.sampling import profiler_enabled, sampler
+from config.tracing import start_trace, trace_db, tracing_enabled
+from .cancellation import SearchCancelled
+from .jobs import claim_next_job, execute_job, requeue_stale_jobs
+
+log = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@contextmanager
+def _job_trace(job) -> Iterator[None]:
+    """Con TRACING, continúa la traza de la petición que creó el job."""
+    if not tracing_enabled():
+        yield
+        return
+    with start_trace('job_search', job.traceparent or None, kind='consumer', **{'job.id': job.pk}), trace_db():
+        yield
+
+
+class SearchWorker:
+    """
+    Ejecuta jobs pendientes con `concurrency` hilos.
+
+    Con once=True cada hilo termina cuando la cola queda vacía (útil en
+    pruebas y en ejecuciones tipo cron); si no, espera `poll_interval`
+    segundos entre consultas hasta que se llama a stop().
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, poll_interval: Optional[float] = None,
+                 worker_id: Optional[str] = None):
+        self.concurrency = max(1, concurrency or getattr(settings, "SEARCH_WORKER_CONCURRENCY", 1))
+        self.poll_interval = (
+            poll_interval if poll_interval is not None
+            else getattr(settings, "SEARCH_WORKER_POLL_SECONDS", 1.0)
+        )
+        self.worker_id = worker_id or default_worker_id()
+        self.processed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def run(self, once: bool = False):
+        """Arranca los hilos y espera a que terminen."""
+        requeue_stale_jobs()
+        self.start(once)
+        self.join()
+
+    def start(self, once: bool = False):
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._loop, args=(f"{self.worker_id}/{i}", once),
+                             name=f"search-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout: Optional[float] = None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _loop(self, slot_id: str, once: bool):
+        try:
+            while not self._stop.is_set():
+                if not self.run_one(slot_id):
+                    if once:
+                        break
+                    self._stop.wait(self.poll_interval)
+        finally:
+            connection.close()
+
+    def run_one(self, slot_id: Optional[str] = None) -> bool:
+        """Reclama y ejecuta un job. Devuelve False si la cola estaba vacía."""
+        job = claim_next_job(slot_id or self.worker_id)
+        if job is None:
+            return False
+        tracked = sampler.begin() if profiler_enabled() else None
+        try:
+            with _job_trace(job):
+                execute_job(job)
+        except SearchCancelled as exc:
+            log.info("Job %s detenido en %s: %s", job.pk, slot_id, exc)
+            with self._lock:
+                self.cancelled += 1
+        except Exception as exc:  # pylint: disable=broad-except
+            log.error("Job %s fallido en %s: %s", job.pk, slot_id, exc)
+            with self._lock:
+                self.failed += 1
+        else:
+            log.info("Job %s completado en %s", job.pk, slot_id)
+        finally:
+            if tracked is not None:
+                sampler.end(tracked, 'job_search')
+        with self._lock:
+            self.processed += 1
+        return True
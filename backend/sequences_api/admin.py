@@ -9,3 +9,31 @@ class DNASequenceAdmin(admin.ModelAdmin):
     search_fields = ('name', 'file_hash')
     list_filter = ('uploaded_at',)
     ordering = ('-uploaded_at',)
+
+    def get_queryset(self, request):
+        # El texto se carga solo al abrir el formulario, no en listados ni borrados
+        return super().get_queryset(request).defer('sequence')
+
+    # Borrado por lotes de claves (ver search_api/deletion.py).
+    # search_api depende de esta app: se importa al usarlo, no al cargar el módulo
+    def get_deleted_objects(self, objs, request):
+        from search_api.deletion import admin_deleted_objects
+        from search_api.models import SearchJob
+
+        jobs = SearchJob.objects.filter(sequence__in=[obj.pk for obj in objs])
+        return admin_deleted_objects(objs, request, jobs)
+
+    def delete_model(self, request, obj):
+        self._delete([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        self._delete(list(queryset.values_list('pk', flat=True)))
+
+    def _delete(self, ids):
+        from search_api.deletion import delete_in_background, delete_sequence_in_background, delete_sequences
+
+        if delete_in_background():
+            for pk in ids:
+                delete_sequence_in_background(pk)
+        else:
+            delete_sequences(ids)
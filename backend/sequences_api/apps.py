@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SequencesApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sequences_api'
+
+    def ready(self):
+        # Registra la invalidación de la caché de secuencias
+        from . import cache  # noqa: F401
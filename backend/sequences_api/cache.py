@@ -0,0 +1,258 @@
+"""
+Caché por proceso del texto de las secuencias.
+
+Las búsquedas cargan los metadatos de la secuencia sin la columna `sequence`
+(defer) y piden el texto a esta caché, de modo que buscar muchas veces en la
+misma referencia no vuelve a leer el texto completo de la base de datos.
+
+- Clave (id, file_hash): si el contenido de una secuencia cambiara, el hash
+  sería otro y nunca se serviría texto obsoleto.
+- Presupuesto en bytes (SEQUENCE_CACHE_MAX_BYTES, 0 = sin caché) con
+  expulsión LRU. Una secuencia mayor que el presupuesto no se guarda.
+- Se invalida al guardar o borrar la secuencia (señales post_save/post_delete;
+  QuerySet.update() no las emite). Cada proceso tiene su propia caché: un
+  borrado en otro proceso solo deja una entrada inútil hasta que se expulse.
+
+Con SEQUENCE_CACHE_BACKEND = "shared", open_sequence sirve en cambio una
+proyección mmap compartida entre procesos (ver shared_cache.py).
+"""
+
+import logging
+import mmap
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from config.metrics import registry
+from config.timing import span
+from .models import DNASequence
+from .shared_cache import get_shared_store, shared_cache_available
+
+log = logging.getLogger(__name__)
+
+CacheKey = Tuple[int, str]
+
+BACKEND_LOCAL = "local"
+BACKEND_SHARED = "shared"
+
+CACHE_REQUESTS = registry.counter(
+    'dna_sequence_cache_requests_total', 'Consultas a las cachés de secuencias', ['cache', 'result'],
+)
+CACHE_EVICTIONS = registry.counter('dna_sequence_cache_evictions_total', 'Secuencias expulsadas', ['cache'])
+CACHE_BYTES = registry.gauge('dna_sequence_cache_bytes', 'Bytes ocupados por las cachés de secuencias', ['cache'])
+CACHE_ENTRIES = registry.gauge('dna_sequence_cache_entries', 'Secuencias guardadas en las cachés', ['cache'])
+
+
+def cache_budget_bytes() -> int:
+    return getattr(settings, "SEQUENCE_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+
+
+def cache_backend() -> str:
+    backend = getattr(settings, "SEQUENCE_CACHE_BACKEND", BACKEND_LOCAL)
+    if backend == BACKEND_SHARED and not shared_cache_available():
+        log.warning("Caché compartida de secuencias no disponible en esta plataforma; se usa la local")
+        return BACKEND_LOCAL
+    return backend
+
+
+class SequenceCache:
+    """
+    LRU de textos de secuencia con presupuesto en bytes. Segura entre hilos.
+    Aciertos, fallos y expulsiones se exportan en /metrics con la etiqueta `name`.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, name: str = BACKEND_LOCAL):
+        self.name = name
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, Tuple[str, int]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_bytes(self) -> int:
+        return cache_budget_bytes() if self._max_bytes is None else self._max_bytes
+
+    def get(self, pk: int, file_hash: str) -> Optional[str]:
+        key = (pk, file_hash)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        CACHE_REQUESTS.inc(cache=self.name, result='miss' if entry is None else 'hit')
+        return None if entry is None else entry[0]
+
+    def put(self, pk: int, file_hash: str, text: str):
+        size = sys.getsizeof(text)
+        budget = self.max_bytes
+        if size > budget:
+            return
+        key = (pk, file_hash)
+        evicted = 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (text, size)
+            self.bytes += size
+            while self.bytes > budget:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                evicted += 1
+            self.evictions += evicted
+        if evicted:
+            CACHE_EVICTIONS.inc(evicted, cache=self.name)
+
+    def peek(self, pk: int, file_hash: str) -> Optional[str]:
+        """Como get pero sin contar como acierto o fallo."""
+        key = (pk, file_hash)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        return None if entry is None else entry[0]
+
+    def contains(self, pk: int, file_hash: str) -> bool:
+        """Si está en caché, sin contar como acierto o fallo ni cambiar el orden LRU."""
+        with self._lock:
+            return (pk, file_hash) in self._entries
+
+    def invalidate(self, pk: int):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == pk]:
+                self.bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else None,
+            }
+
+
+sequence_cache = SequenceCache()
+
+
+def load_sequence_text(sequence: DNASequence) -> str:
+    """
+    Texto de `sequence`. Si la instancia ya lo trae cargado se usa tal cual
+    (y se guarda en la caché); si se cargó con defer('sequence') se busca en
+    la caché y, si no está, se lee solo esa columna.
+    """
+    if 'sequence' not in sequence.get_deferred_fields():
+        if cache_budget_bytes():
+            sequence_cache.put(sequence.pk, sequence.file_hash, sequence.sequence)
+        return sequence.sequence
+
+    if not cache_budget_bytes():
+        return _read_text(sequence.pk)
+    text = sequence_cache.get(sequence.pk, sequence.file_hash)
+    if text is None:
+        text = _read_text(sequence.pk)
+        sequence_cache.put(sequence.pk, sequence.file_hash, text)
+    return text
+
+
+def _read_text(pk: int) -> str:
+    with span('sequence_text'):
+        return DNASequence.objects.values_list('sequence', flat=True).get(pk=pk)
+
+
+@contextmanager
+def open_sequence(sequence: DNASequence) -> Iterator[Union[str, mmap.mmap]]:
+    """
+    Datos de la secuencia para el motor de búsqueda, válidos dentro del
+    bloque: el texto (caché local) o una proyección mmap de solo lectura
+    de los bytes ASCII (caché compartida), sin copiarla al proceso.
+    """
+    if cache_backend() != BACKEND_SHARED or 'sequence' not in sequence.get_deferred_fields():
+        yield load_sequence_text(sequence)
+        return
+    store = get_shared_store()
+    with store.open(sequence.pk, sequence.file_hash, lambda: _read_text(sequence.pk)) as data:
+        yield data
+
+
+@contextmanager
+def cached_sequence(sequence: DNASequence) -> Iterator[Optional[Union[str, mmap.mmap]]]:
+    """
+    Como open_sequence pero sin ir a la BD: el texto o la proyección si la
+    instancia ya lo trae o está en alguna caché, None si no. Para leer
+    tramos sueltos (el contexto de los resultados) sin cargar la secuencia.
+    """
+    if 'sequence' not in sequence.get_deferred_fields():
+        yield sequence.sequence
+        return
+    if cache_backend() == BACKEND_SHARED:
+        with get_shared_store().peek(sequence.pk, sequence.file_hash) as data:
+            if data is not None:
+                yield data
+                return
+    yield sequence_cache.peek(sequence.pk, sequence.file_hash) if cache_budget_bytes() else None
+
+
+def is_sequence_cached(sequence: DNASequence) -> bool:
+    """Si open_sequence() encontraría el texto sin leerlo de la BD (sin contar como acceso)."""
+    if 'sequence' not in sequence.get_deferred_fields():
+        return True
+    if cache_backend() == BACKEND_SHARED:
+        return get_shared_store().contains(sequence.pk, sequence.file_hash)
+    return bool(cache_budget_bytes()) and sequence_cache.contains(sequence.pk, sequence.file_hash)
+
+
+def _export_gauges():
+    """Tamaño de las cachés de este proceso para /metrics."""
+    with sequence_cache._lock:
+        CACHE_BYTES.set(sequence_cache.bytes, cache=BACKEND_LOCAL)
+        CACHE_ENTRIES.set(len(sequence_cache._entries), cache=BACKEND_LOCAL)
+    if cache_backend() == BACKEND_SHARED:
+        shared = get_shared_store().stats()
+        CACHE_BYTES.set(shared['bytes'], cache=BACKEND_SHARED)
+        CACHE_ENTRIES.set(shared['segments'], cache=BACKEND_SHARED)
+
+
+registry.on_collect(_export_gauges)
+
+
+def cache_stats() -> Dict:
+    """Contadores de la caché local y, si está activa, de la compartida."""
+    stats = sequence_cache.stats()
+    stats['backend'] = cache_backend()
+    stats['shared'] = get_shared_store().stats() if stats['backend'] == BACKEND_SHARED else None
+    return stats
+
+
+def invalidate_sequence(sequence_id: int):
+    """Descarta la secuencia de las cachés (también tras borrarla sin señales)."""
+    sequence_cache.invalidate(sequence_id)
+    if cache_backend() == BACKEND_SHARED:
+        get_shared_store().invalidate(sequence_id)
+
+
+@receiver(post_save, sender=DNASequence)
+@receiver(post_delete, sender=DNASequence)
+def _invalidate_sequence(sender, instance, **kwargs):
+    invalidate_sequence(instance.pk)
@@ -4,6 +4,7 @@ import io
 from django.utils import timezone
 from rest_framework import serializers
 
+from config.timing import span
 from .models import DNASequence
 from .validators import normalize_sequence, validate_dna_sequence
 
@@ -67,25 +68,30 @@ class DNASequenceUploadSerializer(serializers.Serializer):
         file = validated_data['file']
         provided_name = validated_data.get('name')
         seq_column = validated_data.get('sequence_column') or None
-        content = file.read()
-        file_hash = hashlib.sha256(content).hexdigest()
+        with span('read'):
+            content = file.read()
+        with span('hash'):
+            file_hash = hashlib.sha256(content).hexdigest()
 
         # Evitar duplicados: si ya existe, devolvemos la instancia
-        existing = DNASequence.objects.filter(file_hash=file_hash).first()
+        with span('dedup'):
+            existing = DNASequence.objects.filter(file_hash=file_hash).first()
         if existing:
             self.was_created = False
             return existing
 
-        raw_text = content.decode('utf-8', errors='ignore')
-        sequence = self._parse_sequence(raw_text, seq_column)
+        with span('parse'):
+            raw_text = content.decode('utf-8', errors='ignore')
+            sequence = self._parse_sequence(raw_text, seq_column)
 
         name = provided_name or getattr(file, 'name', 'dna_sequence')
-        instance = DNASequence.objects.create(
-            name=name,
-            sequence=sequence,
-            length=len(sequence),
-            uploaded_at=timezone.now(),
-            file_hash=file_hash,
-        )
+        with span('db_insert'):
+            instance = DNASequence.objects.create(
+                name=name,
+                sequence=sequence,
+                length=len(sequence),
+                uploaded_at=timezone.now(),
+                file_hash=file_hash,
+            )
         self.was_created = True
         return instance
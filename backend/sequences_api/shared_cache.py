@@ -0,0 +1,266 @@
+"""
+Caché de secuencias compartida entre los procesos de un mismo host.
+
+Con varios workers (gunicorn pre-fork, search_worker) la caché por proceso
+(cache.py) guarda una copia de cada secuencia en cada proceso. Aquí cada
+secuencia se escribe una sola vez en un fichero de SEQUENCE_SHM_DIR (por
+defecto en /dev/shm, es decir, en memoria) y los procesos lo proyectan con
+mmap en solo lectura: todos leen las mismas páginas sin copiarlas, y la
+memoria no crece con el número de workers.
+
+Coordinación con bloqueos de fichero (fcntl.flock), sin proceso aparte:
+- Reserva: quien no encuentra una secuencia toma el bloqueo exclusivo de
+  `.lock`, vuelve a comprobar, la lee de la BD y la publica con rename
+  atómico; así solo un proceso la lee de la BD aunque falle en varios a la vez.
+- Referencias: cada proyección abierta mantiene un bloqueo compartido sobre
+  su fichero. El sistema operativo lleva la cuenta y la libera aunque el
+  proceso muera.
+- Expulsión: con `.lock` tomado, se borran las secuencias usadas hace más
+  tiempo hasta volver al presupuesto (SEQUENCE_SHM_MAX_BYTES), saltando las
+  que alguien tiene abiertas (su bloqueo exclusivo no bloqueante falla).
+
+Requiere fcntl (POSIX); sin él se usa la caché por proceso.
+"""
+
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+from django.conf import settings
+
+from config.metrics import registry
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".seq"
+
+# Mismas métricas que la caché por proceso (cache.py), con cache="shared"
+_REQUESTS = registry.counter(
+    'dna_sequence_cache_requests_total', 'Consultas a las cachés de secuencias', ['cache', 'result'],
+)
+_EVICTIONS = registry.counter('dna_sequence_cache_evictions_total', 'Secuencias expulsadas', ['cache'])
+
+# Como mucho una actualización de la fecha de uso (orden LRU) por segmento y proceso en este intervalo
+_TOUCH_INTERVAL_SECONDS = 5.0
+
+
+def shared_cache_available() -> bool:
+    return fcntl is not None
+
+
+def default_directory() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "dna-sequences")
+
+
+class SharedSequenceStore:
+    """Coordinador de los segmentos de secuencia compartidos en `directory`."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        if fcntl is None:
+            raise RuntimeError("La caché compartida de secuencias necesita fcntl (POSIX)")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock_path = os.path.join(directory, ".lock")
+        self._counters_lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, pk: int, file_hash: str) -> str:
+        return os.path.join(self.directory, f"{pk}-{file_hash}{SEGMENT_SUFFIX}")
+
+    def contains(self, pk: int, file_hash: str) -> bool:
+        """Si el segmento ya está publicado (sin contar como acierto ni fallo)."""
+        return os.path.exists(self._path(pk, file_hash))
+
+    def _incr(self, name: str):
+        with self._counters_lock:
+            setattr(self, name, getattr(self, name) + 1)
+        if name == 'evictions':
+            _EVICTIONS.inc(cache='shared')
+        else:
+            _REQUESTS.inc(cache='shared', result='hit' if name == 'hits' else 'miss')
+
+    @contextmanager
+    def _coordinator(self):
+        with open(self._lock_path, "a+b") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _touch(self, path: str):
+        now = time.monotonic()
+        if now - self._touched.get(path, 0.0) < _TOUCH_INTERVAL_SECONDS:
+            return
+        self._touched[path] = now
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def _map(self, path: str) -> Iterator[Optional[mmap.mmap]]:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            yield None
+            return
+        try:
+            # La referencia: mientras dure, nadie puede expulsar el segmento
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            if os.fstat(fd).st_size == 0:
+                yield b""
+                return
+            mapped = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            try:
+                yield mapped
+            finally:
+                mapped.close()
+        finally:
+            os.close(fd)  # libera también el bloqueo
+
+    @contextmanager
+    def peek(self, pk: int, file_hash: str) -> Iterator[Optional[mmap.mmap]]:
+        """Proyección de la secuencia si ya está publicada (None si no), sin publicarla ni contar el acceso."""
+        path = self._path(pk, file_hash)
+        with self._map(path) as mapped:
+            if mapped is not None:
+                self._touch(path)
+            yield mapped
+
+    @contextmanager
+    def open(self, pk: int, file_hash: str, load: Callable[[], str]):
+        """
+        Proyección de solo lectura de la secuencia. Si no está publicada, la
+        publica con `load()` (p. ej. la lectura de la BD) una sola vez entre
+        todos los procesos.
+        """
+        path = self._path(pk, file_hash)
+        with self._map(path) as mapped:
+            if mapped is not None:
+                self._incr('hits')
+                self._touch(path)
+                yield mapped
+                return
+
+        self._incr('misses')
+        with self._coordinator():
+            if not os.path.exists(path):
+                self._publish(path, load())
+                self._evict(keep=path)
+        with self._map(path) as mapped:
+            if mapped is None:
+                # Publicada por encima del presupuesto y ya expulsada: se sirve sin compartir
+                yield load()
+                return
+            yield mapped
+
+    def _publish(self, path: str, text: str):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(text.encode("ascii"))
+            os.rename(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _segments(self):
+        segments = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(SEGMENT_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    segments.append((stat.st_mtime, stat.st_size, entry.path))
+        return segments
+
+    def _try_remove(self, path: str) -> bool:
+        """Borra el segmento si nadie lo tiene proyectado."""
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return True
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        try:
+            os.unlink(path)
+        finally:
+            os.close(fd)
+        return True
+
+    def _evict(self, keep: Optional[str] = None):
+        segments = sorted(self._segments())
+        total = sum(size for _, size, _ in segments)
+        for _, size, path in segments:
+            if total <= self.max_bytes:
+                break
+            if path == keep and size <= self.max_bytes:
+                continue
+            if self._try_remove(path):
+                total -= size
+                self._incr('evictions')
+                log.info("Secuencia expulsada de la caché compartida: %s", os.path.basename(path))
+
+    def invalidate(self, pk: int):
+        """Quita las secuencias del id. Quien ya las tenga proyectadas las sigue leyendo hasta cerrarlas."""
+        prefix = f"{pk}-"
+        with self._coordinator():
+            for _, _, path in self._segments():
+                if os.path.basename(path).startswith(prefix):
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+
+    def stats(self) -> Dict:
+        segments = self._segments()
+        with self._counters_lock:
+            lookups = self.hits + self.misses
+            return {
+                'directory': self.directory,
+                'segments': len(segments),
+                'bytes': sum(size for _, size, _ in segments),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else None,
+            }
+
+
+_store: Optional[SharedSequenceStore] = None
+_store_lock = threading.Lock()
+
+
+def get_shared_store() -> SharedSequenceStore:
+    """Coordinador del proceso para el directorio y presupuesto configurados."""
+    global _store
+    directory = getattr(settings, "SEQUENCE_SHM_DIR", None) or default_directory()
+    max_bytes = getattr(settings, "SEQUENCE_SHM_MAX_BYTES", 1024 * 1024 * 1024)
+    with _store_lock:
+        if _store is None or _store.directory != directory:
+            _store = SharedSequenceStore(directory, max_bytes)
+        _store.max_bytes = max_bytes
+        return _store
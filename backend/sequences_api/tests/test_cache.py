@@ -0,0 +1,112 @@
+"""
+Pruebas de la caché de secuencias (sequences_api/cache.py)
+
+Cubre:
+- LRU con presupuesto en bytes y contadores
+- Clave (id, file_hash)
+- Invalidación al guardar y borrar
+- load_sequence_text con instancias diferidas
+- Endpoint GET /api/sequences/cache/
+"""
+
+import sys
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from sequences_api.cache import SequenceCache, load_sequence_text, sequence_cache
+from sequences_api.models import DNASequence
+
+
+class SequenceCacheTests(SimpleTestCase):
+    """Pruebas de la estructura LRU"""
+
+    def test_hit_and_miss_counters(self):
+        cache = SequenceCache(max_bytes=10_000)
+        self.assertIsNone(cache.get(1, "h1"))
+        cache.put(1, "h1", "ATG")
+        self.assertEqual(cache.get(1, "h1"), "ATG")
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+    def test_other_hash_is_a_miss(self):
+        cache = SequenceCache(max_bytes=10_000)
+        cache.put(1, "h1", "ATG")
+        self.assertIsNone(cache.get(1, "h2"))
+
+    def test_evicts_least_recently_used(self):
+        size = sys.getsizeof("A" * 100)
+        cache = SequenceCache(max_bytes=size * 2)
+        cache.put(1, "h1", "A" * 100)
+        cache.put(2, "h2", "C" * 100)
+        cache.get(1, "h1")
+        cache.put(3, "h3", "G" * 100)
+        self.assertIsNone(cache.get(2, "h2"))
+        self.assertIsNotNone(cache.get(1, "h1"))
+        self.assertIsNotNone(cache.get(3, "h3"))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertLessEqual(cache.stats()['bytes'], size * 2)
+
+    def test_larger_than_budget_not_cached(self):
+        cache = SequenceCache(max_bytes=10)
+        cache.put(1, "h1", "A" * 100)
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_invalidate(self):
+        cache = SequenceCache(max_bytes=10_000)
+        cache.put(1, "h1", "ATG")
+        cache.put(2, "h2", "ATG")
+        cache.invalidate(1)
+        self.assertIsNone(cache.get(1, "h1"))
+        self.assertEqual(cache.stats()['entries'], 1)
+
+
+class LoadSequenceTextTests(TestCase):
+    """Lectura del texto con la caché del proceso"""
+
+    def setUp(self):
+        sequence_cache.clear()
+        self.sequence = DNASequence.objects.create(name="cached", sequence="ATGC" * 100)
+        sequence_cache.clear()
+
+    def _deferred(self):
+        return DNASequence.objects.defer('sequence').get(pk=self.sequence.pk)
+
+    def test_second_read_hits_cache(self):
+        self.assertEqual(load_sequence_text(self._deferred()), "ATGC" * 100)
+        deferred = self._deferred()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(load_sequence_text(deferred), "ATGC" * 100)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(sequence_cache.stats()['hits'], 1)
+
+    def test_loaded_instance_fills_cache(self):
+        load_sequence_text(DNASequence.objects.get(pk=self.sequence.pk))
+        with CaptureQueriesContext(connection) as queries:
+            load_sequence_text(self._deferred())
+        self.assertEqual(len(queries), 1)  # solo la fila sin el texto
+
+    def test_save_and_delete_invalidate(self):
+        load_sequence_text(self._deferred())
+        self.sequence.name = "renamed"
+        self.sequence.save()
+        self.assertEqual(sequence_cache.stats()['entries'], 0)
+
+        load_sequence_text(self._deferred())
+        self.sequence.delete()
+        self.assertEqual(sequence_cache.stats()['entries'], 0)
+
+    @override_settings(SEQUENCE_CACHE_MAX_BYTES=0)
+    def test_disabled(self):
+        load_sequence_text(self._deferred())
+        load_sequence_text(self._deferred())
+        self.assertEqual(sequence_cache.stats()['entries'], 0)
+
+    def test_stats_endpoint(self):
+        load_sequence_text(self._deferred())
+        data = self.client.get('/api/sequences/cache/').json()
+        self.assertEqual(data['entries'], 1)
+        self.assertEqual(data['misses'], 1)
+        self.assertIn('evictions', data)
@@ -0,0 +1,152 @@
+"""
+Pruebas de la caché de secuencias compartida (sequences_api/shared_cache.py)
+
+Cubre:
+- Publicación única y proyección de solo lectura
+- Varios procesos: una sola lectura del origen y una sola copia en disco
+- Expulsión LRU que respeta las proyecciones abiertas
+- Invalidación
+- Búsquedas con SEQUENCE_CACHE_BACKEND = "shared"
+- Contexto de los resultados recortado de la proyección, sin leer la BD
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from sequences_api.cache import sequence_cache
+from sequences_api.models import DNASequence
+from sequences_api.shared_cache import SharedSequenceStore, shared_cache_available
+from search_api.jobs import execute_job
+from search_api.models import SearchJob
+from search_api.result_store import read_results
+
+
+def _open_in_child(directory, marker_path, results):
+    """Proceso hijo: abre la secuencia 1 y anota si tuvo que cargarla."""
+    store = SharedSequenceStore(directory, 1 << 20)
+
+    def load():
+        with open(marker_path, "a") as marker:
+            marker.write("x")
+        return "ATGC" * 1000
+
+    with store.open(1, "h", load) as data:
+        results.put(bytes(data[:8]))
+
+
+@unittest.skipUnless(shared_cache_available(), "requiere fcntl")
+class SharedSequenceStoreTests(SimpleTestCase):
+    """Pruebas del coordinador"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.store = SharedSequenceStore(self.directory, 1 << 20)
+
+    def test_publishes_once_and_maps_read_only(self):
+        loads = []
+
+        def load():
+            loads.append(1)
+            return "ATGCATGC"
+
+        with self.store.open(1, "h", load) as data:
+            self.assertEqual(bytes(data), b"ATGCATGC")
+            with self.assertRaises(TypeError):
+                data[0] = ord("T")
+        with self.store.open(1, "h", load) as data:
+            self.assertEqual(data.find(b"GCA"), 2)
+        self.assertEqual(len(loads), 1)
+        stats = self.store.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['segments']), (1, 1, 1))
+
+    def test_processes_share_one_copy(self):
+        marker = os.path.join(self.directory, "loads.txt")
+        ctx = multiprocessing.get_context("fork")
+        results = ctx.Queue()
+        children = [ctx.Process(target=_open_in_child, args=(self.directory, marker, results)) for _ in range(4)]
+        for child in children:
+            child.start()
+        for child in children:
+            child.join(10)
+            self.assertEqual(child.exitcode, 0)
+
+        self.assertEqual([results.get(timeout=5) for _ in children], [b"ATGCATGC"] * 4)
+        with open(marker) as f:
+            self.assertEqual(f.read(), "x")
+        self.assertEqual(self.store.stats()['segments'], 1)
+
+    def test_eviction_skips_open_segments(self):
+        store = SharedSequenceStore(self.directory, 2500)
+        with store.open(1, "a", lambda: "A" * 1000):
+            with store.open(2, "b", lambda: "C" * 1000):
+                pass
+            with store.open(3, "c", lambda: "G" * 1000) as data:
+                self.assertEqual(len(data), 1000)
+            names = sorted(os.listdir(self.directory))
+        self.assertIn("1-a.seq", names)
+        self.assertNotIn("2-b.seq", names)
+        self.assertIn("3-c.seq", names)
+        self.assertEqual(store.stats()['evictions'], 1)
+
+    def test_invalidate(self):
+        with self.store.open(7, "h", lambda: "ATG"):
+            pass
+        self.store.invalidate(7)
+        self.assertEqual(self.store.stats()['segments'], 0)
+
+
+@unittest.skipUnless(shared_cache_available(), "requiere fcntl")
+@override_settings(USE_GRPC_SEARCH=False, SEQUENCE_CACHE_BACKEND="shared")
+class SharedBackendSearchTests(TestCase):
+    """Búsquedas leyendo la secuencia proyectada"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.settings_override = override_settings(SEQUENCE_SHM_DIR=self.directory)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        sequence_cache.clear()
+        self.sequence = DNASequence.objects.create(name="shared", sequence="CCGATTACACC" * 100)
+
+    def _search(self, pattern):
+        job = SearchJob.objects.create(sequence=self.sequence, pattern=pattern, status='PROCESSING')
+        execute_job(SearchJob.objects.get(pk=job.pk))
+        job.refresh_from_db()
+        return job
+
+    def test_search_on_mapped_sequence(self):
+        job = self._search("GATTACA")
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertEqual(job.total_matches, 100)
+        first = read_results(job, 0, 1)[0]
+        self.assertEqual(first['position'], 2)
+        self.assertEqual(first['context_after'], "CCCCGATTAC")
+
+        self._search("TTAC")
+        data = self.client.get('/api/sequences/cache/').json()
+        self.assertEqual(data['backend'], "shared")
+        self.assertEqual((data['shared']['misses'], data['shared']['hits']), (1, 1))
+        self.assertEqual(data['entries'], 0)  # sin copia en la caché del proceso
+
+    def test_delete_invalidates(self):
+        self._search("GATTACA")
+        self.sequence.delete()
+        self.assertEqual(os.listdir(self.directory), [".lock"])
+
+    def test_context_from_mapped_sequence(self):
+        job = self._search("GATTACA")
+        job.sequence = DNASequence.objects.defer('sequence').get(pk=self.sequence.pk)
+        with CaptureQueriesContext(connection) as queries:
+            results = read_results(job, 0, 3)
+        self.assertEqual([r['position'] for r in results], [2, 13, 24])
+        self.assertEqual((results[1]['context_before'], results[1]['context_after']), ("ATTACACCCC", "CCCCGATTAC"))
+        self.assertFalse(any('SUBSTR' in q['sql'].upper() for q in queries.captured_queries))
@@ -1,8 +1,10 @@
 from django.urls import path
 
-from .views import DNASequenceListView, DNASequenceUploadView
+from .views import DNASequenceDetailView, DNASequenceListView, DNASequenceUploadView, SequenceCacheStatsView
 
 urlpatterns = [
     path('sequences/upload/', DNASequenceUploadView.as_view(), name='sequence-upload'),
     path('sequences/', DNASequenceListView.as_view(), name='sequence-list'),
+    path('sequences/<int:pk>/', DNASequenceDetailView.as_view(), name='sequence-detail'),
+    path('sequences/cache/', SequenceCacheStatsView.as_view(), name='sequence-cache-stats'),
 ]
@@ -1,24 +1,51 @@
+import time
+
+from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from config.metrics import registry
+from config.timing import span
+from .cache import cache_stats
 from .models import DNASequence
 from .serializers import DNASequenceSerializer, DNASequenceUploadSerializer
 
 
+UPLOAD_BYTES = registry.counter('dna_upload_bytes_total', 'Bytes de ficheros de secuencia recibidos')
+UPLOAD_SECONDS = registry.histogram(
+    'dna_upload_duration_seconds', 'Duración de las subidas de secuencias', ['outcome'],
+)
+
+
 class DNASequenceUploadView(APIView):
     """
     Endpoint para cargar una secuencia desde archivo CSV/FASTA/TXT.
     """
 
     def post(self, request, *args, **kwargs):
+        t0 = time.perf_counter()
+        upload = request.FILES.get('file')
+        if upload is not None:
+            UPLOAD_BYTES.inc(upload.size)
+
         serializer = DNASequenceUploadSerializer(data=request.data)
-        if not serializer.is_valid():
+        with span('validate'):
+            valid = serializer.is_valid()
+        if not valid:
+            UPLOAD_SECONDS.observe(time.perf_counter() - t0, outcome='invalid')
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        sequence = serializer.save()
+        try:
+            sequence = serializer.save()
+        except ValidationError:
+            UPLOAD_SECONDS.observe(time.perf_counter() - t0, outcome='invalid')
+            raise
         response_serializer = DNASequenceSerializer(sequence)
-        created = status.HTTP_201_CREATED if getattr(serializer, 'was_created', True) else status.HTTP_200_OK
+        was_created = getattr(serializer, 'was_created', True)
+        UPLOAD_SECONDS.observe(time.perf_counter() - t0, outcome='created' if was_created else 'duplicate')
+        created = status.HTTP_201_CREATED if was_created else status.HTTP_200_OK
         return Response(response_serializer.data, status=created)
 
 
@@ -27,7 +54,41 @@ class DNASequenceListView(generics.ListAPIView):
     Lista las secuencias almacenadas (paginable).
     """
 
-    queryset = DNASequence.objects.all().order_by('-uploaded_at')
+    # Sin el texto de la secuencia: el listado solo muestra sus metadatos
+    queryset = DNASequence.objects.defer('sequence').order_by('-uploaded_at')
     serializer_class = DNASequenceSerializer
 
+
+class DNASequenceDetailView(APIView):
+    """
+    Borra una secuencia con sus jobs y resultados por lotes (ver
+    search_api/deletion.py). Con `?background=true` (o
+    SEARCH_DELETE_BACKGROUND) responde 202 y el borrado sigue en un hilo.
+    """
+
+    def delete(self, request, pk, *args, **kwargs):
+        # search_api depende de esta app: importarlo al cargar el módulo haría un ciclo
+        from search_api.deletion import delete_in_background, delete_sequence, delete_sequence_in_background
+
+        get_object_or_404(DNASequence.objects.only('pk'), pk=pk)
+        background = request.query_params.get('background')
+        if background is None:
+            background = delete_in_background()
+        else:
+            background = background.lower() in ('1', 'true', 'yes')
+        if background:
+            delete_sequence_in_background(pk)
+            return Response({'id': pk, 'status': 'deleting'}, status=status.HTTP_202_ACCEPTED)
+        return Response({'id': pk, 'status': 'deleted', 'deleted': delete_sequence(pk)}, status=status.HTTP_200_OK)
+
+
+class SequenceCacheStatsView(APIView):
+    """
+    Estado de la caché de secuencias de este proceso: entradas, bytes,
+    aciertos, fallos y expulsiones, y en `shared` los de la caché compartida.
+    """
+
+    def get(self, request, *args, **kwargs):
+        return Response(cache_stats(), status=status.HTTP_200_OK)
+
 # Create your views here.
@@ -0,0 +1,154 @@
+"""
+Presupuestos de rendimiento por endpoint para la suite de tests.
+
+measure_usage() mide lo que cuesta un bloque de código:
+- `queries`: sentencias SQL ejecutadas (en todas las conexiones).
+- `db_bytes`: bytes aproximados de las filas leídas de la BD (longitud de
+  textos y binarios, 8 por número), para detectar columnas grandes que se
+  cargan sin necesidad, como el texto de una secuencia.
+- `peak_bytes`: pico de memoria de Python (tracemalloc) respecto al inicio.
+
+BudgetAssertions.assertWithinBudget() falla con el SQL ejecutado cuando
+alguna medida supera el Budget. Los datos se generan con build_dataset() a
+varias escalas: si un endpoint hace N+1 consultas o lee columnas enteras,
+el presupuesto se rompe al crecer la escala.
+"""
+
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from django.db import connections
+
+from search_api.models import SearchJob
+from search_api.result_store import write_positions
+from sequences_api.models import DNASequence
+
+# Bases de cada secuencia del conjunto de datos
+SEQUENCE_LENGTH = 20_000
+
+# Coincidencias del primer job por unidad de escala (el patrón aparece cada 8 bases)
+RESULTS_PER_SCALE = 20
+
+_FETCH_METHODS = ('fetchone', 'fetchmany', 'fetchall')
+
+
+@dataclass(frozen=True)
+class Budget:
+    queries: int
+    db_bytes: int
+    peak_bytes: int
+
+
+@dataclass
+class Usage:
+    queries: int = 0
+    db_bytes: int = 0
+    peak_bytes: int = 0
+    statements: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict:
+        return {'queries': self.queries, 'db_bytes': self.db_bytes, 'peak_bytes': self.peak_bytes}
+
+
+def _row_bytes(row) -> int:
+    total = 0
+    for value in row:
+        if value is None:
+            continue
+        if isinstance(value, (str, bytes, bytearray, memoryview)):
+            total += len(value)
+        else:
+            total += 8
+    return total
+
+
+def _count_rows(usage: Usage, rows, single: bool):
+    if rows is None:
+        return
+    usage.db_bytes += _row_bytes(rows) if single else sum(_row_bytes(row) for row in rows)
+
+
+def _instrument(cursor, usage: Usage):
+    """Cuenta las filas que se lean del cursor (CursorWrapper de Django)."""
+    if getattr(cursor, '_budget_usage', None) is None:
+        for name in _FETCH_METHODS:
+            fetch = getattr(cursor, name)
+
+            def counted(*args, _fetch=fetch, _single=name == 'fetchone', **kwargs):
+                rows = _fetch(*args, **kwargs)
+                if cursor._budget_usage is not None:
+                    _count_rows(cursor._budget_usage, rows, _single)
+                return rows
+
+            setattr(cursor, name, counted)
+    cursor._budget_usage = usage
+
+
+@contextmanager
+def measure_usage() -> Iterator[Usage]:
+    usage = Usage()
+    cursors = []
+
+    def wrapper(execute, sql, params, many, context):
+        usage.queries += 1
+        usage.statements.append(sql)
+        result = execute(sql, params, many, context)
+        _instrument(context['cursor'], usage)
+        cursors.append(context['cursor'])
+        return result
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(wrapper))
+            yield usage
+    finally:
+        usage.peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+        if started_tracing:
+            tracemalloc.stop()
+        for cursor in cursors:
+            cursor._budget_usage = None
+
+
+class BudgetAssertions:
+    """Mixin para TestCase."""
+
+    def assertWithinBudget(self, usage: Usage, budget: Budget, label: Optional[str] = None):
+        exceeded = [
+            f"{name}={getattr(usage, name)} (máx. {getattr(budget, name)})"
+            for name in ('queries', 'db_bytes', 'peak_bytes')
+            if getattr(usage, name) > getattr(budget, name)
+        ]
+        if exceeded:
+            statements = "\n".join(f"  {sql}" for sql in usage.statements)
+            self.fail(f"{label or 'Presupuesto'} excedido: {', '.join(exceeded)}\nSQL:\n{statements}")
+
+
+def build_dataset(scale: int) -> Dict:
+    """
+    `scale` secuencias de SEQUENCE_LENGTH bases, un job completado por
+    secuencia y RESULTS_PER_SCALE * scale coincidencias en el primero.
+    """
+    unit = "ACGTTGCA"
+    text = (unit * (SEQUENCE_LENGTH // len(unit) + 1))[:SEQUENCE_LENGTH]
+    sequences = DNASequence.objects.bulk_create(
+        DNASequence(name=f"seq-{index}.fasta", sequence=text, length=len(text), gc_content=50.0,
+                    file_hash=f"{index:064x}")
+        for index in range(scale)
+    )
+    jobs = SearchJob.objects.bulk_create(
+        SearchJob(sequence=sequence, pattern="ACGT", status='COMPLETED', total_matches=0)
+        for sequence in sequences
+    )
+    job = jobs[0]
+    positions = list(range(0, 8 * RESULTS_PER_SCALE * scale, 8))
+    write_positions(job, positions)
+    SearchJob.objects.filter(pk=job.pk).update(total_matches=len(positions))
+    return {'sequences': sequences, 'jobs': jobs, 'job': job}
@@ -6,17 +6,43 @@ Para ejecutar:
 
 Luego abrir http://localhost:8089 para la interfaz web
 
+Para cargar el transporte gRPC real sin el binario C++:
+    python backend/manage.py run_search_server --workers 8
+
 Escenarios:
 - Upload de secuencias
 - Búsqueda de patrones
 - Listado de secuencias
 - Carga mixta
+
+Al terminar se imprime el estado de la caché de secuencias del servidor
+(GET /api/sequences/cache/): con búsquedas repetidas sobre la misma
+secuencia, los fallos (lecturas del texto en BD) deben ser una fracción
+pequeña de las búsquedas.
 """
 
 import json
 import io
 import random
-from locust import HttpUser, task, between, SequentialTaskSet
+import urllib.request
+from locust import HttpUser, task, between, SequentialTaskSet, events
+
+
+@events.test_stop.add_listener
+def report_sequence_cache(environment, **kwargs):
+    """Imprime aciertos y fallos de la caché de secuencias del proceso que respondió."""
+    if not environment.host:
+        return
+    try:
+        with urllib.request.urlopen(f"{environment.host}/api/sequences/cache/", timeout=5) as response:
+            stats = json.loads(response.read())
+    except OSError as exc:
+        print(f"Caché de secuencias: no disponible ({exc})")
+        return
+    print(
+        f"Caché de secuencias: {stats['hits']} aciertos, {stats['misses']} lecturas en BD, "
+        f"{stats['evictions']} expulsiones, {stats['bytes']} bytes"
+    )
 
 
 class SequenceUploadTasks(SequentialTaskSet):
@@ -0,0 +1,197 @@
+"""
+Pruebas del banco de pruebas de rendimiento (backend/benchmarks)
+
+Cubre:
+- Genomas sintéticos deterministas: semilla, bloques, GC, repeticiones y tramos de N
+- FASTA generado por bloques, sin el genoma entero en memoria
+- Tamaños y patrones de muestra
+- Medición, selección de casos y ejecución de la suite en pequeño
+- Comparación con la línea base y JSON de resultados
+"""
+
+import json
+import os
+import tempfile
+from dataclasses import replace
+
+from django.test import SimpleTestCase, TestCase
+
+from benchmarks import genomes
+from benchmarks.cases import Case, NormalizeCase, SearchCase, UploadCase, default_cases
+from benchmarks.genomes import (
+    GenomeSpec,
+    format_size,
+    generate_genome,
+    iter_fasta,
+    iter_genome,
+    parse_size,
+    sample_pattern,
+    to_fasta,
+)
+from benchmarks.runner import (
+    STATUS_IMPROVEMENT,
+    STATUS_MISSING,
+    STATUS_NEW,
+    STATUS_OK,
+    STATUS_REGRESSION,
+    build_report,
+    compare,
+    load_report,
+    measure,
+    run_suite,
+    select_cases,
+    write_report,
+)
+
+
+class GenomeTests(SimpleTestCase):
+    """Generadores de genomas"""
+
+    def test_deterministic_per_seed(self):
+        spec = GenomeSpec(50_000, repeat_fraction=0.1, n_run_every=10_000, seed=7)
+        self.assertEqual(generate_genome(spec), generate_genome(spec))
+        self.assertNotEqual(generate_genome(spec), generate_genome(replace(spec, seed=8)))
+
+    def test_prefix_does_not_depend_on_size(self):
+        small = generate_genome(GenomeSpec(2_000, seed=3))
+        large = b"".join(iter_genome(GenomeSpec(genomes.BLOCK_SIZE + 10, seed=3))).decode()
+        self.assertEqual(large[:2_000], small)
+        self.assertEqual(len(large), genomes.BLOCK_SIZE + 10)
+
+    def test_streamed_fasta(self):
+        # Varios bloques y líneas que cruzan el límite entre bloques
+        spec = GenomeSpec(genomes.BLOCK_SIZE * 2 + 7, seed=5)
+        genome = generate_genome(spec)
+        for lowercase in (False, True):
+            streamed = b"".join(iter_fasta(spec, name="chr1", lowercase=lowercase)).decode()
+            self.assertEqual(streamed, to_fasta(genome, name="chr1", lowercase=lowercase))
+        self.assertEqual(b"".join(iter_fasta(GenomeSpec(0))), b">synthetic\n")
+
+    def test_upload_cases_skip_huge_genomes(self):
+        huge = GenomeSpec(parse_size("1gb"))
+        self.assertFalse(NormalizeCase().supports(huge))
+        self.assertFalse(UploadCase().supports(huge))
+        self.assertTrue(NormalizeCase().supports(GenomeSpec(parse_size("100mb"))))
+
+    def test_gc_bias(self):
+        for gc in (0.2, 0.6):
+            genome = generate_genome(GenomeSpec(200_000, gc=gc))
+            measured = (genome.count("G") + genome.count("C")) / len(genome)
+            self.assertAlmostEqual(measured, gc, delta=0.01)
+        self.assertEqual(set(generate_genome(GenomeSpec(10_000))), set("ACGT"))
+
+    def test_n_runs_and_repeats(self):
+        genome = generate_genome(GenomeSpec(200_000, n_run_every=20_000, n_run_length=50))
+        self.assertIn("N" * 50, genome)
+        self.assertAlmostEqual(genome.count("N") / len(genome), 50 / 20_000, delta=0.002)
+
+        plain = generate_genome(GenomeSpec(200_000, seed=1))
+        repetitive = generate_genome(GenomeSpec(200_000, repeat_fraction=0.3, repeat_unit=3, seed=1))
+        # Los tramos repetidos tienen periodo repeat_unit
+        def periodic_windows(genome):
+            return sum(genome[i:i + 60] == genome[i:i + 3] * 20 for i in range(0, len(genome) - 60, 50))
+
+        self.assertEqual(periodic_windows(plain), 0)
+        self.assertGreater(periodic_windows(repetitive), 100)
+
+    def test_sizes(self):
+        self.assertEqual(parse_size("1kb"), 1_000)
+        self.assertEqual(parse_size("2.5MB"), 2_500_000)
+        self.assertEqual(parse_size("1gb"), 1_000_000_000)
+        self.assertEqual(parse_size("123"), 123)
+        with self.assertRaises(ValueError):
+            parse_size("1tb")
+        self.assertEqual(format_size(10_000_000), "10mb")
+        self.assertEqual(format_size(1_500), "1500b")
+
+    def test_sample_pattern_is_present(self):
+        genome = generate_genome(GenomeSpec(20_000, n_run_every=1_000))
+        pattern = sample_pattern(genome, 20, seed=1)
+        self.assertIn(pattern, genome)
+        self.assertNotIn("N", pattern)
+        self.assertEqual(pattern, sample_pattern(genome, 20, seed=1))
+
+
+class _CountingCase(Case):
+    name = "counting"
+    group = "test"
+
+    def __init__(self):
+        super().__init__(kind="fake")
+        self.prepared = 0
+        self.runs = 0
+
+    def before_each(self):
+        self.prepared += 1
+
+    def run(self):
+        self.runs += 1
+        return self.runs
+
+
+class RunnerTests(SimpleTestCase):
+    """Medición, selección y comparación"""
+
+    def test_measure(self):
+        case = _CountingCase()
+        stats = measure(case, repeats=4, warmup=2)
+        self.assertEqual(stats['repeats'], 4)
+        self.assertEqual(case.runs, 6)
+        self.assertEqual(case.prepared, 6)
+        self.assertEqual(stats['output'], 6)
+        self.assertLessEqual(stats['min_s'], stats['median_s'])
+
+    def test_select_cases(self):
+        cases = default_cases("127.0.0.1:1")
+        self.assertEqual([c.key for c in select_cases(cases, ["search[engine=local*"])],
+                         ["search[engine=local,pattern=short]", "search[engine=local,pattern=long]",
+                          "search[engine=local,pattern=absent]"])
+        self.assertEqual({c.name for c in select_cases(cases, ["persistence", "normalize"])},
+                         {"persist", "normalize"})
+
+    def test_grpc_case_needs_server(self):
+        spec = GenomeSpec(1_000)
+        self.assertFalse(SearchCase("grpc", "short").supports(spec))
+        self.assertTrue(SearchCase("grpc", "short", "127.0.0.1:1").supports(spec))
+
+    def test_compare(self):
+        def report(**medians):
+            return {'results': {key: {'median_s': value} for key, value in medians.items()}}
+
+        rows = {row['key']: row for row in compare(
+            report(a=1.5, b=1.0, c=0.5, d=1.0),
+            report(a=1.0, b=1.05, c=1.0, e=1.0),
+            tolerance=0.10,
+        )}
+        self.assertEqual(rows['a']['status'], STATUS_REGRESSION)
+        self.assertAlmostEqual(rows['a']['ratio'], 1.5)
+        self.assertEqual(rows['b']['status'], STATUS_OK)
+        self.assertEqual(rows['c']['status'], STATUS_IMPROVEMENT)
+        self.assertEqual(rows['d']['status'], STATUS_NEW)
+        self.assertEqual(rows['e']['status'], STATUS_MISSING)
+
+
+class SuiteTests(TestCase):
+    """Suite completa sobre un genoma pequeño (sin servidor gRPC)"""
+
+    def test_run_and_report(self):
+        spec = GenomeSpec(0, n_run_every=500, seed=2)
+        results = run_suite([2_000], spec, default_cases(), repeats=2, warmup=0, log=lambda msg: None)
+
+        self.assertIn("normalize@2kb", results)
+        self.assertIn("upload@2kb", results)
+        self.assertIn("persist[storage=rows]@2kb", results)
+        self.assertIn("serialize@2kb", results)
+        self.assertNotIn("search[engine=grpc,pattern=short]@2kb", results)
+        self.assertEqual(results["search[engine=local,pattern=absent]@2kb"]['output'], 0)
+        self.assertGreater(results["search[engine=local,pattern=short]@2kb"]['output'], 0)
+        self.assertEqual(results["upload@2kb"]['output'], 2_000)
+
+        report = build_report(results, spec)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            write_report(report, path)
+            loaded = load_report(path)
+        self.assertEqual(loaded['meta']['genome']['n_run_every'], 500)
+        self.assertEqual(json.loads(json.dumps(loaded['results'])), loaded['results'])
+        self.assertTrue(all(row['status'] == STATUS_OK for row in compare(loaded, loaded)))
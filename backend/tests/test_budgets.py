@@ -0,0 +1,149 @@
+"""
+Presupuestos de consultas, bytes leídos de la BD y memoria por endpoint
+
+Cubre:
+- El arnés de medición (tests/budgets.py): consultas, bytes y pico de memoria
+- Listado de secuencias sin cargar el texto de cada secuencia
+- Detalle, cancelación y eventos de un job sin N+1 ni el texto de la secuencia
+- Búsqueda síncrona con los ajustes por defecto: el texto de la secuencia se lee una sola vez
+- Los mismos presupuestos con datos a escala 1x, 10x y 100x
+"""
+
+from django.test import TestCase, override_settings
+
+from sequences_api.cache import sequence_cache
+from sequences_api.models import DNASequence
+from search_api.models import SearchJob
+from tests.budgets import SEQUENCE_LENGTH, Budget, BudgetAssertions, build_dataset, measure_usage
+
+KB = 1024
+
+# Presupuestos por endpoint; no dependen de la escala de los datos
+LIST_BUDGET = Budget(queries=2, db_bytes=4 * KB, peak_bytes=256 * KB)
+DETAIL_BUDGET = Budget(queries=4, db_bytes=8 * KB, peak_bytes=512 * KB)
+CANCEL_BUDGET = Budget(queries=3, db_bytes=1 * KB, peak_bytes=256 * KB)
+EVENTS_BUDGET = Budget(queries=4, db_bytes=2 * KB, peak_bytes=256 * KB)
+QUEUE_BUDGET = Budget(queries=5, db_bytes=1 * KB, peak_bytes=256 * KB)
+# La búsqueda tiene que leer el texto de la secuencia, pero solo una vez. Con
+# la coalescencia (activa por defecto) el líder toma la clave: UPDATE entre
+# SAVEPOINT y RELEASE (dentro de la transacción de la prueba; en autocommit
+# es solo el UPDATE). La clave se libera en el mismo UPDATE que lo completa.
+SEARCH_BUDGET = Budget(queries=13, db_bytes=SEQUENCE_LENGTH + 8 * KB, peak_bytes=2048 * KB)
+
+
+class HarnessTests(BudgetAssertions, TestCase):
+    """Medición de consultas, bytes y memoria"""
+
+    @classmethod
+    def setUpTestData(cls):
+        build_dataset(3)
+
+    def test_counts_queries_and_bytes(self):
+        with measure_usage() as usage:
+            names = list(DNASequence.objects.values_list('name', flat=True))
+        self.assertEqual(usage.queries, 1)
+        self.assertEqual(usage.db_bytes, sum(len(name) for name in names))
+        self.assertIn('dna_sequences', usage.statements[0])
+
+    def test_detects_full_column_loads_and_n_plus_one(self):
+        with measure_usage() as usage:
+            [job.sequence.name for job in SearchJob.objects.all()]
+        self.assertEqual(usage.queries, 4)
+        self.assertGreaterEqual(usage.db_bytes, 3 * SEQUENCE_LENGTH)
+        with self.assertRaises(AssertionError) as ctx:
+            self.assertWithinBudget(usage, Budget(queries=1, db_bytes=KB, peak_bytes=10 * 1024 * KB), "jobs")
+        self.assertIn("queries=4 (máx. 1)", str(ctx.exception))
+        self.assertIn("SELECT", str(ctx.exception))
+
+        with measure_usage() as usage:
+            [job.sequence.name for job in SearchJob.objects.with_sequence_name()]
+        self.assertEqual(usage.queries, 1)
+        self.assertLess(usage.db_bytes, KB)
+
+    def test_peak_memory(self):
+        with measure_usage() as usage:
+            data = bytearray(4 * 1024 * KB)
+            del data
+        self.assertGreaterEqual(usage.peak_bytes, 4 * 1024 * KB)
+
+
+# El resto de ajustes, los de por defecto (coalescencia incluida)
+local_sync_search = override_settings(USE_GRPC_SEARCH=False, SEARCH_EXECUTION_MODE='sync')
+
+
+class _EndpointBudgets(BudgetAssertions):
+    SCALE = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        data = build_dataset(cls.SCALE)
+        cls.job = data['job']
+        cls.sequence = data['sequences'][-1]
+
+    def _measure(self, request):
+        request()  # calentamiento: imports perezosos y cachés de Django
+        sequence_cache.clear()
+        with measure_usage() as usage:
+            response = request()
+            if response.streaming:
+                b"".join(response.streaming_content)
+        return response, usage
+
+    def _check(self, label, budget, request, expected_status=200):
+        response, usage = self._measure(request)
+        self.assertEqual(response.status_code, expected_status)
+        self.assertWithinBudget(usage, budget, f"{label} (escala {self.SCALE}x)")
+        return response
+
+    def test_sequence_list(self):
+        response = self._check("GET /api/sequences/", LIST_BUDGET, lambda: self.client.get('/api/sequences/'))
+        self.assertEqual(response.json()['count'], self.SCALE)
+
+    def test_job_detail(self):
+        response = self._check(
+            "GET /api/search/jobs/{id}/", DETAIL_BUDGET,
+            lambda: self.client.get(f'/api/search/jobs/{self.job.pk}/'),
+        )
+        self.assertEqual(response.json()['job']['sequence_name'], "seq-0.fasta")
+
+    def test_job_cancel_finished(self):
+        self._check(
+            "POST /api/search/jobs/{id}/cancel/", CANCEL_BUDGET,
+            lambda: self.client.post(f'/api/search/jobs/{self.job.pk}/cancel/'), expected_status=409,
+        )
+
+    def test_job_events_finished(self):
+        self._check(
+            "GET /api/search/jobs/{id}/events/", EVENTS_BUDGET,
+            lambda: self.client.get(f'/api/search/jobs/{self.job.pk}/events/'),
+        )
+
+    def test_queue_stats(self):
+        self._check("GET /api/search/queue/", QUEUE_BUDGET, lambda: self.client.get('/api/search/queue/'))
+
+    def test_sync_search(self):
+        response = self._check(
+            "POST /api/search/", SEARCH_BUDGET,
+            lambda: self.client.post('/api/search/', {'sequence_id': self.sequence.pk, 'pattern': 'ACGT'},
+                                     content_type='application/json'),
+        )
+        self.assertEqual(response.json()['job']['total_matches'], SEQUENCE_LENGTH // 8)
+
+
+@local_sync_search
+class EndpointBudgetTests(_EndpointBudgets, TestCase):
+    """Datos base"""
+
+
+@local_sync_search
+class EndpointBudgetScale10Tests(_EndpointBudgets, TestCase):
+    """Datos 10x"""
+
+    SCALE = 10
+
+
+@local_sync_search
+class EndpointBudgetScale100Tests(_EndpointBudgets, TestCase):
+    """Datos 100x"""
+
+    SCALE = 100
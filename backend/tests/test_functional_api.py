@@ -17,6 +17,7 @@ from django.urls import reverse
 
 from sequences_api.models import DNASequence
 from search_api.models import SearchJob, SearchResult
+from search_api.result_store import count_results
 
 
 class SequencesAPIFunctionalTests(TestCase):
@@ -228,7 +229,7 @@ class SearchAPIFunctionalTests(TestCase):
         job_id = data['job']['id']
 
         job = SearchJob.objects.get(id=job_id)
-        self.assertGreater(job.results.count(), 0)
+        self.assertGreater(count_results(job), 0)
 
     def test_search_without_sequence_id(self):
         """POST sin sequence_id debe retornar 400"""
@@ -440,6 +441,19 @@ class APICorsTests(TestCase):
         # Debe permitir OPTIONS
         self.assertIn(response.status_code, [200, 204])
 
+    def test_preflight_allows_delete(self):
+        """El preflight de los endpoints de borrado debe permitir DELETE"""
+        sequence = DNASequence.objects.create(name="cors", sequence="ATGC")
+        job = SearchJob.objects.create(sequence=sequence, pattern="ATG", status='COMPLETED')
+        for url in (f'/api/sequences/{sequence.pk}/', f'/api/search/jobs/{job.pk}/'):
+            response = self.client.options(
+                url, HTTP_ORIGIN='http://localhost:3000', HTTP_ACCESS_CONTROL_REQUEST_METHOD='DELETE',
+            )
+            self.assertEqual(response.status_code, 200)
+            methods = [m.strip() for m in response['Access-Control-Allow-Methods'].split(',')]
+            self.assertIn('DELETE', methods)
+            self.assertIn('X-Client-Id', response['Access-Control-Allow-Headers'])
+
 
 class APIErrorHandlingTests(TestCase):
     """Pruebas de manejo de errores de la API"""
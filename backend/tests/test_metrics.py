@@ -0,0 +1,234 @@
+"""
+Pruebas del registro de métricas y de /metrics (config/metrics.py)
+
+Cubre:
+- Counter, Gauge e Histogram con etiquetas, seguros entre hilos
+- Formato de texto de Prometheus
+- Agregación de varios procesos por directorio compartido
+- Ficheros de procesos muertos sumados al archivo y borrados; pids reutilizados
+- Métricas de subidas, búsquedas, gRPC, cachés y coalescencia vía /metrics
+"""
+
+import io
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+from unittest.mock import patch
+
+import grpc
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from config.metrics import MetricsRegistry, registry, render_text
+from sequences_api.cache import sequence_cache
+from search_api import coalescing
+from search_api.services import run_search
+
+
+def _value(text, sample):
+    """Valor de una muestra exacta (nombre{etiquetas}) en el texto exportado."""
+    match = re.search(rf"^{re.escape(sample)} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def _child_updates(directory):
+    """Proceso hijo: suma a un contador y un histograma y vuelca sus métricas."""
+    with override_settings(METRICS_MULTIPROCESS_DIR=directory):
+        child = MetricsRegistry()
+        child.counter('jobs_total', 'Jobs', ['status']).inc(3, status='ok')
+        child.histogram('latency_seconds', 'Latencia', buckets=(0.1, 1.0)).observe(0.5)
+        child.gauge('in_use', 'En uso').set(7)
+        child.flush()
+
+
+class RegistryTests(SimpleTestCase):
+    """Tipos de métrica y exportación"""
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_with_labels(self):
+        counter = self.registry.counter('requests_total', 'Peticiones', ['route'])
+        counter.inc(route='local')
+        counter.inc(2, route='local')
+        counter.inc(route='grpc')
+        self.assertEqual(counter.value(route='local'), 3)
+        with self.assertRaises(ValueError):
+            counter.inc(-1, route='local')
+        with self.assertRaises(ValueError):
+            counter.inc(engine='x')
+        self.assertIs(self.registry.counter('requests_total', 'Peticiones', ['route']), counter)
+
+    def test_histogram_buckets_in_text_format(self):
+        histogram = self.registry.histogram('latency_seconds', 'Latencia "total"', ['engine'], buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value, engine='kmp')
+        text = render_text(self.registry.snapshot())
+        self.assertIn('# HELP latency_seconds Latencia \\"total\\"', text)
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        self.assertEqual(_value(text, 'latency_seconds_bucket{engine="kmp",le="0.1"}'), 1)
+        self.assertEqual(_value(text, 'latency_seconds_bucket{engine="kmp",le="1.0"}'), 3)
+        self.assertEqual(_value(text, 'latency_seconds_bucket{engine="kmp",le="+Inf"}'), 4)
+        self.assertEqual(_value(text, 'latency_seconds_count{engine="kmp"}'), 4)
+        self.assertAlmostEqual(_value(text, 'latency_seconds_sum{engine="kmp"}'), 4.25)
+
+    def test_thread_safe(self):
+        counter = self.registry.counter('hits_total', 'Aciertos')
+        histogram = self.registry.histogram('size', 'Tamaño', buckets=(1,))
+
+        def work():
+            for _ in range(5000):
+                counter.inc()
+                histogram.observe(0.5)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.value(), 40000)
+        self.assertEqual(histogram.count(), 40000)
+
+    def test_collect_hooks_update_gauges(self):
+        gauge = self.registry.gauge('queue_depth', 'Profundidad')
+        self.registry.on_collect(lambda: gauge.set(42))
+        self.assertIn('queue_depth 42', render_text(self.registry.snapshot()))
+
+
+class MultiprocessTests(SimpleTestCase):
+    """Suma de los procesos que vuelcan en el directorio compartido"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def test_aggregates_other_processes(self):
+        ctx = multiprocessing.get_context("fork")
+        children = [ctx.Process(target=_child_updates, args=(self.directory,)) for _ in range(2)]
+        for child in children:
+            child.start()
+        for child in children:
+            child.join(10)
+            self.assertEqual(child.exitcode, 0)
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+        local = MetricsRegistry()
+        local.counter('jobs_total', 'Jobs', ['status']).inc(status='ok')
+        with override_settings(METRICS_MULTIPROCESS_DIR=self.directory):
+            text = local.render()
+        self.assertEqual(_value(text, 'jobs_total{status="ok"}'), 7)
+        self.assertEqual(_value(text, 'latency_seconds_count'), 2)
+        self.assertEqual(_value(text, 'latency_seconds_bucket{le="1.0"}'), 2)
+        # Gauges de procesos que ya terminaron no cuentan
+        self.assertIsNone(_value(text, 'in_use'))
+
+        # Sus ficheros se sumaron al archivo y se borraron; el total no cambia
+        self.assertEqual(sorted(f for f in os.listdir(self.directory) if f.endswith('.json')), ['archive.json'])
+        with override_settings(METRICS_MULTIPROCESS_DIR=self.directory):
+            text = local.render()
+        self.assertEqual(_value(text, 'jobs_total{status="ok"}'), 7)
+        self.assertEqual(_value(text, 'latency_seconds_count'), 2)
+
+    def test_reused_pid_keeps_dead_process_counters(self):
+        dead = {'pid': 2 ** 22 + 1, 'metrics': {'jobs_total': {
+            'kind': 'counter', 'help': 'Jobs', 'labelnames': [], 'buckets': [], 'samples': [[[], 5]],
+        }}}
+        with open(os.path.join(self.directory, f"{os.getpid()}-0123456789ab.json"), "w") as f:
+            json.dump(dead, f)
+        with override_settings(METRICS_MULTIPROCESS_DIR=self.directory):
+            # Otro proceso con el mismo pid escribe su propio fichero
+            other = MetricsRegistry()
+            other.counter('jobs_total', 'Jobs').inc(2)
+            other.flush()
+            text = MetricsRegistry().render()
+        self.assertEqual(_value(text, 'jobs_total'), 7)
+
+    def test_interrupted_compaction_does_not_count_twice(self):
+        dead = {'pid': 2 ** 22 + 1, 'metrics': {'jobs_total': {
+            'kind': 'counter', 'help': 'Jobs', 'labelnames': [], 'buckets': [], 'samples': [[[], 5]],
+        }}}
+        # Sumado al archivo pero sin llegar a borrarse
+        with open(os.path.join(self.directory, "1-dead.json"), "w") as f:
+            json.dump(dead, f)
+        with open(os.path.join(self.directory, "archive.json"), "w") as f:
+            json.dump(dict(dead, folded=["1-dead.json"]), f)
+        with override_settings(METRICS_MULTIPROCESS_DIR=self.directory):
+            text = MetricsRegistry().render()
+        self.assertEqual(_value(text, 'jobs_total'), 5)
+        self.assertNotIn("1-dead.json", os.listdir(self.directory))
+
+    def test_flush_is_throttled(self):
+        local = MetricsRegistry()
+        counter = local.counter('events_total', 'Eventos')
+        with override_settings(METRICS_MULTIPROCESS_DIR=self.directory, METRICS_FLUSH_SECONDS=60):
+            counter.inc()
+            counter.inc()
+        files = os.listdir(self.directory)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith(f"{os.getpid()}-"))
+        with open(os.path.join(self.directory, files[0])) as f:
+            self.assertIn('"events_total"', f.read())
+
+
+@override_settings(USE_GRPC_SEARCH=False, SEARCH_COALESCING=False)
+class MetricsEndpointTests(TestCase):
+    """GET /metrics tras subir y buscar"""
+
+    def setUp(self):
+        registry.reset()
+        sequence_cache.clear()
+
+    def _metrics(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_upload_and_search_metrics(self):
+        upload = io.BytesIO(b"ATGCATGCATGC")
+        upload.name = "seq.txt"
+        response = self.client.post('/api/sequences/upload/', {'file': upload})
+        self.assertEqual(response.status_code, 201)
+        sequence_id = response.json()['id']
+
+        for _ in range(2):
+            self.client.post('/api/search/', {'sequence_id': sequence_id, 'pattern': 'ATG'},
+                             content_type='application/json')
+
+        text = self._metrics()
+        self.assertEqual(_value(text, 'dna_upload_bytes_total'), 12)
+        self.assertEqual(_value(text, 'dna_upload_duration_seconds_count{outcome="created"}'), 1)
+        self.assertEqual(_value(text, 'dna_search_jobs_total{status="completed"}'), 2)
+        self.assertEqual(
+            _value(text, 'dna_search_duration_seconds_count{engine="naive-local",route="local"}'), 2)
+        self.assertEqual(_value(text, 'dna_search_matches_bucket{le="10.0"}'), 2)
+        self.assertEqual(_value(text, 'dna_sequence_cache_requests_total{cache="local",result="miss"}'), 1)
+        self.assertEqual(_value(text, 'dna_sequence_cache_requests_total{cache="local",result="hit"}'), 1)
+        self.assertGreater(_value(text, 'dna_sequence_cache_bytes{cache="local"}'), 0)
+
+    def test_invalid_upload(self):
+        upload = io.BytesIO(b"HELLO")
+        upload.name = "bad.txt"
+        self.assertEqual(self.client.post('/api/sequences/upload/', {'file': upload}).status_code, 400)
+        self.assertEqual(_value(self._metrics(), 'dna_upload_duration_seconds_count{outcome="invalid"}'), 1)
+
+    @override_settings(USE_GRPC_SEARCH=True, SEARCH_COST_ROUTING=False)
+    def test_grpc_errors_and_fallbacks(self):
+        error = grpc.RpcError()
+        error.code = lambda: grpc.StatusCode.UNAVAILABLE
+        with patch('search_api.services.run_grpc_search', side_effect=error):
+            result = run_search("ATGCATGC", "ATG")
+        self.assertEqual(result['route'], 'local-fallback')
+        text = self._metrics()
+        self.assertEqual(_value(text, 'dna_grpc_errors_total{method="Search",code="UNAVAILABLE"}'), 1)
+        self.assertEqual(_value(text, 'dna_grpc_fallbacks_total{method="Search"}'), 1)
+
+    def test_coalescing_counters(self):
+        coalescing.stats.incr('leaders')
+        coalescing.stats.incr('coalesced_local')
+        text = self._metrics()
+        self.assertEqual(_value(text, 'dna_search_coalesce_total{kind="leaders"}'), 1)
+        self.assertEqual(_value(text, 'dna_search_coalesce_total{kind="coalesced_local"}'), 1)
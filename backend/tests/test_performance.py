@@ -7,16 +7,24 @@ Cubre:
 - Comparación gRPC vs Local
 - Uso de memoria
 - Eficiencia de algoritmos
+- Lecturas del texto de la secuencia con la caché de secuencias
 """
 
 import time
 import io
 import json
+import os
+from django.db import connection
 from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from unittest.mock import patch, Mock
 
+from sequences_api.cache import sequence_cache
 from sequences_api.models import DNASequence
 from search_api.models import SearchJob, SearchResult
+from search_api.pagination import encode_cursor
+from search_api.persistence import ResultWriter
+from search_api.result_store import count_results, read_results, write_positions
 from search_api.services import run_local_search, run_grpc_search
 
 
@@ -266,6 +274,189 @@ class DatabasePerformanceTests(TestCase):
         self.assertLess(elapsed_ms, 300)
 
 
+class ResultStorageComparisonTests(TestCase):
+    """
+    Compara el almacenamiento compacto (bloques varint) con una fila
+    SearchResult por coincidencia: latencia de escritura, de lectura de una
+    página y espacio en disco.
+    """
+
+    N_MATCHES = 100_000
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="storage", sequence="ATCG" * 100_000)
+
+    def _db_bytes(self):
+        if connection.vendor != 'sqlite':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA page_count")
+            pages = cursor.fetchone()[0]
+            cursor.execute("PRAGMA page_size")
+            return pages * cursor.fetchone()[0]
+
+    def _measure(self, write):
+        job = SearchJob.objects.create(sequence=self.sequence, pattern="ATC", status='COMPLETED')
+        positions = range(0, self.N_MATCHES * 4, 4)
+
+        before = self._db_bytes()
+        start = time.perf_counter()
+        write(job, positions)
+        write_ms = (time.perf_counter() - start) * 1000
+        after = self._db_bytes()
+
+        start = time.perf_counter()
+        page = read_results(job, self.N_MATCHES // 2, 100)
+        read_ms = (time.perf_counter() - start) * 1000
+
+        self.assertEqual(len(page), 100)
+        self.assertEqual(page[0]['position'], (self.N_MATCHES // 2) * 4)
+        disk = (after - before) if before is not None else None
+        return write_ms, read_ms, disk
+
+    def test_compact_vs_rows(self):
+        def write_rows(job, positions):
+            SearchResult.objects.bulk_create(
+                [
+                    SearchResult(
+                        job=job,
+                        position=p,
+                        context_before="ATCGATCGAT",
+                        context_after="GATCGATCGA",
+                    )
+                    for p in positions
+                ],
+                batch_size=5000,
+            )
+
+        rows_write, rows_read, rows_disk = self._measure(write_rows)
+        compact_write, compact_read, compact_disk = self._measure(write_positions)
+
+        print(f"{self.N_MATCHES} matches - filas: escritura {rows_write:.1f}ms, "
+              f"lectura página {rows_read:.2f}ms, disco {rows_disk} bytes")
+        print(f"{self.N_MATCHES} matches - compacto: escritura {compact_write:.1f}ms, "
+              f"lectura página {compact_read:.2f}ms, disco {compact_disk} bytes")
+
+        self.assertLess(compact_write, rows_write)
+        if rows_disk is not None:
+            self.assertLess(compact_disk * 10, rows_disk)
+
+
+class ResultPersistenceThroughputTests(TestCase):
+    """
+    Rendimiento de ResultWriter (persistencia por lotes en streaming) para
+    10^4, 10^5 y 10^6 coincidencias. Las filas con 10^6 coincidencias solo se
+    miden con PERF_LARGE=1, por su duración.
+    """
+
+    SIZES = (10_000, 100_000, 1_000_000)
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="throughput", sequence="ATCG" * 1000)
+
+    def _persist(self, n_matches):
+        job = SearchJob.objects.create(sequence=self.sequence, pattern="ATC", status='PROCESSING')
+        start = time.perf_counter()
+        with ResultWriter(job) as writer:
+            for i in range(n_matches):
+                writer.add({'position': i * 4, 'context_before': 'ATCGATCGAT', 'context_after': 'GATCGATCGA'})
+                self.assertLessEqual(len(writer._buffer), writer.batch_size)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(count_results(job), n_matches)
+        return elapsed
+
+    def test_compact_throughput(self):
+        for n in self.SIZES:
+            elapsed = self._persist(n)
+            print(f"compacto {n} matches: {elapsed * 1000:.1f}ms ({n / elapsed:,.0f} matches/s)")
+
+    @override_settings(SEARCH_RESULT_STORAGE="rows")
+    def test_rows_throughput(self):
+        sizes = self.SIZES if os.environ.get("PERF_LARGE") else self.SIZES[:-1]
+        for n in sizes:
+            elapsed = self._persist(n)
+            print(f"filas {n} matches: {elapsed * 1000:.1f}ms ({n / elapsed:,.0f} matches/s)")
+
+
+class KeysetPaginationPerformanceTests(TestCase):
+    """
+    La latencia de una página de resultados debe ser la misma en la página 1
+    y en la 10.000 (1.000.000 de coincidencias, 100 por página).
+    """
+
+    N_MATCHES = 1_000_000
+    PAGE_SIZE = 100
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="keyset", sequence="ATCG" * 1000)
+        self.job = SearchJob.objects.create(sequence=self.sequence, pattern="ATC", status='COMPLETED')
+        write_positions(self.job, range(0, self.N_MATCHES * 4, 4))
+
+    def _page_ms(self, params, repeat=20):
+        url = f'/api/search/jobs/{self.job.id}/'
+        self.client.get(url, params)  # calentamiento
+        start = time.perf_counter()
+        for _ in range(repeat):
+            response = self.client.get(url, params)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+        self.assertEqual(response.status_code, 200)
+        return elapsed_ms, response.json()
+
+    def test_constant_latency_deep_pages(self):
+        first_ms, first = self._page_ms({'limit': self.PAGE_SIZE})
+        # Cursor equivalente al que devolvería la página 9.999
+        deep_cursor = encode_cursor((9_999 * self.PAGE_SIZE - 1) * 4, "n")
+        deep_ms, deep = self._page_ms({'limit': self.PAGE_SIZE, 'cursor': deep_cursor})
+
+        print(f"Página 1: {first_ms:.2f}ms, página 10000: {deep_ms:.2f}ms")
+
+        self.assertEqual(first['results'][0]['position'], 0)
+        self.assertEqual(deep['results'][0]['position'], 9_999 * self.PAGE_SIZE * 4)
+        self.assertIsNone(deep['next_cursor'])
+        self.assertLess(deep_ms, first_ms * 3 + 5)
+
+
+@override_settings(USE_GRPC_SEARCH=False)
+class SequenceCacheDBReadTests(TestCase):
+    """
+    Escenario SearchHeavyUser del locustfile: muchas búsquedas sobre la misma
+    secuencia de 4kb. Sin caché cada búsqueda lee el texto de la BD (y los
+    tramos de contexto de sus resultados); con caché solo la primera, y el
+    contexto se recorta del texto en caché.
+    """
+
+    SEARCHES = 50
+    # Todos aparecen en la secuencia: los resultados llevan contexto
+    PATTERNS = ["ATC", "TCGA", "CGAT", "GATC", "ATCGATCG", "CGA", "TCG"]
+
+    def setUp(self):
+        self.sequence = DNASequence.objects.create(name="search_test.txt", sequence="ATCG" * 1000)
+        sequence_cache.clear()
+
+    def _sequence_reads(self):
+        with CaptureQueriesContext(connection) as queries:
+            for i in range(self.SEARCHES):
+                response = self.client.post(
+                    '/api/search/',
+                    json.dumps({'sequence_id': self.sequence.id, 'pattern': self.PATTERNS[i % len(self.PATTERNS)]}),
+                    content_type='application/json',
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.json()['results'][0]['context_after'])
+        column = f'"{DNASequence._meta.db_table}"."sequence"'
+        return sum(1 for query in queries if column in query['sql'])
+
+    def test_cache_reduces_sequence_reads(self):
+        with override_settings(SEQUENCE_CACHE_MAX_BYTES=0):
+            uncached = self._sequence_reads()
+        cached = self._sequence_reads()
+        print(f"Lecturas del texto en {self.SEARCHES} búsquedas: sin caché {uncached}, con caché {cached}")
+        # Sin caché: el texto para el motor y un SUBSTR para el contexto
+        self.assertEqual(uncached, 2 * self.SEARCHES)
+        self.assertEqual(cached, 1)
+        self.assertGreaterEqual(sequence_cache.stats()['hits'], self.SEARCHES - 1)
+
+
 class MemoryEfficiencyTests(TestCase):
     """Pruebas de eficiencia de memoria (básicas)"""
 
@@ -0,0 +1,133 @@
+"""
+Pruebas del perfilado bajo demanda (config/profiling.py)
+
+Cubre:
+- Activación por cabecera X-Profile o ?_profile=1 solo con REQUEST_PROFILING
+- Clientes permitidos por IP o por token
+- Ficheros .prof, .tracemalloc y resumen .json, con el id en X-Profile-Id
+- Una petición perfilada a la vez y rotación de perfiles antiguos
+"""
+
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import tracemalloc
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from config import profiling
+from sequences_api.models import DNASequence
+
+
+class _ProfilingDirMixin:
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        override = override_settings(
+            REQUEST_PROFILING=True,
+            REQUEST_PROFILING_DIR=self.directory,
+            REQUEST_PROFILING_ALLOWED_IPS=['127.0.0.1'],
+            REQUEST_PROFILING_TOKEN=None,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _files(self):
+        return sorted(os.listdir(self.directory))
+
+
+class ProfilingEndpointTests(_ProfilingDirMixin, TestCase):
+    """Middleware sobre la API"""
+
+    def setUp(self):
+        super().setUp()
+        DNASequence.objects.create(name="seq", sequence="ATGC" * 10)
+
+    def test_header_writes_artifacts(self):
+        response = self.client.get('/api/sequences/', HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        artifact_id = response[profiling.RESPONSE_HEADER]
+        self.assertEqual(self._files(), [f"{artifact_id}{ext}" for ext in ('.json', '.prof', '.tracemalloc')])
+
+        base = os.path.join(self.directory, artifact_id)
+        with open(base + '.json') as f:
+            summary = json.load(f)
+        self.assertEqual(summary['path'], '/api/sequences/')
+        self.assertEqual(summary['status'], 200)
+        self.assertGreater(summary['duration_ms'], 0)
+        self.assertTrue(any('get' in row['function'] for row in summary['top_functions']))
+        self.assertTrue(summary['top_allocations'])
+
+        self.assertGreater(pstats.Stats(base + '.prof').total_calls, 0)
+        self.assertTrue(tracemalloc.Snapshot.load(base + '.tracemalloc').traces)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_query_flag(self):
+        response = self.client.get('/api/sequences/?_profile=1')
+        self.assertIn(profiling.RESPONSE_HEADER, response)
+
+    def test_untriggered_or_disabled(self):
+        self.assertNotIn(profiling.RESPONSE_HEADER, self.client.get('/api/sequences/'))
+        with override_settings(REQUEST_PROFILING=False):
+            self.assertNotIn(profiling.RESPONSE_HEADER, self.client.get('/api/sequences/', HTTP_X_PROFILE='1'))
+        self.assertEqual(self._files(), [])
+
+    def test_client_not_allowed(self):
+        response = self.client.get('/api/sequences/', HTTP_X_PROFILE='1', REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(profiling.RESPONSE_HEADER, response)
+
+        with override_settings(REQUEST_PROFILING_TOKEN='s3cret'):
+            denied = self.client.get('/api/sequences/', HTTP_X_PROFILE='nope', REMOTE_ADDR='10.0.0.5')
+            allowed = self.client.get('/api/sequences/?_profile=s3cret', REMOTE_ADDR='10.0.0.5')
+        self.assertNotIn(profiling.RESPONSE_HEADER, denied)
+        self.assertIn(profiling.RESPONSE_HEADER, allowed)
+
+
+class ProfileRequestTests(_ProfilingDirMixin, SimpleTestCase):
+    """profile_request() directamente"""
+
+    def setUp(self):
+        super().setUp()
+        self.request = RequestFactory().get('/x')
+
+    def test_one_profile_at_a_time(self):
+        def view(request):
+            inner = profiling.profile_request(request, lambda r: HttpResponse("inner"))
+            self.assertEqual(inner[profiling.SKIPPED_HEADER], 'busy')
+            return HttpResponse("outer")
+
+        response = profiling.profile_request(self.request, view)
+        self.assertIn(profiling.RESPONSE_HEADER, response)
+        self.assertEqual(len(self._files()), 3)
+
+    def test_rotation(self):
+        with override_settings(REQUEST_PROFILING_MAX_ARTIFACTS=2):
+            ids = []
+            for _ in range(3):
+                ids.append(profiling.profile_request(self.request, lambda r: HttpResponse())[profiling.RESPONSE_HEADER])
+                # Distintos mtime para que el orden sea estable
+                for name in os.listdir(self.directory):
+                    path = os.path.join(self.directory, name)
+                    if not name.startswith(ids[-1]):
+                        os.utime(path, (os.path.getmtime(path) - 10,) * 2)
+        self.assertEqual({name.split('.')[0] for name in self._files()}, set(ids[1:]))
+
+    def test_keeps_external_tracing(self):
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        profiling.profile_request(self.request, lambda r: HttpResponse())
+        self.assertTrue(tracemalloc.is_tracing())
+
+    def test_write_error_does_not_break_response(self):
+        blocker = os.path.join(self.directory, 'file')
+        open(blocker, 'w').close()
+        with override_settings(REQUEST_PROFILING_DIR=os.path.join(blocker, 'sub')), \
+                self.assertLogs('config.profiling', 'ERROR'):
+            response = profiling.profile_request(self.request, lambda r: HttpResponse("ok"))
+        self.assertEqual(response.content, b"ok")
+        self.assertEqual(response[profiling.SKIPPED_HEADER], 'write-error')
@@ -0,0 +1,228 @@
+"""
+Pruebas de la grabación de peticiones (config/recording.py) y de su
+reproducción (benchmarks/replay.py)
+
+Cubre:
+- Forma anonimizada de subidas, búsquedas y consultas de jobs, sin ids ni cursores
+- Patrones redactados, muestreo y desactivado por defecto
+- Velocidad, concurrencia, omitidos y percentiles del informe
+- Reproducción por HTTP contra el servidor de pruebas
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, override_settings
+
+from benchmarks.replay import Replayer, build_report, format_report, http_transport, load_workload, percentile
+from config.recording import anonymize
+from search_api.models import SearchJob
+from sequences_api.models import DNASequence
+
+
+class _RecordingMixin:
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.path = os.path.join(directory, 'workload.jsonl')
+        override = override_settings(
+            REQUEST_RECORDING=True,
+            REQUEST_RECORDING_FILE=self.path,
+            USE_GRPC_SEARCH=False,
+            SEARCH_EXECUTION_MODE='sync',
+            SEARCH_COALESCING=False,
+            SEARCH_CANCEL_POLL_SECONDS=0,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _upload(self, text, name='seq.fasta'):
+        response = self.client.post('/api/sequences/upload/', {'file': SimpleUploadedFile(name, text.encode())})
+        return response.json()['id']
+
+    def _search(self, sequence_id, pattern='ATG', **options):
+        body = dict({'sequence_id': sequence_id, 'pattern': pattern}, **options)
+        return self.client.post('/api/search/', json.dumps(body), content_type='application/json')
+
+    def _entries(self):
+        if not os.path.exists(self.path):
+            return []
+        return load_workload(self.path)
+
+
+class RecorderTests(_RecordingMixin, TestCase):
+    """Líneas grabadas por RequestRecordingMiddleware"""
+
+    def test_records_anonymized_shapes(self):
+        sequence_id = self._upload(">s\n" + "ATGCATGC" * 100 + "\n")
+        job_id = self._search(sequence_id, 'atg', allow_overlapping=False).json()['job']['id']
+        self.client.get(f'/api/search/jobs/{job_id}/?limit=10&cursor=abc', headers={'X-Client-Id': 'alice'})
+        self.client.get('/api/sequences/')
+
+        upload, search, detail, listing = self._entries()
+        self.assertEqual(upload['endpoint'], 'api/sequences/upload/')
+        self.assertEqual(upload['request']['sequence_ref'], anonymize('seq', sequence_id))
+        self.assertEqual(upload['request']['sequence_length'], 800)
+        self.assertGreater(upload['request']['upload_bytes'], 800)
+
+        self.assertEqual((search['method'], search['endpoint'], search['status']), ('POST', 'api/search/', 200))
+        self.assertEqual(search['request'], {
+            'sequence_ref': anonymize('seq', sequence_id),
+            'sequence_length': 800,
+            'gc_content': 50.0,
+            'pattern': 'ATG',
+            'allow_overlapping': False,
+        })
+        self.assertEqual(search['job_ref'], anonymize('job', job_id))
+        self.assertIn('engine', search['timings'])
+        self.assertGreater(search['duration_ms'], 0)
+
+        self.assertEqual(detail['endpoint'], 'api/search/jobs/<int:pk>/')
+        self.assertEqual(detail['job_ref'], search['job_ref'])
+        self.assertEqual(detail['query'], {'limit': '10'})
+        self.assertTrue(detail['cursor'])
+        self.assertEqual(detail['client'], anonymize('client', 'alice'))
+        self.assertNotIn('alice', json.dumps(detail))
+        self.assertNotIn('127.0.0.1', json.dumps(search))
+
+        self.assertEqual(listing['endpoint'], 'api/sequences/')
+        self.assertNotIn('request', listing)
+
+    def test_redacted_patterns(self):
+        sequence_id = DNASequence.objects.create(name="r", sequence="ATGC" * 10).pk
+        with self.settings(REQUEST_RECORDING_PATTERNS=False):
+            self._search(sequence_id, 'GATTACA')
+            self.client.post('/api/search/batch/', json.dumps({'sequence_ids': [sequence_id], 'patterns': ['AT', 'GC']}),
+                             content_type='application/json')
+        search, batch = self._entries()
+        self.assertEqual(search['request']['pattern_length'], 7)
+        self.assertNotIn('GATTACA', json.dumps(search))
+        self.assertEqual(batch['request']['patterns'], [{'pattern_length': 2}, {'pattern_length': 2}])
+        self.assertEqual(batch['request']['sequences'][0]['sequence_length'], 40)
+
+    def test_invalid_requests_are_recorded(self):
+        self._search(999999)
+        self.client.post('/api/search/', 'not json', content_type='application/json')
+        missing, malformed = self._entries()
+        self.assertEqual(missing['status'], 400)
+        self.assertIsNone(missing['request']['sequence_length'])
+        self.assertEqual(malformed['status'], 400)
+        self.assertNotIn('request', malformed)
+
+    def test_disabled_sampled_and_other_paths(self):
+        with self.settings(REQUEST_RECORDING=False):
+            self.client.get('/api/sequences/')
+        with self.settings(REQUEST_RECORDING_SAMPLE_RATE=0.0):
+            self.client.get('/api/sequences/')
+        self.client.get('/no-such-page/')
+        self.client.options('/api/sequences/')
+        self.assertEqual(self._entries(), [])
+
+
+class ReplaySchedulingTests(SimpleTestCase):
+    """Tiempos, concurrencia y percentiles con un transporte simulado"""
+
+    def _entries(self, count, spacing):
+        return [
+            {'ts': 1000 + i * spacing, 'method': 'GET', 'endpoint': 'api/sequences/', 'status': 200, 'duration_ms': 5.0}
+            for i in range(count)
+        ]
+
+    def test_speedup(self):
+        sent = []
+
+        def transport(method, path, body, upload, headers):
+            sent.append(time.perf_counter())
+            return 200, None
+
+        replayer = Replayer(self._entries(5, 0.1), transport, speedup=10)
+        replayer.run()
+        # 0,4 s grabados a x10
+        self.assertAlmostEqual(sent[-1] - sent[0], 0.04, delta=0.03)
+
+    def test_concurrency_limit_and_lag(self):
+        in_flight, peak = [0], [0]
+        lock = threading.Lock()
+
+        def transport(method, path, body, upload, headers):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            return 200, None
+
+        replayer = Replayer(self._entries(8, 0.0), transport, speedup=0, concurrency=2)
+        report = build_report(replayer.run(), replayer.elapsed_s)
+        self.assertEqual(peak[0], 2)
+        self.assertGreaterEqual(report['endpoints']['total']['lag_ms']['max'], 100)
+        self.assertGreaterEqual(report['endpoints']['total']['latency_ms']['p50'], 50)
+        self.assertEqual(report['endpoints']['total']['recorded_ms']['p95'], 5.0)
+
+    def test_unresolved_job_is_skipped(self):
+        entries = [{'ts': 0, 'method': 'GET', 'endpoint': 'api/search/jobs/<int:pk>/', 'job_ref': 'x', 'status': 200}]
+        results = Replayer(entries, lambda *args: self.fail("no debe enviarse"), speedup=0).run()
+        self.assertTrue(results[0]['skipped'])
+        self.assertEqual(build_report(results, 1.0)['endpoints']['total']['skipped'], 1)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 51)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 50))
+
+
+class LiveReplayTests(_RecordingMixin, LiveServerTestCase):
+    """Grabación reproducida por HTTP contra el servidor de pruebas"""
+
+    def test_http_transport(self):
+        send = http_transport(self.live_server_url, timeout=30)
+        status, sequence = send('POST', '/api/sequences/upload/', None, ('s.fasta', b">s\nATGATGATG\n"), {})
+        self.assertEqual(status, 201)
+        status, data = send('POST', '/api/search/', {'sequence_id': sequence['id'], 'pattern': 'ATG'}, None, {})
+        self.assertEqual((status, data['job']['total_matches']), (200, 3))
+        status, data = send('POST', '/api/search/', {'sequence_id': sequence['id'], 'pattern': 'XYZ'}, None, {})
+        self.assertEqual(status, 400)
+        self.assertIn('pattern', data)
+
+    def test_replays_recorded_workload(self):
+        sequence = DNASequence.objects.create(name="recorded", sequence="ATGCGTAC" * 200)
+        job_id = self._search(sequence.pk).json()['job']['id']
+        self.client.get(f'/api/search/jobs/{job_id}/')
+        self._search(sequence.pk, 'CGT')
+        uploaded = self._upload(">u\n" + "GATTACA" * 50 + "\n", name='u.fasta')
+        self._search(uploaded, 'TTA')
+        entries = self._entries()
+        self.assertEqual(len(entries), 5)
+
+        with self.settings(REQUEST_RECORDING=False):
+            replayer = Replayer(entries, http_transport(self.live_server_url, timeout=30), speedup=0,
+                                concurrency=1, log=lambda *args: None)
+            replayer.prepare()
+            results = replayer.run()
+
+        # La secuencia buscada se preparó con la misma longitud; la subida se reprodujo
+        prepared = DNASequence.objects.get(pk=replayer.sequences[anonymize('seq', sequence.pk)])
+        self.assertNotEqual(prepared.pk, sequence.pk)
+        self.assertEqual(prepared.length, sequence.length)
+        self.assertIn(anonymize('seq', uploaded), replayer.sequences)
+        self.assertEqual(SearchJob.objects.filter(sequence=prepared).count(), 2)
+
+        self.assertEqual([row['status'] for row in results], [200, 200, 200, 201, 200])
+        # El job consultado es el que creó la búsqueda reproducida
+        self.assertEqual(replayer.jobs[anonymize('job', job_id)],
+                         SearchJob.objects.get(sequence=prepared, pattern='ATG').pk)
+
+        report = build_report(results, replayer.elapsed_s)
+        self.assertEqual(report['endpoints']['total']['requests'], 5)
+        self.assertEqual(report['endpoints']['total']['errors'], 0)
+        self.assertEqual(report['endpoints']['POST api/search/']['requests'], 3)
+        self.assertIsNotNone(report['endpoints']['POST api/search/']['latency_ms']['p95'])
+        self.assertIn('POST api/search/', format_report(report))
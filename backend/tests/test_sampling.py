@@ -0,0 +1,154 @@
+"""
+Pruebas del perfilador por muestreo de peticiones lentas (config/sampling.py)
+
+Cubre:
+- Muestreo de las pilas de los hilos registrados, recortadas en quien registra
+- Solo se guardan las peticiones por encima del umbral, por endpoint
+- Formato de pilas colapsadas y rotación por tamaño
+- Agregación de frames (self/total) y el comando profile_hotspots
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from config.sampling import SamplingProfiler, hotspots, load_samples, parse_collapsed, sampler
+from sequences_api.views import DNASequenceListView
+
+
+def _busy(ms):
+    deadline = time.perf_counter() + ms / 1000
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _slow_request(profiler, ms, endpoint):
+    tracked = profiler.begin()
+    _busy(ms)
+    return profiler.end(tracked, endpoint)
+
+
+class _SamplesDirMixin:
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        override = override_settings(
+            SAMPLING_PROFILER=True,
+            SAMPLING_PROFILER_DIR=self.directory,
+            SAMPLING_PROFILER_INTERVAL_MS=1,
+            SAMPLING_PROFILER_THRESHOLD_MS=0,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _read(self, name):
+        with open(os.path.join(self.directory, name)) as f:
+            return f.read()
+
+
+class SamplingProfilerTests(_SamplesDirMixin, SimpleTestCase):
+    """Muestreo, umbral, formato y rotación"""
+
+    def setUp(self):
+        super().setUp()
+        self.profiler = SamplingProfiler()
+
+    def test_samples_slow_requests(self):
+        _slow_request(self.profiler, 100, 'GET_slow')
+        self.profiler.flush()
+
+        self.assertEqual(os.listdir(self.directory), ['GET_slow.collapsed'])
+        stacks = parse_collapsed(self._read('GET_slow.collapsed').splitlines())
+        self.assertGreater(sum(stacks.values()), 5)
+        for stack in stacks:
+            # La pila empieza en quien llamó a begin()
+            self.assertEqual(stack[0], 'tests/test_sampling.py:_slow_request')
+        self.assertIn('tests/test_sampling.py:_busy', {stack[-1] for stack in stacks})
+
+    def test_fast_requests_are_discarded(self):
+        with override_settings(SAMPLING_PROFILER_THRESHOLD_MS=10_000):
+            elapsed = _slow_request(self.profiler, 30, 'GET_fast')
+        self.profiler.flush()
+        self.assertLess(elapsed, 10_000)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_idle_without_requests(self):
+        _slow_request(self.profiler, 20, 'GET_x')
+        samples = self.profiler.samples
+        time.sleep(0.05)
+        self.assertEqual(self.profiler.samples, samples)
+
+    def test_rotation_by_size(self):
+        with override_settings(SAMPLING_PROFILER_MAX_BYTES=1, SAMPLING_PROFILER_BACKUPS=2):
+            for _ in range(4):
+                self.profiler._pending.append(('GET_x', Counter({('a', 'b'): 1})))
+                self.profiler.flush()
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ['GET_x.collapsed', 'GET_x.collapsed.1', 'GET_x.collapsed.2'])
+        self.assertEqual(self._read('GET_x.collapsed'), "a;b 1\n")
+        self.assertEqual(sum(load_samples(self.directory)['GET_x'].values()), 3)
+        self.assertEqual(sum(load_samples(self.directory, include_rotated=False)['GET_x'].values()), 1)
+
+
+class HotspotTests(SimpleTestCase):
+    """Agregación de frames"""
+
+    def test_self_and_total(self):
+        stacks = parse_collapsed([
+            "view;services:_find_matches 6\n",
+            "view;persist;bulk_create 3\n",
+            "view;f;f 1\n",
+            "malformed line\n",
+        ])
+        rows = {row['frame']: row for row in hotspots(stacks, limit=10)}
+        self.assertEqual(hotspots(stacks, limit=1)[0]['frame'], 'services:_find_matches')
+        self.assertEqual(rows['services:_find_matches']['self'], 6)
+        self.assertAlmostEqual(rows['services:_find_matches']['self_pct'], 60.0)
+        self.assertEqual(rows['view']['self'], 0)
+        self.assertEqual(rows['view']['total'], 10)
+        # Un frame recursivo cuenta una vez por pila en total
+        self.assertEqual(rows['f']['total'], 1)
+        self.assertEqual(hotspots(stacks, limit=1, sort='total')[0]['frame'], 'view')
+
+
+class MiddlewareTests(_SamplesDirMixin, TestCase):
+    """Peticiones reales a la API y comando profile_hotspots"""
+
+    def test_slow_endpoint_and_command(self):
+        original = DNASequenceListView.list
+
+        def slow_list(view, request, *args, **kwargs):
+            _busy(80)
+            return original(view, request, *args, **kwargs)
+
+        with patch.object(DNASequenceListView, 'list', slow_list):
+            self.assertEqual(self.client.get('/api/sequences/').status_code, 200)
+        sampler.flush()
+
+        self.assertIn('GET_api_sequences.collapsed', os.listdir(self.directory))
+        stacks = load_samples(self.directory)['GET_api_sequences']
+        self.assertTrue(all(stack[0] == 'config/middleware.py:SamplingProfilerMiddleware.__call__'
+                            for stack in stacks))
+
+        out = io.StringIO()
+        call_command('profile_hotspots', dir=self.directory, limit=5, stdout=out)
+        output = out.getvalue()
+        self.assertIn('GET_api_sequences:', output)
+        self.assertIn('tests/test_sampling.py:_busy', output)
+
+    def test_disabled(self):
+        with override_settings(SAMPLING_PROFILER=False):
+            self.client.get('/api/sequences/')
+        sampler.flush()
+        self.assertEqual(os.listdir(self.directory), [])
+        out = io.StringIO()
+        call_command('profile_hotspots', dir=self.directory, stdout=out)
+        self.assertIn('Sin muestras', out.getvalue())
@@ -0,0 +1,259 @@
+"""
+Pruebas de las trazas distribuidas (config/tracing.py)
+
+Cubre:
+- Traza por petición con spans de etapas, consultas a la BD y render
+- Continuación de un traceparent entrante y muestreo
+- Propagación por metadatos gRPC con los spans del servidor de referencia
+- Spans devueltos por el servidor acotados en número y bytes (lotes grandes)
+- Continuación de la traza en el worker asíncrono
+- Exportador JSON-lines y comando show_trace
+"""
+
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from config.tracing import (
+    MAX_REMOTE_SPANS,
+    MAX_REMOTE_SPANS_BYTES,
+    InMemoryExporter,
+    breakdown,
+    load_spans,
+    memory_exporter,
+    parse_traceparent,
+    span,
+    start_trace,
+)
+from search_api.grpc_server import create_server
+from search_api.models import SearchJob
+from search_api.worker import SearchWorker
+from sequences_api.models import DNASequence
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+traced = override_settings(
+    TRACING=True,
+    TRACING_EXPORTER='memory',
+    TRACING_SAMPLE_RATE=1.0,
+    USE_GRPC_SEARCH=False,
+    SEARCH_EXECUTION_MODE='sync',
+    SEARCH_COALESCING=False,
+    SEARCH_CANCEL_POLL_SECONDS=0,
+)
+
+
+def _by_name(spans):
+    return {s['name']: s for s in spans}
+
+
+class TraceContextTests(SimpleTestCase):
+    """traceparent, anidado y exportación"""
+
+    def test_parse_traceparent(self):
+        self.assertEqual(parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01"), (TRACE_ID, PARENT_ID, True))
+        self.assertEqual(parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00")[2], False)
+        for value in (None, "", "garbage", f"01-{TRACE_ID}-{PARENT_ID}-01", f"00-{'0' * 32}-{PARENT_ID}-01"):
+            self.assertIsNone(parse_traceparent(value))
+
+    def test_nesting_and_errors(self):
+        exporter = InMemoryExporter()
+        with self.assertRaises(ValueError):
+            with start_trace('root', exporter=exporter) as root:
+                with span('child', size=3):
+                    pass
+                raise ValueError("boom")
+        spans = _by_name(exporter.spans)
+        self.assertEqual(spans['child']['parent_id'], root.span_id)
+        self.assertEqual(spans['child']['attributes'], {'size': 3})
+        self.assertEqual(spans['root']['status'], 'error')
+        self.assertIn('boom', spans['root']['attributes']['error'])
+
+    def test_span_without_trace_is_noop(self):
+        with span('orphan') as current:
+            self.assertIsNone(current)
+
+    @override_settings(TRACING_SAMPLE_RATE=0.0)
+    def test_sampling(self):
+        exporter = InMemoryExporter()
+        with start_trace('unsampled', exporter=exporter) as root:
+            self.assertIsNone(root)
+        # Un traceparent muestreado se respeta aunque la tasa sea 0
+        with start_trace('continued', f"00-{TRACE_ID}-{PARENT_ID}-01", exporter=exporter) as root:
+            self.assertEqual(root.trace_id, TRACE_ID)
+        self.assertEqual([s['name'] for s in exporter.spans], ['continued'])
+        self.assertEqual(exporter.spans[0]['parent_id'], PARENT_ID)
+
+
+@traced
+class RequestTracingTests(TestCase):
+    """Trazas de peticiones reales a la API"""
+
+    def setUp(self):
+        memory_exporter.clear()
+        self.sequence = DNASequence.objects.create(name="traced", sequence="ATGCGTAC" * 100)
+
+    def _search(self, **headers):
+        return self.client.post(
+            '/api/search/', json.dumps({'sequence_id': self.sequence.pk, 'pattern': 'ATG'}),
+            content_type='application/json', headers=headers,
+        )
+
+    def test_request_spans(self):
+        response = self._search()
+        self.assertEqual(response.status_code, 200)
+        trace_id = response['X-Trace-Id']
+        spans = memory_exporter.trace(trace_id)
+        names = _by_name(spans)
+
+        root = names['POST api/search/']
+        self.assertIsNone(root['parent_id'])
+        self.assertEqual(root['attributes']['http.status_code'], 200)
+        for stage in ('validate', 'sequence_fetch', 'job_create', 'engine', 'serialize', 'render'):
+            self.assertIn(stage, names)
+        self.assertEqual(names['render']['parent_id'], root['span_id'])
+
+        ids = {s['span_id'] for s in spans}
+        self.assertTrue(all(s['parent_id'] in ids for s in spans if s is not root))
+        db = [s for s in spans if s['name'] == 'db']
+        self.assertTrue(db)
+        self.assertTrue(any('INSERT INTO "search_jobs"' in s['attributes']['db.statement'] for s in db))
+        # Las consultas cuelgan de la etapa que las hizo
+        self.assertIn(names['sequence_fetch']['span_id'], {s['parent_id'] for s in db})
+        self.assertGreater(breakdown(spans)['db_ms'], 0)
+
+    def test_continues_incoming_trace(self):
+        response = self._search(traceparent=f"00-{TRACE_ID}-{PARENT_ID}-01")
+        self.assertEqual(response['X-Trace-Id'], TRACE_ID)
+        root = _by_name(memory_exporter.trace(TRACE_ID))['POST api/search/']
+        self.assertEqual(root['parent_id'], PARENT_ID)
+
+    def test_disabled(self):
+        with self.settings(TRACING=False):
+            response = self._search()
+        self.assertNotIn('X-Trace-Id', response)
+        self.assertEqual(memory_exporter.spans, [])
+
+    def test_async_job_continues_trace(self):
+        response = self.client.post(
+            '/api/search/', json.dumps({'sequence_id': self.sequence.pk, 'pattern': 'ATG', 'mode': 'async'}),
+            content_type='application/json',
+        )
+        trace_id = response['X-Trace-Id']
+        job = SearchJob.objects.get(pk=response.json()['job']['id'])
+        self.assertEqual(parse_traceparent(job.traceparent)[0], trace_id)
+
+        SearchWorker(concurrency=1).run_one()
+        names = _by_name(memory_exporter.trace(trace_id))
+        self.assertEqual(names['job_search']['kind'], 'consumer')
+        self.assertEqual(names['job_search']['parent_id'], parse_traceparent(job.traceparent)[1])
+        self.assertEqual(names['engine']['parent_id'], names['job_search']['span_id'])
+
+
+@traced
+class GrpcPropagationTests(TestCase):
+    """Contexto en los metadatos y spans del servidor de referencia"""
+
+    def setUp(self):
+        memory_exporter.clear()
+        self.server, self.port, _ = create_server("127.0.0.1", 0, max_workers=2)
+        self.addCleanup(self.server.stop, None)
+        self.sequence = DNASequence.objects.create(name="remote", sequence="ATGCGTAC" * 100)
+
+    def test_server_spans_join_trace(self):
+        with self.settings(USE_GRPC_SEARCH=True, GRPC_HOST="127.0.0.1", GRPC_PORT=str(self.port)):
+            response = self.client.post(
+                '/api/search/', json.dumps({'sequence_id': self.sequence.pk, 'pattern': 'ATG'}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.json()['job']['route'], 'grpc')
+        spans = memory_exporter.trace(response['X-Trace-Id'])
+        names = _by_name(spans)
+
+        client = names['grpc.client/Search']
+        server = names['DnaSearch/Search']
+        self.assertEqual(client['kind'], 'client')
+        self.assertEqual(client['attributes']['rpc.address'], f"127.0.0.1:{self.port}")
+        self.assertEqual((server['parent_id'], server['service']), (client['span_id'], 'dna-search'))
+        remote_engine = [s for s in spans if s['name'] == 'engine' and s['service'] == 'dna-search']
+        self.assertEqual(remote_engine[0]['parent_id'], server['span_id'])
+
+        split = breakdown(spans)
+        self.assertAlmostEqual(split['grpc_server_ms'], server['duration_ms'], places=3)
+        self.assertAlmostEqual(split['grpc_network_ms'], client['duration_ms'] - server['duration_ms'], places=2)
+
+    def test_batch_search(self):
+        from search_api.grpc_client import GrpcSearchClient
+
+        exporter = InMemoryExporter()
+        with start_trace('batch', exporter=exporter):
+            GrpcSearchClient("127.0.0.1", self.port).search_batch({'1': "ATGATG", '2': "CATG"}, ["ATG", "CA"])
+        names = [s['name'] for s in exporter.spans]
+        self.assertIn('DnaSearch/BatchSearch', names)
+        # Un motor por par, hijos de la llamada del servidor
+        self.assertEqual(names.count('engine'), 4)
+
+    def test_large_batch_spans_fit_in_metadata(self):
+        from search_api.services import run_batch_search
+
+        sequences = {i: "ATGCGTAC" * 20 + "A" * i for i in range(1, 51)}
+        patterns = ["ATG", "CGT", "TAC", "GCG", "ACA", "AAA", "GTA", "CAT", "TTT", "GGG"] * 2
+        patterns = [p + "A" * (i // 10) for i, p in enumerate(patterns)]  # 20 patrones distintos
+        exporter = InMemoryExporter()
+        with self.settings(USE_GRPC_SEARCH=True, GRPC_HOST="127.0.0.1", GRPC_PORT=str(self.port)):
+            with start_trace('batch', exporter=exporter):
+                results = run_batch_search(sequences, patterns)
+        # 1000 pares (SEARCH_BATCH_MAX_PAIRS) sin caer al motor local por los metadatos
+        self.assertEqual(len(results), 1000)
+        self.assertEqual({r['route'] for r in results}, {'grpc'})
+
+        remote = [s for s in exporter.spans if s['service'] == 'dna-search']
+        self.assertLessEqual(len(remote), MAX_REMOTE_SPANS)
+        self.assertLessEqual(len(json.dumps(remote, separators=(',', ':'))), MAX_REMOTE_SPANS_BYTES)
+        server = _by_name(remote)['DnaSearch/BatchSearch']
+        dropped = server['attributes']['dropped_spans']
+        kept_engines = sum(s['name'] == 'engine' for s in remote)
+        self.assertEqual(kept_engines + dropped['engine']['count'], 1000)
+        self.assertGreater(dropped['engine']['duration_ms'], 0)
+        ids = {s['span_id'] for s in remote}
+        self.assertTrue(all(s['parent_id'] in ids for s in remote if s is not server))
+
+    def test_untraced_call_has_no_server_spans(self):
+        from search_api.grpc_client import GrpcSearchClient
+
+        resp = GrpcSearchClient("127.0.0.1", self.port).search("ATGATG", "ATG")
+        self.assertEqual(resp.total_matches, 2)
+        self.assertEqual(memory_exporter.spans, [])
+
+
+@traced
+class JsonLinesExportTests(TestCase):
+    """Fichero de spans y comando show_trace"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.path = os.path.join(directory, 'traces.jsonl')
+
+    def test_file_and_command(self):
+        sequence = DNASequence.objects.create(name="file", sequence="ATGATG")
+        with self.settings(TRACING_EXPORTER='jsonl', TRACING_FILE=self.path):
+            response = self.client.post('/api/search/', json.dumps({'sequence_id': sequence.pk, 'pattern': 'ATG'}),
+                                        content_type='application/json')
+        spans = load_spans(self.path)
+        self.assertTrue(spans)
+        self.assertEqual({s['trace_id'] for s in spans}, {response['X-Trace-Id']})
+
+        out = io.StringIO()
+        call_command('show_trace', file=self.path, stdout=out)
+        output = out.getvalue()
+        self.assertIn(f"Traza {response['X-Trace-Id']}", output)
+        self.assertIn('POST api/search/ (django)', output)
+        self.assertIn('    engine (django)', output)
+        self.assertIn('db_ms:', output)
@@ -1,5 +1,6 @@
 #pragma once
 
+#include <functional>
 #include <string>
 #include <vector>
 
@@ -8,7 +9,12 @@ namespace dna {
 // KMP con soporte de solapamiento configurado por el caller (control en el loop externo).
 class KMPSearch {
 public:
-    static std::vector<size_t> Find(const std::string& text, const std::string& pattern, bool allow_overlapping);
+    // Cada kCancelCheckInterval caracteres se consulta `should_stop` (si se indica);
+    // si devuelve true la búsqueda termina y devuelve las posiciones encontradas hasta ese punto.
+    static constexpr size_t kCancelCheckInterval = 1 << 20;
+
+    static std::vector<size_t> Find(const std::string& text, const std::string& pattern, bool allow_overlapping,
+                                    const std::function<bool()>& should_stop = {});
 
 private:
     static std::vector<int> BuildLps(const std::string& pattern);
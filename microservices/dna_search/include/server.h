@@ -12,11 +12,17 @@ public:
                         const SearchRequest* request,
                         SearchResponse* response) override;
 
+    grpc::Status BatchSearch(grpc::ServerContext* context,
+                             const BatchSearchRequest* request,
+                             BatchSearchResponse* response) override;
+
 private:
-    void FillMatches(const std::string& sequence,
+    // Devuelve false si la llamada se canceló (cliente desconectado o plazo vencido) antes de terminar.
+    bool FillMatches(const std::string& sequence,
                      const std::string& pattern,
                      bool allow_overlapping,
-                     SearchResponse* response);
+                     SearchResponse* response,
+                     grpc::ServerContext* context);
 };
 
 }  // namespace dna
@@ -19,7 +19,8 @@ std::vector<int> KMPSearch::BuildLps(const std::string& pattern) {
     return lps;
 }
 
-std::vector<size_t> KMPSearch::Find(const std::string& text, const std::string& pattern, bool allow_overlapping) {
+std::vector<size_t> KMPSearch::Find(const std::string& text, const std::string& pattern, bool allow_overlapping,
+                                    const std::function<bool()>& should_stop) {
     std::vector<size_t> positions;
     if (pattern.empty() || text.empty() || pattern.size() > text.size()) {
         return positions;
@@ -28,7 +29,14 @@ std::vector<size_t> KMPSearch::Find(const std::string& text, const std::string&
     const auto lps = BuildLps(pattern);
     size_t i = 0;  // text index
     size_t j = 0;  // pattern index
+    size_t next_check = kCancelCheckInterval;
     while (i < text.size()) {
+        if (should_stop && i >= next_check) {
+            if (should_stop()) {
+                break;
+            }
+            next_check = i + kCancelCheckInterval;
+        }
         if (pattern[j] == text[i]) {
             i++;
             j++;
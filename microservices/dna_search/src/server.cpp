@@ -1,19 +1,132 @@
 #include "server.h"
 
+#include <algorithm>
+#include <atomic>
 #include <chrono>
+#include <cstdint>
+#include <random>
+#include <sstream>
 #include <string>
+#include <thread>
 #include <vector>
 
 #include "algorithms/kmp.h"
 
 namespace dna {
 
-grpc::Status DnaSearchServiceImpl::Search(grpc::ServerContext* /*context*/,
+namespace {
+
+// Contexto de traza W3C (`traceparent`) que envía el backend Django en los metadatos.
+// Si llega muestreado, los spans del servidor vuelven en los metadatos finales
+// `x-trace-spans` (JSON) y el cliente los añade a su traza (config/tracing.py).
+struct TraceContext {
+    std::string trace_id;
+    std::string parent_id;
+    bool sampled = false;
+};
+
+struct SpanRecord {
+    std::string span_id;
+    std::string parent_id;
+    std::string name;
+    std::string kind;
+    double start_s;
+    double duration_ms;
+};
+
+bool IsHex(const std::string& value) {
+    return !value.empty() && value.find_first_not_of("0123456789abcdef") == std::string::npos;
+}
+
+TraceContext ParseTraceparent(const grpc::ServerContext* context) {
+    TraceContext trace;
+    if (context == nullptr) {
+        return trace;
+    }
+    const auto& metadata = context->client_metadata();
+    const auto it = metadata.find("traceparent");
+    if (it == metadata.end()) {
+        return trace;
+    }
+    // 00-<trace_id 32 hex>-<parent_id 16 hex>-<flags 2 hex>
+    const std::string value(it->second.data(), it->second.size());
+    if (value.size() != 55 || value.compare(0, 3, "00-") != 0 || value[35] != '-' || value[52] != '-') {
+        return trace;
+    }
+    const std::string trace_id = value.substr(3, 32);
+    const std::string parent_id = value.substr(36, 16);
+    const std::string flags = value.substr(53, 2);
+    if (!IsHex(trace_id) || !IsHex(parent_id) || !IsHex(flags)) {
+        return trace;
+    }
+    trace.trace_id = trace_id;
+    trace.parent_id = parent_id;
+    trace.sampled = (std::stoi(flags, nullptr, 16) & 1) != 0;
+    return trace;
+}
+
+std::string NewSpanId() {
+    thread_local std::mt19937_64 rng{std::random_device{}()};
+    std::ostringstream out;
+    out << std::hex;
+    out.width(16);
+    out.fill('0');
+    out << rng();
+    return out.str();
+}
+
+double EpochSeconds(std::chrono::system_clock::time_point when) {
+    return std::chrono::duration_cast<std::chrono::microseconds>(when.time_since_epoch()).count() / 1e6;
+}
+
+double ElapsedMs(std::chrono::steady_clock::time_point start, std::chrono::steady_clock::time_point end) {
+    return std::chrono::duration_cast<std::chrono::microseconds>(end - start).count() / 1000.0;
+}
+
+std::string SpansJson(const TraceContext& trace, const std::vector<SpanRecord>& spans) {
+    std::ostringstream out;
+    out.precision(17);
+    out << "[";
+    for (size_t i = 0; i < spans.size(); ++i) {
+        const auto& span = spans[i];
+        out << (i ? "," : "") << "{\"trace_id\":\"" << trace.trace_id << "\",\"span_id\":\"" << span.span_id
+            << "\",\"parent_id\":\"" << span.parent_id << "\",\"name\":\"" << span.name << "\",\"kind\":\""
+            << span.kind << "\",\"service\":\"dna-search\",\"start\":" << span.start_s
+            << ",\"duration_ms\":" << span.duration_ms << ",\"status\":\"ok\",\"attributes\":{}}";
+    }
+    out << "]";
+    return out.str();
+}
+
+// Span del servidor (hijo del span de cliente) y, opcionalmente, el del motor
+void AttachSpans(grpc::ServerContext* context, const TraceContext& trace, const std::string& name,
+                 std::chrono::system_clock::time_point wall_start, std::chrono::steady_clock::time_point start,
+                 std::chrono::steady_clock::time_point engine_start, std::chrono::steady_clock::time_point engine_end) {
+    if (context == nullptr || !trace.sampled) {
+        return;
+    }
+    const auto end = std::chrono::steady_clock::now();
+    const std::string server_id = NewSpanId();
+    const auto engine_wall = wall_start + std::chrono::duration_cast<std::chrono::system_clock::duration>(
+        engine_start - start);
+    const std::vector<SpanRecord> spans = {
+        {server_id, trace.parent_id, name, "server", EpochSeconds(wall_start), ElapsedMs(start, end)},
+        {NewSpanId(), server_id, "engine", "internal", EpochSeconds(engine_wall), ElapsedMs(engine_start, engine_end)},
+    };
+    context->AddTrailingMetadata("x-trace-spans", SpansJson(trace, spans));
+}
+
+}  // namespace
+
+grpc::Status DnaSearchServiceImpl::Search(grpc::ServerContext* context,
                                           const SearchRequest* request,
                                           SearchResponse* response) {
     if (!request || !response) {
         return grpc::Status(grpc::StatusCode::INVALID_ARGUMENT, "Invalid request");
     }
+    const auto wall_start = std::chrono::system_clock::now();
+    const auto call_start = std::chrono::steady_clock::now();
+    const TraceContext trace = ParseTraceparent(context);
 
     const std::string sequence = request->sequence();
     const std::string pattern = request->pattern();
@@ -24,7 +137,10 @@ grpc::Status DnaSearchServiceImpl::Search(grpc::ServerContext* /*context*/,
     }
 
     const auto start = std::chrono::steady_clock::now();
-    FillMatches(sequence, pattern, allow_overlapping, response);
+    if (!FillMatches(sequence, pattern, allow_overlapping, response, context)) {
+        response->Clear();
+        return grpc::Status(grpc::StatusCode::CANCELLED, "Search cancelled");
+    }
     const auto end = std::chrono::steady_clock::now();
     const auto elapsed_ms = std::chrono::duration_cast<std::chrono::microseconds>(end - start).count() / 1000.0;
 
@@ -32,14 +148,100 @@ grpc::Status DnaSearchServiceImpl::Search(grpc::ServerContext* /*context*/,
     response->set_search_time_ms(elapsed_ms);
     response->set_algorithm_used("KMP");
 
+    AttachSpans(context, trace, "DnaSearch/Search", wall_start, call_start, start, end);
+    return grpc::Status::OK;
+}
+
+grpc::Status DnaSearchServiceImpl::BatchSearch(grpc::ServerContext* context,
+                                               const BatchSearchRequest* request,
+                                               BatchSearchResponse* response) {
+    if (!request || !response) {
+        return grpc::Status(grpc::StatusCode::INVALID_ARGUMENT, "Invalid request");
+    }
+
+    const auto wall_start = std::chrono::system_clock::now();
+    const auto start = std::chrono::steady_clock::now();
+    const TraceContext trace = ParseTraceparent(context);
+    const bool allow_overlapping = request->allow_overlapping();
+
+    // Pares (secuencia, patrón) en orden secuencia-mayor
+    std::vector<std::pair<int, int>> pairs;
+    pairs.reserve(static_cast<size_t>(request->sequences_size()) * request->patterns_size());
+    for (int s = 0; s < request->sequences_size(); ++s) {
+        for (int p = 0; p < request->patterns_size(); ++p) {
+            pairs.emplace_back(s, p);
+        }
+    }
+
+    std::vector<SearchResponse> partials(pairs.size());
+    std::vector<std::string> errors(pairs.size());
+    std::atomic<size_t> next{0};
+    std::atomic<bool> cancelled{false};
+
+    auto worker = [&]() {
+        for (size_t i = next++; i < pairs.size() && !cancelled; i = next++) {
+            const auto& sequence = request->sequences(pairs[i].first).sequence();
+            const auto& pattern = request->patterns(pairs[i].second);
+            if (pattern.empty() || sequence.empty()) {
+                errors[i] = "Sequence and pattern cannot be empty";
+                continue;
+            }
+            const auto pair_start = std::chrono::steady_clock::now();
+            if (!FillMatches(sequence, pattern, allow_overlapping, &partials[i], context)) {
+                cancelled = true;
+                break;
+            }
+            const auto pair_end = std::chrono::steady_clock::now();
+            partials[i].set_total_matches(partials[i].matches_size());
+            partials[i].set_search_time_ms(
+                std::chrono::duration_cast<std::chrono::microseconds>(pair_end - pair_start).count() / 1000.0);
+            partials[i].set_algorithm_used("KMP");
+        }
+    };
+
+    const size_t hw = std::max(1u, std::thread::hardware_concurrency());
+    const size_t n_threads = std::min(hw, pairs.size());
+    std::vector<std::thread> threads;
+    for (size_t t = 1; t < n_threads; ++t) {
+        threads.emplace_back(worker);
+    }
+    worker();
+    for (auto& th : threads) {
+        th.join();
+    }
+    const auto engine_end = std::chrono::steady_clock::now();
+    if (cancelled) {
+        return grpc::Status(grpc::StatusCode::CANCELLED, "Batch search cancelled");
+    }
+
+    for (size_t i = 0; i < pairs.size(); ++i) {
+        auto* result = response->add_results();
+        result->set_sequence_id(request->sequences(pairs[i].first).id());
+        result->set_pattern(request->patterns(pairs[i].second));
+        if (!errors[i].empty()) {
+            result->set_error(errors[i]);
+        } else {
+            result->mutable_response()->Swap(&partials[i]);
+        }
+    }
+
+    const auto end = std::chrono::steady_clock::now();
+    response->set_total_time_ms(std::chrono::duration_cast<std::chrono::microseconds>(end - start).count() / 1000.0);
+    AttachSpans(context, trace, "DnaSearch/BatchSearch", wall_start, start, start, engine_end);
     return grpc::Status::OK;
 }
 
-void DnaSearchServiceImpl::FillMatches(const std::string& sequence,
+bool DnaSearchServiceImpl::FillMatches(const std::string& sequence,
                                        const std::string& pattern,
                                        bool allow_overlapping,
-                                       SearchResponse* response) {
-    const auto positions = KMPSearch::Find(sequence, pattern, allow_overlapping);
+                                       SearchResponse* response,
+                                       grpc::ServerContext* context) {
+    // Cancelación cooperativa: el cliente canceló la llamada o venció su plazo
+    const auto should_stop = [context]() { return context != nullptr && context->IsCancelled(); };
+    const auto positions = KMPSearch::Find(sequence, pattern, allow_overlapping, should_stop);
+    if (should_stop()) {
+        return false;
+    }
     const int context_window = 10;
 
     for (const auto pos : positions) {
@@ -57,6 +259,7 @@ void DnaSearchServiceImpl::FillMatches(const std::string& sequence,
         match->set_context_before(before);
         match->set_context_after(after);
     }
+    return true;
 }
 
 }  // namespace dna